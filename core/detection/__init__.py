@@ -20,6 +20,7 @@ from core.detection.core import (
     prepare_logic,
     filter_rear_boxes_if_multilayer,
     remove_fake_top_layer,
+    cluster_box_array,
     cluster_layers,
     cluster_layers_with_roi,
     cluster_layers_with_box_roi,
@@ -35,6 +36,8 @@ from core.detection.core import (
 from core.detection.processors import (
     StackProcessorFactory,
     count_boxes,  # 算法统一入口：count_boxes(image_path, pile_id)
+    count_boxes_batch,  # 批量计数：count_boxes_batch([(image_path, pile_id, depth), ...])
+    count_boxes_traced,  # 计数并返回各阶段追踪结果：{"total", "trace"}
 )
 
 # 可视化模块
@@ -62,6 +65,7 @@ __all__ = [
     "prepare_logic",
     "filter_rear_boxes_if_multilayer",
     "remove_fake_top_layer",
+    "cluster_box_array",
     "cluster_layers",
     "cluster_layers_with_roi",
     "cluster_layers_with_box_roi",
@@ -75,6 +79,8 @@ __all__ = [
     # 堆垛处理模块（推荐使用）
     "StackProcessorFactory",
     "count_boxes",  # 算法统一入口：count_boxes(image_path, pile_id)
+    "count_boxes_batch",
+    "count_boxes_traced",
     
     # 可视化模块
     "prepare_scene",
@@ -6,6 +6,8 @@
 """
 from .scene_prepare import prepare_logic
 from .layer_clustering import (
+    boxes_to_array,
+    cluster_box_array,
     cluster_layers,
     cluster_layers_with_roi,
     cluster_layers_with_box_roi,
@@ -20,6 +22,8 @@ from .layer_filter import filter_rear_boxes_if_multilayer, remove_fake_top_layer
 
 __all__ = [
     "prepare_logic",
+    "boxes_to_array",
+    "cluster_box_array",
     "cluster_layers",
     "cluster_layers_with_roi",
     "cluster_layers_with_box_roi",
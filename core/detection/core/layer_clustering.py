@@ -2,10 +2,92 @@
 
 import cv2
 import numpy as np
+from functools import lru_cache
 from typing import Dict, List, Union
 from pathlib import Path
 
 from core.detection.utils.path_utils import get_output_path
+from core.detection.utils.image_context import load_image
+
+
+# 聚类结果缓存的条目数（同一组检测框的聚类结果在计数流程和可视化之间复用）
+CLUSTER_CACHE_SIZE = 32
+
+
+def boxes_to_array(boxes: List[Dict]) -> np.ndarray:
+    """box 字典列表转为 (N, 4) 数组，每行为 [x1, y1, x2, y2]"""
+    if not boxes:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.array([(b["x1"], b["y1"], b["x2"], b["y2"]) for b in boxes], dtype=np.float64)
+
+
+def cluster_box_array(coords: np.ndarray, gap_ratio: float = 0.6) -> Dict:
+    """
+    分层聚类核心：按 box 中心 y 坐标排序，相邻中心的间距超过 平均框高 * gap_ratio 时分层
+
+    结果按 (框坐标, gap_ratio) 缓存，同一组检测框重复聚类（如可视化）时直接复用；
+    返回的数组为只读，调用方不应修改
+
+    :param coords: (N, 4) 数组，每行为 [x1, y1, x2, y2]
+    :param gap_ratio: 分层阈值（相对平均框高）
+    :return: {
+        "layer_count": 层数,
+        "avg_h": 平均框高,
+        "labels": 每个box所属层（0为最上层，与输入顺序对应）,
+        "members": 每层的box下标（按中心y从上到下）,
+        "avg_y": 每层中心y的均值,
+        "y_top": 每层box的最小y1,
+        "y_bottom": 每层box的最大y2
+    }
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 4)
+    return _cluster_box_array_cached(coords.tobytes(), float(gap_ratio))
+
+
+@lru_cache(maxsize=CLUSTER_CACHE_SIZE)
+def _cluster_box_array_cached(key: bytes, gap_ratio: float) -> Dict:
+    coords = np.frombuffer(key, dtype=np.float64).reshape(-1, 4)
+    n = len(coords)
+    if n == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {"layer_count": 0, "avg_h": 0.0, "labels": np.empty(0, dtype=np.intp), "members": (),
+                "avg_y": empty, "y_top": empty, "y_bottom": empty}
+
+    y_center = 0.5 * (coords[:, 1] + coords[:, 3])
+    order = np.argsort(y_center, kind="stable")  # 从上到下排序（中心相同时保持输入顺序）
+    sorted_y = y_center[order]
+    avg_h = float(np.abs(coords[order, 3] - coords[order, 1]).mean())
+
+    # 间距超过阈值的位置即新一层的起点
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_y) > avg_h * gap_ratio) + 1))
+    counts = np.diff(np.append(starts, n))
+    labels = np.empty(n, dtype=np.intp)
+    labels[order] = np.repeat(np.arange(len(starts)), counts)
+
+    result = {
+        "layer_count": len(starts),
+        "avg_h": avg_h,
+        "labels": labels,
+        "members": tuple(tuple(m.tolist()) for m in np.split(order, starts[1:])),
+        "avg_y": np.add.reduceat(sorted_y, starts) / counts,
+        "y_top": np.minimum.reduceat(coords[order, 1], starts),
+        "y_bottom": np.maximum.reduceat(coords[order, 3], starts),
+    }
+    for value in result.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return result
+
+
+def _layer_roi(clusters: Dict, layer: int, pile_roi: Dict[str, float], padding_ratio: float) -> Dict:
+    """层ROI：层内box的上下边界向外扩展 平均框高 * padding_ratio，并限制在pile范围内"""
+    padding = clusters["avg_h"] * padding_ratio
+    y_top = max(pile_roi["y1"], clusters["y_top"][layer] - padding)
+    y_bottom = min(pile_roi["y2"], clusters["y_bottom"][layer] + padding)
+    return {
+        "y_top": round(float(y_top), 2),
+        "y_bottom": round(float(y_bottom), 2)
+    }
 
 
 def cluster_layers(boxes: List[Dict], pile_roi: Dict[str, float], gap_ratio: float = 0.6) -> Dict:
@@ -15,34 +97,13 @@ def cluster_layers(boxes: List[Dict], pile_roi: Dict[str, float], gap_ratio: flo
     if not boxes:
         return {"layer_count": 0, "layers": []}
 
-    centers = []
-    for b in boxes:
-        yc = 0.5 * (b["y1"] + b["y2"])
-        h = abs(b["y2"] - b["y1"])
-        centers.append((yc, h, b))
-    centers.sort(key=lambda x: x[0])  # 从上到下排序
-
-    avg_h = np.mean([c[1] for c in centers])
-    threshold = avg_h * gap_ratio
-
-    layers, current = [], [centers[0]]
-    for i in range(1, len(centers)):
-        gap = centers[i][0] - centers[i-1][0]
-        if gap > threshold:
-            layers.append(current)
-            current = [centers[i]]
-        else:
-            current.append(centers[i])
-    layers.append(current)
-
+    clusters = cluster_box_array(boxes_to_array(boxes), gap_ratio)
     layer_info = []
-    for idx, layer in enumerate(layers, start=1):
-        boxes_in_layer = [c[2] for c in layer]
-        avg_y = np.mean([c[0] for c in layer])
+    for idx, members in enumerate(clusters["members"], start=1):
         layer_info.append({
             "index": idx,
-            "avg_y": round(float(avg_y), 2),
-            "boxes": boxes_in_layer
+            "avg_y": round(float(clusters["avg_y"][idx - 1]), 2),
+            "boxes": [boxes[i] for i in members]
         })
 
     return {
@@ -63,43 +124,14 @@ def cluster_layers_with_roi(
     if not boxes:
         return {"layer_count": 0, "layers": []}
 
-    centers = []
-    for b in boxes:
-        yc = 0.5 * (b["y1"] + b["y2"])
-        h = abs(b["y2"] - b["y1"])
-        centers.append((yc, h, b))
-    centers.sort(key=lambda x: x[0])
-
-    avg_h = np.mean([c[1] for c in centers])
-    threshold = avg_h * gap_ratio
-
-    layers, current = [], [centers[0]]
-    for i in range(1, len(centers)):
-        gap = centers[i][0] - centers[i-1][0]
-        if gap > threshold:
-            layers.append(current)
-            current = [centers[i]]
-        else:
-            current.append(centers[i])
-    layers.append(current)
-
+    clusters = cluster_box_array(boxes_to_array(boxes), gap_ratio)
     layer_info = []
-    for idx, layer in enumerate(layers, start=1):
-        boxes_in_layer = [c[2] for c in layer]
-        avg_y = np.mean([c[0] for c in layer])
-        y_tops = [b["y1"] for b in boxes_in_layer]
-        y_bottoms = [b["y2"] for b in boxes_in_layer]
-        y_top = max(pile_roi["y1"], min(y_tops) - avg_h * padding_ratio)
-        y_bottom = min(pile_roi["y2"], max(y_bottoms) + avg_h * padding_ratio)
-
+    for idx, members in enumerate(clusters["members"], start=1):
         layer_info.append({
             "index": idx,
-            "avg_y": round(float(avg_y), 2),
-            "roi": {
-                "y_top": round(float(y_top), 2),
-                "y_bottom": round(float(y_bottom), 2)
-            },
-            "boxes": boxes_in_layer
+            "avg_y": round(float(clusters["avg_y"][idx - 1]), 2),
+            "roi": _layer_roi(clusters, idx - 1, pile_roi, padding_ratio),
+            "boxes": [boxes[i] for i in members]
         })
 
     return {
@@ -120,55 +152,28 @@ def cluster_layers_with_box_roi(
     if not boxes:
         return {"layer_count": 0, "layers": []}
 
-    centers = []
-    for b in boxes:
-        yc = 0.5 * (b["y1"] + b["y2"])
-        h = abs(b["y2"] - b["y1"])
-        centers.append((yc, h, b))
-    centers.sort(key=lambda x: x[0])
-
-    avg_h = np.mean([c[1] for c in centers])
-    threshold = avg_h * gap_ratio
-
-    # 聚类逻辑
-    layers, current = [], [centers[0]]
-    for i in range(1, len(centers)):
-        gap = centers[i][0] - centers[i-1][0]
-        if gap > threshold:
-            layers.append(current)
-            current = [centers[i]]
-        else:
-            current.append(centers[i])
-    layers.append(current)
+    coords = boxes_to_array(boxes)
+    clusters = cluster_box_array(coords, gap_ratio)
+    rows = coords.tolist()
+    areas = ((coords[:, 2] - coords[:, 0]) * (coords[:, 3] - coords[:, 1])).tolist()
 
     # 输出层结构
     layer_info = []
-    for idx, layer in enumerate(layers, start=1):
+    for idx, members in enumerate(clusters["members"], start=1):
         boxes_in_layer = []
-        for j, c in enumerate(layer, start=1):
-            b = c[2]
-            x1, y1, x2, y2 = map(float, [b["x1"], b["y1"], b["x2"], b["y2"]])
-            area = (x2 - x1) * (y2 - y1)
+        for j, i in enumerate(members, start=1):
+            x1, y1, x2, y2 = rows[i]
             boxes_in_layer.append({
                 "id": j,
                 "roi": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
-                "conf": round(float(b["conf"]), 4),
-                "area": round(area, 2)
+                "conf": round(float(boxes[i]["conf"]), 4),
+                "area": round(areas[i], 2)
             })
 
-        avg_y = np.mean([c[0] for c in layer])
-        y_tops = [b["y1"] for b in [c[2] for c in layer]]
-        y_bottoms = [b["y2"] for b in [c[2] for c in layer]]
-        y_top = max(pile_roi["y1"], min(y_tops) - avg_h * padding_ratio)
-        y_bottom = min(pile_roi["y2"], max(y_bottoms) + avg_h * padding_ratio)
-
         layer_info.append({
             "index": idx,
-            "avg_y": round(float(avg_y), 2),
-            "roi": {
-                "y_top": round(float(y_top), 2),
-                "y_bottom": round(float(y_bottom), 2)
-            },
+            "avg_y": round(float(clusters["avg_y"][idx - 1]), 2),
+            "roi": _layer_roi(clusters, idx - 1, pile_roi, padding_ratio),
             "boxes": boxes_in_layer
         })
 
@@ -179,7 +184,7 @@ def cluster_layers_with_box_roi(
 
 
 def draw_layers_on_image(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     pile_roi: Dict[str, float],
     layer_result: Dict,
     save_path: str = "annotated_layers.jpg",
@@ -189,7 +194,7 @@ def draw_layers_on_image(
     """
     根据 layer_core 的结果在图像上绘制分层信息。
     """
-    img = cv2.imread(image_path)
+    img = load_image(image_path)
     if img is None:
         raise FileNotFoundError(f"未找到图像: {image_path}")
 
@@ -227,7 +232,7 @@ def draw_layers_on_image(
 
 
 def draw_layers_with_roi(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     pile_roi: Dict[str, float],
     layer_result: Dict,
     save_path: str = "annotated_layers_roi.jpg",
@@ -237,7 +242,7 @@ def draw_layers_with_roi(
     """
     可视化：绘制层中心线 + 层ROI矩形 + 层号文字
     """
-    img = cv2.imread(image_path)
+    img = load_image(image_path)
     if img is None:
         raise FileNotFoundError(f"未找到图像: {image_path}")
 
@@ -287,7 +292,7 @@ def draw_layers_with_roi(
 
 
 def draw_layers_with_box_roi(
-    img_path: str,
+    img_path: Union[str, np.ndarray],
     pile_roi: Dict[str, float],
     layer_result: Dict,
     save_path: str = "annotated_layers_green.jpg",
@@ -303,7 +308,7 @@ def draw_layers_with_box_roi(
     分层+Box可视化：
     层ROI使用绿色半透明背景，Box使用粗边框
     """
-    img = cv2.imread(img_path)
+    img = load_image(img_path)
     if img is None:
         raise FileNotFoundError(f"未找到图像: {img_path}")
 
@@ -397,7 +402,7 @@ def draw_layers_with_box_roi(
 
 
 def visualize_layers(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     boxes: list,
     pile_roi: dict,
     save_path: str = "annotated_layers.jpg",
@@ -422,7 +427,7 @@ def visualize_layers(
 
 
 def visualize_layers_with_roi(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     boxes: list,
     pile_roi: dict,
     save_path: str = "annotated_layers_roi.jpg",
@@ -448,7 +453,7 @@ def visualize_layers_with_roi(
 
 
 def visualize_layers_with_box_roi(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     boxes: list,
     pile_roi: dict,
     save_path: str = "annotated_layers_boxes.jpg",
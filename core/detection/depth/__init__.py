@@ -2,5 +2,6 @@
 
 from .depth_calculator import DepthCalculator
 from .depth_processor import DepthProcessor
+from .stereo_engine import StereoDepthEngine, configure_stereo_engine, get_stereo_engine
 
-__all__ = ['DepthCalculator', 'DepthProcessor']
+__all__ = ['DepthCalculator', 'DepthProcessor', 'StereoDepthEngine', 'configure_stereo_engine', 'get_stereo_engine']
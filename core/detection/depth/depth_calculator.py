@@ -1,4 +1,11 @@
-"""深度计算模块：从立体图像计算深度图"""
+"""
+深度计算模块：从立体图像计算深度图
+
+数组接口（内存中串联，不读写文件）:
+    split_stereo_pair → compute_disparity → disparity_to_depth / colorize，或 compute_depth 一步完成
+文件接口（兼容旧调用）:
+    generate_disparity_map / process_stereo_image / save_depth_cache 等
+"""
 
 import cv2
 import numpy as np
@@ -7,6 +14,10 @@ from pathlib import Path
 from typing import Optional, Tuple
 from PIL import Image
 
+from core.detection.depth.stereo_engine import StereoDepthEngine, get_stereo_engine
+from core.detection.utils.artifact_sink import ARTIFACT_DEBUG, ARTIFACT_REQUIRED, ArtifactSink
+from core.detection.utils.tracer import trace_stage
+
 
 class DepthCalculator:
     """深度计算器：从立体图像计算深度图"""
@@ -14,17 +25,48 @@ class DepthCalculator:
     def __init__(self, 
                  focal_length_px: float = 11000.0,
                  baseline_mm: float = 60.0,
-                 enable_debug: bool = True):
+                 enable_debug: bool = True,
+                 stereo_engine: Optional[StereoDepthEngine] = None,
+                 save_debug_artifacts: bool = False,
+                 artifact_sink: Optional[ArtifactSink] = None):
         """
         初始化深度计算器
         
         :param focal_length_px: 焦距（像素）
         :param baseline_mm: 基线长度（毫米）
         :param enable_debug: 是否启用调试输出
+        :param stereo_engine: 立体匹配引擎（可选，默认使用 get_stereo_engine() 的共享引擎）
+        :param save_debug_artifacts: 是否保存中间调试文件（四个象限分割图、原始视差 disparity.tiff）
+        :param artifact_sink: 后台写盘器（可选，提供时视差可视化图在后台着色写盘；默认同步写盘）
         """
         self.focal_length_px = focal_length_px
         self.baseline_mm = baseline_mm
         self.enable_debug = enable_debug
+        self._stereo_engine = stereo_engine
+        self.save_debug_artifacts = save_debug_artifacts
+        self.artifact_sink = artifact_sink
+
+    @property
+    def stereo_engine(self) -> StereoDepthEngine:
+        """立体匹配引擎（未指定时每次获取共享引擎，配置变化后自动使用新引擎）"""
+        return self._stereo_engine or get_stereo_engine()
+
+    @staticmethod
+    def rotated_roi_to_source(roi: Tuple[float, float, float, float],
+                              width: int, height: int) -> Tuple[int, int, int, int]:
+        """
+        将旋转后（逆时针90度）坐标系中的归一化区域换算为未旋转左图的像素区域
+
+        旋转后的归一化坐标 (u, v) 对应原图 (x, y) = ((1 - v) * width, u * height)
+
+        :param roi: 旋转后坐标系中的归一化区域 (u1, v1, u2, v2)，与旋转后RGB图的归一化坐标一致
+        :param width: 未旋转左图宽度
+        :param height: 未旋转左图高度
+        :return: 左图像素区域 (x1, y1, x2, y2)
+        """
+        u1, v1, u2, v2 = (min(1.0, max(0.0, float(v))) for v in roi)
+        return (int(np.floor((1.0 - v2) * width)), int(np.floor(u1 * height)),
+                int(np.ceil((1.0 - v1) * width)), int(np.ceil(u2 * height)))
     
     def rotate_image(self, image_path: str, rotation_angle: int = 90,
                      output_path: Optional[str] = None,
@@ -134,11 +176,148 @@ class DepthCalculator:
             if self.enable_debug:
                 print(f"分割错误: {str(e)}")
             raise
+
+    @staticmethod
+    def split_stereo_pair(image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        从拼接图中取左上、右上象限作为左右图（numpy视图，不复制、不编码）
+
+        :param image: 拼接图数组（四个象限）
+        :return: (左图, 右图)，尺寸一致
+        """
+        height, width = image.shape[:2]
+        if width < 2 or height < 2:
+            raise ValueError(f"图片尺寸过小 ({width}x{height})，无法分割")
+        mid_x, mid_y = width // 2, height // 2
+        return image[:mid_y, :mid_x], image[:mid_y, mid_x:mid_x * 2]
+
+    def _save_quadrants(self, image: np.ndarray, output_dir: str, base_name: str) -> list:
+        """保存四个象限（调试用，PNG无损，与立体匹配的输入一致）"""
+        os.makedirs(output_dir, exist_ok=True)
+        height, width = image.shape[:2]
+        mid_x, mid_y = width // 2, height // 2
+        quadrants = [
+            image[:mid_y, :mid_x],      # 左上
+            image[:mid_y, mid_x:],      # 右上
+            image[mid_y:, :mid_x],      # 左下
+            image[mid_y:, mid_x:]       # 右下
+        ]
+        quadrant_paths = []
+        for i, quadrant in enumerate(quadrants, start=1):
+            output_path = os.path.join(output_dir, f"{base_name}_{i}.png")
+            cv2.imwrite(output_path, quadrant)
+            quadrant_paths.append(output_path)
+        return quadrant_paths
+    
+    # ==================== 数组接口（内存中串联，不读写文件） ====================
+    
+    def compute_disparity(self, left: np.ndarray, right: np.ndarray,
+                          roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        计算视差图（未旋转，与左图同一坐标系）
+        
+        :param left: 左图（灰度或BGR）
+        :param right: 右图（灰度或BGR，尺寸与左图不一致时两者缩放到共同的最小尺寸）
+        :param roi: 只计算该区域 (x1, y1, x2, y2)（左图像素坐标，可选），区域外为无效视差
+        :return: 视差图（float32，像素；无法匹配的像素为 INVALID_DISPARITY）
+        """
+        if left.ndim == 3:
+            left = cv2.cvtColor(left, cv2.COLOR_BGR2GRAY)
+        if right.ndim == 3:
+            right = cv2.cvtColor(right, cv2.COLOR_BGR2GRAY)
+        
+        # 确保图像尺寸一致
+        if left.shape != right.shape:
+            if self.enable_debug:
+                print("左右图像尺寸不一致，调整为一致的尺寸...")
+            new_height = min(left.shape[0], right.shape[0])
+            new_width = min(left.shape[1], right.shape[1])
+            left = cv2.resize(left, (new_width, new_height))
+            right = cv2.resize(right, (new_width, new_height))
+            if self.enable_debug:
+                print(f"调整后尺寸: {new_width}x{new_height}")
+        
+        # 使用缓存的立体匹配引擎计算视差图
+        engine = self.stereo_engine
+        if self.enable_debug:
+            print(f"实际处理尺寸: {left.shape[1]}x{left.shape[0]}")
+            print(f"使用立体匹配引擎计算视差图: {engine.config()}")
+        return engine.compute(left, right, roi=roi)
+    
+    def disparity_to_depth(self, disparity: np.ndarray) -> np.ndarray:
+        """
+        视差转深度（毫米单位）
+        
+        :param disparity: 视差数据
+        :return: 深度图（毫米）
+        """
+        # 避免除以零错误
+        disparity_img = np.copy(disparity)
+        disparity_img[disparity_img <= 0] = 0.0001
+        
+        # 计算深度
+        depth = (self.focal_length_px * self.baseline_mm) / disparity_img
+        
+        # 将过大值和无效值设为零
+        depth[np.isinf(depth)] = 0
+        depth[np.isnan(depth)] = 0
+        
+        return depth
+    
+    @staticmethod
+    def colorize(disparity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        视差可视化
+        
+        :param disparity: 视差数据
+        :return: (归一化的8位灰度图, JET 彩色图)
+        """
+        disparity_visual = cv2.normalize(
+            disparity, None, alpha=0, beta=255,
+            norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U
+        )
+        return disparity_visual, cv2.applyColorMap(disparity_visual, cv2.COLORMAP_JET)
+    
+    def compute_depth(self, image: np.ndarray,
+                      roi: Optional[Tuple[float, float, float, float]] = None,
+                      rotate_input: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        从双目拼接图计算深度矩阵：分割 → 视差 → 旋转90度（逆时针）→ 深度，全部在内存中完成
+        
+        :param image: 拼接图数组（灰度或BGR，左上象限为左图、右上象限为右图）
+        :param roi: 只计算该区域（旋转后坐标系中的归一化区域 (u1, v1, u2, v2)，可选；区域外为无效视差）
+        :param rotate_input: 是否先将拼接图逆时针旋转90度
+        :return: (深度矩阵（毫米，旋转后坐标系）, 旋转后的视差数据)
+        """
+        if rotate_input:
+            image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        left, right = self.split_stereo_pair(image)
+        
+        source_roi = None
+        if roi is not None:
+            source_roi = self.rotated_roi_to_source(roi, left.shape[1], left.shape[0])
+            if self.enable_debug:
+                print(f"只计算区域视差: 旋转后归一化区域={tuple(round(v, 3) for v in roi)}, 左图像素区域={source_roi}")
+        with trace_stage("sgbm"):
+            disparity = self.compute_disparity(left, right, roi=source_roi)
+        
+        # 旋转视差数据90度（与旋转后的RGB图坐标系一致）
+        disparity_rotated = cv2.rotate(disparity, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        if self.enable_debug:
+            print(f"原始视差图尺寸: {disparity.shape[1]}x{disparity.shape[0]}")
+            print(f"旋转后视差图尺寸: {disparity_rotated.shape[1]}x{disparity_rotated.shape[0]}")
+        
+        with trace_stage("depth_convert"):
+            depth = self.disparity_to_depth(disparity_rotated)
+        return depth, disparity_rotated
+    
+    # ==================== 文件接口（兼容旧调用） ====================
     
     def generate_disparity_map(self, left_path: str, right_path: str, 
                               output_dir: str = "disparity_results",
                               debug_output_dir: Optional[str] = None,
-                              original_image_dir: Optional[str] = None) -> Tuple[str, np.ndarray, Optional[str]]:
+                              original_image_dir: Optional[str] = None,
+                              roi: Optional[Tuple[float, float, float, float]] = None) -> Tuple[str, np.ndarray, Optional[str]]:
         """
         生成视差图及可视化，并旋转视差数据90度（顺时针）
         
@@ -147,6 +326,7 @@ class DepthCalculator:
         :param output_dir: 输出目录（用于保存旋转后的视差数据）
         :param debug_output_dir: 调试输出目录（可选，用于保存可视化图像）
         :param original_image_dir: 原图目录（可选，用于在非debug模式下保存depth_color.jpg）
+        :param roi: 只计算该区域（旋转后坐标系中的归一化区域 (u1, v1, u2, v2)，可选；区域外为无效视差）
         :return: (视差图路径, 旋转后的视差数据, 彩色可视化路径)
         """
         # 读取图像
@@ -156,82 +336,85 @@ class DepthCalculator:
         if left_img is None or right_img is None:
             raise FileNotFoundError("无法读取左右图像")
         
-        # 确保图像尺寸一致
-        if left_img.shape[0] != right_img.shape[0] or left_img.shape[1] != right_img.shape[1]:
-            if self.enable_debug:
-                print("左右图像尺寸不一致，调整为一致的尺寸...")
-            new_height = min(left_img.shape[0], right_img.shape[0])
-            new_width = min(left_img.shape[1], right_img.shape[1])
-            left_img = cv2.resize(left_img, (new_width, new_height))
-            right_img = cv2.resize(right_img, (new_width, new_height))
-            if self.enable_debug:
-                print(f"调整后尺寸: {new_width}x{new_height}") 
-        
-        # 打印实际处理尺寸
-        if self.enable_debug:
-            print(f"实际处理尺寸: {left_img.shape[1]}x{left_img.shape[0]}")
+        source_roi = None
+        if roi is not None:
+            width = min(left_img.shape[1], right_img.shape[1])
+            height = min(left_img.shape[0], right_img.shape[0])
+            source_roi = self.rotated_roi_to_source(roi, width, height)
+        disparity = self.compute_disparity(left_img, right_img, roi=source_roi)
         
-        # 转换为灰度图
-        left_gray = cv2.cvtColor(left_img, cv2.COLOR_BGR2GRAY)
-        right_gray = cv2.cvtColor(right_img, cv2.COLOR_BGR2GRAY)
+        # 旋转视差数据90度（顺时针）
+        disparity_rotated = cv2.rotate(disparity, cv2.ROTATE_90_COUNTERCLOCKWISE)
         
-        # 使用SGBM算法创建视差图
-        if self.enable_debug:
-            print("使用SGBM算法计算视差图...")
-        
-        # 配置视差参数
-        window_size = 11
-        min_disp = 0
-        num_disp = 128 - min_disp
-        
-        stereo = cv2.StereoSGBM_create(
-            minDisparity=min_disp,
-            numDisparities=num_disp,
-            blockSize=window_size,
-            P1=8 * 3 * window_size ** 2,
-            P2=32 * 3 * window_size ** 2,
-            disp12MaxDiff=10,
-            uniquenessRatio=20,
-            speckleWindowSize=200,
-            speckleRange=2
-        )
+        disparity_path, disparity_color_path = self.save_disparity_outputs(
+            disparity_rotated, output_dir,
+            debug_output_dir=debug_output_dir,
+            original_image_dir=original_image_dir)
+        return disparity_path, disparity_rotated, disparity_color_path
+    
+    def save_disparity_outputs(self, disparity_rotated: np.ndarray,
+                               output_dir: Optional[str],
+                               debug_output_dir: Optional[str] = None,
+                               original_image_dir: Optional[str] = None,
+                               save_visuals: bool = True) -> Tuple[Optional[str], Optional[str]]:
+        """
+        保存视差数据和可视化图像
         
-        # 计算视差图
-        disparity = stereo.compute(left_gray, right_gray).astype(np.float32) / 16.0
+        设置了 artifact_sink 时可视化图在后台着色写盘：调试图可能按策略跳过或在队列满时丢弃，
+        原图目录的 depth_color.jpg 供前端展示，作为必需产物始终写入
         
-        # 保存结果目录
-        os.makedirs(output_dir, exist_ok=True)
+        :param disparity_rotated: 旋转后的视差数据（提交后台写盘后不应再修改）
+        :param output_dir: 原始视差数据 disparity.tiff 的保存目录（None 时不保存）
+        :param debug_output_dir: 调试输出目录（debug模式下保存灰度/彩色可视化图）
+        :param original_image_dir: 原图目录（可选，保存 depth_color.jpg）
+        :param save_visuals: 是否保存debug模式下的灰度/彩色可视化图
+        :return: (视差数据路径, debug模式下的彩色可视化路径)，未保存的为None
+        """
+        # 保存旋转后的原始视差数据
+        disparity_path = None
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            disparity_path = os.path.join(output_dir, "disparity.tiff")
+            cv2.imwrite(disparity_path, disparity_rotated)
         
-        # 旋转视差数据90度（顺时针）
-        disparity_rotated = cv2.rotate(disparity, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        if self.enable_debug:
-            print(f"原始视差图尺寸: {disparity.shape[1]}x{disparity.shape[0]}")
-            print(f"旋转后视差图尺寸: {disparity_rotated.shape[1]}x{disparity_rotated.shape[0]}")
+        vis_output_dir = debug_output_dir or output_dir
+        save_debug_visual = save_visuals and self.enable_debug and vis_output_dir is not None
+        if not save_debug_visual and original_image_dir is None:
+            return disparity_path, None
         
-        # 保存旋转后的原始视差数据
-        disparity_path = os.path.join(output_dir, "disparity.tiff")
-        cv2.imwrite(disparity_path, disparity_rotated)
+        if self.artifact_sink is None:
+            return disparity_path, self._write_disparity_visuals(
+                disparity_rotated, vis_output_dir if save_debug_visual else None, original_image_dir)
         
-        # 生成可视化图像（无论debug模式与否）
-        # 创建归一化的可视化视差图 (8位灰度) - 使用旋转后的数据
-        disparity_visual = cv2.normalize(
-            disparity_rotated, None, alpha=0, beta=255, 
-            norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U
-        )
+        sink = self.artifact_sink
+        disparity_color_path = None
+        if save_debug_visual and sink.submit(
+                lambda: self._write_disparity_visuals(disparity_rotated, vis_output_dir, None),
+                name=os.path.join(vis_output_dir, "depth_color.jpg"), priority=ARTIFACT_DEBUG):
+            disparity_color_path = os.path.join(vis_output_dir, "depth_color.jpg")
+        if original_image_dir is not None:
+            sink.submit(lambda: self._write_disparity_visuals(disparity_rotated, None, original_image_dir),
+                        name=os.path.join(original_image_dir, "depth_color.jpg"), priority=ARTIFACT_REQUIRED)
+        return disparity_path, disparity_color_path
+    
+    def _write_disparity_visuals(self, disparity_rotated: np.ndarray,
+                                 vis_output_dir: Optional[str],
+                                 original_image_dir: Optional[str]) -> Optional[str]:
+        """
+        着色并写入视差可视化图
         
-        # 创建彩色可视化视差图
-        disparity_color = cv2.applyColorMap(disparity_visual, cv2.COLORMAP_JET)
+        :param disparity_rotated: 旋转后的视差数据
+        :param vis_output_dir: debug可视化目录（None 时不保存灰度/彩色调试图）
+        :param original_image_dir: 原图目录（None 时不保存 depth_color.jpg）
+        :return: debug模式下的彩色可视化路径，未保存时为None
+        """
+        # 创建归一化的可视化视差图 (8位灰度) 和彩色可视化视差图 - 使用旋转后的数据
+        disparity_visual, disparity_color = self.colorize(disparity_rotated)
         
         disparity_color_path = None
         
         # debug模式下：保存到debug_output_dir
-        if self.enable_debug:
-            # 确定可视化图像保存目录（优先使用debug_output_dir）
-            if debug_output_dir is not None:
-                vis_output_dir = debug_output_dir
-            else:
-                vis_output_dir = output_dir
-            
+        if vis_output_dir is not None:
             # 确保目录存在
             os.makedirs(vis_output_dir, exist_ok=True)
             
@@ -262,28 +445,16 @@ class DepthCalculator:
                 if self.enable_debug:
                     print(f"⚠️  深度图保存失败: {depth_path}")
         
-        # 返回旋转后的视差数据，用于后续深度计算
-        return disparity_path, disparity_rotated, disparity_color_path
+        return disparity_color_path
     
     def calculate_depth(self, disparity: np.ndarray) -> np.ndarray:
         """
-        计算深度图（毫米单位）
+        计算深度图（毫米单位，同 disparity_to_depth）
         
         :param disparity: 视差数据
         :return: 深度图（毫米）
         """
-        # 避免除以零错误
-        disparity_img = np.copy(disparity)
-        disparity_img[disparity_img <= 0] = 0.0001
-        
-        # 计算深度
-        depth = (self.focal_length_px * self.baseline_mm) / disparity_img
-        
-        # 将过大值和无效值设为零
-        depth[np.isinf(depth)] = 0
-        depth[np.isnan(depth)] = 0
-        
-        return depth
+        return self.disparity_to_depth(disparity)
     
     def save_depth_matrix(self, depth: np.ndarray, csv_path: str) -> Tuple[str, str]:
         """
@@ -337,103 +508,135 @@ class DepthCalculator:
         
         return csv_path, preview_path
     
+    def save_depth_cache(self, depth: np.ndarray, cache_path: str,
+                         dtype: str = "float32") -> str:
+        """
+        将深度数据保存为二进制缓存（.npy 可内存映射读取，.npz 为压缩格式）
+        
+        :param depth: 深度数据数组（毫米）
+        :param cache_path: 缓存文件路径（扩展名决定格式：.npy / .npz）
+        :param dtype: 存储类型：float32（无损）、float16 或 uint16（毫米取整），
+                      后两种格式中超出表示范围的值记为0（无效值）
+        :return: 缓存文件路径
+        """
+        if dtype == "float32":
+            data = depth.astype(np.float32, copy=False)
+        elif dtype in ("float16", "uint16"):
+            max_value = np.finfo(np.float16).max if dtype == "float16" else np.iinfo(np.uint16).max
+            valid = np.isfinite(depth) & (depth > 0) & (depth <= max_value)
+            data = np.where(valid, depth, 0)
+            data = np.rint(data).astype(np.uint16) if dtype == "uint16" else data.astype(np.float16)
+        else:
+            raise ValueError(f"不支持的深度缓存类型: {dtype}")
+        
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        if cache_path.endswith(".npz"):
+            np.savez_compressed(cache_path, depth=data)
+        else:
+            np.save(cache_path, data)
+        
+        if self.enable_debug:
+            print(f"深度缓存保存至: {cache_path} ({dtype}, {os.path.getsize(cache_path) / 1024:.1f} KB)")
+        
+        return cache_path
+    
     def process_stereo_image(self, image_path: str, 
                             output_dir: Optional[str] = None,
                             debug_output_dir: Optional[str] = None,
                             skip_rotation: bool = False,
-                            original_image_dir: Optional[str] = None) -> Tuple[np.ndarray, str]:
+                            original_image_dir: Optional[str] = None,
+                            cache_format: Optional[str] = None,
+                            cache_dtype: str = "float32",
+                            roi: Optional[Tuple[float, float, float, float]] = None,
+                            save_visuals: bool = True) -> Tuple[np.ndarray, Optional[str]]:
         """
-        处理立体图像，生成深度矩阵CSV
+        处理立体图像，生成深度矩阵（内存数组，按需持久化）
         
         :param image_path: 输入图像路径（包含四个象限的立体图像）
         :param output_dir: 输出目录（可选，默认在图像同目录下）
         :param debug_output_dir: 调试输出目录（可选，用于保存视差图可视化）
         :param skip_rotation: 是否跳过旋转（如果图像已经旋转过）
         :param original_image_dir: 原图目录（可选，用于在非debug模式下保存depth_color.jpg）
-        :return: (深度图数组, depth_matrix.csv路径)
+        :param cache_format: 深度矩阵持久化格式（可选）：None 不落盘，"npy"/"npz" 二进制缓存，
+                             "csv" 导出文本矩阵（体积大、速度慢，仅用于人工查看）
+        :param cache_dtype: 二进制缓存的存储类型（见 save_depth_cache）
+        :param roi: 只计算该区域（旋转后坐标系中的归一化区域 (u1, v1, u2, v2)，可选，默认全图；
+                    区域外与无法匹配的像素一样按无效视差处理）
+        :param save_visuals: 是否保存debug模式下的视差可视化图（原图目录的 depth_color.jpg 不受影响）
+        :return: (深度图数组, 深度缓存路径；未持久化时为None)
         """
+        if cache_format not in (None, "npy", "npz", "csv"):
+            raise ValueError(f"不支持的深度缓存格式: {cache_format}")
+        
         if self.enable_debug:
             print("=" * 50)
             print("开始处理立体图像:", os.path.basename(image_path))
         
-        # 0. 旋转图像（顺时针90度）- 如果未跳过
-        if not skip_rotation:
-            if self.enable_debug:
-                print("\n步骤0: 旋转图像（逆时针90度）...")
-            # 创建旋转后的临时图像文件（不覆盖原文件）
-            rotated_image_path = self.rotate_image(image_path, rotation_angle=90, overwrite=False)
-        else:
-            if self.enable_debug:
+        # 0. 读取拼接图（只解码一次，直接读为灰度），需要时在内存中旋转（逆时针90度）
+        with trace_stage("depth_decode"):
+            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise FileNotFoundError(f"无法读取立体图像: {image_path}")
+            if not skip_rotation:
+                if self.enable_debug:
+                    print("\n步骤0: 旋转图像（逆时针90度）...")
+                image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+            elif self.enable_debug:
                 print("\n步骤0: 跳过旋转（图像已旋转）...")
-            rotated_image_path = image_path
         
-        # 1. 分割图像（使用旋转后的图像）
-        if self.enable_debug:
-            print("\n步骤1: 分割图像...")
-        # 如果提供了debug_output_dir，将split结果保存到那里
-        # 这样所有生成的图都会在output目录下
-        split_base_dir = debug_output_dir if debug_output_dir else None
-        quadrants, split_output_dir, orig_width, orig_height = self.split_image(
-            rotated_image_path, output_base_dir=split_base_dir)
-        
-        # split_image已经会将图保存到debug_output_dir（如果提供）
+        orig_height, orig_width = image.shape[:2]
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        # 如果提供了debug_output_dir，调试文件保存到那里，否则保存到图像同目录
+        split_output_dir = os.path.join(debug_output_dir or os.path.dirname(image_path), f"{base_name}_split")
+        if self.save_debug_artifacts:
+            quadrant_paths = self._save_quadrants(image, split_output_dir, base_name)
+            if self.enable_debug:
+                print(f"💾 已保存四个象限分割图: {', '.join(os.path.basename(p) for p in quadrant_paths)}")
+        
+        # 1~3. 分割（左上象限作为左图，右上象限作为右图，内存视图无损传给立体匹配）→ 视差 → 深度
         if self.enable_debug:
             print(f"原始图像尺寸: {orig_width}x{orig_height}")
-            print(f"分割图目录: {split_output_dir}")
+            print("\n步骤1-3: 内存中分割图像、生成视差图、计算深度图...")
+        depth, disparity_data = self.compute_depth(image, roi=roi)
         
-        # 2. 提取左上和右上图像（左右图）
-        # 注意：左图用左上象限，右图用右上象限
-        left_path = quadrants[0]  # 左上象限作为左图
-        right_path = quadrants[1]  # 右上象限作为右图
-        if self.enable_debug:
-            print(f"\n📸 深度处理使用的左右图:")
-            print(f"   ✅ 左图（左眼图像）: {os.path.basename(left_path)} - 左上象限 (quadrants[0])")
-            print(f"   ✅ 右图（右眼图像）: {os.path.basename(right_path)} - 右上象限 (quadrants[1])")
-            print(f"   左图完整路径: {left_path}")
-            print(f"   右图完整路径: {right_path}")
-            
-            # 打印左右图的详细信息
-            import cv2
-            left_img = cv2.imread(left_path)
-            right_img = cv2.imread(right_path)
-            if left_img is not None and right_img is not None:
-                print(f"\n   左图尺寸: {left_img.shape[1]}x{left_img.shape[0]} (宽x高)")
-                print(f"   右图尺寸: {right_img.shape[1]}x{right_img.shape[0]} (宽x高)")
-        
-        # 3. 生成视差图
-        if self.enable_debug:
-            print("\n步骤2: 生成视差图...")
+        # 保存可视化（原始视差数据只在保存调试文件时落盘）
         disparity_results_dir = os.path.join(split_output_dir, "disparity_results")
-        disparity_path, disparity_data, disparity_visual = self.generate_disparity_map(
-            left_path, right_path, disparity_results_dir, 
-            debug_output_dir=debug_output_dir,
-            original_image_dir=original_image_dir)
-        
-        # 4. 计算深度图
-        if self.enable_debug:
-            print("\n步骤3: 计算深度图...")
-        depth = self.calculate_depth(disparity_data)
+        self.save_disparity_outputs(
+            disparity_data,
+            disparity_results_dir if self.save_debug_artifacts else None,
+            debug_output_dir=debug_output_dir or disparity_results_dir,
+            original_image_dir=original_image_dir,
+            save_visuals=save_visuals)
+        
+        # 4. 按需持久化深度矩阵（默认只在内存中传递）
+        if cache_format is None:
+            if self.enable_debug:
+                print("\n步骤4: 深度矩阵保留在内存中（未持久化）")
+                print(f"   深度矩阵尺寸: {depth.shape[0]}行 x {depth.shape[1]}列")
+            return depth, None
         
-        # 5. 保存深度矩阵CSV
         if self.enable_debug:
-            print("\n步骤4: 转换深度图为矩阵CSV...")
+            print(f"\n步骤4: 保存深度矩阵（{cache_format}）...")
         if output_dir is None:
             depth_dir = os.path.join(split_output_dir, "depth_results")
         else:
             depth_dir = output_dir
         os.makedirs(depth_dir, exist_ok=True)
         
-        depth_csv_path = os.path.join(depth_dir, "depth_matrix.csv")
-        csv_path, preview_path = self.save_depth_matrix(depth, depth_csv_path)
+        with trace_stage("depth_cache"):
+            if cache_format == "csv":
+                cache_path, _ = self.save_depth_matrix(depth, os.path.join(depth_dir, "depth_matrix.csv"))
+            else:
+                cache_path = self.save_depth_cache(
+                    depth, os.path.join(depth_dir, f"depth_matrix.{cache_format}"), dtype=cache_dtype)
         
         if self.enable_debug:
             print("\n" + "=" * 50)
             print("处理完成! 结果文件:")
             print(f"- 目录: {depth_dir}")
-            print(f"  - depth_matrix.csv - 深度矩阵数据")
-            print(f"  - depth_matrix_preview.png - 矩阵预览图")
-            print(f"\n*CSV格式说明: {depth.shape[0]}行 x {depth.shape[1]}列的矩阵")
-            print(f"  第y行第x列的值 = 像素点(x, y)的深度(mm)，0表示无效值")
+            print(f"  - {os.path.basename(cache_path)} - 深度矩阵数据")
+            print(f"\n*矩阵格式说明: {depth.shape[0]}行 x {depth.shape[1]}列")
+            print(f"  第y行第x列的值 = 像素点(x, y)的深度(mm)")
         
-        return depth, csv_path
+        return depth, cache_path
 
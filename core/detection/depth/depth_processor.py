@@ -20,14 +20,27 @@ class DepthProcessor:
     
     def load_depth_matrix(self, csv_file: str) -> np.ndarray:
         """
-        从CSV文件加载深度矩阵
+        从缓存文件加载深度矩阵
         
-        :param csv_file: depth_matrix.csv文件路径
-        :return: 深度矩阵（numpy数组）
+        :param csv_file: 深度矩阵文件路径（depth_matrix.csv，或二进制缓存 .npy/.npz）
+        :return: 深度矩阵（numpy数组；.npy 为只读内存映射）
         """
         if self.enable_debug:
             print(f"正在读取深度矩阵文件: {csv_file}")
         
+        # 二进制缓存：.npy 直接内存映射，.npz 解压读取
+        if str(csv_file).endswith(".npy"):
+            depth_matrix = np.load(csv_file, mmap_mode="r")
+        elif str(csv_file).endswith(".npz"):
+            with np.load(csv_file) as data:
+                depth_matrix = data["depth"]
+        else:
+            depth_matrix = None
+        if depth_matrix is not None:
+            if self.enable_debug:
+                print(f"深度矩阵尺寸: {depth_matrix.shape[0]}行 x {depth_matrix.shape[1]}列 ({depth_matrix.dtype})")
+            return depth_matrix
+        
         depth_matrix = []
         with open(csv_file, 'r') as csvfile:
             reader = csv.reader(csvfile)
@@ -120,6 +133,7 @@ class DepthProcessor:
         result_status = "无有效点"
         region_min = region_max = 0
         std_val = 0.0
+        filtered_points = []
 
         center_value = depth_matrix[y, x] if (0 <= y < depth_height and 0 <= x < depth_width) else 0
         
@@ -184,6 +198,132 @@ class DepthProcessor:
             "filtered_points": filtered_points if filtered_points else []
         }
     
+    # extract_depth_at_positions 返回的结构化数组字段（与 extract_depth_at_position 的结果字典对应）
+    DEPTH_SAMPLE_DTYPE = np.dtype([
+        ("success", np.bool_),
+        ("value", np.float64),
+        ("center_value", np.float64),
+        ("median_value", np.float64),
+        ("status", "U32"),
+        ("valid_points_count", np.int32),
+        ("total_valid_points", np.int32),
+        ("region_min", np.float64),
+        ("region_max", np.float64),
+        ("std", np.float64),
+        ("pixel_x", np.int32),
+        ("pixel_y", np.int32),
+        ("x_start", np.int32),
+        ("x_end", np.int32),
+        ("y_start", np.int32),
+        ("y_end", np.int32),
+    ])
+    
+    def extract_depth_at_positions(self,
+                                   depth_matrix: np.ndarray,
+                                   centers,
+                                   region_size: int = 5) -> np.ndarray:
+        """
+        批量提取多个坐标位置的深度值（extract_depth_at_position 的向量化版本）
+        
+        所有窗口通过 stride tricks 一次切出，中位数过滤、宽松过滤和均值/标准差在一次向量化计算中完成，
+        过滤规则与逐点版本一致（数值差异仅来自浮点累加顺序）。
+        不返回 filtered_points 明细，需要逐点明细时使用 extract_depth_at_position。
+        
+        :param depth_matrix: 深度矩阵（numpy数组）
+        :param centers: 归一化坐标序列 [(norm_x, norm_y), ...]，形状 (N, 2)
+        :param region_size: 提取区域大小（默认5x5）
+        :return: 结构化数组（dtype=DEPTH_SAMPLE_DTYPE），每个坐标一条记录
+        """
+        depth = np.asarray(depth_matrix)
+        depth_height, depth_width = depth.shape
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        n = len(centers)
+        samples = np.zeros(n, dtype=self.DEPTH_SAMPLE_DTYPE)
+        if n == 0:
+            return samples
+        
+        # 像素坐标（与 int() 一致，向零取整）
+        xs = (centers[:, 0] * depth_width).astype(np.int64)
+        ys = (centers[:, 1] * depth_height).astype(np.int64)
+        in_range = (xs >= 0) & (xs < depth_width) & (ys >= 0) & (ys < depth_height)
+        xi = np.clip(xs, 0, depth_width - 1)
+        yi = np.clip(ys, 0, depth_height - 1)
+        
+        # 用0填充边界（0为无效值，等价于逐点版本的边界裁剪），再用 stride tricks 切出所有窗口
+        half_size = region_size // 2
+        window = 2 * half_size + 1
+        padded = np.pad(depth, half_size, mode="constant", constant_values=0)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, (window, window))
+        values = windows[yi, xi].reshape(n, window * window).astype(np.float64)
+        
+        # 有效点：值 > 0（与逐点版本相同，跳过 value <= 0 的点）
+        valid = ~(values <= 0) & in_range[:, None]
+        total_valid = valid.sum(axis=1)
+        has_valid = total_valid > 0
+        rows = np.arange(n)
+        
+        # 掩码中位数：无效点置为 +inf 后排序，取有效部分的中间值
+        sorted_values = np.sort(np.where(valid, values, np.inf), axis=1)
+        lo = np.maximum(total_valid - 1, 0) // 2
+        hi = np.minimum(total_valid // 2, window * window - 1)
+        median = np.where(has_valid, (sorted_values[rows, lo] + sorted_values[rows, hi]) / 2.0, 0.0)
+        
+        # 第一轮过滤：与中位数差距不超过500
+        filtered = valid & (np.abs(values - median[:, None]) <= 500)
+        filtered_count = filtered.sum(axis=1)
+        
+        # 过滤后点太少时，改用有效点的均值±2倍标准差
+        loose = has_valid & (filtered_count < 5)
+        valid_count = np.maximum(total_valid, 1)[:, None]
+        valid_mean = np.where(valid, values, 0.0).sum(axis=1, keepdims=True) / valid_count
+        valid_std = np.sqrt(np.where(valid, (values - valid_mean) ** 2, 0.0).sum(axis=1, keepdims=True) / valid_count)
+        loose_filtered = valid & (np.abs(values - valid_mean) <= 2 * valid_std)
+        filtered = np.where(loose[:, None], loose_filtered, filtered)
+        filtered_count = filtered.sum(axis=1)
+        has_filtered = filtered_count > 0
+        
+        # 过滤后点的统计量
+        count = np.maximum(filtered_count, 1)[:, None]
+        mean = np.where(filtered, values, 0.0).sum(axis=1, keepdims=True) / count
+        std = np.sqrt(np.where(filtered, (values - mean) ** 2, 0.0).sum(axis=1, keepdims=True) / count)
+        region_min = np.where(filtered, values, np.inf).min(axis=1)
+        region_max = np.where(filtered, values, -np.inf).max(axis=1)
+        
+        samples["success"] = in_range
+        samples["value"] = np.where(has_filtered, np.round(mean[:, 0], 1), 0.0)
+        samples["center_value"] = np.where(in_range, depth[yi, xi], 0.0)
+        samples["median_value"] = median
+        samples["valid_points_count"] = filtered_count
+        samples["total_valid_points"] = total_valid
+        samples["region_min"] = np.where(has_filtered, region_min, 0.0)
+        samples["region_max"] = np.where(has_filtered, region_max, 0.0)
+        samples["std"] = np.where(has_filtered, std[:, 0], 0.0)
+        samples["pixel_x"] = xs
+        samples["pixel_y"] = ys
+        samples["x_start"] = np.maximum(0, xs - half_size)
+        samples["x_end"] = np.minimum(depth_width, xs + half_size + 1)
+        samples["y_start"] = np.maximum(0, ys - half_size)
+        samples["y_end"] = np.minimum(depth_height, ys + half_size + 1)
+        
+        # 状态文本（与逐点版本一致）
+        for i in range(n):
+            if not in_range[i]:
+                samples["status"][i] = "坐标超出范围"
+            elif not has_valid[i]:
+                samples["status"][i] = "无有效点"
+            elif not has_filtered[i]:
+                samples["status"][i] = "无有效过滤点"
+            elif loose[i]:
+                samples["status"][i] = f"宽松过滤: {filtered_count[i]}/{total_valid[i]}点"
+            else:
+                samples["status"][i] = f"中位数过滤: {filtered_count[i]}/{total_valid[i]}点"
+        
+        if self.enable_debug:
+            print(f"批量提取深度: {n} 个坐标, 成功 {int(in_range.sum())} 个, "
+                  f"有效值 {int((samples['value'] > 0).sum())} 个")
+        
+        return samples
+    
     def process_depth_data(self, csv_file: str, norm_x: float, norm_y: float,
                           output_dir: Optional[str] = None) -> Optional[str]:
         """
@@ -0,0 +1,221 @@
+"""
+立体匹配引擎：每个相机创建一次，缓存匹配器和校正映射表，避免每帧重新创建 StereoSGBM
+
+支持的模式（速度/精度按部署选择，可用 scripts/benchmark_depth.py 与默认模式对比）:
+    sgbm             全分辨率 SGBM（默认，与原实现输出一致）
+    sgbm_downscaled  缩小后 SGBM，视差按比例放大并上采样回原尺寸
+    bm               StereoBM 块匹配（最快，弱纹理区域空洞较多）
+
+另外 compute 可传入 roi，只在该区域（含视差搜索所需的左侧边距）内匹配，区域外记为无效视差。
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STEREO_MODES = ("sgbm", "sgbm_downscaled", "bm")
+
+# 默认匹配参数（与原 DepthCalculator.generate_disparity_map 一致）
+DEFAULT_NUM_DISPARITIES = 128
+DEFAULT_BLOCK_SIZE = 11
+
+# 无效视差（SGBM/BM 以 minDisparity - 1 标记无法匹配的像素）
+INVALID_DISPARITY = -1.0
+
+
+def _round_up(value: float, multiple: int) -> int:
+    return int(np.ceil(value / multiple) * multiple)
+
+
+class StereoDepthEngine:
+    """立体匹配引擎（非线程安全的匹配器由内部锁保护）"""
+
+    def __init__(self, mode: str = "sgbm",
+                 num_disparities: int = DEFAULT_NUM_DISPARITIES,
+                 block_size: int = DEFAULT_BLOCK_SIZE,
+                 scale: float = 0.5,
+                 num_threads: int = 0,
+                 calibration_path: Optional[Union[str, Path]] = None):
+        """
+        :param mode: 匹配模式（见 STEREO_MODES）
+        :param num_disparities: 全分辨率下的视差搜索范围（16 的倍数）
+        :param block_size: 全分辨率下的匹配块大小（奇数）
+        :param scale: sgbm_downscaled 模式的缩放比例（0~1）
+        :param num_threads: OpenCV 线程数（0 表示不修改；进程级设置）
+        :param calibration_path: 双目标定文件（.npz，含 K1, D1, K2, D2, R, T），提供时先做极线校正
+        """
+        if mode not in STEREO_MODES:
+            raise ValueError(f"不支持的立体匹配模式: {mode}，可选: {', '.join(STEREO_MODES)}")
+        if not 0 < scale <= 1:
+            raise ValueError(f"缩放比例必须在 (0, 1] 之间: {scale}")
+        self.mode = mode
+        self.num_disparities = _round_up(num_disparities, 16)
+        self.block_size = block_size | 1
+        self.scale = scale if mode == "sgbm_downscaled" else 1.0
+        self.num_threads = int(num_threads or 0)
+        self.calibration_path = Path(calibration_path) if calibration_path else None
+        self._calibration = self._load_calibration(self.calibration_path) if self.calibration_path else None
+        # 图像尺寸 (h, w) -> 校正映射表
+        self._rectify_maps: Dict[Tuple[int, int], Tuple[np.ndarray, ...]] = {}
+        self._lock = threading.Lock()
+        if self.num_threads > 0:
+            cv2.setNumThreads(self.num_threads)
+        self._matcher = self._create_matcher()
+
+    @staticmethod
+    def _load_calibration(path: Path) -> Dict[str, np.ndarray]:
+        if not path.exists():
+            raise FileNotFoundError(f"双目标定文件不存在: {path}")
+        with np.load(path) as data:
+            missing = [key for key in ("K1", "D1", "K2", "D2", "R", "T") if key not in data]
+            if missing:
+                raise ValueError(f"双目标定文件缺少参数: {', '.join(missing)}")
+            return {key: data[key] for key in ("K1", "D1", "K2", "D2", "R", "T")}
+
+    def _matcher_params(self) -> Tuple[int, int]:
+        """当前模式下实际使用的 (视差范围, 块大小)"""
+        if self.scale == 1.0:
+            return self.num_disparities, self.block_size
+        return max(16, _round_up(self.num_disparities * self.scale, 16)), max(3, int(self.block_size * self.scale) | 1)
+
+    def _create_matcher(self):
+        num_disp, window_size = self._matcher_params()
+        if self.mode == "bm":
+            matcher = cv2.StereoBM_create(numDisparities=num_disp, blockSize=max(5, window_size))
+            matcher.setDisp12MaxDiff(10)
+            matcher.setUniquenessRatio(20)
+            matcher.setSpeckleWindowSize(200)
+            matcher.setSpeckleRange(2)
+            return matcher
+        return cv2.StereoSGBM_create(
+            minDisparity=0,
+            numDisparities=num_disp,
+            blockSize=window_size,
+            P1=8 * 3 * window_size ** 2,
+            P2=32 * 3 * window_size ** 2,
+            disp12MaxDiff=10,
+            uniquenessRatio=20,
+            speckleWindowSize=200,
+            speckleRange=2
+        )
+
+    def _rectify(self, left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """极线校正（映射表按图像尺寸缓存）"""
+        size = left.shape[:2]
+        maps = self._rectify_maps.get(size)
+        if maps is None:
+            c = self._calibration
+            image_size = (size[1], size[0])
+            r1, r2, p1, p2, _, _, _ = cv2.stereoRectify(c["K1"], c["D1"], c["K2"], c["D2"], image_size, c["R"], c["T"])
+            maps = (*cv2.initUndistortRectifyMap(c["K1"], c["D1"], r1, p1, image_size, cv2.CV_16SC2),
+                    *cv2.initUndistortRectifyMap(c["K2"], c["D2"], r2, p2, image_size, cv2.CV_16SC2))
+            self._rectify_maps[size] = maps
+        return (cv2.remap(left, maps[0], maps[1], cv2.INTER_LINEAR),
+                cv2.remap(right, maps[2], maps[3], cv2.INTER_LINEAR))
+
+    def _match(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """在（可能缩小的）图像上匹配，返回原尺寸的视差"""
+        if self.scale == 1.0:
+            with self._lock:
+                return self._matcher.compute(left, right).astype(np.float32) / 16.0
+
+        h, w = left.shape[:2]
+        small_size = (max(1, int(round(w * self.scale))), max(1, int(round(h * self.scale))))
+        left_small = cv2.resize(left, small_size, interpolation=cv2.INTER_AREA)
+        right_small = cv2.resize(right, small_size, interpolation=cv2.INTER_AREA)
+        with self._lock:
+            disparity = self._matcher.compute(left_small, right_small).astype(np.float32) / 16.0
+        # 视差按缩放比例放大；无效区域用最近邻上采样，避免插值把无效值混入有效视差
+        invalid = cv2.resize((disparity < 0).astype(np.uint8), (w, h), interpolation=cv2.INTER_NEAREST) > 0
+        disparity = cv2.resize(disparity, (w, h), interpolation=cv2.INTER_LINEAR) / self.scale
+        disparity[invalid] = INVALID_DISPARITY
+        return disparity
+
+    def compute(self, left_gray: np.ndarray, right_gray: np.ndarray,
+                roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        计算视差图
+
+        :param left_gray: 左图（灰度）
+        :param right_gray: 右图（灰度，与左图尺寸一致）
+        :param roi: 只计算该区域 (x1, y1, x2, y2)（左图坐标，可选），区域外为 INVALID_DISPARITY
+        :return: 视差图（float32，与输入同尺寸）
+        """
+        if self._calibration is not None:
+            left_gray, right_gray = self._rectify(left_gray, right_gray)
+        if roi is None:
+            return self._match(left_gray, right_gray)
+
+        h, w = left_gray.shape[:2]
+        x1, y1, x2, y2 = (int(v) for v in roi)
+        x1, x2 = max(0, min(x1, w)), max(0, min(x2, w))
+        y1, y2 = max(0, min(y1, h)), max(0, min(y2, h))
+        disparity = np.full((h, w), INVALID_DISPARITY, dtype=np.float32)
+        if x2 <= x1 or y2 <= y1:
+            return disparity
+        # 左侧留出视差搜索范围，四周留出匹配块的一半，保证区域内的匹配窗口完整
+        half_block = self.block_size // 2 + 1
+        cx1 = max(0, x1 - self.num_disparities - half_block)
+        cx2 = min(w, x2 + half_block)
+        cy1 = max(0, y1 - half_block)
+        cy2 = min(h, y2 + half_block)
+        crop = self._match(np.ascontiguousarray(left_gray[cy1:cy2, cx1:cx2]),
+                           np.ascontiguousarray(right_gray[cy1:cy2, cx1:cx2]))
+        disparity[y1:y2, x1:x2] = crop[y1 - cy1:y2 - cy1, x1 - cx1:x2 - cx1]
+        return disparity
+
+    def config(self) -> Dict:
+        """引擎配置（用于缓存键和状态输出）"""
+        return {
+            "mode": self.mode,
+            "num_disparities": self.num_disparities,
+            "block_size": self.block_size,
+            "scale": self.scale,
+            "num_threads": self.num_threads,
+            "calibration_path": str(self.calibration_path) if self.calibration_path else None,
+        }
+
+
+# ==================== 引擎缓存 ====================
+
+_default_config: Dict = {}
+_engines: Dict[str, StereoDepthEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def configure_stereo_engine(mode: str = "sgbm", scale: float = 0.5, num_threads: int = 0,
+                            calibration_path: Optional[Union[str, Path]] = None, **kwargs):
+    """
+    设置立体匹配引擎默认配置（配置变化后，下次获取时按新配置创建）
+
+    :param mode: 匹配模式（见 STEREO_MODES）
+    :param scale: sgbm_downscaled 模式的缩放比例
+    :param num_threads: OpenCV 线程数（0 表示不修改）
+    :param calibration_path: 双目标定文件（可选）
+    """
+    global _default_config
+    with _engines_lock:
+        _default_config = {"mode": mode, "scale": scale, "num_threads": num_threads,
+                           "calibration_path": calibration_path, **kwargs}
+        _engines.clear()
+
+
+def get_stereo_engine(camera_id: str = "default") -> StereoDepthEngine:
+    """
+    获取相机对应的立体匹配引擎（每个相机只创建一次）
+
+    :param camera_id: 相机标识（不同相机可使用不同的标定文件）
+    """
+    with _engines_lock:
+        engine = _engines.get(camera_id)
+        if engine is None:
+            engine = StereoDepthEngine(**_default_config)
+            _engines[camera_id] = engine
+            logger.info(f"[StereoDepthEngine] 已创建立体匹配引擎: camera={camera_id}, {engine.config()}")
+        return engine
@@ -14,7 +14,7 @@ from .stack_processor import (
     PartialStackProcessor,
     TemplateBasedPartialProcessor,
 )
-from .factory import StackProcessorFactory, count_boxes
+from .factory import StackProcessorFactory, count_boxes, count_boxes_batch, count_boxes_traced
 # 向后兼容：导出旧接口
 from .full_layer_verification import (
     calc_coverage,
@@ -38,4 +38,6 @@ __all__ = [
     "TemplateBasedPartialProcessor",
     "StackProcessorFactory",
     "count_boxes",  # 算法统一入口
+    "count_boxes_batch",  # 批量计数入口
+    "count_boxes_traced",  # 计数并返回阶段追踪结果
 ]
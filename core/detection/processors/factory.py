@@ -1,9 +1,12 @@
 """堆垛处理器工厂：根据满层判断结果自动选择对应的处理模块"""
 
+import copy
 import logging
-from typing import Dict, List, Optional, Union, Tuple
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union, Tuple
 from pathlib import Path
-from ultralytics import YOLO
 import cv2
 import numpy as np
 
@@ -23,12 +26,19 @@ from .stack_processor import (
 )
 
 # 导入核心算法模块
-from core.detection.utils.yolo_utils import extract_yolo_detections
 from core.detection.core.scene_prepare import prepare_logic
 from core.detection.core.layer_filter import remove_fake_top_layer
 from core.detection.core.layer_clustering import cluster_layers_with_box_roi
 from core.detection.utils.pile_db import PileTypeDatabase
+from core.detection.utils.model_registry import (
+    get_model_registry,
+    DEFAULT_PILE_CONFIG_PATH
+)
 from core.detection.utils.path_utils import ensure_output_dir
+from core.detection.utils.image_context import ImageContext, load_image, rotate_image_array
+from core.detection.utils.artifact_sink import ArtifactSink, ARTIFACT_DEBUG, ARTIFACT_FINAL, get_artifact_sink
+from core.detection.utils.detector_backend import DetectorBackend, UltralyticsBackend
+from core.detection.utils.tracer import StageTracer, trace_stage
 
 # 导入可视化模块
 from core.detection.visualization import prepare_scene
@@ -42,6 +52,9 @@ from core.detection.core.layer_clustering import (
 # 导入深度处理模块
 from core.detection.depth import DepthCalculator, DepthProcessor
 
+# 深度计算区域：top_layer 只算顶层所在的横带，pile 算整个堆垛区域，full 算全图（开启可视化时总是全图）
+DEPTH_REGIONS = ("top_layer", "pile", "full")
+
 
 class StackProcessorFactory:
     """
@@ -66,7 +79,12 @@ class StackProcessorFactory:
                  model_path: Optional[Union[str, Path]] = None,
                  pile_config_path: Optional[Union[str, Path]] = None,
                  confidence_threshold: float = 0.65,
-                 output_dir: Optional[Union[str, Path]] = None):
+                 output_dir: Optional[Union[str, Path]] = None,
+                 depth_cache_format: Optional[str] = None,
+                 depth_region: str = "top_layer",
+                 depth_roi_padding: float = 0.1,
+                 save_debug_artifacts: bool = False,
+                 artifact_sink: Optional[ArtifactSink] = None):
         """
         :param detector: 满层判断器（可选，默认使用 CoverageBasedDetector）
         :param full_processor: 满层处理器（可选，默认使用 TemplateBasedFullProcessor）
@@ -74,32 +92,62 @@ class StackProcessorFactory:
         :param single_layer_processor: 单层处理器（可选，默认使用 TemplateBasedSingleLayerProcessor）
         :param enable_debug: 是否启用调试输出（打印日志）
         :param enable_visualization: 是否启用可视化（保存效果图到output目录）
-        :param model_path: YOLO模型路径（可选，用于count方法）
+        :param model_path: 检测模型路径（可选，.pt/.onnx/OpenVINO IR，默认使用 config.json 中 detector 配置的模型）
         :param pile_config_path: 堆垛配置路径（可选，用于count方法）
         :param confidence_threshold: 置信度阈值（默认0.65）
         :param output_dir: 可视化输出目录（可选，默认使用 core/detection/output）
+        :param depth_cache_format: 深度矩阵持久化格式（可选，默认None只在内存中传递；
+                                   "npy"/"npz" 二进制缓存，"csv" 文本导出）
+        :param depth_region: 深度计算区域（见 DEPTH_REGIONS，默认只算顶层横带；开启可视化时算全图）
+        :param depth_roi_padding: 深度计算区域向外扩展的比例（相对堆垛宽/高）
+        :param save_debug_artifacts: 是否保存深度处理的中间调试文件（象限分割图、原始视差数据）
+        :param artifact_sink: 可视化/调试图的后台写盘器（可选，默认使用 get_artifact_sink() 的进程级写盘器，
+                              按 config.json 的 artifacts 策略保存）
         """
+        if depth_region not in DEPTH_REGIONS:
+            raise ValueError(f"不支持的深度计算区域: {depth_region}，可选: {', '.join(DEPTH_REGIONS)}")
         self.detector = detector or CoverageBasedDetector(enable_debug=enable_debug)
         self.enable_debug = enable_debug
         self.enable_visualization = enable_visualization
         self.confidence_threshold = confidence_threshold
         self.output_dir = output_dir
+        self.depth_cache_format = depth_cache_format
+        self.depth_region = depth_region
+        self.depth_roi_padding = depth_roi_padding
+        # 可视化/调试图在后台渲染写盘；本次计数是否保存由写盘器的策略决定（见 _count）
+        self.artifact_sink = artifact_sink or get_artifact_sink()
+        self._save_artifacts = True
         
-        # 初始化YOLO模型和pile数据库（如果提供了路径）
+        # 初始化检测器和pile数据库（如果提供了路径），实例来自进程级模型注册表
+        # 检测器后端（ultralytics/onnx/openvino）由注册表按 config.json 的 detector 配置创建
+        self.detector_backend: Optional[DetectorBackend] = None
+        self.detector_lock = None
+        # ultralytics 后端时为 YOLO 实例（向后兼容：外部直接设置 self.model 时包装为后端使用）
         self.model = None
+        self.model_lock = None
         self.pile_db = None
         
         # 深度图数据（numpy数组）
         self.depth_image = None
         # 深度图路径（用于深度处理）
         self.depth_image_path_for_processing = None
-        # 深度矩阵CSV路径（缓存文件）
+        # 深度矩阵（毫米，内存中传递给处理器）
+        self.depth_matrix = None
+        # 深度矩阵缓存文件路径（仅在设置了 depth_cache_format 时生成）
         self.depth_matrix_csv_path = None
         # 原始图路径和目录（用于保存raw.jpg和depth.jpg）
         self.original_image_path = None
         self.original_image_dir = None
+        # 当前处理图像的内存上下文（源图只解码一次，旋转后的数组供YOLO和可视化复用）
+        self.image_context = None
+        # 最近一次 count 调用的各阶段耗时（毫秒）和完整追踪结果（CPU时间、读写字节数、峰值内存增量）
+        self.last_timings: Dict[str, float] = {}
+        self.last_trace: Dict[str, Any] = {}
+        self.tracer: Optional[StageTracer] = None
         # 深度计算器和处理器
-        self.depth_calculator = DepthCalculator(enable_debug=enable_debug)
+        self.depth_calculator = DepthCalculator(enable_debug=enable_debug,
+                                                save_debug_artifacts=save_debug_artifacts,
+                                                artifact_sink=self.artifact_sink)
         self.depth_processor = DepthProcessor(enable_debug=enable_debug)
         
         # 创建处理器，传递深度计算器
@@ -119,36 +167,81 @@ class StackProcessorFactory:
         if pile_config_path is not None:
             self._init_pile_db(pile_config_path)
     
-    def _init_model(self, model_path: Union[str, Path]):
-        """初始化YOLO模型"""
-        if self.model is None:
-            model_path = Path(model_path)
-            if not model_path.exists():
-                raise FileNotFoundError(f"YOLO模型文件不存在: {model_path}")
+    def _init_model(self, model_path: Optional[Union[str, Path]] = None):
+        """
+        初始化检测器（从模型注册表获取共享实例）
+        
+        :param model_path: 模型路径（可选，默认使用注册表配置的检测模型）
+        """
+        if self.detector_backend is None:
+            if model_path is not None:
+                model_path = Path(model_path)
+                if not model_path.exists():
+                    raise FileNotFoundError(f"YOLO模型文件不存在: {model_path}")
+            registry = get_model_registry()
+            self.detector_backend, self.detector_lock = registry.get_detector_and_lock(model_path)
+            if isinstance(self.detector_backend, UltralyticsBackend):
+                self.model = self.detector_backend.model
+                self.model_lock = self.detector_lock
             if self.enable_debug:
-                print(f"加载YOLO模型: {model_path}")
-            self.model = YOLO(str(model_path))
+                print(f"获取检测器: backend={self.detector_backend.name}, model={self.detector_backend.model_path}")
+    
+    def _ensure_detector(self):
+        """确保检测器可用（外部直接设置了 self.model 时包装为 ultralytics 后端）"""
+        if self.detector_backend is None:
+            if self.model is not None:
+                self.detector_backend = UltralyticsBackend(getattr(self.model, "ckpt_path", None) or "", model=self.model)
+                self.detector_lock = self.model_lock
+            else:
+                self._init_model()
+    
+    def _detect(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        """执行检测（共享检测器实例的推理需要串行化）"""
+        self._ensure_detector()
+        if self.detector_lock is not None:
+            with self.detector_lock:
+                return self.detector_backend.detect(images, conf=self.confidence_threshold)
+        return self.detector_backend.detect(images, conf=self.confidence_threshold)
     
     def _init_pile_db(self, pile_config_path: Union[str, Path]):
-        """初始化堆垛配置数据库"""
+        """初始化堆垛配置数据库（从模型注册表获取共享实例）"""
         if self.pile_db is None:
             pile_config_path = Path(pile_config_path)
             if not pile_config_path.exists():
                 raise FileNotFoundError(f"堆垛配置文件不存在: {pile_config_path}")
             if self.enable_debug:
-                print(f"加载堆垛配置: {pile_config_path}")
-            self.pile_db = PileTypeDatabase(str(pile_config_path))
+                print(f"获取堆垛配置: {pile_config_path}")
+            self.pile_db = get_model_registry().get_pile_db(pile_config_path)
     
     def count(self, image_path: Union[str, Path], pile_id: int, 
-              depth_image_path: Optional[Union[str, Path]] = None) -> int:
+              depth_image_path: Optional[Union[str, Path]] = None,
+              detections: Optional[List[Dict]] = None,
+              profile: Optional[str] = None) -> int:
         """
         算法统一入口：从图片路径和pile_id计算总箱数
         
         :param image_path: 图片路径（RGB图片）
         :param pile_id: 堆垛ID
         :param depth_image_path: 深度图路径（可选，预留参数）
-        :return: 总箱数（烟箱数）
+        :param detections: 预先计算的YOLO检测结果（可选，提供时跳过YOLO，用于批量推理后的后处理）
+        :param profile: 性能分析方式（可选，"cprofile" / "pyinstrument"），报告见 self.last_trace["profile"]
+        :return: 总箱数（烟箱数），各阶段耗时见 self.last_timings，完整追踪结果见 self.last_trace
         """
+        self.tracer = StageTracer()
+        try:
+            with self.tracer.activate(), self.tracer.profile(profile), self.tracer.stage("total"):
+                return self._count(image_path, pile_id, depth_image_path, detections)
+        finally:
+            self.last_timings = self.tracer.timings()
+            self.last_trace = self.tracer.to_dict()
+            if self.enable_debug:
+                print("\n⏱️  各阶段耗时:")
+                print(self.tracer.format_table())
+    
+    def _count(self, image_path: Union[str, Path], pile_id: int,
+               depth_image_path: Optional[Union[str, Path]],
+               detections: Optional[List[Dict]]) -> int:
+        """count 的实际流程，各阶段记录到 self.tracer"""
         # 确保 logging 配置了 handler（避免子模块 logger 无输出）
         if not logging.getLogger().handlers:
             logging.basicConfig(level=logging.INFO)
@@ -156,28 +249,37 @@ class StackProcessorFactory:
         logger.info(f"[Detection] ===== count_boxes 被调用 =====")
         logger.info(f"[Detection] image_path={image_path}, pile_id={pile_id}, depth_image_path={depth_image_path}")
 
-        # 验证和初始化
-        image_path = self._validate_inputs(image_path, depth_image_path)
-        vis_output_dir = self._prepare_visualization_dir()
+        # 验证和初始化（深度图在这里加载）
+        with trace_stage("validate"):
+            image_path = self._validate_inputs(image_path, depth_image_path)
+            vis_output_dir = self._prepare_visualization_dir()
+            self._save_artifacts = (self.enable_debug or self.enable_visualization) and \
+                self.artifact_sink.begin_run()
         
-        # Step 0: 旋转原图（在YOLO检测之前）
-        rotated_image_path = self._rotate_and_save_image(image_path, vis_output_dir)
-        # 使用旋转后的图像进行后续处理
-        processing_image_path = rotated_image_path if rotated_image_path else image_path
+        # Step 0: 解码并在内存中旋转原图（在YOLO检测之前），旋转图异步写盘
+        with trace_stage("decode"):
+            self.image_context = ImageContext(image_path, rotation_angle=90)
+            processing_image = self.image_context.image
+            rotated_image_path = self._rotate_and_save_image(image_path, vis_output_dir)
+        # 旋转后图像的路径只用于命名输出文件，图像数据直接使用内存数组
+        processing_image_path = Path(rotated_image_path) if rotated_image_path else image_path
 
-        # Step 1: YOLO检测（使用旋转后的图像）
-        detections = self._run_yolo_detection(processing_image_path)
+        # Step 1: YOLO检测（使用旋转后的图像；已提供检测结果时跳过）
+        if detections is None:
+            with trace_stage("yolo"):
+                detections = self._run_yolo_detection(processing_image_path, image=processing_image)
+        elif self.enable_debug:
+            print(f"使用预先计算的YOLO检测结果: {len(detections)} 个对象")
         if not detections:
             logger.warning("[Detection] YOLO未检测到任何目标")
             return 0
 
         logger.info(f"[Detection] YOLO检测到 {len(detections)} 个目标, 类别: {set(d.get('cls') for d in detections)}")
 
-        # Step 1.5: 深度图处理（在 pile 检测之前，以便生成 depth_color.jpg）
-        self._process_depth_image(processing_image_path, vis_output_dir)
-
         # Step 2: 场景准备（使用旋转后的图像）
-        prepared = self._prepare_scene(detections, processing_image_path, vis_output_dir)
+        with trace_stage("scene"):
+            prepared = self._prepare_scene(detections, processing_image_path, vis_output_dir,
+                                           image=processing_image)
         if not prepared:
             logger.warning("[Detection] 场景准备失败，未检测到有效pile区域")
             return 0
@@ -185,13 +287,13 @@ class StackProcessorFactory:
         logger.info(f"[Detection] 场景准备成功: pile_roi={pile_roi}, pile内box数={len(boxes)}")
 
         # 添加图像尺寸信息到pile_roi（用于深度处理，使用旋转后的图像）
-        img = cv2.imread(str(processing_image_path))
-        if img is not None:
-            pile_roi["image_width"] = img.shape[1]
-            pile_roi["image_height"] = img.shape[0]
+        pile_roi["image_width"] = self.image_context.width
+        pile_roi["image_height"] = self.image_context.height
 
         # Step 3: 分层聚类（使用旋转后的图像）
-        layers = self._cluster_layers(boxes, pile_roi, processing_image_path, vis_output_dir)
+        with trace_stage("cluster"):
+            layers = self._cluster_layers(boxes, pile_roi, processing_image_path, vis_output_dir,
+                                          image=processing_image)
         if not layers:
             logger.warning("[Detection] 分层聚类失败，未提取到有效层")
             return 0
@@ -199,23 +301,31 @@ class StackProcessorFactory:
         logger.info(f"[Detection] 分层聚类完成: 层数={len(layers)}, 每层箱数={[len(l.get('boxes',[])) for l in layers]}")
 
         # Step 4: 处理层（去误层、重新索引）
-        layers = self._process_layers(layers)
-
         # Step 5: 获取模板配置
-        template_layers = self._get_template_config(pile_id, layers)
+        with trace_stage("layer_process"):
+            layers = self._process_layers(layers)
+            template_layers = self._get_template_config(pile_id, layers)
         pile_name = self.pile_db.get_pile(pile_id).get("name", str(pile_id)) if self.pile_db else str(pile_id)
         logger.info(f"[Detection] 使用垛型: pile_id={pile_id}({pile_name}), 期望层配置={template_layers}")
 
+        # Step 5.5: 深度图处理（在满层判断之前；只计算堆垛/顶层区域，开启可视化时计算全图）
+        with trace_stage("depth"):
+            self._process_depth_image(processing_image_path, vis_output_dir,
+                                      roi=self._depth_roi(pile_roi, layers))
+
         # 可视化：处理后的分层结果（使用旋转后的图像）
         if self.enable_visualization:
-            self._save_layer_visualization(processing_image_path, boxes, pile_roi, layers, vis_output_dir)
+            with trace_stage("visualization"):
+                self._save_layer_visualization(processing_image_path, boxes, pile_roi, layers, vis_output_dir,
+                                               image=processing_image)
 
         # Step 6: 处理堆垛（满层判断和计数）
         # 传递原始YOLO检测结果，供单层处理器提取top类使用
-        total_count = self.process(layers, template_layers, pile_roi,
-                                  yolo_detections=detections,
-                                  image_path=image_path,
-                                  output_dir=vis_output_dir)
+        with trace_stage("process"):
+            total_count = self.process(layers, template_layers, pile_roi,
+                                      yolo_detections=detections,
+                                      image_path=image_path,
+                                      output_dir=vis_output_dir)
 
         logger.info(f"[Detection] ===== 识别结果汇总 =====")
         logger.info(f"[Detection] 最终计数: {total_count} 箱")
@@ -223,10 +333,70 @@ class StackProcessorFactory:
 
         # 可视化：最终结果（使用旋转后的图像）
         if self.enable_visualization:
-            self._save_final_visualization(processing_image_path, pile_roi, layers, vis_output_dir)
+            with trace_stage("visualization"):
+                self._save_final_visualization(processing_image_path, pile_roi, layers, vis_output_dir,
+                                               image=processing_image)
         
         return total_count
     
+    def detect_batch(self, image_paths: Sequence[Union[str, Path]], batch_size: int = 8) -> List[Dict]:
+        """
+        批量YOLO检测：按固定大小分批，将多张旋转后的图像堆叠为一个批次推理
+        
+        每批图像只在推理期间驻留内存；单张图像读取失败不影响其他图像。
+        
+        :param image_paths: 图片路径或目录列表（目录按 count 的规则查找 main.jpeg）
+        :param batch_size: 每批图像数量
+        :return: 与输入顺序一致的列表
+                 [{"image_path": str, "detections": List[Dict] | None, "error": str | None,
+                   "timings": {"decode": ms, "yolo": ms}}, ...]
+                 yolo 耗时为所在批次耗时按图像数均摊
+        """
+        self._ensure_detector()
+        batch_size = max(1, int(batch_size))
+        results: List[Dict] = []
+        
+        for batch_start in range(0, len(image_paths), batch_size):
+            batch_items = []
+            frames = []
+            for image_path in image_paths[batch_start:batch_start + batch_size]:
+                item = {"image_path": str(image_path), "detections": None, "error": None, "timings": {}}
+                results.append(item)
+                start = time.perf_counter()
+                try:
+                    main_image_path, _ = self._find_image_files(image_path)
+                    if main_image_path is None:
+                        main_image_path = Path(image_path)
+                    item["image_path"] = str(main_image_path)
+                    frames.append(ImageContext(main_image_path, rotation_angle=90).image)
+                    batch_items.append(item)
+                except Exception as e:
+                    item["error"] = str(e)
+                item["timings"]["decode"] = round((time.perf_counter() - start) * 1000, 1)
+            
+            if not frames:
+                continue
+            
+            start = time.perf_counter()
+            try:
+                batch_results = self._detect(frames)
+                yolo_ms = round((time.perf_counter() - start) * 1000 / len(frames), 1)
+                for item, detections in zip(batch_items, batch_results):
+                    item["detections"] = detections
+                    item["timings"]["yolo"] = yolo_ms
+                for item in batch_items:
+                    if item["detections"] is None:
+                        item["error"] = "YOLO未返回该图像的检测结果"
+            except Exception as e:
+                for item in batch_items:
+                    item["error"] = f"YOLO批量推理失败: {e}"
+            
+            if self.enable_debug:
+                print(f"📦 批量检测: 第{batch_start // batch_size + 1}批 {len(frames)} 张, "
+                      f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        return results
+    
     def _find_image_files(self, input_path: Union[str, Path]) -> Tuple[Optional[Path], Optional[Path]]:
         """
         查找main.jpeg和fourth.jpeg文件
@@ -344,16 +514,9 @@ class StackProcessorFactory:
                 self.depth_image = None
                 self.depth_image_path_for_processing = None
         
-        # 初始化模型和数据库（如果未初始化）
-        if self.model is None:
-            project_root = Path(__file__).resolve().parent.parent.parent.parent
-            default_model_path = project_root / "shared" / "models" / "yolo" / "best.pt"
-            self._init_model(default_model_path)
-        
+        # 初始化数据库（如果未初始化）；YOLO模型在需要检测时才初始化
         if self.pile_db is None:
-            project_root = Path(__file__).resolve().parent.parent.parent.parent
-            default_config_path = project_root / "core" / "config" / "pile_config.json"
-            self._init_pile_db(default_config_path)
+            self._init_pile_db(DEFAULT_PILE_CONFIG_PATH)
         
         return image_path
     
@@ -372,20 +535,24 @@ class StackProcessorFactory:
         
         return vis_output_dir
     
-    def _run_yolo_detection(self, image_path: Path) -> List[Dict]:
-        """运行YOLO检测"""
+    def _run_yolo_detection(self, image_path: Path, image: Optional[np.ndarray] = None) -> List[Dict]:
+        """
+        运行YOLO检测
+        
+        :param image_path: 图像路径（未提供image时从该路径读取，也用于命名输出文件）
+        :param image: 已解码的BGR图像（可选，提供时直接作为YOLO输入，不再读取文件）
+        """
         if self.enable_debug:
             print(f"开始检测图片: {image_path}")
+        if image is None:
+            image = load_image(image_path)
+            if image is None:
+                raise FileNotFoundError(f"无法读取图像: {image_path}")
         
-        results = self.model.predict(
-            source=str(image_path),
-            save=False,
-            conf=self.confidence_threshold
-        )
-        detections = extract_yolo_detections(results)
+        detections = self._detect([image])[0]
         
         # 在debug模式下保存YOLO检测结果图
-        if self.enable_debug and results:
+        if self.enable_debug:
             try:
                 # 准备输出目录
                 if self.output_dir:
@@ -398,11 +565,12 @@ class StackProcessorFactory:
                 image_stem = image_path_obj.stem
                 yolo_output_path = output_dir / f"{image_stem}_yolo_detection.jpg"
                 
-                # 使用YOLO的plot方法生成带检测框的图像
-                annotated_img = results[0].plot()
-                cv2.imwrite(str(yolo_output_path), annotated_img)
-                
-                print(f"💾 已保存YOLO检测结果图: {yolo_output_path}")
+                # 使用检测器后端绘制带检测框的图像（绘制和写盘都在后台完成）
+                detector_backend = self.detector_backend
+                snapshot = copy.deepcopy(detections)
+                if self._save_artifacts and self.artifact_sink.save_image(
+                        lambda: detector_backend.plot(image, snapshot), yolo_output_path):
+                    print(f"💾 已提交后台保存YOLO检测结果图: {yolo_output_path}")
                 print(f"   检测到 {len(detections)} 个对象")
             except Exception as e:
                 if self.enable_debug:
@@ -416,8 +584,9 @@ class StackProcessorFactory:
         return detections
     
     def _prepare_scene(self, detections: List[Dict], image_path: Path,
-                      vis_output_dir: Optional[Path]) -> Optional[Dict]:
-        """场景准备"""
+                      vis_output_dir: Optional[Path],
+                      image: Optional[np.ndarray] = None) -> Optional[Dict]:
+        """场景准备（image 为已解码的图像，提供时可视化不再读取文件）"""
         prepared = prepare_logic(detections, conf_thr=self.confidence_threshold)
         
         if prepared is None:
@@ -429,22 +598,24 @@ class StackProcessorFactory:
         if self.enable_visualization:
             image_path_obj = Path(image_path) if isinstance(image_path, str) else image_path
             image_name = image_path_obj.stem
-            prepare_scene(
-                image_path=str(image_path_obj),
-                yolo_output=detections,
+            snapshot = copy.deepcopy(detections)
+            submitted = self._submit_artifact(f"{image_name}_step1_scene_prepare.jpg", lambda: prepare_scene(
+                image_path=image if image is not None else str(image_path_obj),
+                yolo_output=snapshot,
                 conf_thr=self.confidence_threshold,
                 save_path=f"{image_name}_step1_scene_prepare.jpg",
                 show=False,
                 output_dir=vis_output_dir
-            )
-            if self.enable_debug:
-                print(f"💾 已保存场景准备结果图")
+            ))
+            if submitted and self.enable_debug:
+                print(f"💾 已提交后台保存场景准备结果图")
         
         return prepared
     
     def _cluster_layers(self, boxes: List[Dict], pile_roi: Dict[str, float],
-                       image_path: Union[str, Path], vis_output_dir: Optional[Path]) -> List[Dict]:
-        """分层聚类"""
+                       image_path: Union[str, Path], vis_output_dir: Optional[Path],
+                       image: Optional[np.ndarray] = None) -> List[Dict]:
+        """分层聚类（image 为已解码的图像，提供时可视化不再读取文件）"""
         layer_result = cluster_layers_with_box_roi(boxes, pile_roi)
         layers = layer_result.get("layers", [])
         
@@ -457,27 +628,29 @@ class StackProcessorFactory:
         if self.enable_visualization:
             image_path_obj = Path(image_path) if isinstance(image_path, str) else image_path
             image_name = image_path_obj.stem
-            visualize_layers(
-                image_path=str(image_path_obj),
-                boxes=boxes,
-                pile_roi=pile_roi,
+            image_source = image if image is not None else str(image_path_obj)
+            boxes_snapshot, roi_snapshot = copy.deepcopy(boxes), dict(pile_roi)
+            submitted = self._submit_artifact(f"{image_name}_step2_layers.jpg", lambda: visualize_layers(
+                image_path=image_source,
+                boxes=boxes_snapshot,
+                pile_roi=roi_snapshot,
                 save_path=f"{image_name}_step2_layers.jpg",
                 gap_ratio=0.6,
                 show=False,
                 output_dir=vis_output_dir
-            )
-            visualize_layers_with_roi(
-                image_path=str(image_path_obj),
-                boxes=boxes,
-                pile_roi=pile_roi,
+            ))
+            submitted = self._submit_artifact(f"{image_name}_step2_layers_roi.jpg", lambda: visualize_layers_with_roi(
+                image_path=image_source,
+                boxes=boxes_snapshot,
+                pile_roi=roi_snapshot,
                 save_path=f"{image_name}_step2_layers_roi.jpg",
                 gap_ratio=0.6,
                 padding_ratio=0.1,
                 show=False,
                 output_dir=vis_output_dir
-            )
-            if self.enable_debug:
-                print(f"💾 已保存分层聚类结果图")
+            )) or submitted
+            if submitted and self.enable_debug:
+                print(f"💾 已提交后台保存分层聚类结果图")
         
         return layers
     
@@ -507,36 +680,39 @@ class StackProcessorFactory:
     
     def _save_layer_visualization(self, image_path: Union[str, Path], boxes: List[Dict],
                                   pile_roi: Dict[str, float], layers: List[Dict],
-                                  vis_output_dir: Path):
+                                  vis_output_dir: Path, image: Optional[np.ndarray] = None):
         """保存分层处理后的可视化结果"""
         image_path_obj = Path(image_path) if isinstance(image_path, str) else image_path
         image_name = image_path_obj.stem
-        visualize_layers_with_box_roi(
-            image_path=str(image_path_obj),
-            boxes=boxes,
-            pile_roi=pile_roi,
+        boxes_snapshot, roi_snapshot = copy.deepcopy(boxes), dict(pile_roi)
+        submitted = self._submit_artifact(f"{image_name}_step3_layers_boxes.jpg", lambda: visualize_layers_with_box_roi(
+            image_path=image if image is not None else str(image_path_obj),
+            boxes=boxes_snapshot,
+            pile_roi=roi_snapshot,
             save_path=f"{image_name}_step3_layers_boxes.jpg",
             show=False,
             target_layers=1,
             alpha=0.3,
             box_thickness=5,
             output_dir=vis_output_dir
-        )
-        if self.enable_debug:
-            print(f"💾 已保存分层box ROI结果图")
+        ))
+        if submitted and self.enable_debug:
+            print(f"💾 已提交后台保存分层box ROI结果图")
     
     def _save_final_visualization(self, image_path: Union[str, Path], pile_roi: Dict[str, float],
-                                  layers: List[Dict], vis_output_dir: Path):
+                                  layers: List[Dict], vis_output_dir: Path,
+                                  image: Optional[np.ndarray] = None):
         """保存最终结果的可视化"""
         image_path_obj = Path(image_path) if isinstance(image_path, str) else image_path
         image_name = image_path_obj.stem
         layer_result_for_vis = {
             "layer_count": len(layers),
-            "layers": layers
+            "layers": copy.deepcopy(layers)
         }
-        draw_layers_with_box_roi(
-            img_path=str(image_path_obj),
-            pile_roi=pile_roi,
+        roi_snapshot = dict(pile_roi)
+        submitted = self._submit_artifact(f"{image_name}_step4_final_result.jpg", lambda: draw_layers_with_box_roi(
+            img_path=image if image is not None else str(image_path_obj),
+            pile_roi=roi_snapshot,
             layer_result=layer_result_for_vis,
             save_path=f"{image_name}_step4_final_result.jpg",
             target_layers=1,
@@ -544,9 +720,21 @@ class StackProcessorFactory:
             alpha=0.35,
             show=False,
             output_dir=vis_output_dir
-        )
-        if self.enable_debug:
-            print(f"💾 已保存最终结果图")
+        ), priority=ARTIFACT_FINAL)
+        if submitted and self.enable_debug:
+            print(f"💾 已提交后台保存最终结果图")
+    
+    def _submit_artifact(self, name: str, job: Callable[[], Any], priority: int = ARTIFACT_DEBUG) -> bool:
+        """
+        提交可视化/调试图到后台写盘器（本次计数不保存产物、策略不保存或队列已满时返回False）
+
+        :param name: 产物名称（用于日志）
+        :param job: 渲染并写盘的无参函数（引用的数据需为快照，提交后不再修改）
+        :param priority: 优先级
+        """
+        if not self._save_artifacts:
+            return False
+        return self.artifact_sink.submit(job, name=name, priority=priority)
     
     def process(self, layers: List[Dict], template_layers: List[int], 
                 pile_roi: Dict[str, float], 
@@ -565,7 +753,8 @@ class StackProcessorFactory:
         :return: 总箱数（烟箱数）
         """
         # Step 1: 满层判断
-        detection_result = self.detector.detect(layers, template_layers, pile_roi, depth_image=self.depth_image)
+        with trace_stage("full_layer_detect"):
+            detection_result = self.detector.detect(layers, template_layers, pile_roi, depth_image=self.depth_image)
         # 将pile_roi添加到detection_result中，供后续处理使用
         detection_result["pile_roi"] = pile_roi
         # 将原始YOLO检测结果添加到detection_result中，供单层处理器使用
@@ -576,8 +765,8 @@ class StackProcessorFactory:
         reason = detection_result.get("reason", "")
         top_layer = detection_result.get("top_layer") or {}
 
-        # 深度矩阵缓存已经在满层判断之前生成（在count方法的Step 1.5中）
-        # 这里只需要将深度数据传递给检测结果
+        # 深度矩阵已经在满层判断之前生成（在count方法的Step 5.5中）
+        # 这里只需要将缓存路径（如果有）传递给检测结果
         if self.depth_matrix_csv_path:
             detection_result["depth_matrix_csv_path"] = self.depth_matrix_csv_path
 
@@ -592,28 +781,30 @@ class StackProcessorFactory:
             logger.info(f"[Detection] 覆盖率指标: coverage={metrics.get('coverage', 0):.3f}, cv_gap={metrics.get('cv_gap', 0):.3f}, cv_width={metrics.get('cv_width', 0):.3f}")
 
         # Step 2: 根据判断结果选择处理模块
-        if status == "single_layer":
-            logger.info("[Detection] 进入单层处理模块")
-            processing_result = self.single_layer_processor.process(
-                layers, template_layers, detection_result, depth_image=self.depth_image
-            )
-        elif status == "full" or is_full:
-            logger.info("[Detection] 进入满层处理模块")
-            processing_result = self.full_processor.process(
-                layers, template_layers, detection_result,
-                depth_image=self.depth_image,
-                depth_matrix_csv_path=self.depth_matrix_csv_path
-            )
-        else:  # status == "partial"
-            logger.info("[Detection] 进入非满层处理模块")
-            # 非满层处理时，传递图像路径和输出目录，让非满层处理器自己处理深度图
-            processing_result = self.partial_processor.process(
-                layers, template_layers, detection_result,
-                depth_image=self.depth_image,
-                depth_matrix_csv_path=self.depth_matrix_csv_path,
-                image_path=image_path,
-                output_dir=output_dir
-            )
+        with trace_stage("stack_process"):
+            if status == "single_layer":
+                logger.info("[Detection] 进入单层处理模块")
+                processing_result = self.single_layer_processor.process(
+                    layers, template_layers, detection_result, depth_image=self.depth_image
+                )
+            elif status == "full" or is_full:
+                logger.info("[Detection] 进入满层处理模块")
+                processing_result = self.full_processor.process(
+                    layers, template_layers, detection_result,
+                    depth_image=self.depth_image,
+                    depth_matrix_csv_path=self.depth_matrix_csv_path
+                )
+            else:  # status == "partial"
+                logger.info("[Detection] 进入非满层处理模块")
+                # 非满层处理时，传递图像路径和输出目录，让非满层处理器自己处理深度图
+                processing_result = self.partial_processor.process(
+                    layers, template_layers, detection_result,
+                    depth_image=self.depth_image,
+                    depth_matrix_csv_path=self.depth_matrix_csv_path,
+                    image_path=image_path,
+                    output_dir=output_dir,
+                    depth_matrix=self.depth_matrix
+                )
 
         # Step 3: 返回总箱数
         total_count = processing_result["total"]
@@ -624,13 +815,13 @@ class StackProcessorFactory:
     def _rotate_and_save_image(self, image_path: Union[str, Path],
                                output_dir: Optional[Union[str, Path]]) -> Optional[str]:
         """
-        旋转原图并保存
+        保存旋转后的原图（旋转已在 ImageContext 中完成，这里只异步写盘）
         - debug模式下：保存到output目录，命名为 {原图名}_rotated.{扩展名}
         - 非debug模式下：保存到原图路径，命名为 raw.jpg 和 {原图名}_rotated.{扩展名}
         
         :param image_path: 输入图像路径
         :param output_dir: 输出目录（用于debug模式）
-        :return: 旋转后的图像路径（如果成功），否则返回None
+        :return: 旋转后的图像路径（写盘在后台完成），出错时返回None
         """
         try:
             image_path = Path(image_path)
@@ -653,50 +844,67 @@ class StackProcessorFactory:
                 # 非debug模式：保存到原图路径，命名为 raw.jpg
                 rotated_path = original_dir / "raw.jpg"
             
-            # 使用深度计算器的旋转功能
-            rotated_path_str = self.depth_calculator.rotate_image(
-                str(image_path),
-                rotation_angle=90,
-                output_path=str(rotated_path),
-                overwrite=True  # 允许覆盖
-            )
-            
             # 无论debug模式与否，都要保存 {原图名}_rotated.{扩展名} 到原始路径
-            rotated_filename = f"{image_stem}_rotated{image_suffix}"
-            rotated_path_original = original_dir / rotated_filename
-            # 复制旋转后的图像到原始路径
-            import shutil
-            shutil.copy2(rotated_path_str, str(rotated_path_original))
-            if self.enable_debug:
-                print(f"✅ 已保存旋转图到原始路径: {rotated_path_original}")
+            rotated_path_original = original_dir / f"{image_stem}_rotated{image_suffix}"
+            save_paths = [rotated_path]
+            if rotated_path_original != rotated_path:
+                save_paths.append(rotated_path_original)
             
-            # 非debug模式下，还要保存 raw.jpg 到原始路径
-            if not (self.enable_debug and output_dir is not None):
-                raw_path = original_dir / "raw.jpg"
-                if rotated_path != raw_path:  # 如果路径不同，才需要复制
-                    shutil.copy2(rotated_path_str, str(raw_path))
-                    if self.enable_debug:
-                        print(f"✅ 已保存raw.jpg到原始路径: {raw_path}")
+            # 同一份内存图像只编码一次，在后台线程写入所有路径
+            self.image_context.save_async(save_paths)
             
             if self.enable_debug:
-                print(f"✅ 原图已旋转并保存至: {rotated_path_str}")
-            else:
-                print(f"✅ 原图已旋转并保存至: {rotated_path_str}")
+                print(f"✅ 原图已旋转，后台保存至: {', '.join(str(p) for p in save_paths)}")
             
-            return rotated_path_str
+            return str(rotated_path)
             
         except Exception as e:
             if self.enable_debug:
-                print(f"⚠️  旋转原图时出错: {e}")
+                print(f"⚠️  保存旋转原图时出错: {e}")
             return None
     
+    def _depth_roi(self, pile_roi: Dict[str, float],
+                   layers: List[Dict]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        深度计算区域（旋转后RGB图的归一化坐标，深度矩阵与其使用同一坐标系）
+
+        深度只在顶层箱子中心点采样，默认只计算顶层所在的横带（宽度取整个堆垛）；
+        开启可视化时需要完整的深度彩色图，返回None表示计算全图
+
+        :param pile_roi: 堆垛ROI（含 image_width / image_height）
+        :param layers: 处理后的分层结果（最上层在前）
+        :return: (u1, v1, u2, v2)，None 表示全图
+        """
+        if self.enable_visualization or self.depth_region == "full":
+            return None
+        image_width = pile_roi.get("image_width")
+        image_height = pile_roi.get("image_height")
+        if not image_width or not image_height:
+            return None
+
+        x1, y1, x2, y2 = pile_roi["x1"], pile_roi["y1"], pile_roi["x2"], pile_roi["y2"]
+        top_boxes = layers[0].get("boxes", []) if layers else []
+        if self.depth_region == "top_layer" and top_boxes:
+            rois = [box.get("roi", box) for box in top_boxes]
+            y1 = min(roi["y1"] for roi in rois)
+            y2 = max(roi["y2"] for roi in rois)
+            x1 = min(x1, min(roi["x1"] for roi in rois))
+            x2 = max(x2, max(roi["x2"] for roi in rois))
+
+        pad_x = (pile_roi["x2"] - pile_roi["x1"]) * self.depth_roi_padding
+        pad_y = (pile_roi["y2"] - pile_roi["y1"]) * self.depth_roi_padding
+        return (max(0.0, (x1 - pad_x) / image_width), max(0.0, (y1 - pad_y) / image_height),
+                min(1.0, (x2 + pad_x) / image_width), min(1.0, (y2 + pad_y) / image_height))
+
     def _process_depth_image(self, image_path: Union[str, Path],
-                             output_dir: Optional[Union[str, Path]]):
+                             output_dir: Optional[Union[str, Path]],
+                             roi: Optional[Tuple[float, float, float, float]] = None):
         """
         处理深度图：在满层判断之前生成深度矩阵缓存
         
         :param image_path: 原始图像路径（RGB图像，已旋转）
         :param output_dir: 输出目录（用于保存视差图可视化）
+        :param roi: 深度计算区域（旋转后RGB图的归一化坐标，见 _depth_roi；None 表示全图）
         """
         try:
             if self.enable_debug:
@@ -705,6 +913,7 @@ class StackProcessorFactory:
                 print(f"   图像路径: {image_path}")
                 print(f"   输出目录: {output_dir}")
                 print(f"   深度图路径: {self.depth_image_path_for_processing}")
+                print(f"   计算区域: {tuple(round(v, 3) for v in roi) if roi else '全图'}")
                 print(f"   depth_calculator存在: {self.depth_calculator is not None}")
             
             # 检查是否有深度图路径
@@ -726,33 +935,28 @@ class StackProcessorFactory:
             else:
                 output_dir = Path(output_dir)
             
-            # 在debug模式下，保存深度图旋转前后的版本（用于调试对比）
+            # 在debug模式下，保存深度图旋转前后的版本（用于调试对比，旋转和写盘在后台完成）
             depth_image_path = self.depth_image_path_for_processing
-            if self.enable_debug:
+            if self.enable_debug and self._save_artifacts and self.depth_image is not None:
                 depth_stem = Path(depth_image_path).stem
                 depth_suffix = Path(depth_image_path).suffix
+                loaded_depth = self.depth_image
                 
                 # 保存加载的原始深度图（旋转前）
                 original_depth_path = output_dir / f"{depth_stem}_loaded_original{depth_suffix}"
-                cv2.imwrite(str(original_depth_path), self.depth_image)
-                print(f"💾 已保存加载的原始深度图（旋转前）: {original_depth_path}")
+                if self.artifact_sink.save_image(loaded_depth, original_depth_path):
+                    print(f"💾 已提交后台保存加载的原始深度图（旋转前）: {original_depth_path}")
                 
                 # 保存旋转后的深度图（仅用于调试对比，不用于处理）
-                rotated_depth_filename = f"{depth_stem}_rotated_for_debug{depth_suffix}"
-                rotated_depth_path = output_dir / rotated_depth_filename
-                
-                rotated_depth_path_str = self.depth_calculator.rotate_image(
-                    str(depth_image_path),
-                    rotation_angle=90,
-                    output_path=str(rotated_depth_path),
-                    overwrite=False
-                )
-                print(f"💾 已保存旋转后的深度图（仅用于调试）: {rotated_depth_path_str}")
+                rotated_depth_path = output_dir / f"{depth_stem}_rotated_for_debug{depth_suffix}"
+                if self.artifact_sink.save_image(lambda: rotate_image_array(loaded_depth, 90), rotated_depth_path):
+                    print(f"💾 已提交后台保存旋转后的深度图（仅用于调试）: {rotated_depth_path}")
                 print(f"   注意：实际处理时使用原始深度图，不旋转")
             
-            # 准备深度缓存目录
+            # 准备深度缓存目录（仅在需要持久化深度矩阵时创建）
             depth_cache_dir = output_dir / "depth_cache"
-            depth_cache_dir.mkdir(parents=True, exist_ok=True)
+            if self.depth_cache_format:
+                depth_cache_dir.mkdir(parents=True, exist_ok=True)
             
             # 计算深度矩阵（只对深度图进行split和处理，不旋转）
             # 视差图可视化保存到主output目录
@@ -765,22 +969,26 @@ class StackProcessorFactory:
             # 使用原始深度图进行处理（不旋转，直接split）
             # 传递原图目录，用于在非debug模式下保存depth.jpg
             original_image_dir = self.original_image_dir if hasattr(self, 'original_image_dir') else None
-            depth_array, csv_path = self.depth_calculator.process_stereo_image(
+            depth_array, cache_path = self.depth_calculator.process_stereo_image(
                 str(depth_image_path),  # 使用原始深度图，不旋转
                 str(depth_cache_dir),
                 debug_output_dir=debug_output_dir,
                 skip_rotation=True,  # 跳过旋转
-                original_image_dir=original_image_dir  # 传递原图目录
+                original_image_dir=original_image_dir,  # 传递原图目录
+                cache_format=self.depth_cache_format,
+                roi=roi,
+                save_visuals=self._save_artifacts
             )
             
-            # 保存深度矩阵CSV路径
-            self.depth_matrix_csv_path = csv_path
+            # 保存深度矩阵缓存路径（未持久化时为None）
+            self.depth_matrix_csv_path = cache_path
             
-            # 同时保存深度图数组供后续使用
+            # 深度矩阵以内存数组形式传递给后续处理
+            self.depth_matrix = depth_array
             self.depth_image = depth_array
             
             if self.enable_debug:
-                print(f"✅ 深度矩阵缓存已生成: {csv_path}")
+                print(f"✅ 深度矩阵已生成: 尺寸={depth_array.shape}, 缓存={cache_path or '未持久化'}")
                 print("=" * 50 + "\n")
                 
         except Exception as e:
@@ -790,6 +998,7 @@ class StackProcessorFactory:
                 import traceback
                 traceback.print_exc()
             self.depth_matrix_csv_path = None
+            self.depth_matrix = None
             self.depth_image = None
 
 
@@ -799,18 +1008,24 @@ def count_boxes(image_path: Union[str, Path], pile_id: int,
                 pile_config_path: Optional[Union[str, Path]] = None,
                 enable_debug: bool = False,
                 enable_visualization: bool = False,
-                output_dir: Optional[Union[str, Path]] = None) -> int:
+                output_dir: Optional[Union[str, Path]] = None,
+                depth_cache_format: Optional[str] = None,
+                detections: Optional[List[Dict]] = None) -> int:
     """
     算法统一入口（便捷函数）：从图片路径和pile_id计算总箱数
     
+    YOLO模型和堆垛配置来自进程级模型注册表，多次调用共享同一份已预热的实例。
+    
     :param image_path: 图片路径（RGB图片）
     :param pile_id: 堆垛ID
     :param depth_image_path: 深度图路径（可选，预留参数）
-    :param model_path: YOLO模型路径（可选，默认使用 shared/models/yolo/best.pt）
+    :param model_path: 检测模型路径（可选，默认使用 config.json 中 detector 配置的模型，未配置时为 shared/models/yolo/best.pt）
     :param pile_config_path: 堆垛配置路径（可选，默认使用 core/config/pile_config.json）
     :param enable_debug: 是否启用调试输出（打印日志）
     :param enable_visualization: 是否启用可视化（保存效果图到output目录）
     :param output_dir: 可视化输出目录（可选，默认使用 core/detection/output）
+    :param depth_cache_format: 深度矩阵持久化格式（可选，默认只在内存中传递；"npy"/"npz"/"csv"）
+    :param detections: 预先计算的YOLO检测结果（可选，提供时跳过YOLO）
     :return: 总箱数（烟箱数）
     
     示例:
@@ -831,7 +1046,145 @@ def count_boxes(image_path: Union[str, Path], pile_id: int,
         enable_visualization=enable_visualization,
         model_path=model_path,
         pile_config_path=pile_config_path,
-        output_dir=output_dir
+        output_dir=output_dir,
+        depth_cache_format=depth_cache_format
     )
-    return factory.count(image_path, pile_id, depth_image_path=depth_image_path)
+    return factory.count(image_path, pile_id, depth_image_path=depth_image_path, detections=detections)
+
+
+def count_boxes_traced(image_path: Union[str, Path], pile_id: int,
+                       depth_image_path: Optional[Union[str, Path]] = None,
+                       profile: Optional[str] = None,
+                       **factory_kwargs) -> Dict[str, Any]:
+    """
+    计数并返回各阶段追踪结果（墙钟/CPU时间、读写字节数、峰值内存增量），可在工作进程中执行
+    
+    :param image_path: 图片路径
+    :param pile_id: 堆垛ID
+    :param depth_image_path: 深度图路径（可选）
+    :param profile: 性能分析方式（可选，"cprofile" / "pyinstrument"）
+    :param factory_kwargs: StackProcessorFactory 的其他参数
+    :return: {"total": int, "trace": {"stages": [...], "profile": {...}}}
+    :raises: 计数失败时抛出原异常（与 count_boxes 一致）
+    """
+    factory = StackProcessorFactory(**factory_kwargs)
+    total = factory.count(image_path, pile_id, depth_image_path=depth_image_path, profile=profile)
+    return {"total": total, "trace": factory.last_trace}
+
+
+def count_batch_item(image_path: Union[str, Path], pile_id: int,
+                     depth_image_path: Optional[Union[str, Path]] = None,
+                     detections: Optional[List[Dict]] = None,
+                     **factory_kwargs) -> Dict[str, Any]:
+    """
+    批量计数中单个库位的后处理（场景准备、分层聚类、堆垛处理），可在工作进程中执行
+    
+    :param image_path: 图片路径
+    :param pile_id: 堆垛ID
+    :param depth_image_path: 深度图路径（可选）
+    :param detections: 该图片的YOLO检测结果
+    :param factory_kwargs: StackProcessorFactory 的其他参数
+    :return: {"total": int | None, "error": str | None, "timings": {stage: ms}, "trace": {"stages": [...]}}
+    """
+    factory = StackProcessorFactory(**factory_kwargs)
+    try:
+        total = factory.count(image_path, pile_id, depth_image_path=depth_image_path, detections=detections)
+        return {"total": total, "error": None, "timings": factory.last_timings, "trace": factory.last_trace}
+    except Exception as e:
+        logger.error(f"[Detection] 批量计数失败: image_path={image_path}, pile_id={pile_id}, error={e}")
+        return {"total": None, "error": str(e), "timings": factory.last_timings, "trace": factory.last_trace}
+
+
+def count_boxes_batch(items: Sequence[Sequence[Any]],
+                      batch_size: int = 8,
+                      max_workers: int = 2,
+                      model_path: Optional[Union[str, Path]] = None,
+                      pile_config_path: Optional[Union[str, Path]] = None,
+                      enable_debug: bool = False,
+                      enable_visualization: bool = False,
+                      output_dir: Optional[Union[str, Path]] = None) -> List[Dict[str, Any]]:
+    """
+    批量计数：YOLO按固定批次推理，后处理（深度、场景准备、分层聚类、堆垛处理）分发到进程池
+    
+    :param items: [(image_path, pile_id), (image_path, pile_id, depth_image_path), ...]
+    :param batch_size: YOLO批次大小
+    :param max_workers: 后处理进程数（<=1 时在当前进程中顺序执行）
+    :param model_path: 检测模型路径（可选）
+    :param pile_config_path: 堆垛配置路径（可选）
+    :param enable_debug: 是否启用调试输出
+    :param enable_visualization: 是否启用可视化
+    :param output_dir: 可视化输出目录（可选）
+    :return: 与输入顺序一致的结果列表
+             [{"index": int, "image_path": str, "pile_id": int, "total": int | None,
+               "error": str | None, "timings": {stage: ms}, "stages": [后处理阶段追踪记录]}, ...]
+    """
+    items = normalize_batch_items(items)
+    factory_kwargs = {
+        "enable_debug": enable_debug,
+        "enable_visualization": enable_visualization,
+        "pile_config_path": pile_config_path,
+        "output_dir": output_dir,
+    }
+    
+    # Step 1: 批量YOLO检测
+    detector = StackProcessorFactory(enable_debug=enable_debug, model_path=model_path)
+    detected = detector.detect_batch([image_path for image_path, _, _ in items], batch_size=batch_size)
+    
+    # Step 2: 后处理分发（检测失败的库位不再后处理）
+    pending = [i for i, det in enumerate(detected) if det["error"] is None]
+    post_args = [
+        dict(image_path=detected[i]["image_path"], pile_id=items[i][1], depth_image_path=items[i][2],
+             detections=detected[i]["detections"], **factory_kwargs)
+        for i in pending
+    ]
+    if max_workers > 1 and len(pending) > 1:
+        # spawn 方式创建进程，避免 fork 带有模型/线程状态的父进程
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(pending)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(count_batch_item, **kwargs) for kwargs in post_args]
+            post_results = dict(zip(pending, [f.result() for f in futures]))
+    else:
+        post_results = dict(zip(pending, [count_batch_item(**kwargs) for kwargs in post_args]))
+    
+    return [
+        merge_batch_result(index, item, detected[index], post_results.get(index))
+        for index, item in enumerate(items)
+    ]
 
+
+def normalize_batch_items(items: Sequence[Sequence[Any]]) -> List[Tuple[Any, int, Any]]:
+    """将批量输入统一为 (image_path, pile_id, depth_image_path) 三元组"""
+    normalized = []
+    for item in items:
+        item = tuple(item)
+        if len(item) not in (2, 3):
+            raise ValueError(f"批量输入项应为 (image_path, pile_id[, depth_image_path]): {item}")
+        normalized.append(item if len(item) == 3 else item + (None,))
+    return normalized
+
+
+def merge_batch_result(index: int, item: Tuple[Any, int, Any], detected: Dict,
+                       post: Optional[Dict]) -> Dict[str, Any]:
+    """
+    合并单个库位的批量检测结果和后处理结果
+    
+    :param index: 输入序号
+    :param item: (image_path, pile_id, depth_image_path)
+    :param detected: detect_batch 返回的对应项
+    :param post: count_batch_item 的返回值（检测失败时为None）
+    """
+    timings = dict(detected["timings"])
+    if post is not None:
+        # 后处理阶段的 decode 为重新解码，单独记录，不覆盖批量阶段的耗时
+        for stage, ms in post["timings"].items():
+            timings["post_decode" if stage == "decode" else stage] = ms
+    return {
+        "index": index,
+        "image_path": detected["image_path"],
+        "pile_id": item[1],
+        "depth_image_path": str(item[2]) if item[2] else None,
+        "total": post["total"] if post else None,
+        "error": post["error"] if post else detected["error"],
+        "timings": timings,
+        "stages": post["trace"].get("stages", []) if post else [],
+    }
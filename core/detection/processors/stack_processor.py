@@ -145,7 +145,8 @@ class PartialStackProcessor(ABC):
                 depth_image: Optional[np.ndarray] = None,
                 depth_matrix_csv_path: Optional[str] = None,
                 image_path: Optional[Union[str, Path]] = None,
-                output_dir: Optional[Union[str, Path]] = None) -> Dict:
+                output_dir: Optional[Union[str, Path]] = None,
+                depth_matrix: Optional[np.ndarray] = None) -> Dict:
         """
         处理非满层堆垛，计算总箱数
         
@@ -153,7 +154,8 @@ class PartialStackProcessor(ABC):
         :param template_layers: 模板层配置（每层期望的箱数）
         :param detection_result: 满层判断结果
         :param depth_image: 深度图（可选，numpy数组）
-        :param depth_matrix_csv_path: 深度矩阵CSV路径（可选，从满层检测缓存中获取）
+        :param depth_matrix_csv_path: 深度矩阵缓存路径（可选，CSV/NPY/NPZ）
+        :param depth_matrix: 深度矩阵（可选，毫米，内存中传递，优先于缓存文件）
         :param image_path: 图像路径（可选，用于深度图处理）
         :param output_dir: 输出目录（可选，用于保存深度图处理结果）
         :return: 处理结果字典，包含 total(int), details(dict) 等
@@ -274,21 +276,22 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                 print(f"   处理流程：直接对原始深度图进行split，不旋转")
             
             # 使用原始深度图进行处理（不旋转，直接split）
-            depth_array, csv_path = self.depth_calculator.process_stereo_image(
+            depth_array, cache_path = self.depth_calculator.process_stereo_image(
                 str(depth_image_path),  # 使用原始深度图，不旋转
                 str(depth_cache_dir),
                 debug_output_dir=debug_output_dir,
-                skip_rotation=True  # 跳过旋转
+                skip_rotation=True,  # 跳过旋转
+                cache_format="npy"
             )
             
             # 更新深度图数组
             self.depth_image = depth_array
             
             if self.enable_debug:
-                print(f"✅ 深度矩阵缓存已生成: {csv_path}")
+                print(f"✅ 深度矩阵缓存已生成: {cache_path}")
                 print("=" * 50 + "\n")
             
-            return csv_path
+            return cache_path
                 
         except Exception as e:
             if self.enable_debug:
@@ -304,12 +307,13 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                                                top_layer_boxes: List[Dict],
                                                pile_roi: Dict[str, float],
                                                depth_image: Optional[np.ndarray],
-                                               depth_matrix_csv_path: Optional[str]) -> int:
+                                               depth_matrix_csv_path: Optional[str],
+                                               depth_matrix: Optional[np.ndarray] = None) -> int:
         """
         使用深度图计算最高层的箱子数量
         
         算法思路：
-        1. 如果提供了深度矩阵CSV路径，优先使用CSV数据
+        1. 如果提供了深度矩阵（内存数组或缓存文件），优先在箱子中心点采样深度
         2. 如果提供了深度图数组，使用深度信息进行更精确的计算
         3. 如果没有深度数据，则使用检测到的箱子数量
         
@@ -317,27 +321,32 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
         :param top_layer_boxes: 顶层的所有烟箱boxes（已过滤）
         :param pile_roi: 堆垛ROI区域
         :param depth_image: 深度图（可选，numpy数组）
-        :param depth_matrix_csv_path: 深度矩阵CSV路径（可选，从满层检测缓存中获取）
+        :param depth_matrix_csv_path: 深度矩阵缓存路径（可选，CSV/NPY/NPZ）
+        :param depth_matrix: 深度矩阵（可选，毫米，内存中传递，优先于缓存文件）
         :return: 计算出的顶层箱子数量
         """
         # 如果没有深度数据，直接返回检测到的箱子数量
-        if depth_image is None and depth_matrix_csv_path is None:
+        if depth_image is None and depth_matrix_csv_path is None and depth_matrix is None:
             count = len(top_layer_boxes)
             if self.enable_debug:
                 print(f"📊 未提供深度数据，使用检测结果: {count} 个箱子")
             return count
         
-        # 优先使用深度矩阵CSV（如果存在）
-        if depth_matrix_csv_path is not None and Path(depth_matrix_csv_path).exists():
+        # 优先使用深度矩阵（内存数组，其次缓存文件）
+        if depth_matrix is not None or (depth_matrix_csv_path is not None and Path(depth_matrix_csv_path).exists()):
             if self.enable_debug:
-                print(f"📊 使用深度矩阵CSV缓存: {depth_matrix_csv_path}")
+                if depth_matrix is not None:
+                    print(f"📊 使用内存中的深度矩阵")
+                else:
+                    print(f"📊 使用深度矩阵缓存: {depth_matrix_csv_path}")
             
             try:
                 from core.detection.depth import DepthProcessor
                 depth_processor = DepthProcessor(enable_debug=self.enable_debug)
                 
                 # 加载深度矩阵以获取图像尺寸
-                depth_matrix = depth_processor.load_depth_matrix(depth_matrix_csv_path)
+                if depth_matrix is None:
+                    depth_matrix = depth_processor.load_depth_matrix(depth_matrix_csv_path)
                 depth_height, depth_width = depth_matrix.shape
                 
                 # 获取原始图像尺寸（从pile_roi推断，或使用深度矩阵尺寸）
@@ -350,8 +359,8 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                     print(f"📊 深度矩阵尺寸: {depth_width}x{depth_height}, "
                           f"图像尺寸: {image_width}x{image_height}")
                 
-                # 对每个顶层box的中心点提取深度值
-                depth_values = []
+                # 收集每个顶层box的中心点，一次批量提取深度值
+                centers = []
                 for box in top_layer_boxes:
                     # 获取box的中心点（像素坐标）
                     if "roi" in box:
@@ -368,19 +377,13 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                     # 确保归一化坐标在[0, 1]范围内
                     center_x_norm = max(0.0, min(1.0, center_x_norm))
                     center_y_norm = max(0.0, min(1.0, center_y_norm))
-                    
-                    # 提取深度值
-                    result = depth_processor.extract_depth_at_position(
-                        depth_matrix,
-                        center_x_norm,
-                        center_y_norm
-                    )
-                    
-                    if result["success"] and result["value"] > 0:
-                        depth_values.append(result["value"])
+                    centers.append((center_x_norm, center_y_norm))
+                
+                samples = depth_processor.extract_depth_at_positions(depth_matrix, centers)
+                depth_values = samples["value"][samples["success"] & (samples["value"] > 0)].tolist()
                 
                 if self.enable_debug:
-                    print(f"📊 从深度矩阵CSV提取到 {len(depth_values)} 个有效深度值")
+                    print(f"📊 从深度矩阵提取到 {len(depth_values)} 个有效深度值")
                     if depth_values:
                         print(f"   深度值范围: {min(depth_values):.1f} - {max(depth_values):.1f} mm")
                 
@@ -390,7 +393,7 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                 
             except Exception as e:
                 if self.enable_debug:
-                    print(f"⚠️  读取深度矩阵CSV时出错: {e}，回退使用检测结果")
+                    print(f"⚠️  读取深度矩阵时出错: {e}，回退使用检测结果")
                 base_count = len(top_layer_boxes)
         elif depth_image is not None:
             # 使用深度图数组进行计算
@@ -433,12 +436,14 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
                 depth_image: Optional[np.ndarray] = None,
                 depth_matrix_csv_path: Optional[str] = None,
                 image_path: Optional[Union[str, Path]] = None,
-                output_dir: Optional[Union[str, Path]] = None) -> Dict:
+                output_dir: Optional[Union[str, Path]] = None,
+                depth_matrix: Optional[np.ndarray] = None) -> Dict:
         """
         处理非满层堆垛
         
         :param depth_image: 深度图（可选，numpy数组）
-        :param depth_matrix_csv_path: 深度矩阵CSV路径（可选，从满层检测缓存中获取）
+        :param depth_matrix_csv_path: 深度矩阵缓存路径（可选，CSV/NPY/NPZ）
+        :param depth_matrix: 深度矩阵（可选，毫米，内存中传递，优先于缓存文件）
         :param image_path: 图像路径（可选，用于深度图处理）
         :param output_dir: 输出目录（可选，用于保存深度图处理结果）
         :return: {
@@ -502,7 +507,8 @@ class TemplateBasedPartialProcessor(PartialStackProcessor):
             top_layer_boxes=top_layer_boxes,
             pile_roi=pile_roi,
             depth_image=depth_image,
-            depth_matrix_csv_path=depth_matrix_csv_path
+            depth_matrix_csv_path=depth_matrix_csv_path,
+            depth_matrix=depth_matrix
         )
     
         # 计算下层模板总和（排除顶层）
@@ -559,7 +565,8 @@ def process_partial_stack(layers: List[Dict], template_layers: List[int],
                          depth_image: Optional[np.ndarray] = None,
                          depth_matrix_csv_path: Optional[str] = None,
                          image_path: Optional[Union[str, Path]] = None,
-                         output_dir: Optional[Union[str, Path]] = None) -> Dict:
+                         output_dir: Optional[Union[str, Path]] = None,
+                         depth_matrix: Optional[np.ndarray] = None) -> Dict:
     """
     处理非满层堆垛（便捷函数）
     
@@ -568,7 +575,8 @@ def process_partial_stack(layers: List[Dict], template_layers: List[int],
     :param detection_result: 满层判断结果
     :param processor: 自定义处理器（可选，默认使用 TemplateBasedPartialProcessor）
     :param depth_image: 深度图（可选，numpy数组）
-    :param depth_matrix_csv_path: 深度矩阵CSV路径（可选，从满层检测缓存中获取）
+    :param depth_matrix_csv_path: 深度矩阵缓存路径（可选，CSV/NPY/NPZ）
+    :param depth_matrix: 深度矩阵（可选，毫米，内存中传递）
     :param image_path: 图像路径（可选，用于深度图处理）
     :param output_dir: 输出目录（可选，用于保存深度图处理结果）
     :return: 处理结果字典
@@ -579,7 +587,8 @@ def process_partial_stack(layers: List[Dict], template_layers: List[int],
                             depth_image=depth_image,
                             depth_matrix_csv_path=depth_matrix_csv_path,
                             image_path=image_path,
-                            output_dir=output_dir)
+                            output_dir=output_dir,
+                            depth_matrix=depth_matrix)
 
 
 # ==================== 单层处理器 ====================
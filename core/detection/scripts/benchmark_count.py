@@ -0,0 +1,352 @@
+"""
+count_boxes 回归 + 吞吐基准测试
+
+在带标注的图片集上运行完整计数流程，输出：
+- 准确率（与标注总箱数比较，按堆垛状态和 pile_id 分组）
+- 总耗时与各阶段耗时的 p50/p95、吞吐量（库位/分钟）、各阶段峰值内存增量
+- 结果保存为 JSON，可与历史结果（--baseline）比较，延迟或准确率退化超过阈值时返回非0退出码
+
+图片集目录结构（默认 tests/test_images/benchmark）:
+    benchmark/
+    ├── labels.json
+    ├── p1_full_01/          # 每个样本一个目录，包含 main.jpeg 和 fourth.jpeg（深度图）
+    │   ├── main.jpeg
+    │   └── fourth.jpeg
+    └── ...
+
+labels.json:
+    {
+      "cases": [
+        {"name": "p1_full_01", "path": "p1_full_01", "pile_id": 1,
+         "stack_type": "full", "expected_total": 30},
+        ...
+      ]
+    }
+    stack_type 取值: full / partial / single_layer；path 为相对 labels.json 的目录或图片路径
+
+使用方法:
+    python -m core.detection.scripts.benchmark_count
+    python -m core.detection.scripts.benchmark_count --repeat 3 --baseline core/detection/output/benchmark/xxx.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.processors.factory import StackProcessorFactory
+from core.detection.utils.model_registry import DEFAULT_PILE_CONFIG_PATH, get_model_registry
+from core.detection.utils.tracer import peak_rss_kb
+
+DEFAULT_CORPUS_DIR = _project_root / "tests" / "test_images" / "benchmark"
+DEFAULT_OUTPUT_DIR = _project_root / "core" / "detection" / "output" / "benchmark"
+STACK_TYPES = ("full", "partial", "single_layer")
+
+
+def load_corpus(corpus_dir: Path) -> List[Dict[str, Any]]:
+    """
+    读取图片集标注
+
+    :param corpus_dir: 图片集目录（包含 labels.json）
+    :return: 样本列表，path 已解析为绝对路径
+    """
+    labels_path = Path(corpus_dir) / "labels.json"
+    if not labels_path.exists():
+        raise FileNotFoundError(f"标注文件不存在: {labels_path}")
+    with open(labels_path, "r", encoding="utf-8") as f:
+        cases = json.load(f).get("cases", [])
+
+    for case in cases:
+        missing = [key for key in ("path", "pile_id", "expected_total") if key not in case]
+        if missing:
+            raise ValueError(f"样本标注缺少字段 {missing}: {case}")
+        if case.get("stack_type") not in (None,) + STACK_TYPES:
+            raise ValueError(f"样本 stack_type 无效: {case}")
+        case.setdefault("name", str(case["path"]))
+        case["path"] = str((labels_path.parent / case["path"]).resolve())
+        if case.get("depth_image_path"):
+            case["depth_image_path"] = str((labels_path.parent / case["depth_image_path"]).resolve())
+    return cases
+
+
+def check_coverage(cases: List[Dict[str, Any]], pile_config_path: Path) -> List[str]:
+    """
+    检查图片集是否覆盖 pile_config.json 中每个 pile_id 的满层/非满层/单层三种状态
+
+    :return: 缺少的组合列表，如 ["pile_id=2/single_layer", ...]
+    """
+    pile_ids = [pile["id"] for pile in get_model_registry().get_pile_db(pile_config_path).list_piles()]
+    covered = {(case["pile_id"], case.get("stack_type")) for case in cases}
+    return [
+        f"pile_id={pile_id}/{stack_type}"
+        for pile_id in pile_ids
+        for stack_type in STACK_TYPES
+        if (pile_id, stack_type) not in covered
+    ]
+
+
+def run_benchmark(cases: List[Dict[str, Any]], repeat: int = 1, warmup: int = 1,
+                  **factory_kwargs) -> Dict[str, Any]:
+    """
+    逐个样本运行计数流程
+
+    :param cases: load_corpus 返回的样本列表
+    :param repeat: 每个样本测量次数
+    :param warmup: 正式测量前的预热次数（使用第一个样本，不计入结果）
+    :param factory_kwargs: StackProcessorFactory 参数（model_path、pile_config_path 等）
+    :return: {"runs": [...], "elapsed_s": float}
+    """
+    factory_kwargs.setdefault("enable_debug", False)
+    if cases:
+        for _ in range(warmup):
+            try:
+                StackProcessorFactory(**factory_kwargs).count(
+                    cases[0]["path"], cases[0]["pile_id"], depth_image_path=cases[0].get("depth_image_path"))
+            except Exception:
+                pass
+
+    runs = []
+    start = time.perf_counter()
+    for case in cases:
+        for iteration in range(repeat):
+            factory = StackProcessorFactory(**factory_kwargs)
+            total, error = None, None
+            try:
+                total = factory.count(case["path"], case["pile_id"],
+                                      depth_image_path=case.get("depth_image_path"))
+            except Exception as e:
+                error = str(e)
+            runs.append({
+                "name": case["name"],
+                "pile_id": case["pile_id"],
+                "stack_type": case.get("stack_type"),
+                "expected_total": case["expected_total"],
+                "total": total,
+                "error": error,
+                "iteration": iteration,
+                "timings": factory.last_timings,
+                "stages": factory.last_trace.get("stages", []),
+            })
+            print(f"{'✅' if total == case['expected_total'] else '❌'} {case['name']} #{iteration}: "
+                  f"识别={total}, 标注={case['expected_total']}, 耗时={factory.last_timings.get('total', 0):.1f} ms"
+                  + (f", 错误={error}" if error else ""))
+    return {"runs": runs, "elapsed_s": time.perf_counter() - start}
+
+
+def _accuracy(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """准确率：完全一致比例、平均绝对误差、失败次数"""
+    errors = [abs(r["total"] - r["expected_total"]) for r in runs if r["total"] is not None]
+    return {
+        "samples": len(runs),
+        "exact_match": round(sum(1 for r in runs if r["total"] == r["expected_total"]) / len(runs), 4) if runs else None,
+        "mae": round(float(np.mean(errors)), 3) if errors else None,
+        "failed": sum(1 for r in runs if r["error"] is not None),
+    }
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(float(np.percentile(values, 50)), 1),
+        "p95": round(float(np.percentile(values, 95)), 1),
+        "max": round(float(np.max(values)), 1),
+    }
+
+
+def summarize(benchmark: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    汇总基准结果
+
+    :param benchmark: run_benchmark 的返回值
+    :return: {"accuracy", "accuracy_by_stack_type", "accuracy_by_pile_id", "latency_ms",
+              "throughput_bins_per_min", "stages"}
+    """
+    runs = benchmark["runs"]
+    by_stack_type: Dict[str, List] = {}
+    by_pile_id: Dict[str, List] = {}
+    for run in runs:
+        by_stack_type.setdefault(str(run["stack_type"]), []).append(run)
+        by_pile_id.setdefault(str(run["pile_id"]), []).append(run)
+
+    stage_wall: Dict[str, List[float]] = {}
+    stage_cpu: Dict[str, List[float]] = {}
+    stage_rss: Dict[str, List[int]] = {}
+    for run in runs:
+        for name, ms in run["timings"].items():
+            stage_wall.setdefault(name, []).append(ms)
+        for record in run["stages"]:
+            stage_cpu.setdefault(record["name"], []).append(record.get("cpu_ms") or 0.0)
+            if record.get("rss_peak_delta_kb") is not None:
+                stage_rss.setdefault(record["name"], []).append(record["rss_peak_delta_kb"])
+
+    stages = {}
+    for name, values in stage_wall.items():
+        stages[name] = {
+            "wall_ms": _percentiles(values),
+            "cpu_ms_p50": _percentiles(stage_cpu.get(name, []))["p50"],
+            "rss_peak_delta_kb_max": max(stage_rss[name]) if stage_rss.get(name) else None,
+        }
+
+    elapsed = benchmark["elapsed_s"]
+    return {
+        "accuracy": _accuracy(runs),
+        "accuracy_by_stack_type": {k: _accuracy(v) for k, v in sorted(by_stack_type.items())},
+        "accuracy_by_pile_id": {k: _accuracy(v) for k, v in sorted(by_pile_id.items(), key=lambda kv: kv[0])},
+        "latency_ms": _percentiles([run["timings"]["total"] for run in runs if "total" in run["timings"]]),
+        "throughput_bins_per_min": round(len(runs) / elapsed * 60, 2) if elapsed > 0 and runs else None,
+        "stages": stages,
+    }
+
+
+def compare_with_baseline(summary: Dict[str, Any], baseline: Dict[str, Any],
+                          max_latency_regression: float = 0.2,
+                          max_accuracy_drop: float = 0.0) -> List[str]:
+    """
+    与历史结果比较
+
+    :param summary: 本次 summarize 结果
+    :param baseline: 历史结果文件中的 summary
+    :param max_latency_regression: 允许的 p50/p95 总耗时相对增幅（0.2 表示 20%）
+    :param max_accuracy_drop: 允许的完全一致比例下降（绝对值）
+    :return: 退化说明列表（为空表示无退化）
+    """
+    regressions = []
+    for key in ("p50", "p95"):
+        current, previous = summary["latency_ms"][key], baseline["latency_ms"][key]
+        if current is not None and previous and current > previous * (1 + max_latency_regression):
+            regressions.append(
+                f"总耗时 {key} 退化: {previous:.1f} ms -> {current:.1f} ms "
+                f"(+{(current / previous - 1) * 100:.1f}%，阈值 {max_latency_regression * 100:.0f}%)"
+            )
+
+    current, previous = summary["accuracy"]["exact_match"], baseline["accuracy"]["exact_match"]
+    if current is not None and previous is not None and previous - current > max_accuracy_drop:
+        regressions.append(
+            f"准确率退化: {previous:.2%} -> {current:.2%}（允许下降 {max_accuracy_drop:.2%}）"
+        )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(summary: Dict[str, Any]):
+    accuracy = summary["accuracy"]
+    print("\n" + "=" * 60)
+    print("📊 基准测试结果")
+    print("=" * 60)
+    print(f"准确率: {accuracy['exact_match']:.2%}（{accuracy['samples']} 次, MAE={accuracy['mae']}, 失败={accuracy['failed']}）"
+          if accuracy["exact_match"] is not None else "准确率: 无样本")
+    for stack_type, acc in summary["accuracy_by_stack_type"].items():
+        print(f"   {stack_type:<14} {acc['exact_match']:.2%} ({acc['samples']} 次)")
+    latency = summary["latency_ms"]
+    print(f"总耗时: p50={latency['p50']} ms, p95={latency['p95']} ms, max={latency['max']} ms")
+    print(f"吞吐量: {summary['throughput_bins_per_min']} 库位/分钟")
+    print(f"\n{'阶段':<20}{'p50 ms':>10}{'p95 ms':>10}{'CPU p50':>10}{'峰值内存+KB':>14}")
+    for name, stage in summary["stages"].items():
+        rss = stage["rss_peak_delta_kb_max"]
+        print(f"{name:<20}{stage['wall_ms']['p50']:>10}{stage['wall_ms']['p95']:>10}"
+              f"{stage['cpu_ms_p50'] if stage['cpu_ms_p50'] is not None else '-':>10}"
+              f"{rss if rss is not None else '-':>14}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="count_boxes 回归 + 吞吐基准测试")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS_DIR), help="图片集目录（包含 labels.json）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个样本测量次数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热次数")
+    parser.add_argument("--model", default=None, help="检测模型路径（默认使用 config.json 中 detector 配置）")
+    parser.add_argument("--pile-config", default=str(DEFAULT_PILE_CONFIG_PATH), help="堆垛配置路径")
+    parser.add_argument("--output", default=None, help="结果JSON路径（默认 core/detection/output/benchmark/）")
+    parser.add_argument("--baseline", default=None, help="历史结果JSON路径（用于回归比较）")
+    parser.add_argument("--max-latency-regression", type=float, default=0.2, help="允许的总耗时相对增幅")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0, help="允许的准确率下降")
+    parser.add_argument("--require-coverage", action="store_true",
+                        help="图片集未覆盖所有 pile_id 的满层/非满层/单层时返回失败")
+    args = parser.parse_args()
+
+    try:
+        cases = load_corpus(Path(args.corpus))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ 读取图片集失败: {e}")
+        return 1
+    if not cases:
+        print(f"❌ 图片集为空: {args.corpus}")
+        return 1
+
+    missing = check_coverage(cases, Path(args.pile_config))
+    if missing:
+        print(f"⚠️  图片集未覆盖 {len(missing)} 个 pile_id/状态组合: {', '.join(missing)}")
+        if args.require_coverage:
+            return 1
+
+    benchmark = run_benchmark(cases, repeat=args.repeat, warmup=args.warmup,
+                              model_path=args.model, pile_config_path=args.pile_config)
+    summary = summarize(benchmark)
+    _print_summary(summary)
+
+    commit = _git_commit()
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": commit,
+            "corpus": str(Path(args.corpus).resolve()),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "detector": get_model_registry().status().get("detector_config"),
+            "peak_rss_kb": peak_rss_kb(),
+            "missing_coverage": missing,
+        },
+        "summary": summary,
+        "runs": benchmark["runs"],
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(summary, baseline["summary"],
+                                            args.max_latency_regression, args.max_accuracy_drop)
+        result["baseline"] = {"path": str(args.baseline), "git_commit": baseline["meta"].get("git_commit"),
+                              "regressions": regressions}
+
+    output_path = Path(args.output) if args.output else (
+        DEFAULT_OUTPUT_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}_{commit or 'nogit'}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output_path}")
+
+    if regressions:
+        print("\n❌ 相比基准结果出现退化:")
+        for message in regressions:
+            print(f"   - {message}")
+        return 1
+    if args.baseline:
+        print("\n✅ 未发现退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
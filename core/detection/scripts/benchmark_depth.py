@@ -0,0 +1,187 @@
+"""
+立体匹配模式基准测试
+
+对同一组双目图片（拼接图，左上象限为左图、右上象限为右图，同 DepthCalculator.split_stereo_pair）
+分别运行各立体匹配模式，输出：
+- 每帧耗时 mean/p50/p95
+- 与参考模式（默认 sgbm）相比的有效视差比例、共同有效像素的视差 MAE、误差超过阈值的坏点率
+
+使用方法:
+    python -m core.detection.scripts.benchmark_depth path/to/fourth.jpeg [更多图片或目录...]
+    python -m core.detection.scripts.benchmark_depth tests/test_images --repeat 5 --roi 100,50,500,400
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.depth.depth_calculator import DepthCalculator
+from core.detection.depth.stereo_engine import STEREO_MODES, StereoDepthEngine
+
+DEFAULT_OUTPUT_DIR = _project_root / "core" / "detection" / "output" / "benchmark"
+DEPTH_IMAGE_NAMES = ("fourth.jpeg", "fourth.jpg", "fourth.png")
+
+
+def collect_images(paths: List[str]) -> List[Path]:
+    """收集双目拼接图（目录下递归查找 fourth.*）"""
+    images = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            images.extend(sorted(p for p in path.rglob("*") if p.name in DEPTH_IMAGE_NAMES))
+        elif path.exists():
+            images.append(path)
+        else:
+            raise FileNotFoundError(f"图片不存在: {path}")
+    return images
+
+
+def load_stereo_pair(image_path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """读取拼接图并取上半部分的左右象限（灰度）"""
+    image = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise FileNotFoundError(f"无法读取图片: {image_path}")
+    left, right = DepthCalculator.split_stereo_pair(image)
+    return np.ascontiguousarray(left), np.ascontiguousarray(right)
+
+
+def compare_disparity(disparity: np.ndarray, reference: np.ndarray, bad_threshold: float = 1.0) -> Dict[str, Any]:
+    """与参考视差比较（只统计两者都有效的像素）"""
+    valid = disparity >= 0
+    both = valid & (reference >= 0)
+    error = np.abs(disparity[both] - reference[both])
+    return {
+        "valid_ratio": round(float(valid.mean()), 4),
+        "mae": round(float(error.mean()), 3) if error.size else None,
+        "bad_pixel_ratio": round(float((error > bad_threshold).mean()), 4) if error.size else None,
+    }
+
+
+def run_benchmark(images: List[Path], modes: List[str], reference_mode: str = "sgbm",
+                  repeat: int = 3, warmup: int = 1, scale: float = 0.5,
+                  roi: Optional[Tuple[int, int, int, int]] = None,
+                  bad_threshold: float = 1.0) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    :param images: 双目拼接图列表
+    :param modes: 要测试的模式
+    :param reference_mode: 参考模式（精度指标以其全图输出为基准）
+    :param repeat: 每张图每个模式的测量次数
+    :param warmup: 预热次数
+    :param scale: sgbm_downscaled 的缩放比例
+    :param roi: 只计算该区域（左图坐标，可选）
+    :param bad_threshold: 坏点判定阈值（像素）
+    """
+    engines = {mode: StereoDepthEngine(mode=mode, scale=scale) for mode in set(modes) | {reference_mode}}
+    latencies: Dict[str, List[float]] = {mode: [] for mode in modes}
+    quality: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in modes}
+
+    for image_path in images:
+        left, right = load_stereo_pair(image_path)
+        reference = engines[reference_mode].compute(left, right)
+        if roi is not None:
+            # 精度只在 ROI 内比较
+            x1, y1, x2, y2 = roi
+            reference = reference[y1:y2, x1:x2]
+        for mode in modes:
+            engine = engines[mode]
+            for _ in range(warmup):
+                engine.compute(left, right, roi=roi)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                disparity = engine.compute(left, right, roi=roi)
+                latencies[mode].append((time.perf_counter() - start) * 1000)
+            if roi is not None:
+                disparity = disparity[y1:y2, x1:x2]
+            quality[mode].append(compare_disparity(disparity, reference, bad_threshold))
+
+    summary = {}
+    for mode in modes:
+        values = latencies[mode]
+        metrics = {key: [q[key] for q in quality[mode] if q[key] is not None] for key in quality[mode][0]}
+        summary[mode] = {
+            "config": engines[mode].config(),
+            "latency_ms": {
+                "mean": round(float(np.mean(values)), 1),
+                "p50": round(float(np.percentile(values, 50)), 1),
+                "p95": round(float(np.percentile(values, 95)), 1),
+            },
+            **{key: round(float(np.mean(v)), 4) if v else None for key, v in metrics.items()},
+        }
+    return {
+        "reference_mode": reference_mode,
+        "images": [str(p) for p in images],
+        "repeat": repeat,
+        "roi": list(roi) if roi else None,
+        "bad_threshold": bad_threshold,
+        "modes": summary,
+    }
+
+
+def _print_summary(result: Dict[str, Any]):
+    print("\n" + "=" * 60)
+    print(f"📊 立体匹配基准测试结果（参考模式: {result['reference_mode']}，{len(result['images'])} 张图）")
+    print("=" * 60)
+    print(f"{'模式':<18}{'mean ms':>10}{'p50 ms':>10}{'有效比例':>10}{'MAE':>8}{'坏点率':>10}")
+    for mode, stats in result["modes"].items():
+        latency = stats["latency_ms"]
+        mae = stats["mae"] if stats["mae"] is not None else "-"
+        bad = f"{stats['bad_pixel_ratio']:.2%}" if stats["bad_pixel_ratio"] is not None else "-"
+        print(f"{mode:<18}{latency['mean']:>10}{latency['p50']:>10}{stats['valid_ratio']:>10.2%}{mae:>8}{bad:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="立体匹配模式基准测试")
+    parser.add_argument("inputs", nargs="+", help="双目拼接图或包含 fourth.jpeg 的目录")
+    parser.add_argument("--modes", default=",".join(STEREO_MODES), help="要测试的模式（逗号分隔）")
+    parser.add_argument("--reference", default="sgbm", choices=STEREO_MODES, help="参考模式")
+    parser.add_argument("--scale", type=float, default=0.5, help="sgbm_downscaled 的缩放比例")
+    parser.add_argument("--roi", default=None, help="只计算该区域 x1,y1,x2,y2（左图坐标）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模式测量次数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热次数")
+    parser.add_argument("--bad-threshold", type=float, default=1.0, help="坏点判定阈值（像素）")
+    parser.add_argument("--output", default=None, help="结果JSON路径（默认 core/detection/output/benchmark/）")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    invalid = [m for m in modes if m not in STEREO_MODES]
+    if invalid:
+        parser.error(f"不支持的模式: {', '.join(invalid)}")
+    roi = tuple(int(v) for v in args.roi.split(",")) if args.roi else None
+    if roi is not None and len(roi) != 4:
+        parser.error("--roi 格式应为 x1,y1,x2,y2")
+
+    images = collect_images(args.inputs)
+    if not images:
+        print("❌ 未找到双目拼接图")
+        return 1
+
+    result = run_benchmark(images, modes, reference_mode=args.reference, repeat=max(1, args.repeat),
+                           warmup=max(0, args.warmup), scale=args.scale, roi=roi,
+                           bad_threshold=args.bad_threshold)
+    result["timestamp"] = datetime.now().isoformat(timespec="seconds")
+    _print_summary(result)
+
+    output_path = Path(args.output) if args.output else \
+        DEFAULT_OUTPUT_DIR / f"depth_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+导出检测模型为 ONNX / OpenVINO 格式（供 CPU 推理后端使用）
+
+使用方法:
+    python -m core.detection.scripts.export_detector --format onnx
+    python -m core.detection.scripts.export_detector --format openvino --int8 --data data.yaml
+
+导出完成后，将 config.json 中 detector.model_path 指向导出的模型
+（.onnx 文件或 *_openvino_model 目录），detector.backend 设为 "auto" 或对应后端名称。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.utils.model_registry import DEFAULT_MODEL_PATH
+
+
+def export_detector(model_path: str, export_format: str = "onnx", imgsz: int = 640,
+                    int8: bool = False, data: str = None, dynamic: bool = True) -> str:
+    """
+    导出检测模型
+
+    :param model_path: .pt 权重路径
+    :param export_format: 导出格式（"onnx" / "openvino"）
+    :param imgsz: 输入尺寸
+    :param int8: 是否INT8量化（openvino 需要提供校准数据集 data）
+    :param data: 校准数据集配置（data.yaml）
+    :param dynamic: 是否导出动态 batch（批量推理时使用）
+    :return: 导出的模型路径
+    """
+    from ultralytics import YOLO
+
+    kwargs = {"format": export_format, "imgsz": imgsz, "dynamic": dynamic}
+    if int8:
+        kwargs["int8"] = True
+        if data:
+            kwargs["data"] = data
+    return YOLO(model_path).export(**kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出检测模型为 ONNX / OpenVINO 格式")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH), help=".pt 权重路径")
+    parser.add_argument("--format", default="onnx", choices=["onnx", "openvino"], help="导出格式")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--int8", action="store_true", help="INT8 量化")
+    parser.add_argument("--data", default=None, help="INT8 校准数据集配置（data.yaml）")
+    parser.add_argument("--static", action="store_true", help="导出固定 batch=1 的模型")
+    args = parser.parse_args()
+
+    output = export_detector(args.model, args.format, args.imgsz, args.int8, args.data, not args.static)
+    print(f"✅ 导出完成: {output}")
+
+
+if __name__ == "__main__":
+    main()
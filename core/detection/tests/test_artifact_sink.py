@@ -0,0 +1,207 @@
+"""
+产物写盘器（core/detection/utils/artifact_sink.py）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_artifact_sink
+    或
+    python core/detection/tests/test_artifact_sink.py
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.utils.artifact_sink import (
+    ARTIFACT_DEBUG,
+    ARTIFACT_FINAL,
+    ARTIFACT_REQUIRED,
+    ArtifactSink,
+)
+
+
+def test_policies():
+    """保存策略：none / final / all / sample"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 保存策略")
+    print("="*60)
+
+    expected = {
+        "none": (False, False, True),
+        "final": (False, True, True),
+        "all": (True, True, True),
+    }
+    for policy, accepted in expected.items():
+        sink = ArtifactSink(policy=policy)
+        actual = tuple(sink.accepts(p) for p in (ARTIFACT_DEBUG, ARTIFACT_FINAL, ARTIFACT_REQUIRED))
+        if actual != accepted:
+            print(f"❌ 策略 {policy} 判定错误: {actual}")
+            return False
+
+    sink = ArtifactSink(policy="sample", sample_every=3)
+    runs = [sink.begin_run() for _ in range(7)]
+    if runs != [True, False, False, True, False, False, True]:
+        print(f"❌ sample 策略抽样错误: {runs}")
+        return False
+    if ArtifactSink(policy="none").begin_run():
+        print("❌ none 策略不应保存产物")
+        return False
+    print("✅ 保存策略正确")
+    return True
+
+
+def test_drop_under_pressure():
+    """队列满时丢弃低优先级产物，必需产物不丢弃"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 队列满时的丢弃")
+    print("="*60)
+
+    sink = ArtifactSink(policy="all", max_queue=2)
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def job(name):
+        def _run():
+            started.set()
+            release.wait(5)
+            written.append(name)
+        return _run
+
+    # 第一个任务占住写盘线程，之后的任务在队列中排队
+    sink.submit(job("busy"), name="busy")
+    started.wait(5)
+    sink.submit(job("debug1"), name="debug1", priority=ARTIFACT_DEBUG)
+    sink.submit(job("debug2"), name="debug2", priority=ARTIFACT_DEBUG)
+    rejected = not sink.submit(job("debug3"), name="debug3", priority=ARTIFACT_DEBUG)
+    sink.submit(job("final"), name="final", priority=ARTIFACT_FINAL)
+    sink.submit(job("required"), name="required", priority=ARTIFACT_REQUIRED)
+    release.set()
+    if not sink.flush(5):
+        print("❌ flush 超时")
+        return False
+
+    status = sink.status()
+    if not rejected or written != ["busy", "debug2", "final", "required"] or status["dropped"] != 2:
+        print(f"❌ 丢弃结果错误: rejected={rejected}, written={written}, status={status}")
+        return False
+    print(f"✅ 队列满时丢弃正确: {status}")
+    return True
+
+
+def test_save_image():
+    """后台渲染并写盘，flush 后文件可读"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 后台保存图像")
+    print("="*60)
+
+    sink = ArtifactSink(policy="all")
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        array_path = Path(tmp_dir) / "array.png"
+        render_path = Path(tmp_dir) / "render.png"
+        sink.save_image(image, array_path)
+        sink.save_image(lambda: cv2.rectangle(image.copy(), (5, 5), (20, 20), (0, 0, 255), -1), render_path)
+        sink.submit(lambda: 1 / 0, name="broken")
+        if not sink.flush(5):
+            print("❌ flush 超时")
+            return False
+        rendered = cv2.imread(str(render_path))
+        if cv2.imread(str(array_path)) is None or rendered is None or rendered[10, 10, 2] != 255:
+            print("❌ 图像未正确写入")
+            return False
+    status = sink.status()
+    sink.close()
+    if status["written"] != 2 or status["failed"] != 1 or sink.submit(lambda: None):
+        print(f"❌ 写盘统计或关闭状态错误: {status}")
+        return False
+    print(f"✅ 后台保存图像正确: {status}")
+    return True
+
+
+def test_atomic_write():
+    """写入临时文件后替换：覆盖已有文件，失败时不留下临时文件"""
+    print("\n" + "="*60)
+    print("🧪 测试4: 原子写入")
+    print("="*60)
+
+    sink = ArtifactSink(policy="all")
+    image = np.full((40, 60, 3), 255, dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target = Path(tmp_dir) / "main_rotated.jpg"
+        target.write_bytes(b"old")
+        # 目标路径是目录时替换失败
+        blocked = Path(tmp_dir) / "blocked.jpg"
+        blocked.mkdir()
+        sink.save_image(image, target, priority=ARTIFACT_REQUIRED)
+        sink.save_image(image, blocked, priority=ARTIFACT_REQUIRED)
+        if not sink.flush(5):
+            print("❌ flush 超时")
+            return False
+        leftovers = sorted(p.name for p in Path(tmp_dir).iterdir() if p.name.endswith(".tmp"))
+        written = cv2.imread(str(target))
+        status = sink.status()
+        if written is None or written.shape != image.shape or leftovers or status["failed"] != 1:
+            print(f"❌ 原子写入错误: leftovers={leftovers}, status={status}")
+            return False
+    sink.close()
+    print(f"✅ 原子写入正确: {status}")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行产物写盘器测试")
+    print("="*60)
+
+    tests = [
+        ("保存策略测试", test_policies),
+        ("队列满时丢弃测试", test_drop_under_pressure),
+        ("后台保存图像测试", test_save_image),
+        ("原子写入测试", test_atomic_write),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,180 @@
+"""
+条码区域裁剪（core/vision/barcode_roi.py）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_barcode_roi
+    或
+    python core/detection/tests/test_barcode_roi.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.vision.barcode_roi import BarcodeRoiDecoder, crop_barcode_rois, deskew, estimate_skew
+
+
+def _make_barcode_image(angle: float = 0.0) -> np.ndarray:
+    """生成白底黑条的模拟条码图像（400x200，条码区域约 x:60-340, y:50-150）"""
+    image = np.full((200, 400, 3), 255, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    x = 60
+    while x < 340:
+        width = int(rng.integers(2, 7))
+        cv2.rectangle(image, (x, 50), (x + width - 1, 150), (0, 0, 0), -1)
+        x += width + int(rng.integers(2, 7))
+    if angle:
+        matrix = cv2.getRotationMatrix2D((200, 100), angle, 1.0)
+        image = cv2.warpAffine(image, matrix, (400, 200), borderValue=(255, 255, 255))
+    return image
+
+
+class _FakeDetector:
+    def __init__(self, detections):
+        self.detections = detections
+
+    def detect(self, images, conf=0.25):
+        return [list(self.detections) for _ in images]
+
+
+class _FakeDecoder:
+    """记录调用；crop_success 为 True 时裁剪区域解码成功"""
+
+    def __init__(self, crop_success: bool):
+        self.crop_success = crop_success
+        self.calls = []
+
+    def decode_crops(self, crops, filename, code_type=None, timeout=30.0):
+        self.calls.append(("crops", [c.shape for c in crops]))
+        return {"filename": filename, "output": "ROI" if self.crop_success else "", "error": ""}
+
+    def decode_image(self, image_path, filename=None, code_type=None, timeout=30.0):
+        self.calls.append(("image", image_path))
+        return {"filename": filename, "output": "FULL", "error": ""}
+
+
+def test_deskew():
+    """倾斜角度估计与纠偏"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 倾斜估计与纠偏")
+    print("="*60)
+
+    if abs(estimate_skew(_make_barcode_image())) > 0.5:
+        print(f"❌ 水平条码角度应接近0: {estimate_skew(_make_barcode_image())}")
+        return False
+    for angle in (10, -12, 25):
+        rotated = _make_barcode_image(angle)
+        estimated = estimate_skew(rotated)
+        corrected = estimate_skew(deskew(rotated))
+        if abs(estimated - angle) > 1.0 or abs(corrected) > 1.0:
+            print(f"❌ 角度 {angle}: 估计 {estimated:.2f}, 纠偏后 {corrected:.2f}")
+            return False
+    print("✅ 倾斜估计与纠偏正确")
+    return True
+
+
+def test_crop_rois():
+    """边距裁剪、按置信度排序、小区域放大"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 条码区域裁剪")
+    print("="*60)
+
+    image = _make_barcode_image()
+    boxes = [
+        {"cls": "barcode", "conf": 0.5, "x1": 60, "y1": 50, "x2": 340, "y2": 150},
+        {"cls": "barcode", "conf": 0.9, "x1": 0, "y1": 0, "x2": 30, "y2": 20},
+    ]
+    crops = crop_barcode_rois(image, boxes, pad_ratio=0.15, deskew_enabled=False, min_side=160)
+    # 高置信度的小框在前：加边距后 42x32（裁剪到图像边界），放大倍数上限为3倍；大框短边放大到 160
+    if [c.shape for c in crops] != [(96, 126, 3), (160, 448, 3)]:
+        print(f"❌ 裁剪尺寸错误: {[c.shape for c in crops]}")
+        return False
+    print("✅ 条码区域裁剪正确")
+    return True
+
+
+def test_roi_fallback():
+    """先解码裁剪区域，未检测到区域或区域解码失败时回退到整图"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 裁剪区域解码与整图回退")
+    print("="*60)
+
+    box = {"cls": "barcode", "conf": 0.8, "x1": 60, "y1": 50, "x2": 340, "y2": 150}
+    pile = {"cls": "pile", "conf": 0.9, "x1": 0, "y1": 0, "x2": 400, "y2": 200}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = str(Path(tmp_dir) / "scan.jpg")
+        cv2.imwrite(image_path, _make_barcode_image())
+
+        cases = [
+            ([box, pile], True, "ROI", ["crops"]),
+            ([box], False, "FULL", ["crops", "image"]),
+            ([pile], True, "FULL", ["image"]),
+        ]
+        for detections, crop_success, expected, expected_calls in cases:
+            decoder = _FakeDecoder(crop_success)
+            roi_decoder = BarcodeRoiDecoder(decoder, detector=_FakeDetector(detections))
+            result = roi_decoder.decode_image(image_path)
+            calls = [kind for kind, _ in decoder.calls]
+            if result["output"] != expected or calls != expected_calls or result["filename"] != "scan.jpg":
+                print(f"❌ 解码流程错误: {result}, 调用: {calls}")
+                return False
+    print("✅ 裁剪区域解码与回退正确")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行条码区域裁剪测试")
+    print("="*60)
+
+    tests = [
+        ("倾斜估计与纠偏测试", test_deskew),
+        ("条码区域裁剪测试", test_crop_rois),
+        ("裁剪区域解码与回退测试", test_roi_fallback),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
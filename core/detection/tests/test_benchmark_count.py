@@ -0,0 +1,173 @@
+"""
+基准测试脚本（scripts/benchmark_count.py）汇总与回归比较逻辑的单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_benchmark_count
+    或
+    python core/detection/tests/test_benchmark_count.py
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.scripts.benchmark_count import (
+    check_coverage,
+    compare_with_baseline,
+    load_corpus,
+    summarize,
+)
+from core.detection.utils.model_registry import DEFAULT_PILE_CONFIG_PATH
+
+
+def _make_run(name, pile_id, stack_type, expected, total, total_ms):
+    return {
+        "name": name, "pile_id": pile_id, "stack_type": stack_type,
+        "expected_total": expected, "total": total, "error": None, "iteration": 0,
+        "timings": {"total": total_ms, "yolo": total_ms / 2},
+        "stages": [
+            {"name": "total", "parent": None, "wall_ms": total_ms, "cpu_ms": total_ms, "rss_peak_delta_kb": 0},
+            {"name": "yolo", "parent": "total", "wall_ms": total_ms / 2, "cpu_ms": 1.0, "rss_peak_delta_kb": 2048},
+        ],
+    }
+
+
+def test_load_corpus_and_coverage():
+    """标注读取（相对路径解析）与 pile_id/状态覆盖检查"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 标注读取与覆盖检查")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        labels = {"cases": [
+            {"name": "p1_full", "path": "p1_full", "pile_id": 1, "stack_type": "full", "expected_total": 30},
+            {"path": "p1_partial/main.jpeg", "pile_id": 1, "stack_type": "partial", "expected_total": 25},
+        ]}
+        with open(Path(tmp_dir) / "labels.json", "w", encoding="utf-8") as f:
+            json.dump(labels, f)
+        cases = load_corpus(Path(tmp_dir))
+
+    if cases[0]["path"] != str((Path(tmp_dir) / "p1_full").resolve()) or cases[1]["name"] != "p1_partial/main.jpeg":
+        print(f"❌ 路径/名称解析错误: {cases}")
+        return False
+
+    missing = check_coverage(cases, DEFAULT_PILE_CONFIG_PATH)
+    if "pile_id=1/full" in missing or "pile_id=1/single_layer" not in missing:
+        print(f"❌ 覆盖检查错误: {missing[:5]}")
+        return False
+    print(f"✅ 读取 {len(cases)} 个样本，缺少 {len(missing)} 个组合")
+    return True
+
+
+def test_summarize():
+    """准确率分组、延迟分位数、阶段汇总"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 结果汇总")
+    print("="*60)
+
+    runs = [
+        _make_run("a", 1, "full", 30, 30, 100.0),
+        _make_run("b", 1, "partial", 25, 24, 200.0),
+        _make_run("c", 2, "full", 40, 40, 300.0),
+        _make_run("d", 2, "single_layer", 8, 8, 400.0),
+    ]
+    summary = summarize({"runs": runs, "elapsed_s": 2.0})
+
+    checks = [
+        (summary["accuracy"]["exact_match"], 0.75),
+        (summary["accuracy"]["mae"], 0.25),
+        (summary["accuracy_by_stack_type"]["full"]["exact_match"], 1.0),
+        (summary["accuracy_by_pile_id"]["1"]["exact_match"], 0.5),
+        (summary["latency_ms"]["p50"], 250.0),
+        (summary["throughput_bins_per_min"], 120.0),
+        (summary["stages"]["yolo"]["rss_peak_delta_kb_max"], 2048),
+    ]
+    for got, expected in checks:
+        if got != expected:
+            print(f"❌ 汇总结果错误: {got} != {expected}")
+            return False
+    print("✅ 汇总结果正确")
+    return True
+
+
+def test_compare_with_baseline():
+    """延迟和准确率退化检测"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 回归比较")
+    print("="*60)
+
+    baseline = {"latency_ms": {"p50": 100.0, "p95": 200.0}, "accuracy": {"exact_match": 0.9}}
+    ok = {"latency_ms": {"p50": 110.0, "p95": 230.0}, "accuracy": {"exact_match": 0.9}}
+    slow = {"latency_ms": {"p50": 100.0, "p95": 260.0}, "accuracy": {"exact_match": 0.9}}
+    worse = {"latency_ms": {"p50": 90.0, "p95": 180.0}, "accuracy": {"exact_match": 0.85}}
+
+    if compare_with_baseline(ok, baseline, max_latency_regression=0.2):
+        print("❌ 阈值内的变化不应判定为退化")
+        return False
+    if len(compare_with_baseline(slow, baseline, max_latency_regression=0.2)) != 1:
+        print("❌ 未检测到 p95 延迟退化")
+        return False
+    if len(compare_with_baseline(worse, baseline)) != 1:
+        print("❌ 未检测到准确率退化")
+        return False
+    if compare_with_baseline(worse, baseline, max_accuracy_drop=0.1):
+        print("❌ 允许范围内的准确率下降不应判定为退化")
+        return False
+    print("✅ 回归比较正确")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行基准测试脚本测试")
+    print("="*60)
+
+    tests = [
+        ("标注读取与覆盖检查测试", test_load_corpus_and_coverage),
+        ("结果汇总测试", test_summarize),
+        ("回归比较测试", test_compare_with_baseline),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
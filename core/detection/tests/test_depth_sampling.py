@@ -0,0 +1,183 @@
+"""
+批量深度采样（DepthProcessor.extract_depth_at_positions）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_depth_sampling
+    或
+    python core/detection/tests/test_depth_sampling.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.depth import DepthProcessor
+
+
+def _make_depth_matrix(height: int = 480, width: int = 640, seed: int = 0) -> np.ndarray:
+    """构造模拟深度矩阵：平滑深度 + 噪声 + 无效点(0) + 视差无效时的超大值"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    depth = 1500.0 + 2.0 * xx + 1.5 * yy + rng.normal(0, 20, (height, width))
+    depth[rng.random((height, width)) < 0.15] = 0.0
+    depth[rng.random((height, width)) < 0.05] = 6.6e9
+    # 一块几乎全无效的区域（触发宽松过滤/无有效点分支）
+    depth[100:110, 200:210] = 0.0
+    depth[104, 204] = 1800.0
+    depth[300:310, 400:410] = 0.0
+    return depth.astype(np.float32)
+
+
+def _make_centers(n: int = 200, seed: int = 1) -> np.ndarray:
+    """随机中心点 + 边界/越界/全无效区域等特殊坐标"""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((n, 2))
+    special = np.array([
+        [0.0, 0.0],
+        [0.999, 0.999],
+        [1.0, 0.5],                  # x 越界
+        [0.5, 1.0],                  # y 越界
+        [205 / 640, 105 / 480],      # 全无效区域
+        [204 / 640, 104 / 480],      # 全无效区域中唯一的有效点
+        [405 / 640, 305 / 480],      # 窗口内无有效点
+    ])
+    return np.vstack([centers, special])
+
+
+def test_batch_matches_single():
+    """批量结果与逐点 extract_depth_at_position 一致"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 批量采样与逐点采样一致性")
+    print("="*60)
+
+    processor = DepthProcessor(enable_debug=False)
+    depth = _make_depth_matrix()
+    centers = _make_centers()
+    samples = processor.extract_depth_at_positions(depth, centers)
+
+    mismatches = []
+    for i, (nx, ny) in enumerate(centers):
+        expected = processor.extract_depth_at_position(depth, nx, ny)
+        got = samples[i]
+        if bool(got["success"]) != expected["success"]:
+            mismatches.append((i, "success", got["success"], expected["success"]))
+            continue
+        if not expected["success"]:
+            continue
+        for key in ("valid_points_count", "total_valid_points", "status"):
+            if got[key] != expected[key]:
+                mismatches.append((i, key, got[key], expected[key]))
+        # 逐点版本在 float32 上累加，允许少量舍入差异
+        for key in ("value", "median_value", "region_min", "region_max", "center_value"):
+            if not np.isclose(got[key], expected[key], rtol=1e-6, atol=0.11):
+                mismatches.append((i, key, got[key], expected[key]))
+        if not np.isclose(got["std"], expected["std"], rtol=1e-4, atol=1e-2):
+            mismatches.append((i, "std", got["std"], expected["std"]))
+        bounds = expected["region_bounds"]
+        for key in ("x_start", "x_end", "y_start", "y_end"):
+            if got[key] != bounds[key]:
+                mismatches.append((i, key, got[key], bounds[key]))
+
+    for mismatch in mismatches[:10]:
+        print(f"❌ 第{mismatch[0]}个坐标 {mismatch[1]}: 批量={mismatch[2]}, 逐点={mismatch[3]}")
+
+    if mismatches:
+        return False
+    print(f"✅ {len(centers)} 个坐标结果一致")
+    return True
+
+
+def test_batch_empty_input():
+    """空坐标列表返回空数组"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 空输入")
+    print("="*60)
+
+    processor = DepthProcessor(enable_debug=False)
+    samples = processor.extract_depth_at_positions(_make_depth_matrix(), [])
+    if len(samples) != 0:
+        print(f"❌ 期望空数组，实际长度 {len(samples)}")
+        return False
+    print("✅ 空输入返回空数组")
+    return True
+
+
+def test_batch_benchmark():
+    """微基准：批量采样与逐点循环耗时对比（仅打印，不作为失败条件）"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 批量采样微基准")
+    print("="*60)
+
+    processor = DepthProcessor(enable_debug=False)
+    depth = _make_depth_matrix()
+    centers = _make_centers(n=500)
+
+    start = time.perf_counter()
+    for nx, ny in centers:
+        processor.extract_depth_at_position(depth, nx, ny)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processor.extract_depth_at_positions(depth, centers)
+    batch_time = time.perf_counter() - start
+
+    print(f"📊 {len(centers)} 个坐标: 逐点 {single_time * 1000:.1f} ms, "
+          f"批量 {batch_time * 1000:.1f} ms, 加速 {single_time / max(batch_time, 1e-9):.1f}x")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行批量深度采样测试")
+    print("="*60)
+
+    tests = [
+        ("批量/逐点一致性测试", test_batch_matches_single),
+        ("空输入测试", test_batch_empty_input),
+        ("批量采样微基准", test_batch_benchmark),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,224 @@
+"""
+检测器推理后端（detector_backend）测试脚本
+
+- 后处理（letterbox / NMS / 坐标还原）与 ultralytics 一致性
+- .pt 与导出 ONNX 模型在测试图片上的检测结果一致性（需要 best.pt 与 onnxruntime）
+
+使用方法:
+    python -m core.detection.tests.test_detector_backend
+    或
+    python core/detection/tests/test_detector_backend.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.utils.detector_backend import (
+    OnnxBackend,
+    UltralyticsBackend,
+    _ExportedModelBackend,
+    resolve_backend_name,
+)
+from core.detection.utils.image_context import load_image
+from core.detection.utils.model_registry import DEFAULT_MODEL_PATH
+
+
+class _StaticOutputBackend(_ExportedModelBackend):
+    """不加载模型，仅用于测试公共后处理"""
+
+    def _infer(self, tensor):
+        raise NotImplementedError
+
+
+def _box_iou(a: dict, b: dict) -> float:
+    ix = max(0.0, min(a["x2"], b["x2"]) - max(a["x1"], b["x1"]))
+    iy = max(0.0, min(a["y2"], b["y2"]) - max(a["y1"], b["y1"]))
+    inter = ix * iy
+    area_a = (a["x2"] - a["x1"]) * (a["y2"] - a["y1"])
+    area_b = (b["x2"] - b["x1"]) * (b["y2"] - b["y1"])
+    return inter / (area_a + area_b - inter + 1e-7)
+
+
+def test_resolve_backend_name():
+    """按配置/文件类型选择后端"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 后端选择")
+    print("="*60)
+
+    cases = [
+        (("best.pt", None), "ultralytics"),
+        (("best.onnx", "auto"), "onnx"),
+        (("best_openvino_model", None), "openvino"),
+        (("model.xml", "auto"), "openvino"),
+        (("best.pt", "onnx"), "onnx"),
+    ]
+    for args, expected in cases:
+        got = resolve_backend_name(*args)
+        if got != expected:
+            print(f"❌ resolve_backend_name{args} = {got}，期望 {expected}")
+            return False
+    try:
+        resolve_backend_name("best.pt", "tensorrt")
+        print("❌ 未知后端应抛出 ValueError")
+        return False
+    except ValueError:
+        pass
+    print("✅ 后端选择正确")
+    return True
+
+
+def test_postprocess_matches_ultralytics():
+    """letterbox + NMS + 坐标还原与 ultralytics 结果一致"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 后处理与 ultralytics 一致性")
+    print("="*60)
+
+    try:
+        import torch
+        from ultralytics.data.augment import LetterBox
+        from ultralytics.utils.nms import non_max_suppression
+        from ultralytics.utils.ops import scale_boxes
+    except ImportError as e:
+        print(f"⚠️  跳过: 缺少 ultralytics/torch ({e})")
+        return True
+
+    backend = _StaticOutputBackend("static.onnx", names={i: f"c{i}" for i in range(4)})
+    rng = np.random.default_rng(0)
+    for image_shape in [(900, 600), (480, 720), (1080, 1920)]:
+        # letterbox 像素级一致
+        image = rng.integers(0, 255, image_shape + (3,), dtype=np.uint8)
+        padded, gains, pad = backend._letterbox(image)
+        expected = LetterBox((640, 640), auto=False)(image=image)
+        if padded.shape != expected.shape or not np.array_equal(padded, expected):
+            print(f"❌ {image_shape} letterbox 结果不一致")
+            return False
+
+        # 构造成簇的候选框，覆盖NMS抑制与按类别NMS
+        n = 3000
+        cx = rng.choice([100, 300, 500], n) + rng.normal(0, 8, n)
+        cy = rng.choice([120, 320, 520], n) + rng.normal(0, 8, n)
+        w, h = 60 + rng.normal(0, 5, n), 80 + rng.normal(0, 5, n)
+        output = np.concatenate([np.stack([cx, cy, w, h]), (rng.random((n, 4)) ** 3).T]).astype(np.float32)
+
+        mine = backend._postprocess(output, image_shape, (gains, pad), 0.25, 0.7)
+        ref = non_max_suppression(torch.from_numpy(output[None]), 0.25, 0.7)[0]
+        ref[:, :4] = scale_boxes((640, 640), ref[:, :4], image_shape)
+
+        got = np.array(sorted(([d["conf"], d["x1"], d["y1"], d["x2"], d["y2"], d["cls_id"]] for d in mine),
+                              key=lambda r: -r[0]))
+        exp = ref.numpy()[:, [4, 0, 1, 2, 3, 5]]
+        exp = exp[np.argsort(-exp[:, 0])]
+        if got.shape != exp.shape or not np.allclose(got, exp, atol=1e-3):
+            print(f"❌ {image_shape} 后处理结果不一致: {got.shape} vs {exp.shape}")
+            return False
+        print(f"✅ {image_shape}: {len(mine)} 个检测框一致")
+    return True
+
+
+def test_onnx_matches_pt():
+    """导出的 ONNX 模型与 .pt 在测试图片上的检测结果一致（逐框 IoU 匹配）"""
+    print("\n" + "="*60)
+    print("🧪 测试3: ONNX 与 .pt 检测结果一致性")
+    print("="*60)
+
+    if not DEFAULT_MODEL_PATH.exists():
+        print(f"⚠️  跳过: 模型文件不存在 {DEFAULT_MODEL_PATH}")
+        return True
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("⚠️  跳过: 未安装 onnxruntime")
+        return True
+
+    image_paths = sorted((_project_root / "tests" / "test_images").rglob("main.jp*g"))
+    if not image_paths:
+        print("⚠️  跳过: 没有测试图片")
+        return True
+
+    onnx_path = DEFAULT_MODEL_PATH.with_suffix(".onnx")
+    if not onnx_path.exists():
+        from core.detection.scripts.export_detector import export_detector
+        onnx_path = Path(export_detector(str(DEFAULT_MODEL_PATH), "onnx"))
+
+    pt_backend = UltralyticsBackend(DEFAULT_MODEL_PATH)
+    onnx_backend = OnnxBackend(onnx_path)
+    images = [load_image(p) for p in image_paths]
+    pt_results = pt_backend.detect(images)
+    onnx_results = onnx_backend.detect(images)
+
+    ok = True
+    for path, pt_dets, onnx_dets in zip(image_paths, pt_results, onnx_results):
+        # 阈值附近的框可能因数值误差有无不同，允许数量相差1
+        if abs(len(pt_dets) - len(onnx_dets)) > 1:
+            print(f"❌ {path.parent.name}: 检测数量 pt={len(pt_dets)}, onnx={len(onnx_dets)}")
+            ok = False
+            continue
+        unmatched = [
+            det for det in pt_dets
+            if det["conf"] > 0.3 and not any(
+                o["cls_id"] == det["cls_id"] and _box_iou(o, det) > 0.9 for o in onnx_dets
+            )
+        ]
+        if unmatched:
+            print(f"❌ {path.parent.name}: {len(unmatched)} 个 .pt 检测框在 ONNX 结果中无匹配")
+            ok = False
+        else:
+            print(f"✅ {path.parent.name}: pt={len(pt_dets)}, onnx={len(onnx_dets)}")
+    return ok
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行检测器后端测试")
+    print("="*60)
+
+    tests = [
+        ("后端选择测试", test_resolve_backend_name),
+        ("后处理一致性测试", test_postprocess_matches_ultralytics),
+        ("ONNX/.pt 一致性测试", test_onnx_matches_pt),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,144 @@
+"""
+分层聚类（core/detection/core/layer_clustering.py）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_layer_clustering
+    或
+    python core/detection/tests/test_layer_clustering.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.core.layer_clustering import (
+    boxes_to_array,
+    cluster_box_array,
+    cluster_layers,
+    cluster_layers_with_box_roi,
+    cluster_layers_with_roi,
+)
+from core.detection.core import layer_clustering
+
+
+def _make_boxes():
+    """3层 x 4列的箱子（中心y约 100/250/400），输入顺序打乱"""
+    boxes = []
+    for row, y in enumerate((40, 190, 340)):
+        for col in range(4):
+            boxes.append({"cls": "box", "conf": 0.9 - 0.01 * col, "x1": 20 + col * 110, "y1": y + col * 3,
+                          "x2": 120 + col * 110, "y2": y + 120 + col * 3})
+    order = np.random.default_rng(0).permutation(len(boxes))
+    return [boxes[i] for i in order]
+
+
+def test_cluster_kernel():
+    """聚类核心：层标签、每层统计"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 聚类核心")
+    print("="*60)
+
+    boxes = _make_boxes()
+    clusters = cluster_box_array(boxes_to_array(boxes))
+    expected_labels = [int((b["y1"] - 40) // 150) for b in boxes]
+    if clusters["layer_count"] != 3 or clusters["labels"].tolist() != expected_labels:
+        print(f"❌ 分层错误: {clusters['layer_count']}, {clusters['labels'].tolist()}")
+        return False
+    if clusters["y_top"].tolist() != [40, 190, 340] or clusters["y_bottom"].tolist() != [169, 319, 469]:
+        print(f"❌ 层边界错误: {clusters['y_top']}, {clusters['y_bottom']}")
+        return False
+    if cluster_box_array(np.empty((0, 4)))["layer_count"] != 0:
+        print("❌ 空输入应返回0层")
+        return False
+    print("✅ 聚类核心正确")
+    return True
+
+
+def test_cluster_views():
+    """三种分层接口的输出一致，且可视化重复聚类时复用缓存"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 分层接口与缓存复用")
+    print("="*60)
+
+    boxes = _make_boxes()
+    pile_roi = {"x1": 0, "y1": 30, "x2": 500, "y2": 480}
+    plain = cluster_layers(boxes, pile_roi)
+    with_roi = cluster_layers_with_roi(boxes, pile_roi)
+    hits = layer_clustering._cluster_box_array_cached.cache_info().hits
+    with_box_roi = cluster_layers_with_box_roi(boxes, pile_roi)
+
+    if layer_clustering._cluster_box_array_cached.cache_info().hits != hits + 1:
+        print("❌ 同一组检测框应复用聚类结果")
+        return False
+    if [l["avg_y"] for l in plain["layers"]] != [104.5, 254.5, 404.5]:
+        print(f"❌ 层中心错误: {[l['avg_y'] for l in plain['layers']]}")
+        return False
+    # 层ROI: 上下扩展 平均框高*0.1=12，并限制在pile范围内
+    if with_roi["layers"][0]["roi"] != {"y_top": 30.0, "y_bottom": 181.0}:
+        print(f"❌ 层ROI错误: {with_roi['layers'][0]['roi']}")
+        return False
+    top = with_box_roi["layers"][0]["boxes"]
+    if [b["roi"]["x1"] for b in top] != [20.0, 130.0, 240.0, 350.0] or top[0]["area"] != 12000.0 \
+            or [b["id"] for b in top] != [1, 2, 3, 4]:
+        print(f"❌ box ROI错误: {top}")
+        return False
+    if [len(l["boxes"]) for l in plain["layers"]] != [len(l["boxes"]) for l in with_box_roi["layers"]]:
+        print("❌ 各接口分层结果不一致")
+        return False
+    print("✅ 分层接口与缓存复用正确")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行分层聚类测试")
+    print("="*60)
+
+    tests = [
+        ("聚类核心测试", test_cluster_kernel),
+        ("分层接口与缓存复用测试", test_cluster_views),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,239 @@
+"""
+立体匹配引擎（core/detection/depth/stereo_engine.py）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_stereo_engine
+    或
+    python core/detection/tests/test_stereo_engine.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.depth.depth_calculator import DepthCalculator
+from core.detection.depth.stereo_engine import INVALID_DISPARITY, StereoDepthEngine
+
+SHIFT = 24
+
+
+def _make_stereo_pair(shift: int = SHIFT):
+    """生成随机纹理的双目图像对（右图为左图整体左移 shift 像素，真实视差为 shift）"""
+    rng = np.random.default_rng(0)
+    texture = rng.integers(0, 256, size=(60, 100), dtype=np.uint8)
+    texture = cv2.resize(texture, (400, 240), interpolation=cv2.INTER_CUBIC)
+    left = np.ascontiguousarray(texture[:, :360])
+    right = np.ascontiguousarray(texture[:, shift:360 + shift])
+    return left, right
+
+
+def _legacy_disparity(left, right):
+    """原 DepthCalculator.generate_disparity_map 中的逐帧 SGBM"""
+    window_size = 11
+    stereo = cv2.StereoSGBM_create(
+        minDisparity=0, numDisparities=128, blockSize=window_size,
+        P1=8 * 3 * window_size ** 2, P2=32 * 3 * window_size ** 2,
+        disp12MaxDiff=10, uniquenessRatio=20, speckleWindowSize=200, speckleRange=2
+    )
+    return stereo.compute(left, right).astype(np.float32) / 16.0
+
+
+def _median_valid(disparity, region=(slice(40, 200), slice(160, 340))):
+    values = disparity[region]
+    values = values[values >= 0]
+    return float(np.median(values)) if values.size else None
+
+
+def test_default_mode_matches_legacy():
+    """默认 sgbm 模式与原实现输出一致"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 默认模式与原实现一致")
+    print("="*60)
+
+    left, right = _make_stereo_pair()
+    engine = StereoDepthEngine()
+    disparity = engine.compute(left, right)
+    # 匹配器被复用，第二次计算结果不变
+    if not np.array_equal(disparity, _legacy_disparity(left, right)) or \
+            not np.array_equal(engine.compute(left, right), disparity):
+        print("❌ 视差与原实现不一致")
+        return False
+    print(f"✅ 输出一致（中位视差 {_median_valid(disparity)}）")
+    return True
+
+
+def test_fast_modes():
+    """缩小匹配和 BM 模式能恢复出接近真实值的视差"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 快速模式视差")
+    print("="*60)
+
+    left, right = _make_stereo_pair()
+    for mode in ("sgbm_downscaled", "bm"):
+        disparity = StereoDepthEngine(mode=mode).compute(left, right)
+        median = _median_valid(disparity)
+        if disparity.shape != left.shape or median is None or abs(median - SHIFT) > 1.5:
+            print(f"❌ {mode}: 尺寸 {disparity.shape}, 中位视差 {median}")
+            return False
+        print(f"   {mode}: 中位视差 {median:.2f}")
+    print("✅ 快速模式视差正确")
+    return True
+
+
+def test_roi():
+    """只在 ROI 内匹配，区域外为无效视差"""
+    print("\n" + "="*60)
+    print("🧪 测试3: ROI 匹配")
+    print("="*60)
+
+    left, right = _make_stereo_pair()
+    roi = (200, 60, 320, 180)
+    disparity = StereoDepthEngine().compute(left, right, roi=roi)
+    outside = np.ones(disparity.shape, dtype=bool)
+    outside[roi[1]:roi[3], roi[0]:roi[2]] = False
+    median = _median_valid(disparity, (slice(roi[1], roi[3]), slice(roi[0], roi[2])))
+    if not np.all(disparity[outside] == INVALID_DISPARITY) or median is None or abs(median - SHIFT) > 1.0:
+        print(f"❌ ROI 匹配错误: 中位视差 {median}")
+        return False
+    print(f"✅ ROI 匹配正确（中位视差 {median:.2f}）")
+    return True
+
+
+def test_rotated_roi():
+    """旋转后坐标系中的区域正确映射到未旋转的双目图"""
+    print("\n" + "="*60)
+    print("🧪 测试4: 旋转坐标区域映射")
+    print("="*60)
+
+    left, right = _make_stereo_pair()
+    stereo = np.vstack([np.hstack([left, right])] * 2)
+    calculator = DepthCalculator(enable_debug=False)
+    roi = (0.2, 0.2, 0.7, 0.6)  # 旋转后RGB图的归一化坐标 (u1, v1, u2, v2)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = str(Path(tmp_dir) / "fourth.png")
+        cv2.imwrite(image_path, stereo)
+        depth, _ = calculator.process_stereo_image(image_path, skip_rotation=True, roi=roi)
+
+    # 深度矩阵为旋转后的坐标系：高=左图宽，宽=左图高
+    height, width = depth.shape
+    if (height, width) != (left.shape[1], left.shape[0]):
+        print(f"❌ 深度矩阵尺寸错误: {depth.shape}")
+        return False
+    expected = calculator.focal_length_px * calculator.baseline_mm / SHIFT
+    valid = np.abs(depth - expected) < expected * 0.1
+    rows, cols = np.nonzero(valid)
+    inside = (roi[0] * width - 1 <= cols) & (cols <= roi[2] * width) & \
+             (roi[1] * height - 1 <= rows) & (rows <= roi[3] * height)
+    region_area = (roi[2] - roi[0]) * width * (roi[3] - roi[1]) * height
+    if not inside.all() or valid.sum() < region_area * 0.9:
+        print(f"❌ 区域映射错误: 区域外有效点 {int((~inside).sum())}, 有效点 {int(valid.sum())}/{int(region_area)}")
+        return False
+    print(f"✅ 区域映射正确（有效点 {int(valid.sum())}/{int(region_area)}）")
+    return True
+
+
+def test_array_api():
+    """数组接口与文件接口结果一致"""
+    print("\n" + "="*60)
+    print("🧪 测试5: 数组接口与文件接口一致")
+    print("="*60)
+
+    left, right = _make_stereo_pair()
+    stereo = np.vstack([np.hstack([left, right])] * 2)
+    calculator = DepthCalculator(enable_debug=False)
+    depth, disparity = calculator.compute_depth(stereo)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = str(Path(tmp_dir) / "fourth.png")
+        left_path, right_path = str(Path(tmp_dir) / "left.png"), str(Path(tmp_dir) / "right.png")
+        cv2.imwrite(image_path, stereo)
+        cv2.imwrite(left_path, left)
+        cv2.imwrite(right_path, right)
+        file_depth, _ = calculator.process_stereo_image(image_path, skip_rotation=True)
+        _, file_disparity, _ = calculator.generate_disparity_map(left_path, right_path, tmp_dir)
+
+    if not (np.array_equal(depth, file_depth) and np.array_equal(disparity, file_disparity)
+            and np.array_equal(depth, calculator.disparity_to_depth(disparity))):
+        print("❌ 数组接口与文件接口结果不一致")
+        return False
+    gray, color = calculator.colorize(disparity)
+    if gray.shape != disparity.shape or color.shape != disparity.shape + (3,):
+        print(f"❌ 可视化尺寸错误: {gray.shape}, {color.shape}")
+        return False
+    print("✅ 数组接口与文件接口结果一致")
+    return True
+
+
+def test_invalid_mode():
+    """不支持的模式报错"""
+    print("\n" + "="*60)
+    print("🧪 测试6: 无效模式")
+    print("="*60)
+
+    try:
+        StereoDepthEngine(mode="unknown")
+    except ValueError:
+        print("✅ 无效模式被拒绝")
+        return True
+    print("❌ 无效模式未报错")
+    return False
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行立体匹配引擎测试")
+    print("="*60)
+
+    tests = [
+        ("默认模式一致性测试", test_default_mode_matches_legacy),
+        ("快速模式视差测试", test_fast_modes),
+        ("ROI 匹配测试", test_roi),
+        ("旋转坐标区域映射测试", test_rotated_roi),
+        ("数组接口一致性测试", test_array_api),
+        ("无效模式测试", test_invalid_mode),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
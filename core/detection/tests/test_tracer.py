@@ -0,0 +1,160 @@
+"""
+阶段追踪（StageTracer）单元测试脚本
+
+使用方法:
+    python -m core.detection.tests.test_tracer
+    或
+    python core/detection/tests/test_tracer.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from core.detection.utils.tracer import StageTracer, current_tracer, trace_stage
+
+
+def test_nested_stages():
+    """嵌套阶段记录父阶段、耗时和读写字节数"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 嵌套阶段记录")
+    print("="*60)
+
+    tracer = StageTracer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with tracer.activate(), tracer.stage("total"):
+            with trace_stage("depth"):
+                with trace_stage("depth_cache"):
+                    np.save(Path(tmp_dir) / "depth.npy", np.zeros((480, 640), dtype=np.float32))
+            with trace_stage("visualization"):
+                time.sleep(0.01)
+            with trace_stage("visualization"):
+                time.sleep(0.01)
+
+    stages = tracer.to_dict()["stages"]
+    names = [record["name"] for record in stages]
+    if names != ["total", "depth", "depth_cache", "visualization", "visualization"]:
+        print(f"❌ 阶段顺序错误: {names}")
+        return False
+    parents = {record["name"]: record["parent"] for record in stages}
+    if parents["depth_cache"] != "depth" or parents["depth"] != "total" or parents["total"] is not None:
+        print(f"❌ 父阶段错误: {parents}")
+        return False
+
+    cache = stages[2]
+    if cache["write_bytes"] is not None and cache["write_bytes"] < 480 * 640 * 4:
+        print(f"❌ 写入字节数偏小: {cache['write_bytes']}")
+        return False
+
+    timings = tracer.timings()
+    if timings["visualization"] < 20 or timings["total"] < timings["visualization"]:
+        print(f"❌ 同名阶段耗时应累加: {timings}")
+        return False
+
+    print(tracer.format_table())
+    print("✅ 嵌套阶段记录正确")
+    return True
+
+
+def test_inactive_trace_stage():
+    """未激活 tracer 时 trace_stage 不记录，激活结束后恢复"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 未激活时不记录")
+    print("="*60)
+
+    tracer = StageTracer()
+    with trace_stage("orphan"):
+        pass
+    with tracer.activate():
+        if current_tracer() is not tracer:
+            print("❌ 激活后 current_tracer 不一致")
+            return False
+    if current_tracer() is not None or tracer.stages:
+        print("❌ 未激活的阶段不应被记录")
+        return False
+    print("✅ 未激活时不记录")
+    return True
+
+
+def test_cprofile_report():
+    """cProfile 报告写入追踪结果"""
+    print("\n" + "="*60)
+    print("🧪 测试3: cProfile 性能分析")
+    print("="*60)
+
+    tracer = StageTracer()
+    with tracer.profile("cprofile"), tracer.stage("total"):
+        sorted(np.random.default_rng(0).random(10000).tolist())
+
+    profile = tracer.to_dict().get("profile")
+    if not profile or profile["mode"] != "cprofile" or "function calls" not in (profile["report"] or ""):
+        print(f"❌ 未生成 cProfile 报告: {profile}")
+        return False
+
+    try:
+        with tracer.profile("perf"):
+            pass
+        print("❌ 不支持的分析方式应抛出 ValueError")
+        return False
+    except ValueError:
+        pass
+    print("✅ cProfile 报告已生成")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行阶段追踪测试")
+    print("="*60)
+
+    tests = [
+        ("嵌套阶段记录测试", test_nested_stages),
+        ("未激活不记录测试", test_inactive_trace_stage),
+        ("cProfile 性能分析测试", test_cprofile_report),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
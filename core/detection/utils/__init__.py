@@ -1,9 +1,14 @@
-"""工具模块：异常、配置数据库、YOLO工具、路径工具"""
+"""工具模块：异常、配置数据库、YOLO工具、路径工具、模型注册表、图像上下文、检测器后端、阶段追踪、产物写盘器"""
 
 from core.detection.utils.exceptions import PileNotFoundError
 from core.detection.utils.pile_db import PileTypeDatabase
 from core.detection.utils.yolo_utils import extract_yolo_detections
 from core.detection.utils.path_utils import ensure_output_dir, get_output_path
+from core.detection.utils.model_registry import ModelRegistry, get_model_registry
+from core.detection.utils.image_context import ImageContext, load_image, save_image_async
+from core.detection.utils.detector_backend import DetectorBackend, create_detector_backend
+from core.detection.utils.tracer import StageTracer, trace_stage
+from core.detection.utils.artifact_sink import ArtifactSink, configure_artifact_sink, get_artifact_sink
 
 __all__ = [
     "PileNotFoundError",
@@ -11,5 +16,17 @@ __all__ = [
     "extract_yolo_detections",
     "ensure_output_dir",
     "get_output_path",
+    "ModelRegistry",
+    "get_model_registry",
+    "ImageContext",
+    "load_image",
+    "save_image_async",
+    "DetectorBackend",
+    "create_detector_backend",
+    "StageTracer",
+    "trace_stage",
+    "ArtifactSink",
+    "configure_artifact_sink",
+    "get_artifact_sink",
 ]
 
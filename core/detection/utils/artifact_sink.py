@@ -0,0 +1,277 @@
+"""
+产物写盘器：可视化图、调试图的渲染和编码写盘在后台线程中完成，计数结果不等待写盘
+
+- 有界队列：队列满时丢弃低优先级（调试）产物，保证内存占用和积压可控
+- 保存策略：none（不保存）/ final（只保存最终结果图）/ all（全部保存）/ sample（每 N 次计数保存一次）
+- 必需产物（如接口返回给前端的 depth_color.jpg）不受策略限制，也不会被丢弃
+- 先写入同目录下的临时文件再 os.replace 替换，读取方（前端、识别流程）不会读到写了一半的图片
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_POLICIES = ("none", "final", "all", "sample")
+
+# 产物优先级
+ARTIFACT_DEBUG = 0      # 中间过程图（YOLO检测图、场景准备图、分层图、调试深度图等）
+ARTIFACT_FINAL = 1      # 最终结果图
+ARTIFACT_REQUIRED = 2   # 其他模块依赖的产物（不受策略限制，不丢弃）
+
+# 与 DepthCalculator.rotate_image 保存 JPEG 时的参数一致（quality=95, optimize, progressive）
+_JPEG_PARAMS = [
+    cv2.IMWRITE_JPEG_QUALITY, 95,
+    cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+    cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
+]
+
+
+def _write_atomic(path: Path, data: bytes):
+    """写入同目录下的临时文件后替换目标文件（隐藏文件名，不会被按扩展名查找图片的逻辑匹配到）"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _encode_and_write(image: np.ndarray, paths: List[str]) -> List[str]:
+    """按扩展名编码一次，原子写入所有目标路径"""
+    encoded: Dict[str, bytes] = {}
+    for path in paths:
+        ext = Path(path).suffix.lower() or ".jpg"
+        if ext not in encoded:
+            params = _JPEG_PARAMS if ext in (".jpg", ".jpeg") else []
+            ok, buf = cv2.imencode(ext, image, params)
+            if not ok:
+                raise ValueError(f"图像编码失败: {path}")
+            encoded[ext] = buf.tobytes()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(Path(path), encoded[ext])
+    return paths
+
+
+class ArtifactSink:
+    """后台产物写盘器（线程安全）"""
+
+    def __init__(self, policy: str = "all", sample_every: int = 10, max_queue: int = 16,
+                 workers: int = 1):
+        """
+        :param policy: 保存策略（见 ARTIFACT_POLICIES）
+        :param sample_every: sample 策略下每 N 次计数保存一次产物
+        :param max_queue: 队列上限（排队中的产物数，超出时丢弃低优先级产物）
+        :param workers: 写盘线程数
+        """
+        if policy not in ARTIFACT_POLICIES:
+            raise ValueError(f"不支持的产物保存策略: {policy}，可选: {', '.join(ARTIFACT_POLICIES)}")
+        self.policy = policy
+        self.sample_every = max(1, int(sample_every))
+        self.max_queue = max(1, int(max_queue))
+        self.workers = max(1, int(workers))
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._active = 0
+        self._runs = 0
+        self._closed = False
+        self._stats = {"submitted": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    # ==================== 策略 ====================
+
+    def begin_run(self) -> bool:
+        """
+        开始一次计数，返回本次计数是否保存可视化/调试产物
+
+        sample 策略下每 sample_every 次计数中的第一次返回 True
+        """
+        if self.policy == "none":
+            return False
+        if self.policy != "sample":
+            return True
+        with self._cond:
+            self._runs += 1
+            return (self._runs - 1) % self.sample_every == 0
+
+    def accepts(self, priority: int = ARTIFACT_DEBUG) -> bool:
+        """该优先级的产物在当前策略下是否保存（不含 sample 的按次抽样，见 begin_run）"""
+        if priority >= ARTIFACT_REQUIRED:
+            return True
+        if self.policy == "none":
+            return False
+        if self.policy == "final":
+            return priority >= ARTIFACT_FINAL
+        return True
+
+    # ==================== 提交 ====================
+
+    def submit(self, job: Callable[[], Any], name: str = "",
+               priority: int = ARTIFACT_DEBUG) -> bool:
+        """
+        提交后台任务（渲染 + 写盘），调用方不等待
+
+        任务中引用的数组和数据在提交后不应再被修改（需要时由调用方先复制）
+
+        :param job: 无参可调用对象，在写盘线程中执行
+        :param name: 产物名称（用于日志）
+        :param priority: 优先级（ARTIFACT_DEBUG / ARTIFACT_FINAL / ARTIFACT_REQUIRED）
+        :return: 是否已加入队列（策略不保存或被丢弃时返回 False）
+        """
+        if not self.accepts(priority):
+            return False
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_queue and priority < ARTIFACT_REQUIRED:
+                # 队列已满：丢弃最早的低优先级产物给高优先级让位，否则丢弃当前产物
+                victim = next((item for item in self._queue if item[0] < priority), None)
+                if victim is None:
+                    self._stats["dropped"] += 1
+                    logger.warning(f"[ArtifactSink] 写盘队列已满，丢弃产物: {name}")
+                    return False
+                self._queue.remove(victim)
+                self._stats["dropped"] += 1
+                logger.warning(f"[ArtifactSink] 写盘队列已满，丢弃低优先级产物: {victim[1]}")
+            self._queue.append((priority, name, job))
+            self._stats["submitted"] += 1
+            self._ensure_threads()
+            self._cond.notify()
+        return True
+
+    def save_image(self, image: Union[np.ndarray, Callable[[], np.ndarray]],
+                   paths: Union[str, Path, List[Union[str, Path]]],
+                   priority: int = ARTIFACT_DEBUG) -> bool:
+        """
+        异步保存图像（同一扩展名只编码一次）
+
+        :param image: 图像数组（提交后不应再修改），或在写盘线程中绘制图像的无参函数
+        :param paths: 一个或多个输出路径
+        :param priority: 优先级
+        """
+        if isinstance(paths, (str, Path)):
+            paths = [paths]
+        paths = [str(p) for p in paths]
+
+        def _write():
+            return _encode_and_write(image() if callable(image) else image, paths)
+
+        return self.submit(_write, name=", ".join(paths), priority=priority)
+
+    # ==================== 写盘线程 ====================
+
+    def _ensure_threads(self):
+        """按需启动写盘线程（调用方持有 self._cond）"""
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"artifact-writer-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                _, name, job = self._queue.popleft()
+                self._active += 1
+            try:
+                job()
+                ok = True
+            except Exception as e:
+                ok = False
+                logger.warning(f"[ArtifactSink] 产物保存失败 {name}: {e}")
+            with self._cond:
+                self._active -= 1
+                self._stats["written" if ok else "failed"] += 1
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的产物全部写完（需要立即读取产物时调用，如测试和脚本）
+
+        :param timeout: 超时时间（秒，None 表示一直等待）
+        :return: 是否在超时前写完
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """写完队列中的产物后停止写盘线程"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        """写盘器状态"""
+        with self._cond:
+            return {
+                "policy": self.policy,
+                "sample_every": self.sample_every,
+                "max_queue": self.max_queue,
+                "pending": len(self._queue) + self._active,
+                **self._stats,
+            }
+
+
+# ==================== 进程级实例 ====================
+
+_default_config: Dict[str, Any] = {}
+_artifact_sink: Optional[ArtifactSink] = None
+_sink_lock = threading.Lock()
+
+
+def configure_artifact_sink(policy: str = "all", sample_every: int = 10, max_queue: int = 16, **kwargs):
+    """
+    设置产物写盘器配置（已有实例时写完积压产物后按新配置重建）
+
+    :param policy: 保存策略（见 ARTIFACT_POLICIES）
+    :param sample_every: sample 策略下每 N 次计数保存一次
+    :param max_queue: 队列上限
+    """
+    global _default_config, _artifact_sink
+    if policy not in ARTIFACT_POLICIES:
+        raise ValueError(f"不支持的产物保存策略: {policy}，可选: {', '.join(ARTIFACT_POLICIES)}")
+    with _sink_lock:
+        _default_config = {"policy": policy, "sample_every": sample_every, "max_queue": max_queue, **kwargs}
+        previous, _artifact_sink = _artifact_sink, None
+    if previous is not None:
+        previous.close()
+
+
+def get_artifact_sink() -> ArtifactSink:
+    """获取进程级产物写盘器（进程退出前写完积压产物）"""
+    global _artifact_sink
+    with _sink_lock:
+        if _artifact_sink is None:
+            _artifact_sink = ArtifactSink(**_default_config)
+            logger.info(f"[ArtifactSink] 已创建产物写盘器: {_default_config or '默认配置'}")
+        return _artifact_sink
+
+
+def _close_at_exit():
+    if _artifact_sink is not None:
+        _artifact_sink.close()
+
+
+atexit.register(_close_at_exit)
@@ -0,0 +1,352 @@
+"""
+检测器推理后端：统一 ultralytics(.pt) / ONNX Runtime / OpenVINO 的检测接口
+
+- ultralytics: 直接使用 YOLO(.pt)，需要 PyTorch
+- onnx: 使用 onnxruntime 加载导出的 .onnx 模型（含 INT8 量化模型），CPU 上无需 PyTorch
+- openvino: 使用 OpenVINO 加载导出的 IR 模型（.xml 或 *_openvino_model 目录）
+
+onnx/openvino 后端自行完成预处理（letterbox）、输出解码和 NMS，与 ultralytics 的默认参数保持一致。
+所有后端的 detect() 返回与 extract_yolo_detections 相同格式的检测结果（附带 cls_id）。
+"""
+
+import ast
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 支持的后端名称
+DETECTOR_BACKENDS = ("ultralytics", "onnx", "openvino")
+
+# 与 ultralytics non_max_suppression 默认参数一致
+DEFAULT_IOU_THRESHOLD = 0.7
+DEFAULT_MAX_DET = 300
+_MAX_WH = 7680  # 按类别NMS时的坐标偏移量
+
+
+def resolve_backend_name(model_path: Union[str, Path], backend: Optional[str] = None) -> str:
+    """
+    根据配置或模型文件类型确定后端
+
+    :param model_path: 模型路径
+    :param backend: 指定的后端（None 或 "auto" 时按文件类型推断）
+    :return: 后端名称
+    """
+    if backend and backend != "auto":
+        if backend not in DETECTOR_BACKENDS:
+            raise ValueError(f"不支持的检测后端: {backend}，可选: {', '.join(DETECTOR_BACKENDS)}")
+        return backend
+    path = Path(model_path)
+    if path.suffix == ".onnx":
+        return "onnx"
+    if path.suffix == ".xml" or path.name.endswith("_openvino_model"):
+        return "openvino"
+    return "ultralytics"
+
+
+def draw_detections(image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+    """在图像副本上绘制检测框（用于调试输出）"""
+    canvas = image.copy()
+    for det in detections:
+        x1, y1, x2, y2 = map(int, (det["x1"], det["y1"], det["x2"], det["y2"]))
+        color = tuple(int(c) for c in np.random.default_rng(det.get("cls_id", 0)).integers(0, 255, 3))
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 3)
+        cv2.putText(canvas, f"{det['cls']} {det['conf']:.2f}", (x1, max(0, y1 - 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, color, 2)
+    return canvas
+
+
+class DetectorBackend(ABC):
+    """检测器后端基类"""
+
+    name = "base"
+
+    def __init__(self, model_path: Union[str, Path]):
+        self.model_path = Path(model_path)
+        self.names: Dict[int, str] = {}
+
+    @abstractmethod
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.25,
+               iou: float = DEFAULT_IOU_THRESHOLD) -> List[List[Dict]]:
+        """
+        批量检测
+
+        :param images: BGR图像列表
+        :param conf: 置信度阈值
+        :param iou: NMS IoU 阈值
+        :return: 每张图像的检测结果 [[{"cls", "cls_id", "conf", "x1", "y1", "x2", "y2"}, ...], ...]
+        """
+
+    def plot(self, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        """绘制检测结果"""
+        return draw_detections(image, detections)
+
+    def warmup(self, size: int = 640):
+        """空推理预热"""
+        self.detect([np.zeros((size, size, 3), dtype=np.uint8)])
+
+
+class UltralyticsBackend(DetectorBackend):
+    """ultralytics YOLO 后端（.pt 权重，也可直接加载 ultralytics 支持的其他格式）"""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: Union[str, Path], model=None):
+        """
+        :param model_path: 模型路径
+        :param model: 已加载的 YOLO 实例（可选，不提供时从 model_path 加载）
+        """
+        super().__init__(model_path)
+        if model is None:
+            from ultralytics import YOLO
+            model = YOLO(str(model_path))
+        self.model = model
+        self.names = dict(getattr(model, "names", None) or {})
+
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.25,
+               iou: float = DEFAULT_IOU_THRESHOLD) -> List[List[Dict]]:
+        from core.detection.utils.yolo_utils import extract_yolo_detections
+
+        results = self.model.predict(source=list(images), save=False, conf=conf, iou=iou, verbose=False)
+        return [extract_yolo_detections([result]) for result in results]
+
+
+class _ExportedModelBackend(DetectorBackend):
+    """导出模型（ONNX/OpenVINO）后端的公共部分：letterbox 预处理、输出解码、NMS"""
+
+    def __init__(self, model_path: Union[str, Path], names: Optional[Dict[int, str]] = None,
+                 imgsz: Optional[Tuple[int, int]] = None):
+        super().__init__(model_path)
+        self.names = dict(names or {})
+        self.imgsz = tuple(imgsz) if imgsz else (640, 640)
+        self.dynamic_batch = False
+
+    @staticmethod
+    def _parse_metadata(metadata: Dict) -> Tuple[Dict[int, str], Optional[Tuple[int, int]]]:
+        """解析 ultralytics 导出时写入的元数据（names / imgsz）"""
+        names = metadata.get("names")
+        imgsz = metadata.get("imgsz")
+        if isinstance(names, str):
+            names = ast.literal_eval(names)
+        if isinstance(imgsz, str):
+            imgsz = ast.literal_eval(imgsz)
+        names = {int(k): str(v) for k, v in (names or {}).items()}
+        return names, (tuple(int(v) for v in imgsz) if imgsz else None)
+
+    def _letterbox(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple[float, float], Tuple[int, int]]:
+        """
+        等比缩放并填充到模型输入尺寸（与 ultralytics LetterBox(auto=False) 一致）
+
+        :return: (填充后的图像, (x方向缩放比, y方向缩放比), (左侧填充, 顶部填充))
+        """
+        height, width = image.shape[:2]
+        new_h, new_w = self.imgsz
+        ratio = min(new_h / height, new_w / width)
+        unpad_w, unpad_h = int(round(width * ratio)), int(round(height * ratio))
+        dw, dh = (new_w - unpad_w) / 2, (new_h - unpad_h) / 2
+        if (width, height) != (unpad_w, unpad_h):
+            image = cv2.resize(image, (unpad_w, unpad_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        # 各方向按取整后的尺寸计算实际缩放比（与 ultralytics scale_boxes 一致）
+        return image, (unpad_w / width, unpad_h / height), (left, top)
+
+    def _preprocess(self, images: Sequence[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[Tuple[float, float], Tuple[int, int]]]]:
+        """BGR图像 -> NCHW float32 RGB [0, 1]"""
+        batch, metas = [], []
+        for image in images:
+            padded, gains, pad = self._letterbox(image)
+            batch.append(padded[:, :, ::-1].transpose(2, 0, 1))
+            metas.append((gains, pad))
+        tensor = np.ascontiguousarray(np.stack(batch)).astype(np.float32) / 255.0
+        return tensor, metas
+
+    @staticmethod
+    def _nms(boxes: np.ndarray, scores: np.ndarray, iou: float) -> np.ndarray:
+        """标准NMS（IoU 大于阈值的低分框被抑制），返回保留的索引"""
+        order = scores.argsort()[::-1]
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        keep = []
+        while order.size > 0:
+            i = order[0]
+            keep.append(i)
+            xx1 = np.maximum(boxes[i, 0], boxes[order[1:], 0])
+            yy1 = np.maximum(boxes[i, 1], boxes[order[1:], 1])
+            xx2 = np.minimum(boxes[i, 2], boxes[order[1:], 2])
+            yy2 = np.minimum(boxes[i, 3], boxes[order[1:], 3])
+            inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+            overlap = inter / (areas[i] + areas[order[1:]] - inter + 1e-7)
+            order = order[1:][overlap <= iou]
+        return np.array(keep, dtype=np.int64)
+
+    def _postprocess(self, output: np.ndarray, image_shape: Tuple[int, int],
+                     meta: Tuple[Tuple[float, float], Tuple[int, int]], conf: float, iou: float) -> List[Dict]:
+        """
+        解码单张图像的输出 (4 + nc, N)：置信度过滤 -> 按类别NMS -> 还原到原图坐标
+        """
+        pred = output.T
+        class_scores = pred[:, 4:]
+        cls_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(pred)), cls_ids]
+        mask = scores > conf
+        if not mask.any():
+            return []
+        pred, cls_ids, scores = pred[mask], cls_ids[mask], scores[mask]
+
+        # xywh(中心点) -> xyxy
+        boxes = np.empty((len(pred), 4), dtype=np.float32)
+        boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+        boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+        boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+        boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+
+        # 按类别NMS：不同类别的框加上偏移量后互不重叠
+        keep = self._nms(boxes + cls_ids[:, None] * _MAX_WH, scores, iou)[:DEFAULT_MAX_DET]
+        boxes, cls_ids, scores = boxes[keep], cls_ids[keep], scores[keep]
+
+        # 去掉 letterbox 填充并缩放回原图，裁剪到图像范围
+        (gain_x, gain_y), (pad_x, pad_y) = meta
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / gain_x).clip(0, image_shape[1])
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / gain_y).clip(0, image_shape[0])
+
+        return [
+            {
+                "cls": self.names.get(int(c), str(int(c))),
+                "cls_id": int(c),
+                "conf": float(s),
+                "x1": float(b[0]), "y1": float(b[1]), "x2": float(b[2]), "y2": float(b[3]),
+            }
+            for b, c, s in zip(boxes, cls_ids, scores)
+        ]
+
+    @abstractmethod
+    def _infer(self, tensor: np.ndarray) -> np.ndarray:
+        """执行推理，返回 (B, 4 + nc, N) 输出"""
+
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.25,
+               iou: float = DEFAULT_IOU_THRESHOLD) -> List[List[Dict]]:
+        images = list(images)
+        if not images:
+            return []
+        if self.dynamic_batch:
+            tensor, metas = self._preprocess(images)
+            outputs = self._infer(tensor)
+        else:
+            # 固定 batch=1 的模型逐张推理
+            outputs, metas = [], []
+            for image in images:
+                tensor, meta = self._preprocess([image])
+                outputs.append(self._infer(tensor)[0])
+                metas.extend(meta)
+        return [
+            self._postprocess(np.asarray(output, dtype=np.float32), image.shape[:2], meta, conf, iou)
+            for output, image, meta in zip(outputs, images, metas)
+        ]
+
+
+class OnnxBackend(_ExportedModelBackend):
+    """ONNX Runtime 后端"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: Union[str, Path], num_threads: int = 0,
+                 names: Optional[Dict[int, str]] = None, imgsz: Optional[Tuple[int, int]] = None):
+        """
+        :param model_path: .onnx 模型路径
+        :param num_threads: 推理线程数（0 表示由 onnxruntime 决定）
+        :param names: 类别名称（可选，默认读取模型元数据）
+        :param imgsz: 输入尺寸 (h, w)（可选，默认读取模型元数据或输入形状）
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnx 检测后端需要安装 onnxruntime: pip install onnxruntime") from e
+        super().__init__(model_path, names, imgsz)
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        input_shape = self.session.get_inputs()[0].shape
+        self.dynamic_batch = not isinstance(input_shape[0], int)
+
+        meta_names, meta_imgsz = self._parse_metadata(self.session.get_modelmeta().custom_metadata_map)
+        self.names = dict(names or meta_names)
+        if imgsz is None:
+            if meta_imgsz:
+                self.imgsz = meta_imgsz
+            elif isinstance(input_shape[2], int) and isinstance(input_shape[3], int):
+                self.imgsz = (input_shape[2], input_shape[3])
+
+    def _infer(self, tensor: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: tensor})[0]
+
+
+class OpenVinoBackend(_ExportedModelBackend):
+    """OpenVINO 后端"""
+
+    name = "openvino"
+
+    def __init__(self, model_path: Union[str, Path], num_threads: int = 0,
+                 names: Optional[Dict[int, str]] = None, imgsz: Optional[Tuple[int, int]] = None):
+        """
+        :param model_path: IR 模型路径（.xml 或 ultralytics 导出的 *_openvino_model 目录）
+        :param num_threads: 推理线程数（0 表示由 OpenVINO 决定）
+        :param names: 类别名称（可选，默认读取 metadata.yaml）
+        :param imgsz: 输入尺寸 (h, w)（可选，默认读取 metadata.yaml）
+        """
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise ImportError("openvino 检测后端需要安装 openvino: pip install openvino") from e
+
+        model_path = Path(model_path)
+        if model_path.is_dir():
+            model_path = next(model_path.glob("*.xml"))
+        super().__init__(model_path, names, imgsz)
+
+        core = ov.Core()
+        model = core.read_model(str(model_path))
+        self.dynamic_batch = model.inputs[0].get_partial_shape()[0].is_dynamic
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if num_threads > 0:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        self.compiled_model = core.compile_model(model, "CPU", config)
+
+        metadata_path = model_path.parent / "metadata.yaml"
+        if metadata_path.exists():
+            import yaml
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                meta_names, meta_imgsz = self._parse_metadata(yaml.safe_load(f) or {})
+            self.names = dict(names or meta_names)
+            if imgsz is None and meta_imgsz:
+                self.imgsz = meta_imgsz
+
+    def _infer(self, tensor: np.ndarray) -> np.ndarray:
+        return self.compiled_model(tensor)[self.compiled_model.outputs[0]]
+
+
+def create_detector_backend(model_path: Union[str, Path], backend: Optional[str] = None,
+                            num_threads: int = 0) -> DetectorBackend:
+    """
+    创建检测器后端
+
+    :param model_path: 模型路径
+    :param backend: 后端名称（"ultralytics" / "onnx" / "openvino"，None 或 "auto" 按文件类型推断）
+    :param num_threads: onnx/openvino 推理线程数（0 表示默认）
+    :return: DetectorBackend 实例
+    """
+    backend = resolve_backend_name(model_path, backend)
+    if backend == "onnx":
+        return OnnxBackend(model_path, num_threads=num_threads)
+    if backend == "openvino":
+        return OpenVinoBackend(model_path, num_threads=num_threads)
+    return UltralyticsBackend(model_path)
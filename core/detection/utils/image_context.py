@@ -0,0 +1,137 @@
+"""图像上下文：每张源图只解码一次，旋转在内存中完成，衍生图片通过产物写盘器异步写盘"""
+
+import logging
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Union
+
+import cv2
+import numpy as np
+
+from core.detection.utils.artifact_sink import ARTIFACT_REQUIRED, _encode_and_write, get_artifact_sink
+
+logger = logging.getLogger(__name__)
+
+# 逆时针旋转角度 -> cv2.rotate 参数（与 PIL Image.rotate(angle, expand=True) 方向一致）
+_ROTATE_CODES = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+
+
+def load_image(image: Union[str, Path, np.ndarray]) -> Optional[np.ndarray]:
+    """
+    获取可绘制的BGR图像
+
+    :param image: 图像路径，或已解码的BGR数组（返回副本，绘制不会修改原数组）
+    :return: BGR图像，读取失败时返回None
+    """
+    if isinstance(image, np.ndarray):
+        return image.copy()
+    return cv2.imread(str(image), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+
+
+def rotate_image_array(image: np.ndarray, rotation_angle: int = 90) -> np.ndarray:
+    """
+    在内存中旋转图像（逆时针，与 DepthCalculator.rotate_image 一致）
+
+    :param image: 图像数组
+    :param rotation_angle: 旋转角度（90的整数倍，正数表示逆时针）
+    :return: 旋转后的图像数组
+    """
+    angle = rotation_angle % 360
+    if angle == 0:
+        return image
+    if angle not in _ROTATE_CODES:
+        raise ValueError(f"仅支持90度整数倍的旋转: {rotation_angle}")
+    return cv2.rotate(image, _ROTATE_CODES[angle])
+
+
+def save_image_async(image: np.ndarray, paths: Union[str, Path, List[Union[str, Path]]]) -> Future:
+    """
+    异步保存图像（不阻塞调用方）
+
+    作为必需产物提交到进程级产物写盘器（其他模块和前端直接读取这些图片，不受保存策略限制、不丢弃）。
+
+    :param image: 图像数组（调用方之后不应再修改该数组）
+    :param paths: 一个或多个输出路径，同一扩展名只编码一次
+    :return: Future，结果为已写入的路径列表
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    paths = [str(p) for p in paths]
+    future: Future = Future()
+
+    def _write():
+        try:
+            future.set_result(_encode_and_write(image, paths))
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+    if not get_artifact_sink().submit(_write, name=", ".join(paths), priority=ARTIFACT_REQUIRED):
+        logger.warning(f"[ImageContext] 产物写盘器已关闭，未保存图像: {paths}")
+        future.set_exception(RuntimeError(f"产物写盘器已关闭: {paths}"))
+    return future
+
+
+class ImageContext:
+    """
+    单张源图的内存上下文
+
+    - 源图只解码一次（cv2，忽略EXIF方向，与PIL读取结果一致）
+    - 旋转在内存中完成，旋转结果供YOLO、尺寸计算和各可视化函数直接使用
+    - 衍生图片（旋转图、raw.jpg等）通过 save_async 交给产物写盘器在后台写盘
+    """
+
+    def __init__(self, image_path: Union[str, Path], rotation_angle: int = 90):
+        """
+        :param image_path: 源图路径
+        :param rotation_angle: 旋转角度（逆时针，默认90度）
+        """
+        self.path = Path(image_path)
+        self.rotation_angle = rotation_angle
+        self.original = load_image(self.path)
+        if self.original is None:
+            raise FileNotFoundError(f"无法读取图像: {self.path}")
+        self.image = rotate_image_array(self.original, rotation_angle)
+        self._pending: List[Future] = []
+
+    @property
+    def width(self) -> int:
+        """旋转后图像宽度"""
+        return self.image.shape[1]
+
+    @property
+    def height(self) -> int:
+        """旋转后图像高度"""
+        return self.image.shape[0]
+
+    def save_async(self, paths: Union[str, Path, List[Union[str, Path]]],
+                   image: Optional[np.ndarray] = None) -> Future:
+        """
+        异步保存图像（默认保存旋转后的图像）
+
+        :param paths: 一个或多个输出路径
+        :param image: 要保存的图像（可选，默认 self.image）
+        :return: Future
+        """
+        future = save_image_async(self.image if image is None else image, paths)
+        self._pending.append(future)
+        return future
+
+    def wait(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        等待本上下文提交的写盘任务完成（需要立即读取衍生图片时调用）
+
+        :return: 已写入的路径列表（失败的任务被忽略）
+        """
+        written = []
+        for future in self._pending:
+            try:
+                written.extend(future.result(timeout=timeout))
+            except Exception:
+                pass
+        self._pending.clear()
+        return written
@@ -0,0 +1,289 @@
+"""模型注册表：进程内共享 YOLO 模型、检测器后端与堆垛配置，避免每次计数重复加载"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.detection.utils.pile_db import PileTypeDatabase
+from core.detection.utils.detector_backend import (
+    DetectorBackend,
+    UltralyticsBackend,
+    create_detector_backend,
+    resolve_backend_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# 默认资源路径（与 StackProcessorFactory 保持一致）
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_MODEL_PATH = _project_root / "shared" / "models" / "yolo" / "best.pt"
+DEFAULT_PILE_CONFIG_PATH = _project_root / "core" / "config" / "pile_config.json"
+
+
+class _RegistryEntry:
+    """注册表条目：缓存对象及其来源文件的 mtime"""
+
+    def __init__(self, obj: Any, mtime: float):
+        self.obj = obj
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        # 同一个 YOLO 实例的 predict 不是线程安全的，按条目串行化推理
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    进程级模型注册表
+
+    - YOLO 权重、检测器后端和堆垛配置按 (绝对路径, mtime) 缓存，同一文件只加载一次
+    - 文件 mtime 变化后，下一次获取时自动重新加载
+    - reload() 强制丢弃缓存并重新加载（用于热更新权重）
+    - 检测器后端默认值通过 configure_detector() 设置（服务层从 config.json 读取）
+    - 加载在全局锁之外进行，同一资源由按键的加载锁保证只加载一次，加载期间其他资源照常获取
+    """
+
+    def __init__(self, warmup: bool = True, warmup_size: int = 640):
+        """
+        :param warmup: 加载模型后是否执行一次空推理预热
+        :param warmup_size: 预热图像边长
+        """
+        self.warmup = warmup
+        self.warmup_size = warmup_size
+        self._lock = threading.RLock()
+        self._models: Dict[str, _RegistryEntry] = {}
+        self._detectors: Dict[str, _RegistryEntry] = {}
+        self._pile_dbs: Dict[str, _RegistryEntry] = {}
+        # 按资源的加载锁（"类别:键" -> 锁）
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # 检测器后端默认配置
+        self.detector_backend = "auto"
+        self.detector_model_path: Optional[Path] = None
+        self.detector_num_threads = 0
+
+    @staticmethod
+    def _resolve(path: Union[str, Path]) -> Path:
+        path = Path(path).resolve()
+        if not path.exists():
+            raise FileNotFoundError(f"文件不存在: {path}")
+        return path
+
+    def _load_model(self, path: Path):
+        # 延迟导入，避免仅使用配置库时引入 ultralytics
+        from ultralytics import YOLO
+
+        start = time.perf_counter()
+        model = YOLO(str(path))
+        if self.warmup:
+            dummy = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+            model.predict(source=dummy, save=False, verbose=False)
+        logger.info(f"[ModelRegistry] 已加载YOLO模型: {path} ({time.perf_counter() - start:.2f}s)")
+        return model
+
+    def _get_or_load(self, kind: str, cache: Dict[str, _RegistryEntry], key: str, mtime: float,
+                     loader: Callable[[], _RegistryEntry]) -> _RegistryEntry:
+        """
+        获取缓存条目，未缓存或 mtime 变化时加载
+
+        全局锁只保护缓存字典；加载在按键的加载锁中进行，同一资源的并发获取只加载一次，
+        其他资源的获取和 status() 不等待加载完成。
+        """
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry.mtime == mtime:
+                return entry
+            load_lock = self._load_locks.setdefault(f"{kind}:{key}", threading.Lock())
+        with load_lock:
+            # 等待加载锁期间其他线程可能已加载完成
+            with self._lock:
+                entry = cache.get(key)
+                if entry is not None and entry.mtime == mtime:
+                    return entry
+            entry = loader()
+            with self._lock:
+                cache[key] = entry
+            return entry
+
+    def _get_entry(self, model_path: Optional[Union[str, Path]] = None) -> _RegistryEntry:
+        path = self._resolve(model_path or DEFAULT_MODEL_PATH)
+        mtime = path.stat().st_mtime
+        return self._get_or_load("model", self._models, str(path), mtime,
+                                 lambda: _RegistryEntry(self._load_model(path), mtime))
+
+    def get_model_and_lock(self, model_path: Optional[Union[str, Path]] = None) -> Tuple[Any, threading.Lock]:
+        """
+        获取共享的 YOLO 模型实例及其推理锁（同一次查找，二者一定属于同一个缓存条目）
+
+        :param model_path: 模型路径（可选，默认 shared/models/yolo/best.pt）
+        :return: (ultralytics.YOLO 实例, 推理锁)
+        """
+        entry = self._get_entry(model_path)
+        return entry.obj, entry.lock
+
+    def get_model(self, model_path: Optional[Union[str, Path]] = None):
+        """
+        获取共享的 YOLO 模型实例（同时需要推理锁时使用 get_model_and_lock）
+
+        :param model_path: 模型路径（可选，默认 shared/models/yolo/best.pt）
+        :return: ultralytics.YOLO 实例
+        """
+        return self._get_entry(model_path).obj
+
+    def get_model_lock(self, model_path: Optional[Union[str, Path]] = None) -> threading.Lock:
+        """获取模型对应的推理锁（同时需要模型实例时使用 get_model_and_lock）"""
+        return self._get_entry(model_path).lock
+
+    def configure_detector(self, backend: Optional[str] = None,
+                           model_path: Optional[Union[str, Path]] = None,
+                           num_threads: int = 0):
+        """
+        设置检测器后端默认配置（配置变化后，下次获取时按新配置加载）
+
+        :param backend: 后端名称（"ultralytics" / "onnx" / "openvino"，None 或 "auto" 按文件类型推断）
+        :param model_path: 默认检测模型路径（可选，默认 shared/models/yolo/best.pt）
+        :param num_threads: onnx/openvino 推理线程数（0 表示默认）
+        """
+        with self._lock:
+            self.detector_backend = backend or "auto"
+            self.detector_model_path = Path(model_path) if model_path else None
+            self.detector_num_threads = int(num_threads or 0)
+            self._detectors.clear()
+
+    def _detector_entry(self, model_path: Optional[Union[str, Path]] = None,
+                        backend: Optional[str] = None) -> _RegistryEntry:
+        path = self._resolve(model_path or self.detector_model_path or DEFAULT_MODEL_PATH)
+        backend = resolve_backend_name(path, backend or self.detector_backend)
+        mtime = path.stat().st_mtime
+        num_threads = self.detector_num_threads
+
+        def _load() -> _RegistryEntry:
+            if backend == "ultralytics":
+                # 与 get_model 共享同一个 YOLO 实例和推理锁
+                model_entry = self._get_entry(path)
+                entry = _RegistryEntry(UltralyticsBackend(path, model=model_entry.obj), mtime)
+                entry.lock = model_entry.lock
+                return entry
+            start = time.perf_counter()
+            detector = create_detector_backend(path, backend, num_threads=num_threads)
+            if self.warmup:
+                detector.warmup(self.warmup_size)
+            logger.info(f"[ModelRegistry] 已加载检测器: backend={backend}, {path} "
+                        f"({time.perf_counter() - start:.2f}s)")
+            return _RegistryEntry(detector, mtime)
+
+        return self._get_or_load("detector", self._detectors, f"{backend}:{path}", mtime, _load)
+
+    def get_detector_and_lock(self, model_path: Optional[Union[str, Path]] = None,
+                              backend: Optional[str] = None) -> Tuple[DetectorBackend, threading.Lock]:
+        """
+        获取共享的检测器后端及其推理锁（同一次查找，二者一定属于同一个缓存条目）
+
+        :param model_path: 模型路径（可选，默认使用 configure_detector 设置的路径或 best.pt）
+        :param backend: 后端名称（可选，默认使用 configure_detector 设置的后端）
+        :return: (DetectorBackend 实例, 推理锁)
+        """
+        entry = self._detector_entry(model_path, backend)
+        return entry.obj, entry.lock
+
+    def get_detector(self, model_path: Optional[Union[str, Path]] = None,
+                     backend: Optional[str] = None) -> DetectorBackend:
+        """
+        获取共享的检测器后端（同时需要推理锁时使用 get_detector_and_lock）
+
+        :param model_path: 模型路径（可选，默认使用 configure_detector 设置的路径或 best.pt）
+        :param backend: 后端名称（可选，默认使用 configure_detector 设置的后端）
+        :return: DetectorBackend 实例
+        """
+        return self._detector_entry(model_path, backend).obj
+
+    def get_detector_lock(self, model_path: Optional[Union[str, Path]] = None,
+                          backend: Optional[str] = None) -> threading.Lock:
+        """获取检测器对应的推理锁（同时需要检测器时使用 get_detector_and_lock）"""
+        return self._detector_entry(model_path, backend).lock
+
+    def get_pile_db(self, pile_config_path: Optional[Union[str, Path]] = None) -> PileTypeDatabase:
+        """
+        获取共享的堆垛配置数据库
+
+        :param pile_config_path: 配置路径（可选，默认 core/config/pile_config.json）
+        :return: PileTypeDatabase 实例
+        """
+        path = self._resolve(pile_config_path or DEFAULT_PILE_CONFIG_PATH)
+        mtime = path.stat().st_mtime
+
+        def _load() -> _RegistryEntry:
+            entry = _RegistryEntry(PileTypeDatabase(path), mtime)
+            logger.info(f"[ModelRegistry] 已加载堆垛配置: {path}")
+            return entry
+
+        return self._get_or_load("pile_db", self._pile_dbs, str(path), mtime, _load).obj
+
+    def preload(self,
+                model_paths: Optional[List[Union[str, Path]]] = None,
+                pile_config_paths: Optional[List[Union[str, Path]]] = None) -> Dict:
+        """
+        预加载模型和配置（通常在服务启动时调用）
+
+        :return: 当前注册表状态
+        """
+        for model_path in model_paths or [None]:
+            self.get_detector(model_path)
+        for config_path in pile_config_paths or [DEFAULT_PILE_CONFIG_PATH]:
+            self.get_pile_db(config_path)
+        return self.status()
+
+    def reload(self) -> Dict:
+        """
+        热更新：丢弃全部缓存，并重新加载此前已加载过的模型和配置（加载在全局锁之外进行）
+
+        :return: 重新加载后的注册表状态
+        """
+        with self._lock:
+            model_paths = [key.split(":", 1)[1] for key in self._detectors.keys()] or None
+            pile_config_paths = list(self._pile_dbs.keys()) or [DEFAULT_PILE_CONFIG_PATH]
+            self._models.clear()
+            self._detectors.clear()
+            self._pile_dbs.clear()
+        return self.preload(model_paths, pile_config_paths)
+
+    def status(self) -> Dict:
+        """返回注册表中已加载资源的信息"""
+        with self._lock:
+            return {
+                "models": [
+                    {"path": key, "mtime": e.mtime, "loaded_at": e.loaded_at}
+                    for key, e in self._models.items()
+                ],
+                "detectors": [
+                    {"backend": key.split(":", 1)[0], "path": key.split(":", 1)[1],
+                     "mtime": e.mtime, "loaded_at": e.loaded_at}
+                    for key, e in self._detectors.items()
+                ],
+                "detector_config": {
+                    "backend": self.detector_backend,
+                    "model_path": str(self.detector_model_path) if self.detector_model_path else None,
+                    "num_threads": self.detector_num_threads,
+                },
+                "pile_configs": [
+                    {"path": key, "mtime": e.mtime, "loaded_at": e.loaded_at}
+                    for key, e in self._pile_dbs.items()
+                ],
+            }
+
+
+# 全局单例实例
+_model_registry: Optional[ModelRegistry] = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取全局ModelRegistry实例（单例模式）"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
@@ -0,0 +1,194 @@
+"""
+阶段耗时追踪：记录计数流程各阶段的墙钟时间、CPU时间、读写字节数和峰值内存增量
+
+用法:
+    tracer = StageTracer()
+    with tracer.activate(), tracer.stage("yolo"):
+        ...
+    # 深层模块中无需传递 tracer，使用 trace_stage 记录到当前激活的 tracer（未激活时不记录）
+    with trace_stage("sgbm"):
+        ...
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import psutil
+except ImportError:  # psutil 不可用时不统计读写字节数
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows 下不统计峰值内存
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 支持的性能分析方式（请求头 X-Profile 的取值）
+PROFILE_MODES = ("cprofile", "pyinstrument")
+
+# 当前线程/协程上下文中激活的 tracer
+_current_tracer: ContextVar[Optional["StageTracer"]] = ContextVar("stage_tracer", default=None)
+
+
+def _io_bytes() -> Optional[tuple]:
+    """进程累计读写字节数 (read, write)，不可用时返回None"""
+    if psutil is None:
+        return None
+    try:
+        counters = psutil.Process().io_counters()
+    except (AttributeError, psutil.Error, OSError):
+        return None
+    # Linux 上 read_chars/write_chars 包含页缓存命中的读写，更贴近实际处理的数据量
+    return (getattr(counters, "read_chars", counters.read_bytes),
+            getattr(counters, "write_chars", counters.write_bytes))
+
+
+def peak_rss_kb() -> Optional[int]:
+    """进程峰值常驻内存（KB），不可用时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位为字节，Linux 上为KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class StageTracer:
+    """计数流程阶段追踪器（单次 count 调用使用一个实例）"""
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+        self.profile_mode: Optional[str] = None
+        self.profile_report: Optional[str] = None
+        self._stack: List[str] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def activate(self) -> Iterator["StageTracer"]:
+        """将本 tracer 设为当前上下文的 tracer，使 trace_stage 记录到这里"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        """
+        记录一个阶段（可嵌套，子阶段记录父阶段名称）
+
+        :param name: 阶段名称
+        :return: 阶段记录（退出时填充各项指标）
+        """
+        record = {"name": name, "parent": self._stack[-1] if self._stack else None}
+        # 进入时加入列表，stages 按开始顺序排列（父阶段在子阶段之前）
+        self.stages.append(record)
+        io_start = _io_bytes()
+        rss_start = peak_rss_kb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        self._stack.append(name)
+        try:
+            yield record
+        finally:
+            wall_end = time.perf_counter()
+            cpu_end = time.process_time()
+            io_end = _io_bytes()
+            rss_end = peak_rss_kb()
+            self._stack.pop()
+            record.update({
+                "start_ms": round((wall_start - self._origin) * 1000, 1),
+                "wall_ms": round((wall_end - wall_start) * 1000, 1),
+                "cpu_ms": round((cpu_end - cpu_start) * 1000, 1),
+                "read_bytes": io_end[0] - io_start[0] if io_start and io_end else None,
+                "write_bytes": io_end[1] - io_start[1] if io_start and io_end else None,
+                "rss_peak_delta_kb": rss_end - rss_start if rss_start is not None else None,
+            })
+
+    @contextmanager
+    def profile(self, mode: Optional[str] = None) -> Iterator[None]:
+        """
+        在上下文内启用性能分析，结果文本保存在 profile_report
+
+        :param mode: "cprofile" / "pyinstrument"，None 时不分析
+        """
+        if not mode:
+            yield
+            return
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的性能分析方式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+        self.profile_mode = mode
+
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("[StageTracer] 未安装 pyinstrument，跳过性能分析")
+                self.profile_report = "pyinstrument 未安装: pip install pyinstrument"
+                yield
+                return
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                self.profile_report = profiler.output_text(unicode=True, color=False)
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+            self.profile_report = stream.getvalue()
+
+    def timings(self) -> Dict[str, float]:
+        """各阶段墙钟耗时（毫秒），同名阶段累加"""
+        result: Dict[str, float] = {}
+        for record in self.stages:
+            result[record["name"]] = round(result.get(record["name"], 0.0) + record["wall_ms"], 1)
+        return result
+
+    def to_dict(self) -> Dict:
+        """追踪结果（阶段按开始顺序排列），可直接序列化为JSON"""
+        result = {"stages": list(self.stages)}
+        if self.profile_mode:
+            result["profile"] = {"mode": self.profile_mode, "report": self.profile_report}
+        return result
+
+    def format_table(self) -> str:
+        """格式化为文本表格（调试输出用）"""
+        lines = [f"{'阶段':<24}{'墙钟ms':>10}{'CPU ms':>10}{'读KB':>10}{'写KB':>10}{'峰值内存+KB':>14}"]
+        depth = {}
+        for record in self.stages:
+            depth[record["name"]] = depth.get(record["parent"], -1) + 1 if record["parent"] else 0
+            name = "  " * depth[record["name"]] + record["name"]
+            read_kb = "-" if record["read_bytes"] is None else f"{record['read_bytes'] / 1024:.0f}"
+            write_kb = "-" if record["write_bytes"] is None else f"{record['write_bytes'] / 1024:.0f}"
+            rss = "-" if record["rss_peak_delta_kb"] is None else str(record["rss_peak_delta_kb"])
+            lines.append(f"{name:<24}{record['wall_ms']:>10.1f}{record['cpu_ms']:>10.1f}"
+                         f"{read_kb:>10}{write_kb:>10}{rss:>14}")
+        return "\n".join(lines)
+
+
+def current_tracer() -> Optional[StageTracer]:
+    """当前上下文中激活的 tracer（未激活时返回None）"""
+    return _current_tracer.get()
+
+
+def trace_stage(name: str):
+    """记录到当前激活的 tracer；没有激活的 tracer 时不做任何事"""
+    tracer = _current_tracer.get()
+    return tracer.stage(name) if tracer is not None else nullcontext()
@@ -38,7 +38,7 @@ def extract_yolo_detections(
             conf = float(b.conf)
             x1, y1, x2, y2 = map(float, b.xyxy[0])
             yolo_dicts.append(
-                {"cls": cls_name, "conf": conf, "x1": x1, "y1": y1, "x2": x2, "y2": y2}
+                {"cls": cls_name, "cls_id": cls_id, "conf": conf, "x1": x1, "y1": y1, "x2": x2, "y2": y2}
             )
 
     return yolo_dicts
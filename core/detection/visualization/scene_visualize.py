@@ -1,24 +1,26 @@
 """场景可视化：绘制pile、box、barcode"""
 
 import cv2
-from typing import Dict
+import numpy as np
+from typing import Dict, Union
 from pathlib import Path
 
 from core.detection.core.scene_prepare import prepare_logic
 from core.detection.utils.path_utils import get_output_path
+from core.detection.utils.image_context import load_image
 
 
 def visualize_pile_scene(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     prepared_data: Dict,
     save_path: str = "annotated.jpg",
     show: bool = True,
     output_dir: Path = None
 ) -> str:
     """
-    将 prepare_core 输出的数据在图像上进行可视化
+    将 prepare_core 输出的数据在图像上进行可视化（image_path 也可以是已解码的BGR图像）
     """
-    img = cv2.imread(image_path)
+    img = load_image(image_path)
     if img is None:
         raise FileNotFoundError(f"未找到图像: {image_path}")
 
@@ -65,7 +67,7 @@ def visualize_pile_scene(
 
 
 def prepare_scene(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     yolo_output: list,
     conf_thr: float = 0.6,
     save_path: str = "annotated.jpg",
@@ -1,11 +1,22 @@
 """视觉处理模块：YOLO 目标检测和条形码识别"""
 
 from core.vision.yolo_detector import YoloDetection
-from core.vision.barcode_recognizer import BarcodeRecognizer
+from core.vision.barcode_recognizer import (
+    BarcodeRecognizer,
+    ZxingBarcodeDecoder,
+    create_barcode_decoder,
+    list_barcode_images,
+)
+from core.vision.barcode_roi import BarcodeRoiDecoder, crop_barcode_rois
 
 __all__ = [
     "YoloDetection",
     "BarcodeRecognizer",
+    "ZxingBarcodeDecoder",
+    "create_barcode_decoder",
+    "list_barcode_images",
+    "BarcodeRoiDecoder",
+    "crop_barcode_rois",
 ]
 
 
@@ -3,9 +3,21 @@ import subprocess
 import json
 import datetime
 import errno
-from typing import List, Dict, Any
+import logging
+import tempfile
+from typing import List, Dict, Any, Optional, Sequence
 from pathlib import Path
 
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 支持的解码后端：cli 调用 BarcodeReaderCLI；zxing 使用 zxing-cpp 在进程内解码
+BARCODE_BACKENDS = ("cli", "zxing")
+
+# 单张图片解码超时（秒）
+DEFAULT_DECODE_TIMEOUT = 30.0
+
 
 class BarcodeRecognizer:
     def __init__(self,
@@ -47,6 +59,18 @@ class BarcodeRecognizer:
         
         self.code_type = code_type
         self.results = []  # 存储识别结果
+        # 库路径环境变量只构建一次，所有图片复用
+        self._env = self._build_env()
+
+    def _build_env(self) -> Dict[str, str]:
+        """构建运行 BarcodeReaderCLI 的环境变量（附加自带的 lib 目录到 LD_LIBRARY_PATH）"""
+        lib_dir = Path(self.barcode_reader_path).parent / "lib"
+        env = os.environ.copy()
+        if lib_dir.exists():
+            existing_ld_path = env.get('LD_LIBRARY_PATH', '')
+            env['LD_LIBRARY_PATH'] = f"{lib_dir}:{existing_ld_path}" if existing_ld_path else str(lib_dir)
+            logger.debug(f"[Barcode] 设置 LD_LIBRARY_PATH: {env['LD_LIBRARY_PATH']}")
+        return env
 
     def process_folder(self, input_dir: str, output_json: str = None) -> List[Dict[str, Any]]:
         """
@@ -64,11 +88,8 @@ class BarcodeRecognizer:
         self.results = []
 
         # 遍历文件夹中的图片
-        for filename in os.listdir(input_dir):
-            if not self._is_image_file(filename):
-                continue
-
-            image_path = os.path.join(input_dir, filename)
+        for image_path in list_barcode_images(input_dir):
+            filename = os.path.basename(image_path)
             # 调用预处理函数（预留，当前返回原始路径）
             processed_path = self.preprocess_image(image_path)
             self._process_image(processed_path, filename)
@@ -91,13 +112,7 @@ class BarcodeRecognizer:
 
     def _is_image_file(self, filename: str) -> bool:
         """检查文件是否为图片格式，且非中间生成文件"""
-        image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif'}
-        ext = os.path.splitext(filename.lower())[1]
-        if ext not in image_extensions:
-            return False
-        # 排除中间生成文件（不含扩展名的 basename）
-        name_without_ext = os.path.splitext(filename)[0].lower()
-        return name_without_ext not in self.EXCLUDED_BASENAMES
+        return is_barcode_image(filename)
 
     def preprocess_image(self, image_path: str) -> str:
         """
@@ -118,24 +133,62 @@ class BarcodeRecognizer:
 
     def _process_image(self, image_path: str, filename: str):
         """处理单张图片的条形码识别"""
-        import logging
-        logger = logging.getLogger(__name__)
+        result = self.decode_image(image_path, filename)
+        self.results.append(result)
+
+        # 打印实时进度 (可选)
+        output = result["output"]
+        print(
+            f"Processed: {filename} | Result: {output[:20]}{'...' if len(output) > 20 else ''}")
 
+    def decode_image(self, image_path: str, filename: Optional[str] = None,
+                     code_type: Optional[str] = None,
+                     timeout: float = DEFAULT_DECODE_TIMEOUT) -> Dict[str, Any]:
+        """
+        识别单张图片的条形码
+
+        :param image_path: 图片路径
+        :param filename: 结果中的文件名（可选，默认取路径中的文件名）
+        :param code_type: 条形码类型（可选，默认使用初始化时的类型）
+        :param timeout: 超时时间（秒）
+        :return: { "filename": str, "output": str, "error": str }
+        """
+        filename = filename or os.path.basename(image_path)
         logger.info(f"[Barcode] 开始识别图片: {filename}, 路径: {image_path}")
+        return self._run_cli([image_path], filename, code_type, timeout)
 
-        # 设置库路径环境变量
-        bin_dir = Path(self.barcode_reader_path).parent
-        lib_dir = bin_dir / "lib"
-        env = os.environ.copy()
-        if lib_dir.exists():
-            existing_ld_path = env.get('LD_LIBRARY_PATH', '')
-            env['LD_LIBRARY_PATH'] = f"{lib_dir}:{existing_ld_path}" if existing_ld_path else str(lib_dir)
-            logger.debug(f"[Barcode] 设置 LD_LIBRARY_PATH: {env['LD_LIBRARY_PATH']}")
+    def decode_crops(self, crops: Sequence[np.ndarray], filename: str,
+                     code_type: Optional[str] = None,
+                     timeout: float = DEFAULT_DECODE_TIMEOUT) -> Dict[str, Any]:
+        """
+        识别同一张图片中裁剪出的多个条码区域（写入临时文件后一次调用 BarcodeReaderCLI 全部识别）
 
+        :param crops: 条码区域图像列表（BGR/灰度）
+        :param filename: 结果中的文件名（原图文件名）
+        :param code_type: 条形码类型（可选，默认使用初始化时的类型）
+        :param timeout: 超时时间（秒）
+        :return: { "filename": str, "output": str, "error": str }
+        """
+        import cv2
+
+        # 优先写入内存文件系统，避免裁剪图落盘
+        tmp_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        with tempfile.TemporaryDirectory(prefix="barcode_roi_", dir=tmp_root) as tmp_dir:
+            crop_paths = []
+            for i, crop in enumerate(crops):
+                crop_path = os.path.join(tmp_dir, f"roi_{i}.png")
+                cv2.imwrite(crop_path, crop)
+                crop_paths.append(crop_path)
+            logger.info(f"[Barcode] 开始识别条码区域: {filename}, 区域数: {len(crop_paths)}")
+            return self._run_cli(crop_paths, filename, code_type, timeout)
+
+    def _run_cli(self, image_paths: List[str], filename: str,
+                 code_type: Optional[str], timeout: float) -> Dict[str, Any]:
+        """调用 BarcodeReaderCLI 识别一张或多张图片（多张图片的结果合并在同一个输出中）"""
         args = [
             self.barcode_reader_path,
-            f'-type={self.code_type}',
-            image_path
+            f'-type={code_type or self.code_type}',
+            *image_paths
         ]
 
         try:
@@ -144,8 +197,8 @@ class BarcodeRecognizer:
                 args,
                 capture_output=True,
                 text=True,
-                timeout=30,
-                env=env
+                timeout=timeout,
+                env=self._env
             )
 
             if cp.returncode == 0 and cp.stdout.strip():
@@ -182,15 +235,11 @@ class BarcodeRecognizer:
             error = f"识别失败: {e}"
             logger.error(f"[Barcode] 识别失败 - 图片: {filename}, 错误: {e}")
 
-        self.results.append({
+        return {
             "filename": filename,
             "output": output,
             "error": error
-        })
-
-        # 打印实时进度 (可选)
-        print(
-            f"Processed: {filename} | Result: {output[:20]}{'...' if len(output) > 20 else ''}")
+        }
 
     def _save_to_json(self, output_json: str):
         """保存结果到JSON文件"""
@@ -204,6 +253,133 @@ class BarcodeRecognizer:
         return self.results
 
 
+class ZxingBarcodeDecoder:
+    """
+    基于 zxing-cpp 的进程内条形码解码器（无需每张图片启动外部进程）
+
+    需要安装: pip install zxing-cpp
+    """
+
+    # 条形码类型 -> zxing-cpp 格式名称（ucc128 即 GS1-128，属于 Code128）
+    FORMAT_NAMES = {
+        'ucc128': 'Code128',
+        'code128': 'Code128',
+        'code39': 'Code39',
+        'code93': 'Code93',
+        'codabar': 'Codabar',
+        'ean13': 'EAN13',
+        'ean8': 'EAN8',
+        'upca': 'UPCA',
+        'upce': 'UPCE',
+        'i25': 'ITF',
+        'pdf417': 'PDF417',
+        'qr': 'QRCode',
+        'datamatrix': 'DataMatrix',
+    }
+
+    def __init__(self, code_type: str = 'ucc128'):
+        """
+        :param code_type: 默认条形码类型
+        """
+        try:
+            import zxingcpp
+        except ImportError as e:
+            raise ImportError("zxing 条码解码后端需要安装 zxing-cpp: pip install zxing-cpp") from e
+        import cv2
+
+        self._zxingcpp = zxingcpp
+        self._cv2 = cv2
+        self.code_type = code_type
+
+    def _formats(self, code_type: str):
+        names = [self.FORMAT_NAMES.get(t.strip().lower()) for t in code_type.split(',')]
+        if not all(names):
+            raise ValueError(f"zxing 后端不支持的条形码类型: {code_type}")
+        formats = [getattr(self._zxingcpp.BarcodeFormat, name) for name in names]
+        combined = formats[0]
+        for fmt in formats[1:]:
+            combined = combined | fmt
+        return combined
+
+    def decode_image(self, image_path: str, filename: Optional[str] = None,
+                     code_type: Optional[str] = None,
+                     timeout: float = DEFAULT_DECODE_TIMEOUT) -> Dict[str, Any]:
+        """
+        识别单张图片的条形码（返回格式同 BarcodeRecognizer.decode_image；超时由调用方的进程池控制）
+        """
+        filename = filename or os.path.basename(image_path)
+        image = self._cv2.imread(image_path, self._cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return {"filename": filename, "output": "", "error": f"无法读取图片: {image_path}"}
+        return self.decode_crops([image], filename, code_type=code_type, timeout=timeout)
+
+    def decode_crops(self, crops: Sequence[np.ndarray], filename: str,
+                     code_type: Optional[str] = None,
+                     timeout: float = DEFAULT_DECODE_TIMEOUT) -> Dict[str, Any]:
+        """
+        识别内存中的图像（整图或裁剪出的条码区域），各图像识别到的条码按顺序合并
+        """
+        texts = []
+        try:
+            formats = self._formats(code_type or self.code_type)
+            for crop in crops:
+                barcodes = self._zxingcpp.read_barcodes(crop, formats=formats)
+                texts.extend(barcode.text for barcode in barcodes if barcode.valid and barcode.text)
+        except Exception as e:
+            logger.error(f"[Barcode] 识别失败 - 图片: {filename}, 错误: {e}")
+            return {"filename": filename, "output": "", "error": f"识别失败: {e}"}
+
+        if not texts:
+            logger.warning(f"[Barcode] 未识别到条码 - 图片: {filename}")
+            return {"filename": filename, "output": "", "error": "未识别到条码"}
+        logger.info(f"[Barcode] 识别成功 - 图片: {filename}, 条码内容: {texts}")
+        return {"filename": filename, "output": "\n".join(texts), "error": ""}
+
+
+def is_barcode_image(filename: str) -> bool:
+    """检查文件是否为图片格式，且非中间生成文件"""
+    image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif'}
+    ext = os.path.splitext(filename.lower())[1]
+    if ext not in image_extensions:
+        return False
+    # 排除中间生成文件（不含扩展名的 basename）
+    name_without_ext = os.path.splitext(filename)[0].lower()
+    return name_without_ext not in BarcodeRecognizer.EXCLUDED_BASENAMES
+
+
+def list_barcode_images(input_dir: str) -> List[str]:
+    """
+    列出扫码相机目录中待识别的图片
+
+    :param input_dir: 图片目录
+    :return: 图片路径列表（目录不存在时返回空列表）
+    """
+    if not os.path.isdir(input_dir):
+        return []
+    return [
+        os.path.join(input_dir, filename)
+        for filename in os.listdir(input_dir)
+        if is_barcode_image(filename)
+    ]
+
+
+def create_barcode_decoder(backend: str = "cli", code_type: str = 'ucc128',
+                           barcode_reader_path: Optional[str] = None):
+    """
+    创建条形码解码器
+
+    :param backend: "cli"（BarcodeReaderCLI）/ "zxing"（zxing-cpp 进程内解码）
+    :param code_type: 默认条形码类型
+    :param barcode_reader_path: BarcodeReaderCLI 路径（cli 后端，可选）
+    :return: 具有 decode_image(image_path, filename, code_type, timeout) 方法的解码器
+    """
+    if backend not in BARCODE_BACKENDS:
+        raise ValueError(f"不支持的条码解码后端: {backend}，可选: {', '.join(BARCODE_BACKENDS)}")
+    if backend == "zxing":
+        return ZxingBarcodeDecoder(code_type=code_type)
+    return BarcodeRecognizer(barcode_reader_path=barcode_reader_path, code_type=code_type)
+
+
 # 使用示例
 if __name__ == "__main__":
     # 初始化识别器 (根据实际路径调整)
@@ -0,0 +1,190 @@
+"""
+条码区域（ROI）预处理：用 YOLO 检测扫码相机图片中的 barcode 框，在内存中裁剪出带边距的区域，
+可选纠偏和放大，只把裁剪区域交给解码器；没有检测到条码区域或区域解码失败时回退到整图解码
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from core.vision.barcode_recognizer import DEFAULT_DECODE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# YOLO 模型中条码的类别名称
+BARCODE_CLASS = "barcode"
+
+
+def pad_box(box: Dict, image_shape, pad_ratio: float = 0.15, min_pad: int = 12) -> tuple:
+    """
+    按框尺寸向外扩展边距（条码两侧需要保留静区），并裁剪到图像范围内
+
+    :param box: 检测框 {"x1", "y1", "x2", "y2"}
+    :param image_shape: 图像尺寸 (h, w, ...)
+    :param pad_ratio: 边距占框宽/高的比例
+    :param min_pad: 最小边距（像素）
+    :return: (x1, y1, x2, y2) 整数坐标
+    """
+    h, w = image_shape[:2]
+    pad_x = max(min_pad, (box["x2"] - box["x1"]) * pad_ratio)
+    pad_y = max(min_pad, (box["y2"] - box["y1"]) * pad_ratio)
+    x1 = max(0, int(box["x1"] - pad_x))
+    y1 = max(0, int(box["y1"] - pad_y))
+    x2 = min(w, int(np.ceil(box["x2"] + pad_x)))
+    y2 = min(h, int(np.ceil(box["y2"] + pad_y)))
+    return x1, y1, x2, y2
+
+
+def estimate_skew(crop: np.ndarray) -> float:
+    """
+    估计条码区域的倾斜角度（度，逆时针为正）
+
+    二值化后横向闭运算把条和空连成一块，取最大轮廓的最小外接矩形角度
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    kernel_w = max(3, gray.shape[1] // 20)
+    closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_w, 3)))
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return 0.0
+    # 不同 OpenCV 版本 minAreaRect 的角度约定不同，直接用外接矩形长边的方向计算
+    points = cv2.boxPoints(cv2.minAreaRect(max(contours, key=cv2.contourArea)))
+    edges = [points[(i + 1) % 4] - points[i] for i in range(2)]
+    dx, dy = max(edges, key=lambda e: float(np.hypot(*e)))
+    angle = float(np.degrees(np.arctan2(dy, dx)))
+    # 归一化到 [-45, 45]（图像坐标 y 轴向下，取反后逆时针为正）
+    angle = (angle + 45) % 90 - 45
+    return -angle
+
+
+def deskew(crop: np.ndarray, min_angle: float = 1.0, max_angle: float = 30.0) -> np.ndarray:
+    """
+    纠正条码区域的倾斜（角度过小或过大时不处理）
+
+    :param crop: 条码区域图像
+    :param min_angle: 小于该角度不纠偏
+    :param max_angle: 大于该角度视为估计不可靠，不纠偏
+    """
+    angle = estimate_skew(crop)
+    if not min_angle <= abs(angle) <= max_angle:
+        return crop
+    h, w = crop.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), -angle, 1.0)
+    # 扩大画布，避免旋转后条码两端被裁掉
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_w, new_h = int(h * sin + w * cos), int(h * cos + w * sin)
+    matrix[0, 2] += new_w / 2 - w / 2
+    matrix[1, 2] += new_h / 2 - h / 2
+    # 用中位灰度填充新增区域（复制边缘会把贴边的条拉成长条，干扰解码）
+    fill = np.median(crop.reshape(-1, crop.shape[2] if crop.ndim == 3 else 1), axis=0)
+    return cv2.warpAffine(crop, matrix, (new_w, new_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=fill.tolist())
+
+
+def upscale(crop: np.ndarray, min_side: int = 160, max_scale: float = 3.0) -> np.ndarray:
+    """短边小于 min_side 时放大（最多 max_scale 倍），保证条码模块宽度足够解码"""
+    short_side = min(crop.shape[:2])
+    if short_side <= 0 or short_side >= min_side:
+        return crop
+    scale = min(max_scale, min_side / short_side)
+    return cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+
+def crop_barcode_rois(image: np.ndarray, boxes: List[Dict], pad_ratio: float = 0.15,
+                      deskew_enabled: bool = True, min_side: int = 160) -> List[np.ndarray]:
+    """
+    裁剪条码区域（按置信度从高到低）
+
+    :param image: 原图（BGR）
+    :param boxes: 条码检测框列表
+    :param pad_ratio: 边距比例
+    :param deskew_enabled: 是否纠偏
+    :param min_side: 放大后的最小短边（0 表示不放大）
+    :return: 裁剪后的区域图像列表
+    """
+    crops = []
+    for box in sorted(boxes, key=lambda b: b.get("conf", 0.0), reverse=True):
+        x1, y1, x2, y2 = pad_box(box, image.shape, pad_ratio)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        crop = image[y1:y2, x1:x2]
+        if deskew_enabled:
+            crop = deskew(crop)
+        if min_side:
+            crop = upscale(crop, min_side)
+        crops.append(crop)
+    return crops
+
+
+class BarcodeRoiDecoder:
+    """在解码器前增加条码区域裁剪：先解码裁剪区域，失败时回退到整图"""
+
+    def __init__(self, decoder, detector=None, detector_lock: Optional[threading.Lock] = None,
+                 conf: float = 0.25, pad_ratio: float = 0.15, deskew_enabled: bool = True,
+                 min_side: int = 160):
+        """
+        :param decoder: 基础解码器（BarcodeRecognizer / ZxingBarcodeDecoder）
+        :param detector: 检测器后端（DetectorBackend，可选，默认从模型注册表获取）
+        :param detector_lock: 检测器推理锁（可选）
+        :param conf: 条码检测置信度阈值
+        :param pad_ratio: 裁剪边距比例
+        :param deskew_enabled: 是否纠偏
+        :param min_side: 裁剪区域放大后的最小短边（0 表示不放大）
+        """
+        if detector is None:
+            from core.detection.utils.model_registry import get_model_registry
+            registry = get_model_registry()
+            detector, detector_lock = registry.get_detector_and_lock()
+        self.decoder = decoder
+        self.detector = detector
+        self.detector_lock = detector_lock
+        self.conf = conf
+        self.pad_ratio = pad_ratio
+        self.deskew_enabled = deskew_enabled
+        self.min_side = min_side
+
+    def detect_rois(self, image: np.ndarray) -> List[Dict]:
+        """检测图像中的条码框"""
+        if self.detector_lock is not None:
+            with self.detector_lock:
+                detections = self.detector.detect([image], conf=self.conf)[0]
+        else:
+            detections = self.detector.detect([image], conf=self.conf)[0]
+        return [d for d in detections if d["cls"] == BARCODE_CLASS]
+
+    def decode_image(self, image_path: str, filename: Optional[str] = None,
+                     code_type: Optional[str] = None,
+                     timeout: float = DEFAULT_DECODE_TIMEOUT) -> Dict[str, Any]:
+        """
+        识别单张图片的条形码（返回格式同 BarcodeRecognizer.decode_image，另含 "rois" 区域数量）
+        """
+        filename = filename or os.path.basename(image_path)
+        deadline = time.monotonic() + timeout
+        rois = 0
+        image = cv2.imread(image_path)
+        if image is not None:
+            try:
+                boxes = self.detect_rois(image)
+                crops = crop_barcode_rois(image, boxes, self.pad_ratio, self.deskew_enabled, self.min_side)
+            except Exception as e:
+                logger.warning(f"[BarcodeRoi] 条码区域检测失败，使用整图解码 - 图片: {filename}, 错误: {e}")
+                crops = []
+            rois = len(crops)
+            if crops:
+                result = self.decoder.decode_crops(crops, filename, code_type=code_type,
+                                                   timeout=max(1.0, deadline - time.monotonic()))
+                if result["output"]:
+                    result["rois"] = rois
+                    return result
+                logger.info(f"[BarcodeRoi] 条码区域未解码成功，回退到整图 - 图片: {filename}, 区域数: {rois}")
+
+        result = self.decoder.decode_image(image_path, filename, code_type=code_type,
+                                           timeout=max(1.0, deadline - time.monotonic()))
+        result["rois"] = rois
+        return result
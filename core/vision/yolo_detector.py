@@ -1,6 +1,6 @@
 import os
 import cv2
-from ultralytics import YOLO
+from core.detection.utils.model_registry import get_model_registry
 from typing import List, Dict, Any, Tuple
 import json
 import datetime  # 添加时间模块
@@ -15,12 +15,14 @@ class YoloDetection:
         """
         初始化条形码检测器
 
-        :param model_path: YOLO模型权重文件路径
+        :param model_path: 检测模型路径（.pt / .onnx / OpenVINO IR，后端按 config.json 的 detector 配置或文件类型选择）
         :param class_mapping: 类别ID到名称的映射 (e.g., {0: 'barcode', 1: 'QR', 2: 'piles', 3: 'box'})
         :param confidence_threshold: 置信度阈值
         :param padding: 裁剪边界扩展像素
         """
-        self.model = YOLO(model_path)
+        # 使用进程级模型注册表中的共享检测器，避免重复加载权重
+        registry = get_model_registry()
+        self.detector, self.detector_lock = registry.get_detector_and_lock(model_path)
         self.class_mapping = class_mapping or {
             0: 'barcode', 1: 'QR', 2: 'piles', 3: 'box'}
         self.confidence_threshold = confidence_threshold
@@ -87,19 +89,15 @@ class YoloDetection:
             print(f"⚠️ 跳过无法读取的图像: {filename}")
             return
 
-        # 执行YOLO预测
-        results = self.model.predict(
-            source=original_image,
-            conf=self.confidence_threshold
-        )
+        # 执行检测
+        with self.detector_lock:
+            detections = self.detector.detect([original_image], conf=self.confidence_threshold)[0]
 
         # 保存带检测框的原始图片
-        if results:
-            plot_image = results[0].plot()  # 获取带框的图像 (RGB)
-            # 转换为BGR格式以便OpenCV保存
-            plot_image_bgr = cv2.cvtColor(plot_image, cv2.COLOR_RGB2BGR)
+        if detections:
+            plot_image = self.detector.plot(original_image, detections)  # 带框的图像 (BGR)
             detected_image_path = os.path.join(detected_images_dir, filename)
-            cv2.imwrite(detected_image_path, plot_image_bgr)
+            cv2.imwrite(detected_image_path, plot_image)
             print(f"✅ 保存带检测框的图像: {detected_image_path}")
         else:
             # 如果没有检测结果，保存原始图片
@@ -108,47 +106,45 @@ class YoloDetection:
             print(f"✅ 保存原始图像（无检测框）: {detected_image_path}")
 
         # 遍历所有检测结果
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                cls = int(box.cls)
-                conf = box.conf.item()
-
-                # 检查类别是否在映射中
-                if cls not in self.class_mapping:
-                    continue
-
-                # 检查置信度
-                if conf < self.confidence_threshold:
-                    continue
-
-                category = self.class_mapping[cls]
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-
-                # 扩展边界
-                x1_pad = max(0, x1 - self.padding)
-                y1_pad = max(0, y1 - self.padding)
-                x2_pad = min(original_image.shape[1], x2 + self.padding)
-                y2_pad = min(original_image.shape[0], y2 + self.padding)
-
-                # 裁剪图像（无预处理）
-                cropped_img = original_image[y1_pad:y2_pad, x1_pad:x2_pad]
-
-                # 保存裁剪图像 (带类别前缀)
-                save_filename = f"{category}_{os.path.splitext(filename)[0]}_{len(self.category_results[category])}.png"
-                save_path = os.path.join(output_dir, category, save_filename)
-                cv2.imwrite(save_path, cropped_img)
-
-                # 记录检测结果
-                self.category_results[category].append({
-                    "original_image": filename,
-                    "cropped_image": save_filename,
-                    "bbox": [x1, y1, x2, y2],
-                    "confidence": conf,
-                    "category": category
-                })
-
-                print(f"✅ 保存裁剪图像: {save_path}")
+        for det in detections:
+            cls = det["cls_id"]
+            conf = det["conf"]
+
+            # 检查类别是否在映射中
+            if cls not in self.class_mapping:
+                continue
+
+            # 检查置信度
+            if conf < self.confidence_threshold:
+                continue
+
+            category = self.class_mapping[cls]
+            x1, y1, x2, y2 = map(int, (det["x1"], det["y1"], det["x2"], det["y2"]))
+
+            # 扩展边界
+            x1_pad = max(0, x1 - self.padding)
+            y1_pad = max(0, y1 - self.padding)
+            x2_pad = min(original_image.shape[1], x2 + self.padding)
+            y2_pad = min(original_image.shape[0], y2 + self.padding)
+
+            # 裁剪图像（无预处理）
+            cropped_img = original_image[y1_pad:y2_pad, x1_pad:x2_pad]
+
+            # 保存裁剪图像 (带类别前缀)
+            save_filename = f"{category}_{os.path.splitext(filename)[0]}_{len(self.category_results[category])}.png"
+            save_path = os.path.join(output_dir, category, save_filename)
+            cv2.imwrite(save_path, cropped_img)
+
+            # 记录检测结果
+            self.category_results[category].append({
+                "original_image": filename,
+                "cropped_image": save_filename,
+                "bbox": [x1, y1, x2, y2],
+                "confidence": conf,
+                "category": category
+            })
+
+            print(f"✅ 保存裁剪图像: {save_path}")
 
     def _save_category_results(self, output_dir: str):
         """将每个类别的结果保存为JSON文件"""
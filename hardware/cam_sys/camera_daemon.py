@@ -0,0 +1,359 @@
+'''
+Description: 相机常驻服务：保持三台相机的登录会话和预览码流，通过本地 HTTP 接口触发抓图
+
+替代每个储位执行三次 `conda run -n tobacco_env python xxx_capture.py`：
+conda 激活、解释器启动、SDK 登录（失败重试间隔3秒）和码流预热（解码器初始化约3秒）
+只在服务启动时（或会话断开重连时）发生一次，之后每次抓图并行触发所有相机，
+图片完整写入 capture_img/<任务号>/<储位>/<相机类型>/ 后返回。
+
+接口（仅监听 127.0.0.1，端口为 config.json 的 ports.camsys）:
+    POST /capture  {"task_no": "...", "bin_location": "...", "cameras": ["3d_camera", ...]（可选，默认全部）}
+    GET  /status
+
+启动（需在编译后的 build 目录中运行，从项目根目录执行）:
+    conda run -n tobacco_env python hardware/cam_sys/build/camera_daemon.py
+
+Copyright (c) 2025 by lizh, All Rights Reserved.
+'''
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger("camera_daemon")
+
+# 码流类型 -> C++ 抓图保存的文件名（见 CamController::getPic）
+STREAM_FILES = {0: "main.jpg", 3: "depth.jpg"}
+
+# 未配置 cameras.devices 时使用的默认相机（与原抓图脚本一致）
+DEFAULT_DEVICES = {
+    "3d_camera": {"ip": "10.16.82.180", "port": 8000, "username": "admin", "password": "qwe147852",
+                  "streams": [0, 3]},
+    "scan_camera_1": {"ip": "10.16.82.181", "port": 8000, "username": "admin", "password": "qwe147852",
+                      "streams": [0]},
+    "scan_camera_2": {"ip": "10.16.82.182", "port": 8000, "username": "admin", "password": "qwe147852",
+                      "streams": [0]},
+}
+
+LOGIN_ATTEMPTS = 3
+LOGIN_RETRY_INTERVAL = 3
+# getCapture 取帧后固定等待3秒才返回，关闭会话前最多等待这么久
+CAPTURE_JOIN_TIMEOUT = 10
+JPEG_EOI = b"\xff\xd9"
+
+
+def find_project_root() -> Path:
+    """向上查找包含 config.json 的项目根目录（脚本可能位于 hardware/cam_sys 或其 build 目录）"""
+    for parent in Path(__file__).resolve().parents:
+        if (parent / "config.json").exists():
+            return parent
+    return Path.cwd()
+
+
+def load_config(project_root: Path) -> Dict[str, Any]:
+    config_file = project_root / "config.json"
+    if not config_file.exists():
+        return {}
+    with open(config_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_frame_complete(path: Path) -> bool:
+    """JPEG 以 EOI 标记（FFD9）结尾才算写完"""
+    try:
+        if path.stat().st_size < 4:
+            return False
+        with open(path, "rb") as f:
+            f.seek(-2, os.SEEK_END)
+            return f.read(2) == JPEG_EOI
+    except OSError:
+        return False
+
+
+def wait_for_frame(path: Path, timeout: float, interval: float = 0.05) -> bool:
+    """等待抓图文件完整写入"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_frame_complete(path):
+            return True
+        time.sleep(interval)
+    return False
+
+
+class CameraSession:
+    """单个相机码流的常驻会话：登录一次，预览码流保持开启，抓图时只触发取帧"""
+
+    def __init__(self, camera_type: str, device: Dict[str, Any], stream: int, capture_root: Path):
+        """
+        :param camera_type: 相机类型（同时是图片目录名：3d_camera / scan_camera_1 / scan_camera_2）
+        :param device: 设备配置（ip, port, username, password）
+        :param stream: 码流类型（0 主码流，3 第四码流）
+        :param capture_root: 抓图根目录（capture_img）
+        """
+        self.camera_type = camera_type
+        self.device = device
+        self.stream = stream
+        self.file_name = STREAM_FILES.get(stream, "default.jpg")
+        self.capture_root = capture_root
+        self.controller = None
+        self.ready = False
+        self.last_error: Optional[str] = None
+        self.captures = 0
+        self._lock = threading.Lock()
+        self._capture_thread: Optional[threading.Thread] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.camera_type}/{self.file_name}"
+
+    def open(self) -> bool:
+        """登录并开启预览（已就绪时直接返回）"""
+        if self.ready:
+            return True
+        import camera_api
+
+        self.close()
+        controller = camera_api.CamController()
+        for attempt in range(LOGIN_ATTEMPTS):
+            if controller.login(self.device["ip"], int(self.device.get("port", 8000)),
+                                self.device.get("username", "admin"), self.device.get("password", "")):
+                break
+            logger.warning(f"[{self.name}] 登录失败（{attempt + 1}/{LOGIN_ATTEMPTS}）: {self.device['ip']}")
+            if attempt < LOGIN_ATTEMPTS - 1:
+                time.sleep(LOGIN_RETRY_INTERVAL)
+        else:
+            self.last_error = f"登录失败: {self.device['ip']}"
+            return False
+
+        controller.setCameraType(self.camera_type)
+        # startRealPlay 内部等待解码器就绪，之后码流保持开启
+        if not controller.startRealPlay(1, self.stream, 0, 1):
+            self.last_error = f"开启预览失败: stream={self.stream}"
+            return False
+        self.controller = controller
+        self.ready = True
+        self.last_error = None
+        logger.info(f"[{self.name}] 会话就绪: {self.device['ip']}, stream={self.stream}")
+        return True
+
+    def _join_capture(self) -> bool:
+        """等待上一次 getCapture 返回（C++ 取帧线程仍在使用预览句柄）"""
+        thread = self._capture_thread
+        if thread is None:
+            return True
+        thread.join(CAPTURE_JOIN_TIMEOUT)
+        if thread.is_alive():
+            logger.warning(f"[{self.name}] getCapture 超过 {CAPTURE_JOIN_TIMEOUT} 秒未返回")
+            return False
+        self._capture_thread = None
+        return True
+
+    def close(self):
+        """停止预览并退出登录"""
+        controller, self.controller, self.ready = self.controller, None, False
+        if not self._join_capture():
+            # 取帧线程仍在使用预览句柄，不能停止预览，会话随进程退出释放
+            return
+        if controller is not None:
+            try:
+                controller.stopRealPlay()
+                controller.logout()
+            except Exception as e:
+                logger.warning(f"[{self.name}] 关闭会话异常: {e}")
+
+    def capture(self, task_no: str, bin_location: str, timeout: float) -> Dict[str, Any]:
+        """
+        触发抓图并等待图片完整写入
+
+        :return: {"success", "file", "elapsed_ms", "error"}
+        """
+        start = time.monotonic()
+        frame_path = self.capture_root / task_no / bin_location / self.camera_type / self.file_name
+        with self._lock:
+            try:
+                if not self.open():
+                    return self._result(False, frame_path, start, self.last_error)
+                if not self._join_capture():
+                    return self._result(False, frame_path, start, "上一次抓图未结束")
+                # 删除同名旧图，避免把上一次的图片当成本次结果
+                if frame_path.exists():
+                    frame_path.unlink()
+                self.controller.setTaskInfo(task_no, bin_location)
+                # getCapture 在后台线程取帧后固定等待3秒，这里不等它返回，只等图片写完；
+                # 线程在下一次抓图或关闭会话前回收
+                self._capture_thread = threading.Thread(target=self.controller.getCapture, daemon=True)
+                self._capture_thread.start()
+                if not wait_for_frame(frame_path, timeout):
+                    # 码流可能已断开，下次抓图时重新登录
+                    self.close()
+                    return self._result(False, frame_path, start, f"等待图片超时（{timeout}秒）")
+                self.captures += 1
+                return self._result(True, frame_path, start)
+            except Exception as e:
+                self.close()
+                return self._result(False, frame_path, start, str(e))
+
+    def _result(self, success: bool, frame_path: Path, start: float, error: Optional[str] = None) -> Dict[str, Any]:
+        elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+        if success:
+            logger.info(f"[{self.name}] 抓图完成: {frame_path} ({elapsed_ms}ms)")
+        else:
+            self.last_error = error
+            logger.error(f"[{self.name}] 抓图失败: {error}")
+        return {"success": success, "file": str(frame_path), "elapsed_ms": elapsed_ms, "error": error}
+
+    def status(self) -> Dict[str, Any]:
+        return {"ip": self.device["ip"], "stream": self.stream, "ready": self.ready,
+                "captures": self.captures, "last_error": self.last_error}
+
+
+class CameraDaemon:
+    """管理所有相机会话，并行抓图"""
+
+    def __init__(self, devices: Dict[str, Dict[str, Any]], capture_root: Path, timeout: float = 30.0):
+        """
+        :param devices: 相机类型 -> 设备配置（含 streams 码流列表）
+        :param capture_root: 抓图根目录
+        :param timeout: 单个码流等待图片的超时时间（秒）
+        """
+        self.timeout = timeout
+        self.sessions: Dict[str, List[CameraSession]] = {
+            camera_type: [CameraSession(camera_type, device, int(stream), capture_root)
+                          for stream in device.get("streams", [0])]
+            for camera_type, device in devices.items()
+        }
+        all_sessions = [s for sessions in self.sessions.values() for s in sessions]
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(all_sessions)),
+                                            thread_name_prefix="camera")
+
+    def warm_up(self):
+        """并行登录所有相机并开启预览（失败的会话在抓图时重试）"""
+        list(self._executor.map(lambda s: s.open(), self._all_sessions()))
+
+    def capture(self, task_no: str, bin_location: str,
+                cameras: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        并行触发指定相机（默认全部）的所有码流抓图
+
+        :return: {"success", "elapsed_ms", "cameras": {相机类型: {"success", "files", "elapsed_ms", "error"}}}
+        """
+        start = time.monotonic()
+        names = cameras or list(self.sessions)
+        unknown = [name for name in names if name not in self.sessions]
+        if unknown:
+            raise ValueError(f"未知相机: {', '.join(unknown)}")
+
+        futures = {name: [self._executor.submit(s.capture, task_no, bin_location, self.timeout)
+                          for s in self.sessions[name]] for name in names}
+        results = {}
+        for name, camera_futures in futures.items():
+            streams = [f.result() for f in camera_futures]
+            errors = [r["error"] for r in streams if not r["success"]]
+            results[name] = {
+                "success": not errors,
+                "files": [r["file"] for r in streams if r["success"]],
+                "elapsed_ms": max(r["elapsed_ms"] for r in streams),
+                "error": "; ".join(errors) if errors else None,
+            }
+        return {
+            "success": all(r["success"] for r in results.values()),
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+            "cameras": results,
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {name: [s.status() for s in sessions] for name, sessions in self.sessions.items()}
+
+    def close(self):
+        for session in self._all_sessions():
+            session.close()
+        self._executor.shutdown(wait=False)
+
+    def _all_sessions(self) -> List[CameraSession]:
+        return [s for sessions in self.sessions.values() for s in sessions]
+
+
+def make_handler(daemon: CameraDaemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, message: str, data: Any = None):
+            body = json.dumps({"code": status, "message": message, "data": data}, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/status":
+                self._send(200, "ok", daemon.status())
+            else:
+                self._send(404, "not found")
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/capture":
+                self._send(404, "not found")
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                task_no, bin_location = payload["task_no"], payload["bin_location"]
+            except (ValueError, KeyError) as e:
+                self._send(400, f"请求参数错误: {e}")
+                return
+            try:
+                result = daemon.capture(task_no, bin_location, payload.get("cameras"))
+            except ValueError as e:
+                self._send(400, str(e))
+                return
+            self._send(200, "抓图成功" if result["success"] else "抓图失败", result)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+def main():
+    project_root = find_project_root()
+    config = load_config(project_root)
+    camera_config = config.get("cameras", {})
+
+    parser = argparse.ArgumentParser(description='相机常驻抓图服务')
+    parser.add_argument('--port', type=int, default=config.get("ports", {}).get("camsys", 5000), help='监听端口')
+    parser.add_argument('--timeout', type=float, default=camera_config.get("capture_timeout", 30),
+                        help='单个码流等待图片的超时时间（秒）')
+    args = parser.parse_args()
+
+    # camera_api*.so 位于脚本所在的 build 目录；C++ 以相对路径 capture_img/ 保存图片，需从项目根目录运行
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(project_root)
+
+    daemon = CameraDaemon(camera_config.get("devices") or DEFAULT_DEVICES,
+                          capture_root=project_root / "capture_img", timeout=args.timeout)
+    daemon.warm_up()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(daemon))
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"相机服务已启动: http://127.0.0.1:{args.port}, 相机: {', '.join(daemon.sessions)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        logger.info("相机服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ LONG CamController::m_lPort[16] = {-1, -1, -1, -1, -1, -1, -1, -1,
 
 // 静态成员变量初始化
 int CamController::times = 0;
+// 进程内存活的 CamController 数量（SDK 只初始化/释放一次，常驻服务中多个相机会话共用）
+int CamController::sdk_refs = 0;
 
 /// 播放库硬解码回调 - 改为静态成员函数
 void CALLBACK CamController::DisplayCBFun(DISPLAY_INFO_YUV* pstDisplayInfo,
@@ -308,14 +310,16 @@ void CamController::createDirectory(const std::string& path) {
   }
 }
 
-CamController::CamController() {
-  // 初始化
-  NET_DVR_Init();
-  char ansiStringss[] = "./sdkLog";
-  NET_DVR_SetLogToFile(3, ansiStringss, TRUE);
-  // 设置连接时间与重连时间
-  NET_DVR_SetConnectTime(2000, 1);
-  NET_DVR_SetReconnect(10000, true);
+CamController::CamController() : lUserID(-1), lRealPlayHandle(-1) {
+  // 初始化（第一个实例初始化SDK）
+  if (sdk_refs++ == 0) {
+    NET_DVR_Init();
+    char ansiStringss[] = "./sdkLog";
+    NET_DVR_SetLogToFile(3, ansiStringss, TRUE);
+    // 设置连接时间与重连时间
+    NET_DVR_SetConnectTime(2000, 1);
+    NET_DVR_SetReconnect(10000, true);
+  }
 }
 
 CamController::~CamController() {
@@ -333,7 +337,10 @@ CamController::~CamController() {
   if (lUserID >= 0) {
     // 退出登录
     NET_DVR_Logout(lUserID);
-    // 释放sdk资源
+  }
+
+  // 最后一个实例释放sdk资源
+  if (--sdk_refs == 0) {
     NET_DVR_Cleanup();
   }
 }
@@ -360,7 +367,6 @@ bool CamController::login(const std::string& deviceAddress, unsigned short port,
   lUserID = NET_DVR_Login_V40(&struLoginInfo, &struDeviceInfoV40);
   if (lUserID < 0) {
     printf("Login failed, error code: %d\n", NET_DVR_GetLastError());
-    NET_DVR_Cleanup();
     return false;
   }
 
@@ -377,12 +383,14 @@ bool CamController::logout() {
     PlayM4_CloseStream(m_lPort[lRealPlayHandle]);
     // 释放播放端口
     PlayM4_FreePort(m_lPort[lRealPlayHandle]);
+    lRealPlayHandle = -1;
   }
 
-  // 退出登录
-  NET_DVR_Logout(lUserID);
-  // 释放sdk资源
-  NET_DVR_Cleanup();
+  // 退出登录（sdk资源在最后一个实例析构时释放）
+  if (lUserID >= 0) {
+    NET_DVR_Logout(lUserID);
+    lUserID = -1;
+  }
 
   return true;
 }
@@ -410,7 +418,7 @@ bool CamController::startRealPlay(unsigned short channel,
   if (lRealPlayHandle < 0) {
     printf("NET_DVR_RealPlay_V40 error %d\n", NET_DVR_GetLastError());
     NET_DVR_Logout(lUserID);
-    NET_DVR_Cleanup();
+    lUserID = -1;
     return false;
   }
   // 等待播放库有数据，否则后面无法使用播放库抓图
@@ -446,6 +454,7 @@ bool CamController::stopRealPlay() {
   PlayM4_CloseStream(m_lPort[lRealPlayHandle]);
   // 释放播放端口
   PlayM4_FreePort(m_lPort[lRealPlayHandle]);
+  lRealPlayHandle = -1;
 
   return true;
 }
@@ -53,6 +53,7 @@ class CamController {
   LONG lRealPlayHandle;
 
   static int times;
+  static int sdk_refs;  // 存活实例数（SDK 初始化/释放引用计数）
   static LONG m_lPort[16];  // 全局的播放库port号
   void getPic();
 
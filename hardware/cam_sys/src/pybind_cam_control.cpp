@@ -15,15 +15,19 @@
 namespace py = pybind11;
 
 PYBIND11_MODULE(camera_api, m) {
+  // 登录、预览、抓图会阻塞数秒，调用期间释放GIL，常驻服务中多个相机可在不同线程并行操作
+  using release_gil = py::call_guard<py::gil_scoped_release>;
   py::class_<CamController>(m, "CamController")
       .def(py::init<>())
       .def("login", &CamController::login, py::arg("deviceAddress"),
-           py::arg("port"), py::arg("userName"), py::arg("password"))
-      .def("logout", &CamController::logout)
+           py::arg("port"), py::arg("userName"), py::arg("password"),
+           release_gil())
+      .def("logout", &CamController::logout, release_gil())
       .def("startRealPlay", &CamController::startRealPlay, py::arg("channel"),
-           py::arg("streamType"), py::arg("linkMode"), py::arg("blocked"))
-      .def("stopRealPlay", &CamController::stopRealPlay)
-      .def("getCapture", &CamController::getCapture)
+           py::arg("streamType"), py::arg("linkMode"), py::arg("blocked"),
+           release_gil())
+      .def("stopRealPlay", &CamController::stopRealPlay, release_gil())
+      .def("getCapture", &CamController::getCapture, release_gil())
       .def("setTaskInfo", &CamController::setTaskInfo, py::arg("task_id"),
            py::arg("bin_code"))
       .def("setCameraType", &CamController::setCameraType,
@@ -0,0 +1,13 @@
+#!/bin/bash
+# 启动相机常驻服务（保持相机登录和预览码流，网关通过 127.0.0.1:5000 触发抓图）
+# 从项目根目录执行此脚本，需先编译 hardware/cam_sys（见 README）
+
+# 获取项目根目录
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+# C++ 以相对路径 capture_img/ 保存图片，需从项目根目录运行
+cd "$PROJECT_ROOT"
+
+# 在编译 camera_api 的 Conda 环境中启动服务
+conda run --no-capture-output -n tobacco_env python hardware/cam_sys/build/camera_daemon.py "$@"
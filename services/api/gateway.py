@@ -3,13 +3,15 @@ Gateway服务 - API 网关入口点
 
 将所有服务模块的路由聚合到一起，提供统一的 API 入口。
 """
-import os
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # 导入共享配置和日志
-from services.api.shared.config import logger, logs_dir, CORS_ORIGINS
+from services.api.shared.config import (
+    logger, logs_dir, CORS_ORIGINS, DETECT_MODULE_AVAILABLE, ENABLE_BARCODE, BARCODE_MODULE_AVAILABLE
+)
 from services.api.shared.operation_log import log_operation
 
 # 导入各服务模块的路由
@@ -21,9 +23,10 @@ from services.api.log.router import router as log_router
 from services.api.history.router import router as history_router
 from services.api.common.router import router as common_router
 from services.api.config.router import router as config_router
+from services.api.model.router import router as model_router
+from services.api.metrics.router import router as metrics_router
 
 # 条形码路由（可选）
-ENABLE_BARCODE = os.getenv("ENABLE_BARCODE", "true").lower() in ("true", "1", "yes")
 if ENABLE_BARCODE:
     try:
         from services.api.routers.barcode import router as barcode_router
@@ -63,6 +66,8 @@ app.include_router(log_router)
 app.include_router(history_router)
 app.include_router(common_router)
 app.include_router(config_router)
+app.include_router(model_router)
+app.include_router(metrics_router)
 
 # 注册条形码路由（可选）
 if ENABLE_BARCODE and BARCODE_ROUTER_AVAILABLE:
@@ -83,7 +88,8 @@ async def root():
         "service": "LeafDepot API Gateway",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 
@@ -96,6 +102,29 @@ async def startup_event():
     logger.info("📚 API文档: http://localhost:8000/docs")
     logger.info(f"📝 日志目录: {logs_dir}")
 
+    # 启动推理进程池：工作进程启动时预加载YOLO模型和堆垛配置，识别任务不再阻塞事件循环
+    if DETECT_MODULE_AVAILABLE:
+        try:
+            from core.detection.utils.model_registry import get_model_registry
+            from services.vision.inference_executor import get_inference_executor
+            executor = get_inference_executor()
+            # 主进程的注册表使用与工作进程相同的检测器后端配置
+            get_model_registry().configure_detector(**executor.detector_config)
+            await asyncio.to_thread(executor.start)
+            logger.info(f"🧠 推理执行器已启动: {executor.status()}")
+        except Exception as e:
+            logger.warning(f"⚠️ 推理执行器启动失败，将在首次识别时启动: {e}")
+
+    # 启动常驻条码解码进程：解码器只初始化一次，两个扫码相机的图片并行解码
+    if ENABLE_BARCODE and BARCODE_MODULE_AVAILABLE:
+        try:
+            from services.vision.barcode_service import get_barcode_service
+            barcode_service = get_barcode_service()
+            await asyncio.to_thread(barcode_service.start)
+            logger.info(f"🔖 条码解码服务已启动: {barcode_service.status()}")
+        except Exception as e:
+            logger.warning(f"⚠️ 条码解码服务启动失败，将在首次识别时启动: {e}")
+
     # 记录启动日志
     log_operation(
         operation_type="system",
@@ -110,6 +139,19 @@ async def startup_event():
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("Gateway服务关闭")
+    if DETECT_MODULE_AVAILABLE:
+        from services.vision.inference_executor import get_inference_executor
+        get_inference_executor().shutdown(wait=False)
+    if ENABLE_BARCODE and BARCODE_MODULE_AVAILABLE:
+        from services.vision.barcode_service import get_barcode_service
+        get_barcode_service().shutdown()
+    # 关闭 RCS、LMS、相机服务客户端的连接池
+    from services.api.shared.camera_client import close_camera_client
+    from services.api.shared.http_client import get_lms_client
+    from services.api.shared.rcs_client import close_rcs_clients
+    await close_rcs_clients()
+    await get_lms_client().aclose()
+    await close_camera_client()
     log_operation(
         operation_type="system",
         action="服务关闭",
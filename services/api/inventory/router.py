@@ -5,9 +5,9 @@ import os
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, Request, BackgroundTasks, HTTPException, status, Body
+from fastapi import APIRouter, Request, BackgroundTasks, HTTPException, status, Body, Header
 from fastapi.responses import JSONResponse, Response
 import pandas as pd
 
@@ -20,20 +20,23 @@ from services.api.shared.config import (
     IS_SIM,
     ENABLE_DEBUG,
     ENABLE_VISUALIZATION,
+    INFERENCE_BATCH_SIZE,
 )
 from services.api.shared.models import (
     TaskStatus,
     BinLocationStatus,
     InventoryTaskProgress,
     ScanAndRecognizeRequest,
+    BatchRecountRequest,
 )
 from services.api.shared.operation_log import log_operation
-from services.api.shared.tobacco_resolver import get_tobacco_case_resolver
+from services.vision.inference_executor import get_inference_executor, InferenceQueueFullError
 
 # 从 service.py 导入核心函数和状态存储
 from services.api.inventory.service import (
     execute_inventory_workflow,
     get_task_state_storage,
+    resolve_scan_barcodes,
     inventory_tasks,
     inventory_task_bins,
     inventory_task_details,
@@ -347,9 +350,23 @@ async def get_task_detail(taskNo: str, binLocation: str):
         )
 
 
+# 识别请求可通过该请求头开启单次性能分析（cprofile / pyinstrument），报告随 detect_result.trace 返回
+PROFILE_HEADER = "X-Profile"
+PROFILE_MODES = ("cprofile", "pyinstrument")  # 与 core.detection.utils.tracer.PROFILE_MODES 一致
+
+
 @router.post("/scan-and-recognize")
-async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
-    """扫码+识别接口"""
+async def scan_and_recognize(
+    request: ScanAndRecognizeRequest = Body(...),
+    x_profile: Optional[str] = Header(None, alias=PROFILE_HEADER)
+):
+    """扫码+识别接口（detect_result.trace 中返回各阶段耗时；X-Profile 请求头可开启性能分析）"""
+    profile = x_profile.strip().lower() if x_profile else None
+    if profile and profile not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{PROFILE_HEADER} 取值无效: {x_profile}，可选: {', '.join(PROFILE_MODES)}"
+        )
     try:
         image_path = f"{request.taskNo}/{request.binLocation}/3d_camera/"
         image_dir = project_root / "capture_img" / image_path
@@ -391,23 +408,11 @@ async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
         scan_dir_2 = image_dir.parent / "scan_camera_2"
         if ENABLE_BARCODE and BARCODE_MODULE_AVAILABLE and BarcodeRecognizer:
             try:
-                recognizer = BarcodeRecognizer(code_type=request.code_type)
-                all_barcode_results = []
-                for scan_dir in [scan_dir_1, scan_dir_2]:
-                    if scan_dir.exists():
-                        barcode_results = recognizer.process_folder(input_dir=str(scan_dir))
-                        all_barcode_results.extend(barcode_results)
-                resolver = get_tobacco_case_resolver()
-
-                resolved_info = None
-                for result in all_barcode_results:
-                    barcode_text = result.get('output') or result.get('text')
-                    if barcode_text:
-                        resolved_info = resolver.resolve(barcode_text)
-                        if resolved_info['success']:
-                            break
+                # 两个扫码相机的图片在常驻解码进程中并行解码，匹配成功后取消剩余解码
+                scan = await resolve_scan_barcodes([scan_dir_1, scan_dir_2], code_type=request.code_type)
+                resolved_info = scan["resolved"]
 
-                if resolved_info and resolved_info['success']:
+                if resolved_info:
                     detected_pile_id = resolved_info['pile_id']
                     results["barcode_result"] = {
                         "image_path": str(scan_dir_1),
@@ -417,7 +422,9 @@ async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
                         "product_name": resolved_info['product_name'],
                         "tobacco_code": resolved_info['tobacco_code'],
                         "mapped_pile_id": detected_pile_id,
-                        "total_images": len(all_barcode_results),
+                        "total_images": scan["total_images"],
+                        "decoded_images": len(scan["results"]),
+                        "matches": scan["matches"],
                         "status": "success"
                     }
                 else:
@@ -463,10 +470,12 @@ async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
                     debug_output_dir.mkdir(parents=True, exist_ok=True)
 
                     depth_path = image_dir / "depth.jpg"
-                    total_count = count_boxes(
+                    # 箱体计数在推理进程池中执行，不阻塞事件循环
+                    counted = await get_inference_executor().count_boxes_traced(
                         image_path=str(image_files[0]),
                         pile_id=detected_pile_id,
                         depth_image_path=str(depth_path) if depth_path.exists() else None,
+                        profile=profile,
                         enable_debug=ENABLE_DEBUG,
                         enable_visualization=ENABLE_VISUALIZATION,
                         output_dir=str(debug_output_dir)
@@ -475,9 +484,12 @@ async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
                     results["detect_result"] = {
                         "image_path": str(image_files[0]),
                         "pile_id": detected_pile_id,
-                        "total_count": total_count,
-                        "status": "success"
+                        "total_count": counted["total"],
+                        "status": "success",
+                        "trace": counted["trace"]
                     }
+            except InferenceQueueFullError as e:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
             except Exception as e:
                 logger.error(f"Detect模块识别失败: {str(e)}")
                 results["detect_result"] = {"status": "failed", "error": str(e)}
@@ -516,6 +528,127 @@ async def scan_and_recognize(request: ScanAndRecognizeRequest = Body(...)):
         )
 
 
+def _find_main_image(image_dir: Path):
+    """在3D相机目录中查找主图（main/raw/image 优先，其次任意图片）"""
+    if not image_dir.is_dir():
+        return None
+    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
+    for name in ['main', 'raw', 'image']:
+        for ext in image_extensions:
+            common_file = image_dir / f"{name}{ext}"
+            if common_file.exists():
+                return common_file
+    for ext in image_extensions:
+        files = sorted(image_dir.glob(f"*{ext}"))
+        if files:
+            return files[0]
+    return None
+
+
+@router.post("/recount-batch")
+async def recount_batch(request: BatchRecountRequest = Body(...)):
+    """
+    批量重新识别接口：对一个任务的多个库位批量执行箱体计数
+
+    YOLO按固定批次推理，后处理分发到推理进程池，返回每个库位的结果和各阶段耗时（毫秒）。
+    推理队列已满时被拒绝的库位 status 为 "rejected"（可稍后重试），其他库位的结果照常返回。
+    """
+    if not DETECT_MODULE_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="检测模块不可用")
+    if not request.bins:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="库位列表不能为空")
+
+    try:
+        items = []
+        missing = []
+        for bin_item in request.bins:
+            image_dir = project_root / "capture_img" / request.taskNo / bin_item.binLocation / "3d_camera"
+            image_file = _find_main_image(image_dir)
+            if image_file is None:
+                missing.append(bin_item.binLocation)
+                continue
+            depth_path = image_dir / "depth.jpg"
+            items.append((str(image_file), bin_item.pile_id, str(depth_path) if depth_path.exists() else None))
+
+        batch_results = []
+        # 批量检测任务本身被拒绝时，所有有图片的库位都记为 rejected
+        batch_rejected = None
+        if items:
+            try:
+                batch_results = await get_inference_executor().count_boxes_batch(
+                    items,
+                    batch_size=request.batch_size or INFERENCE_BATCH_SIZE,
+                    enable_debug=ENABLE_DEBUG,
+                    enable_visualization=ENABLE_VISUALIZATION,
+                    output_dir=str(project_root / "debug" / request.taskNo / "batch")
+                )
+            except InferenceQueueFullError as e:
+                logger.warning(f"批量识别被拒绝: {str(e)}")
+                batch_rejected = str(e)
+
+        # 按请求顺序组装结果（缺少图片的库位不参与批量识别）
+        results = []
+        batch_iter = iter(batch_results)
+        for bin_item in request.bins:
+            if bin_item.binLocation in missing:
+                results.append({"binLocation": bin_item.binLocation, "status": "failed", "error": "图片不存在"})
+                continue
+            if batch_rejected is not None:
+                results.append({"binLocation": bin_item.binLocation, "status": "rejected", "error": batch_rejected})
+                continue
+            result = next(batch_iter)
+            if result["rejected"]:
+                bin_result_status = "rejected"
+            else:
+                bin_result_status = "success" if result["error"] is None else "failed"
+            results.append({
+                "binLocation": bin_item.binLocation,
+                "pile_id": result["pile_id"],
+                "image_path": result["image_path"],
+                "total_count": result["total"],
+                "status": bin_result_status,
+                "error": result["error"],
+                "timings": result["timings"],
+            })
+
+        # 更新库位识别结果
+        task_bins = get_task_state_storage()["bins"]
+        if request.taskNo in task_bins:
+            by_location = {r["binLocation"]: r for r in results}
+            for bin_status in task_bins[request.taskNo]:
+                result = by_location.get(bin_status.bin_location)
+                if result and result["status"] == "success":
+                    bin_status.detect_result = {
+                        "image_path": result["image_path"],
+                        "pile_id": result["pile_id"],
+                        "total_count": result["total_count"],
+                        "status": "success"
+                    }
+
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        rejected = sum(1 for r in results if r["status"] == "rejected")
+        message = f"批量识别完成: {succeeded}/{len(results)} 个库位成功"
+        if rejected:
+            message += f"，{rejected} 个库位因推理队列已满未识别，请稍后重试"
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "code": 200,
+                "message": message,
+                "data": {"taskNo": request.taskNo, "results": results}
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"批量识别失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批量识别失败: {str(e)}"
+        )
+
+
 @router.get("/recognition-result")
 async def get_recognition_result(taskNo: str, binLocation: str):
     """读取识别结果接口"""
@@ -10,9 +10,7 @@ import logging
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-
-import requests
+from typing import Dict, List, Any, Optional, Callable, Awaitable
 
 # 添加项目根目录到路径
 _project_root = Path(__file__).parent.parent.parent.parent
@@ -32,18 +30,24 @@ from services.api.shared.config import (
     RCS_CALLBACK_URL,
     ENABLE_BARCODE,
     BARCODE_MODULE_AVAILABLE,
+    BARCODE_EARLY_EXIT,
+    BARCODE_REQUIRED_MATCHES,
     DETECT_MODULE_AVAILABLE,
     ENABLE_DEBUG,
     ENABLE_VISUALIZATION,
+    PIPELINE_INVENTORY,
+    PIPELINE_MAX_INFLIGHT,
 )
 
+from services.vision.inference_executor import get_inference_executor
+from services.vision.barcode_service import get_barcode_service
+
 # 从 robot/router 导入状态管理（避免与 services.api.state 混淆）
 from services.api.robot.router import (
-    _robot_status_store,
-    _status_event,
     update_robot_status as _router_update_status,
     wait_for_robot_status as _router_wait_status,
 )
+from services.api.robot.status_broker import get_status_broker
 
 # 任务状态存储
 _inventory_tasks: Dict[str, TaskStatus] = {}
@@ -83,117 +87,21 @@ def get_inventory_service():
 # ==================== 机器人任务下发函数 ====================
 
 async def submit_inventory_task(task_no: str, bin_locations: List[str], is_sim: bool = True, max_retries: int = 3):
-    """下发盘点任务，接收任务编号和储位名称列表，支持失败重试"""
-    import time as time_module
-    import uuid
+    """下发盘点任务，接收任务编号和储位名称列表，支持失败重试（退避等待不阻塞事件循环）"""
+    from services.api.shared.rcs_client import get_rcs_client
 
     try:
         logger.info(f"下发盘点任务: {task_no}, 储位: {bin_locations}, 模拟模式: {is_sim}")
 
-        last_error = None
-        for attempt in range(max_retries):
-            try:
-                if is_sim:
-                    # ====== 模拟模式 ======
-                    url = f"{RCS_FULL_URL}/api/robot/controller/task/submit"
-                    headers = {
-                        "X-lr-request-id": "ldui",
-                        "Content-Type": "application/json"
-                    }
-                    target_route = [
-                        {"seq": i, "type": "ZONE", "code": loc}
-                        for i, loc in enumerate(bin_locations)
-                    ]
-                    request_body = {
-                        "taskType": "PF-CTU-COMMON-TEST",
-                        "targetRoute": target_route
-                    }
-                    response = requests.post(url, json=request_body, headers=headers, timeout=30)
+        result = await get_rcs_client(is_sim).submit_task(bin_locations, max_retries=max_retries)
+        if result["success"]:
+            default_code = "ctu001" if is_sim else ""
+            robot_task_code = result["data"].get("data", {}).get("robotTaskCode", default_code)
+            logger.info(f"储位 {bin_locations} 已发送到机器人系统, robotTaskCode={robot_task_code}")
+            return {"success": True, "message": "盘点任务已下发", "robotTaskCode": robot_task_code}
 
-                else:
-                    # ====== 真实模式 ======
-                    real_cfg = RCS_REAL or {}
-                    protocol = "https" if real_cfg.get("use_ssl", True) else "http"
-                    host = real_cfg.get("host", "10.16.82.90")
-                    port = real_cfg.get("port", 443)
-                    base_url = f"{protocol}://{host}:{port}"
-                    url = f"{base_url}{RCS_PREFIX}/api/robot/controller/task/submit"
-
-                    timestamp = str(int(time_module.time() * 1000))
-                    headers = {
-                        "X-App-Id": real_cfg.get("app_id", "1008"),
-                        "X-Sign": real_cfg.get("sign", ""),
-                        "X-Timestamp": timestamp,
-                        "X-LR-REQUEST-ID": str(uuid.uuid4()),
-                        "Content-Type": "application/json"
-                    }
-                    # 构建 targetRoute：STORAGE（储位）+ CARRIER_TYPE（载体类型）
-                    target_route = []
-                    for i, loc in enumerate(bin_locations):
-                        target_route.append({
-                            "autoStart": 1,
-                            "code": loc,
-                            "extra": {},
-                            "seq": i,
-                            "type": "STORAGE"
-                        })
-                        target_route.append({
-                            "autoStart": 1,
-                            "code": "1",
-                            "extra": {},
-                            "seq": i,
-                            "type": "CARRIER_TYPE"
-                        })
-                    request_body = {
-                        "extra": {},
-                        "groupCode": "",
-                        "interrupt": 0,
-                        "liftCode": "",
-                        "robotTaskCode": "",
-                        "robotType": "",
-                        "targetRoute": target_route,
-                        "taskType": real_cfg.get("task_type", "PF-CTU-HS-H-DETECT-NOTIFY-1")
-                    }
-                    logger.info(f"【真实RCS下发请求】url={url} headers={json.dumps(headers, ensure_ascii=False)} body={json.dumps(request_body, ensure_ascii=False)}")
-                    response = requests.post(url, json=request_body, headers=headers, timeout=20, verify=False)
-                    logger.info(f"【真实RCS下发响应】code={response.status_code} body={response.text}")
-
-                if response.status_code == 200:
-                    response_data = response.json()
-                    # 兼容两种返回格式：code="SUCCESS" 或 success=true
-                    is_success = response_data.get("success") is True or response_data.get("code") == "SUCCESS"
-                    if is_success:
-                        robot_task_code = ""
-                        if is_sim:
-                            robot_task_code = response_data.get("data", {}).get("robotTaskCode", "ctu001")
-                        else:
-                            robot_task_code = response_data.get("data", {}).get("robotTaskCode", "")
-                        logger.info(f"储位 {bin_locations} 已发送到机器人系统, robotTaskCode={robot_task_code}")
-                        return {"success": True, "message": "盘点任务已下发", "robotTaskCode": robot_task_code}
-                    else:
-                        last_error = f" RCS 返回错误: {response_data.get('message', '')} ({response_data.get('errorCode', '')})"
-                        logger.warning(f"下发任务失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-                else:
-                    last_error = f" HTTP {response.status_code}"
-                    logger.warning(f"下发任务失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-
-            except requests.exceptions.Timeout:
-                last_error = " 请求超时"
-                logger.warning(f"下发任务超时 (尝试 {attempt + 1}/{max_retries})")
-            except requests.exceptions.ConnectionError as conn_err:
-                last_error = f" 连接失败: {conn_err}"
-                logger.warning(f"下发任务连接失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-            except Exception as req_err:
-                last_error = f" 请求异常: {req_err}"
-                logger.warning(f"下发任务异常 (尝试 {attempt + 1}/{max_retries}){last_error}")
-
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 2
-                logger.info(f"等待 {wait_time} 秒后重试...")
-                time_module.sleep(wait_time)
-
-        logger.error(f"下发盘点任务失败，已达到最大重试次数 ({max_retries})")
-        return {"success": False, "message": f"盘点任务下发失败，已重试{max_retries}次{last_error}"}
+        logger.error(f"下发盘点任务失败，已达到最大重试次数 ({max_retries}){result['error']}")
+        return {"success": False, "message": f"盘点任务下发失败，已重试{max_retries}次{result['error']}"}
 
     except Exception as e:
         logger.error(f"下发盘点任务失败: {str(e)}")
@@ -201,86 +109,19 @@ async def submit_inventory_task(task_no: str, bin_locations: List[str], is_sim:
 
 
 async def continue_inventory_task(is_sim: bool = True, robot_task_code: str = "", max_retries: int = 3):
-    """继续盘点任务，支持失败重试"""
-    import time as time_module
-    import uuid
+    """继续盘点任务，支持失败重试（退避等待不阻塞事件循环）"""
+    from services.api.shared.rcs_client import get_rcs_client
 
     try:
         logger.info(f"继续执行盘点任务, 模拟模式: {is_sim}, robotTaskCode: {robot_task_code}")
 
-        last_error = None
-        for attempt in range(max_retries):
-            try:
-                if is_sim:
-                    url = f"{RCS_FULL_URL}/api/robot/controller/task/extend/continue"
-                    headers = {
-                        "X-lr-request-id": "ldui",
-                        "Content-Type": "application/json"
-                    }
-                    request_body = {
-                        "triggerType": "TASK",
-                        "triggerCode": "001"
-                    }
-                    response = requests.post(url, json=request_body, headers=headers, timeout=30)
+        result = await get_rcs_client(is_sim).continue_task(robot_task_code, max_retries=max_retries)
+        if result["success"]:
+            logger.info(f"继续执行盘点任务命令已发送到机器人系统")
+            return {"success": True, "message": "盘点任务已继续"}
 
-                else:
-                    # ====== 真实模式 ======
-                    real_cfg = RCS_REAL or {}
-                    protocol = "https" if real_cfg.get("use_ssl", True) else "http"
-                    host = real_cfg.get("host", "10.16.82.90")
-                    port = real_cfg.get("port", 443)
-                    base_url = f"{protocol}://{host}:{port}"
-                    continue_path = real_cfg.get("continue_url", "/rcs/rtas/api/robot/controller/task/extend/continue")
-                    url = f"{base_url}{continue_path}"
-
-                    timestamp = str(int(time_module.time() * 1000))
-                    headers = {
-                        "X-App-Id": real_cfg.get("app_id", "1008"),
-                        "X-Sign": real_cfg.get("sign", ""),
-                        "X-Timestamp": timestamp,
-                        "X-LR-REQUEST-ID": str(uuid.uuid4()),
-                        "Content-Type": "application/json"
-                    }
-                    request_body = {
-                        "extra": {},
-                        "triggerType": "TASK",
-                        "triggerCode": robot_task_code
-                    }
-                    logger.info(f"【真实RCS继续请求】url={url} headers={json.dumps(headers, ensure_ascii=False)} body={json.dumps(request_body, ensure_ascii=False)}")
-                    response = requests.post(url, json=request_body, headers=headers, timeout=20, verify=False)
-                    logger.info(f"【真实RCS继续响应】code={response.status_code} body={response.text}")
-
-                if response.status_code == 200:
-                    response_data = response.json()
-                    # 兼容两种返回格式：code="SUCCESS" 或 success=true
-                    is_success = response_data.get("success") is True or response_data.get("code") == "SUCCESS"
-                    if is_success:
-                        logger.info(f"继续执行盘点任务命令已发送到机器人系统")
-                        return {"success": True, "message": "盘点任务已继续"}
-                    else:
-                        last_error = f" RCS 返回错误: {response_data.get('message', '')} ({response_data.get('errorCode', '')})"
-                        logger.warning(f"继续任务失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-                else:
-                    last_error = f" HTTP {response.status_code}"
-                    logger.warning(f"继续任务失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-
-            except requests.exceptions.Timeout:
-                last_error = " 请求超时"
-                logger.warning(f"继续任务超时 (尝试 {attempt + 1}/{max_retries})")
-            except requests.exceptions.ConnectionError as conn_err:
-                last_error = f" 连接失败: {conn_err}"
-                logger.warning(f"继续任务连接失败 (尝试 {attempt + 1}/{max_retries}){last_error}")
-            except Exception as req_err:
-                last_error = f" 请求异常: {req_err}"
-                logger.warning(f"继续任务异常 (尝试 {attempt + 1}/{max_retries}){last_error}")
-
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 2
-                logger.info(f"等待 {wait_time} 秒后重试...")
-                time_module.sleep(wait_time)
-
-        logger.error(f"继续盘点任务失败，已达到最大重试次数 ({max_retries})")
-        return {"success": False, "message": f"继续任务已重试{max_retries}次{last_error}"}
+        logger.error(f"继续盘点任务失败，已达到最大重试次数 ({max_retries}){result['error']}")
+        return {"success": False, "message": f"继续任务已重试{max_retries}次{result['error']}"}
 
     except Exception as e:
         logger.error(f"继续盘点任务失败: {str(e)}")
@@ -289,14 +130,14 @@ async def continue_inventory_task(is_sim: bool = True, robot_task_code: str = ""
 
 # ==================== 机器人状态管理函数 ====================
 
-async def update_robot_status(method: str, data: Optional[Dict] = None):
-    """更新机器人状态并触发事件（委托给 robot/router）"""
-    await _router_update_status(method, data)
+async def update_robot_status(method: str, data: Optional[Dict] = None, robot_task_code: str = ""):
+    """更新机器人状态并通知等待方（委托给 robot/router）"""
+    await _router_update_status(method, data, robot_task_code)
 
 
-async def wait_for_robot_status(expected_method: str, timeout: int = 300):
-    """等待特定机器人状态（委托给 robot/router）"""
-    return await _router_wait_status(expected_method, timeout)
+async def wait_for_robot_status(expected_method: str, timeout: int = 300, robot_task_code: str = ""):
+    """等待特定机器人状态（委托给 robot/router），指定 robotTaskCode 时只等待该任务的状态"""
+    return await _router_wait_status(expected_method, timeout, robot_task_code)
 
 
 # ==================== 系统在线状态检查 ====================
@@ -322,7 +163,7 @@ async def check_systems_online(is_sim: bool, with_camera: bool) -> Dict[str, Any
     :param with_camera: 是否使用真实相机
     :return: {"online": bool, "details": {...}}
     """
-    from services.api.shared.config import RCS_BASE_URL, CAPTURE_SCRIPTS
+    from services.api.shared.config import RCS_BASE_URL
     import re
 
     results = {"rcs": {}, "cameras": {}}
@@ -344,16 +185,13 @@ async def check_systems_online(is_sim: bool, with_camera: bool) -> Dict[str, Any
         return {"online": all_online, "details": results}
 
     # 检查相机在线状态
-    camera_ips = {
-        "3d_camera": "10.16.82.180",
-        "scan_camera_1": "10.16.82.181",
-        "scan_camera_2": "10.16.82.182",
-    }
-    camera_port = 8000  # 海康威视相机默认管理端口
+    from services.api.shared.config import CAMERA_DEVICES
 
     all_cameras_online = True
-    for cam_name, cam_ip in camera_ips.items():
-        cam_online = check_service_online(cam_ip, camera_port)
+    for cam_name, device in CAMERA_DEVICES.items():
+        cam_ip = device["ip"]
+        # 海康威视相机默认管理端口 8000
+        cam_online = check_service_online(cam_ip, int(device.get("port", 8000)))
         results["cameras"][cam_name] = {"ip": cam_ip, "online": cam_online}
         if not cam_online:
             all_cameras_online = False
@@ -366,37 +204,6 @@ async def check_systems_online(is_sim: bool, with_camera: bool) -> Dict[str, Any
 
 # ==================== 图片检查和抓图函数 ====================
 
-async def check_image_exists(task_no: str, bin_location: str, camera_type: str) -> bool:
-    """检查指定相机类型的图片是否存在"""
-    try:
-        image_dir = project_root / "capture_img" / task_no / bin_location / camera_type
-
-        if not image_dir.exists():
-            logger.warning(f"图片目录不存在: {image_dir}")
-            return False
-
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
-        for ext in image_extensions:
-            for common_name in ['main', 'MAIN', 'raw', 'RAW', 'image', 'IMAGE']:
-                image_file = image_dir / f"{common_name}{ext}"
-                if image_file.exists():
-                    logger.info(f"找到图片文件: {image_file}")
-                    return True
-
-        for ext in image_extensions:
-            image_files = list(image_dir.glob(f"*{ext}"))
-            if image_files:
-                logger.info(f"找到图片文件: {image_files[0]}")
-                return True
-
-        logger.warning(f"未找到图片文件: {image_dir}")
-        return False
-
-    except Exception as e:
-        logger.error(f"检查图片存在性失败: {str(e)}")
-        return False
-
-
 async def execute_capture_script(script_path: str, task_no: str, bin_location: str) -> Dict[str, Any]:
     """执行单个抓图脚本"""
     conda_env = "tobacco_env"
@@ -440,106 +247,299 @@ def _ping_camera(host: str, timeout: int = 3) -> bool:
         return False
 
 
-async def capture_images_with_scripts(task_no: str, bin_location: str) -> Dict[str, Any]:
-    """使用脚本抓取图片（带重试机制）"""
-    from services.api.shared.config import CAPTURE_SCRIPTS
+async def trigger_capture(task_no: str, bin_location: str,
+                         cameras: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    触发相机抓图
+
+    优先使用相机常驻服务（并行抓图，图片写完才返回）；服务未启动或配置为 script 模式时逐个执行抓图脚本
 
-    max_retries = 5  # 增加重试次数
-    retry_count = 0
+    :param cameras: 相机类型列表（可选，默认全部相机）
+    :return: 相机服务的抓图结果（含各相机耗时）；使用抓图脚本时返回None
+    :raises Exception: 抓图失败
+    """
+    from services.api.shared.config import CAMERA_CAPTURE_MODE, CAMERA_DEVICES, CAPTURE_SCRIPTS_BY_CAMERA
 
-    while retry_count < max_retries:
+    cameras = list(cameras or CAMERA_DEVICES)
+
+    if CAMERA_CAPTURE_MODE == "daemon":
+        from services.api.shared.camera_client import CameraDaemonUnavailable, get_camera_client
         try:
-            # 抓图前检测相机网络是否可达（检测3D相机IP）
-            if not _ping_camera("10.16.82.180"):
-                logger.warning(f"相机 10.16.82.180 不可达，等待重试...")
-                await asyncio.sleep(5)  # 等待网络恢复
+            result = await get_camera_client().capture(task_no, bin_location, cameras)
+        except CameraDaemonUnavailable as e:
+            logger.warning(f"相机服务不可用，回退到抓图脚本: {e}")
+        else:
+            if not result["success"]:
+                errors = {name: r["error"] for name, r in result["cameras"].items() if not r["success"]}
+                raise Exception(f"相机服务抓图失败: {errors}")
+            return result
 
-            logger.info(f"开始抓图: {task_no}/{bin_location}, 第 {retry_count + 1} 次尝试")
+    for camera_type in cameras:
+        script_path = CAPTURE_SCRIPTS_BY_CAMERA.get(camera_type)
+        if not script_path or not os.path.exists(script_path):
+            logger.warning(f"抓图脚本不存在: {camera_type} ({script_path})")
+            continue
 
-            # 执行所有抓图脚本
-            for script_path in CAPTURE_SCRIPTS:
-                if not os.path.exists(script_path):
-                    logger.warning(f"抓图脚本不存在: {script_path}")
-                    continue
+        result = await execute_capture_script(script_path, task_no, bin_location)
+        if not result["success"]:
+            raise Exception(f"抓图脚本执行失败: {result.get('error')}")
+    return None
 
-                result = await execute_capture_script(script_path, task_no, bin_location)
-                if not result["success"]:
-                    raise Exception(f"抓图脚本执行失败: {result.get('error')}")
 
-            # 等待图片生成
-            await asyncio.sleep(2)
+def _expected_capture_files(camera_type: str) -> List[str]:
+    """相机抓图完成后应生成的图片文件名（每个码流一张）"""
+    from services.api.shared.config import CAMERA_DEVICES, CAMERA_STREAM_FILES
 
-            # 检查图片是否存在
-            image_dir = project_root / "capture_img" / task_no / bin_location / "3d_camera"
-            if not image_dir.exists():
-                raise Exception(f"图片目录不存在: {image_dir}")
+    streams = CAMERA_DEVICES.get(camera_type, {}).get("streams", [0])
+    return [CAMERA_STREAM_FILES.get(stream, "default.jpg") for stream in streams]
 
-            # 查找图片文件
-            image_files = list(image_dir.glob("*.jpg")) + list(image_dir.glob("*.png"))
-            if not image_files:
-                raise Exception(f"未找到图片文件: {image_dir}")
 
-            logger.info(f"抓图成功: {task_no}/{bin_location}")
+async def capture_camera_images(task_no: str, bin_location: str, camera_type: str) -> Dict[str, Any]:
+    """
+    单个相机抓图（带重试机制，失败时只重新触发该相机）
+
+    :param camera_type: 相机类型（如 3d_camera、scan_camera_1）
+    :return: {"success", "files", "elapsed_ms", "attempts", "error"}，elapsed_ms 为含重试的总耗时
+    """
+    from services.api.shared.config import (
+        CAMERA_DEVICES, CAMERA_FRAME_TIMEOUT, CAMERA_MAX_RETRIES, CAMERA_RETRY_INTERVAL,
+    )
+    from services.api.shared.frame_notifier import wait_for_frames
+
+    camera_ip = CAMERA_DEVICES[camera_type]["ip"]
+    image_dir = project_root / "capture_img" / task_no / bin_location / camera_type
+    expected_files = _expected_capture_files(camera_type)
+    start = time.perf_counter()
+    error = None
+
+    for attempt in range(1, CAMERA_MAX_RETRIES + 1):
+        try:
+            # 抓图前检测相机网络是否可达
+            if not await asyncio.to_thread(_ping_camera, camera_ip):
+                logger.warning(f"相机 {camera_type} ({camera_ip}) 不可达，等待重试...")
+                await asyncio.sleep(CAMERA_RETRY_INTERVAL)  # 等待网络恢复
+
+            logger.info(f"开始抓图: {task_no}/{bin_location}/{camera_type}, 第 {attempt} 次尝试")
+
+            # 只接受本次触发之后写入的图片（目录中可能留有上一次抓图或失败尝试的旧图片）
+            attempt_start = time.time()
+            await trigger_capture(task_no, bin_location, [camera_type])
 
+            # 抓图脚本返回时图片可能尚未写完：各图片写完关闭后立即继续，超时未到达则本次抓图失败
+            # （相机服务在图片写完后才返回，此时立即返回）
+            await wait_for_frames(image_dir, expected_files, CAMERA_FRAME_TIMEOUT, since=attempt_start)
+
+            elapsed_ms = round((time.perf_counter() - start) * 1000)
+            logger.info(f"抓图成功: {task_no}/{bin_location}/{camera_type}, 耗时 {elapsed_ms}ms")
             return {
                 "success": True,
-                "photo3dPath": f"/{task_no}/{bin_location}/3d_camera/main.jpg",
-                "photoDepthPath": f"/{task_no}/{bin_location}/3d_camera/depth.jpg",
-                "image_count": len(image_files)
+                "files": [str(image_dir / name) for name in expected_files],
+                "elapsed_ms": elapsed_ms,
+                "attempts": attempt,
+                "error": None,
             }
 
         except Exception as e:
-            retry_count += 1
-            logger.error(f"抓图失败 (尝试 {retry_count}/{max_retries}): {str(e)}")
+            error = str(e)
+            logger.error(f"抓图失败: {camera_type} (尝试 {attempt}/{CAMERA_MAX_RETRIES}): {error}")
+            if attempt < CAMERA_MAX_RETRIES:
+                await asyncio.sleep(CAMERA_RETRY_INTERVAL)  # 等待后只重试该相机
+
+    return {
+        "success": False,
+        "files": [],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000),
+        "attempts": CAMERA_MAX_RETRIES,
+        "error": error or "超过最大重试次数",
+    }
+
+
+def start_camera_captures(task_no: str, bin_location: str) -> Dict[str, "asyncio.Task[Dict[str, Any]]"]:
+    """
+    并行触发所有相机抓图
+
+    :return: 相机类型 -> 抓图任务（结果见 capture_camera_images），识别可在对应相机完成后立即开始
+    """
+    from services.api.shared.config import CAMERA_DEVICES
+
+    return {
+        camera_type: asyncio.create_task(capture_camera_images(task_no, bin_location, camera_type))
+        for camera_type in CAMERA_DEVICES
+    }
+
+
+async def collect_capture_results(task_no: str, bin_location: str,
+                                  captures: Dict[str, Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    等待所有相机抓图完成并汇总结果
+
+    :param captures: start_camera_captures 返回的抓图任务
+    :return: {"success", "photo3dPath", "photoDepthPath", "image_count", "cameras": {相机类型: 抓图结果}}，
+             失败时为 {"success": False, "error", "cameras"}
+    """
+    cameras = dict(zip(captures, await asyncio.gather(*captures.values())))
+    per_camera = ", ".join(f"{name}={r['elapsed_ms']}ms/{r['attempts']}次" for name, r in cameras.items())
+
+    failed = {name: r["error"] for name, r in cameras.items() if not r["success"]}
+    if failed:
+        logger.error(f"抓图失败: {task_no}/{bin_location} ({per_camera}), 失败相机: {failed}")
+        return {"success": False, "error": f"相机抓图失败: {failed}", "cameras": cameras}
+
+    logger.info(f"抓图成功: {task_no}/{bin_location} ({per_camera})")
+    return {
+        "success": True,
+        "photo3dPath": f"/{task_no}/{bin_location}/3d_camera/main.jpg",
+        "photoDepthPath": f"/{task_no}/{bin_location}/3d_camera/depth.jpg",
+        "image_count": len(cameras.get("3d_camera", {}).get("files", [])),
+        "cameras": cameras,
+    }
 
-            if retry_count < max_retries:
-                await asyncio.sleep(5)  # 等待后重试
-            else:
-                return {"success": False, "error": str(e)}
 
-    return {"success": False, "error": "超过最大重试次数"}
+async def capture_images_with_scripts(task_no: str, bin_location: str) -> Dict[str, Any]:
+    """抓取图片（各相机并行抓图，失败的相机单独重试）"""
+    return await collect_capture_results(task_no, bin_location, start_camera_captures(task_no, bin_location))
+
+
+async def capture_and_recognize(
+    task_no: str,
+    bin_location: str,
+    on_captured: Optional[Callable[[], Awaitable[Any]]] = None
+) -> tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    抓图并识别：识别在对应相机抓图完成后立即开始（条码识别等待扫码相机，数量检测等待3D相机），不等待最慢的相机
+
+    :param on_captured: 所有相机抓图结束（无论成功与否）后立即调用的回调
+    :return: (抓图结果, 识别结果)，抓图失败时识别结果为None
+    """
+    captures = start_camera_captures(task_no, bin_location)
+    capture_img_dir = project_root / "capture_img" / task_no / bin_location
+    recognition = asyncio.create_task(run_barcode_and_detect(
+        task_no=task_no,
+        bin_location=bin_location,
+        scan_dirs=[capture_img_dir / "scan_camera_1", capture_img_dir / "scan_camera_2"],
+        detect_dir=capture_img_dir / "3d_camera",
+        pile_id=1,
+        code_type="ucc128",
+        captures=captures
+    ))
+
+    try:
+        capture_results = await collect_capture_results(task_no, bin_location, captures)
+        if on_captured is not None:
+            await on_captured()
+    except BaseException:
+        recognition.cancel()
+        raise
+
+    if not capture_results.get("success"):
+        # 储位按异常处理，已开始的识别结果不再使用
+        recognition.cancel()
+        return capture_results, None
+    return capture_results, await recognition
 
 
 # ==================== 识别函数 ====================
 
+async def resolve_scan_barcodes(scan_dirs: List[Path], code_type: str = "ucc128") -> Dict[str, Any]:
+    """
+    识别扫码相机图片中的条码并解析烟箱信息
+
+    流式模式（BARCODE_EARLY_EXIT）下两个相机的图片并行解码，每个结果到达后立即解析，
+    同一六位码成功解析 BARCODE_REQUIRED_MATCHES 次后取消剩余解码；
+    全部图片解码完仍未达到次数时，取成功次数最多（相同时最先解析到）的结果
+
+    :param scan_dirs: 扫码相机图片目录列表（不存在的目录会被跳过）
+    :param code_type: 条码类型
+    :return: {"resolved": 解析结果（未匹配时为None）, "matches": 一致的解析次数,
+              "results": 已解码的结果列表, "total_images": 图片总数}
+    """
+    from services.api.shared.tobacco_resolver import get_tobacco_case_resolver
+
+    resolver = get_tobacco_case_resolver()
+    barcode_service = get_barcode_service()
+    images = barcode_service.scan_images(scan_dirs, interleave=BARCODE_EARLY_EXIT)
+    required = BARCODE_REQUIRED_MATCHES if BARCODE_EARLY_EXIT else 1
+    results: List[Dict[str, Any]] = []
+    # 六位码 -> [成功解析次数, 解析结果]（按首次解析顺序）
+    votes: Dict[str, list] = {}
+
+    def _accept(br: Dict[str, Any]) -> bool:
+        """记录一个解码结果，一致的解析次数达到要求时返回 True"""
+        results.append(br)
+        barcode_text = br.get('output') or br.get('text')
+        if not barcode_text:
+            return False
+        resolved_info = resolver.resolve(barcode_text)
+        if not resolved_info['success']:
+            return False
+        vote = votes.setdefault(resolved_info['six_digit_code'], [0, resolved_info])
+        vote[0] += 1
+        return vote[0] >= required
+
+    if BARCODE_EARLY_EXIT:
+        stream = barcode_service.decode_stream(images, code_type=code_type)
+        try:
+            async for br in stream:
+                if _accept(br):
+                    break
+        finally:
+            # 取消尚未开始的解码
+            await stream.aclose()
+    else:
+        for br in await barcode_service.decode(images, code_type=code_type):
+            if _accept(br):
+                break
+
+    if len(results) < len(images):
+        logger.info(f"条码已匹配，跳过剩余 {len(images) - len(results)} 张图片")
+    best = max(votes.values(), key=lambda vote: vote[0], default=None)
+    return {
+        "resolved": best[1] if best else None,
+        "matches": best[0] if best else 0,
+        "results": results,
+        "total_images": len(images),
+    }
+
+
 async def run_barcode_and_detect(
     task_no: str,
     bin_location: str,
     scan_dirs: list[Path],
     detect_dir: Path,
     pile_id: int = 1,
-    code_type: str = "ucc128"
+    code_type: str = "ucc128",
+    captures: Optional[Dict[str, Awaitable[Dict[str, Any]]]] = None
 ) -> Dict[str, Any]:
-    """执行条码识别和数量检测"""
+    """
+    执行条码识别和数量检测
+
+    :param captures: 各相机的抓图任务（可选，见 start_camera_captures），
+                     条码识别和数量检测分别在扫码相机、3D相机抓图完成后开始
+    """
     result = {
         "barcode_result": None,
         "detect_result": None,
         "photos": []
     }
 
+    async def _wait_captured(image_dirs: List[Path]) -> bool:
+        """等待目录对应相机的抓图完成，返回是否全部成功（不随识别取消而取消抓图）"""
+        for image_dir in image_dirs:
+            if captures and image_dir.name in captures:
+                if not (await asyncio.shield(captures[image_dir.name]))["success"]:
+                    return False
+        return True
+
     # 条码识别：处理 scan_camera_1 和 scan_camera_2 目录
     if ENABLE_BARCODE and BARCODE_MODULE_AVAILABLE:
         try:
-            from core.vision.barcode_recognizer import BarcodeRecognizer
-            from services.api.shared.tobacco_resolver import get_tobacco_case_resolver
-
-            recognizer = BarcodeRecognizer(code_type=code_type)
-            all_barcode_results = []
-            for scan_dir in scan_dirs:
-                if scan_dir.exists():
-                    barcode_results = recognizer.process_folder(input_dir=str(scan_dir))
-                    all_barcode_results.extend(barcode_results)
-            resolver = get_tobacco_case_resolver()
-
-            resolved_info = None
-            for br in all_barcode_results:
-                barcode_text = br.get('output') or br.get('text')
-                if barcode_text:
-                    resolved_info = resolver.resolve(barcode_text)
-                    if resolved_info['success']:
-                        break
+            if not await _wait_captured(scan_dirs):
+                raise Exception("扫码相机抓图失败")
+            # 两个扫码相机的图片在常驻解码进程中并行解码，匹配成功后取消剩余解码
+            scan = await resolve_scan_barcodes(scan_dirs, code_type=code_type)
+            resolved_info = scan["resolved"]
 
-            if resolved_info and resolved_info['success']:
+            if resolved_info:
                 pile_id = resolved_info['pile_id']
                 result["barcode_result"] = {
                     "status": "success",
@@ -566,8 +566,8 @@ async def run_barcode_and_detect(
     # 数量检测：处理 3d_camera 目录
     if DETECT_MODULE_AVAILABLE:
         try:
-            from core.detection import count_boxes
-
+            if not await _wait_captured([detect_dir]):
+                raise Exception("3D相机抓图失败")
             image_files = []
             image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
 
@@ -588,7 +588,8 @@ async def run_barcode_and_detect(
 
             if image_files:
                 depth_path = detect_dir / "depth.jpg"
-                total_count = count_boxes(
+                # 箱体计数在推理进程池中执行，不阻塞事件循环
+                counted = await get_inference_executor().count_boxes_traced(
                     image_path=str(image_files[0]),
                     pile_id=pile_id,
                     depth_image_path=str(depth_path) if depth_path.exists() else None,
@@ -598,8 +599,9 @@ async def run_barcode_and_detect(
 
                 result["detect_result"] = {
                     "status": "success",
-                    "total_count": total_count,
-                    "pile_id": pile_id
+                    "total_count": counted["total"],
+                    "pile_id": pile_id,
+                    "trace": counted["trace"]
                 }
             else:
                 result["detect_result"] = {"status": "failed", "error": "未找到图片"}
@@ -620,9 +622,18 @@ async def process_single_bin_location(
     bin_location: str,
     index: int,
     total: int,
-    is_sim: bool = False
+    is_sim: bool = False,
+    on_captured: Optional[Callable[[], Awaitable[Any]]] = None,
+    robot_task_code: str = ""
 ) -> Dict[str, Any]:
-    """处理单个储位的完整流程"""
+    """
+    处理单个储位的完整流程
+
+    :param robot_task_code: 真实模式下该储位的机器人任务编号，只等待该任务的 end 状态
+                            （为空时等待任意任务的最新状态）
+    :param on_captured: 真实模式下抓图结束（无论成功与否）后立即调用的回调，
+                        流水线模式用它在识别开始前发送 continue，让机器人先行前往下一个库位
+    """
     result = {
         "binLocation": bin_location,
         "sequence": index + 1,
@@ -648,7 +659,8 @@ async def process_single_bin_location(
             if WITH_CAMERA:
                 # 不等待机器人，直接执行相机脚本
                 logger.info(f"模拟模式 with_camera：执行相机脚本 for {bin_location}")
-                capture_results = await capture_images_with_scripts(task_no, bin_location)
+                # 各相机并行抓图，识别在对应相机抓图完成后立即开始
+                capture_results, recognition_result = await capture_and_recognize(task_no, bin_location)
                 if not capture_results.get("success"):
                     result["status"] = "异常"
                     result["error"] = f"抓图失败: {capture_results.get('error')}"
@@ -664,17 +676,6 @@ async def process_single_bin_location(
                 result["photoScan1Path"] = f"/{task_no}/{bin_location}/scan_camera_1/main.jpg"
                 result["photoScan2Path"] = f"/{task_no}/{bin_location}/scan_camera_2/main.jpg"
 
-                # 执行识别
-                capture_img_dir = project_root / "capture_img" / task_no / bin_location
-                recognition_result = await run_barcode_and_detect(
-                    task_no=task_no,
-                    bin_location=bin_location,
-                    scan_dirs=[capture_img_dir / "scan_camera_1", capture_img_dir / "scan_camera_2"],
-                    detect_dir=capture_img_dir / "3d_camera",
-                    pile_id=1,
-                    code_type="ucc128"
-                )
-
                 detect_result = recognition_result.get("detect_result", {})
                 barcode_result = recognition_result.get("barcode_result", {})
 
@@ -848,16 +849,19 @@ async def process_single_bin_location(
             # 真实模式
             logger.info(f"============等待机器人就位信息: {bin_location}")
             try:
-                ctu_status = await wait_for_robot_status("end", timeout=600)  # 真实模式等待10分钟
+                ctu_status = await wait_for_robot_status("end", timeout=600,  # 真实模式等待10分钟
+                                                         robot_task_code=robot_task_code)
 
                 if ctu_status and ctu_status.get("method") == "end":
-                    capture_results = await capture_images_with_scripts(task_no, bin_location)
+                    # 各相机并行抓图，识别在对应相机抓图完成后立即开始
+                    capture_results, recognition_result = await capture_and_recognize(
+                        task_no, bin_location, on_captured=on_captured)
                     result["captureResults"] = capture_results
 
                     if not capture_results.get("success"):
                         logger.error(f"抓图失败，跳过储位: {bin_location}")
                         result["status"] = "异常"
-                        result["error"] = "抓图失败（重试3次后仍失败）"
+                        result["error"] = f"抓图失败: {capture_results.get('error')}"
                         result["actualQuantity"] = 0
                         result["actualSpec"] = "未识别"
                         result["endTime"] = datetime.now().isoformat()
@@ -871,17 +875,6 @@ async def process_single_bin_location(
                     result["photoScan1Path"] = f"/{task_no}/{bin_location}/scan_camera_1/main.jpg"
                     result["photoScan2Path"] = f"/{task_no}/{bin_location}/scan_camera_2/main.jpg"
 
-                    capture_img_dir = project_root / "capture_img" / task_no / bin_location
-
-                    recognition_result = await run_barcode_and_detect(
-                        task_no=task_no,
-                        bin_location=bin_location,
-                        scan_dirs=[capture_img_dir / "scan_camera_1", capture_img_dir / "scan_camera_2"],
-                        detect_dir=capture_img_dir / "3d_camera",
-                        pile_id=1,
-                        code_type="ucc128"
-                    )
-
                     detect_result = recognition_result.get("detect_result", {})
                     barcode_result = recognition_result.get("barcode_result", {})
 
@@ -964,8 +957,72 @@ async def process_single_bin_location(
 
 # ==================== 完整工作流执行函数 ====================
 
+def _collect_bin_result(task_no: str, bin_location: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """更新储位状态，并生成该储位的盘点结果（含与系统库存的差异）"""
+    # 更新 bin 状态
+    if task_no in _inventory_task_bins:
+        for bin_status in _inventory_task_bins[task_no]:
+            if bin_status.bin_location == bin_location:
+                bin_status.status = "completed" if result["status"] == "成功" else "failed"
+                break
+
+    # 从原始盘点项中查找匹配的储位信息
+    inventory_item = None
+    if task_no in _inventory_task_details and "inventoryItems" in _inventory_task_details[task_no]:
+        for item in _inventory_task_details[task_no]["inventoryItems"]:
+            if item.get("locationName") == bin_location:
+                inventory_item = item
+                break
+
+    # 计算差异
+    actual_qty = int(result.get("actualQuantity", 0) or 0)
+    system_qty = int(inventory_item.get("systemQuantity", 0) or 0) if inventory_item else 0
+    difference = actual_qty - system_qty
+
+    return {
+        "binLocation": bin_location,
+        "status": result["status"],
+        "actualQuantity": result.get("actualQuantity"),
+        "actualSpec": result.get("actualSpec"),
+        "photo3dPath": result.get("photo3dPath"),
+        "photoDepthPath": result.get("photoDepthPath"),
+        "photoScan1Path": result.get("photoScan1Path", ""),
+        "photoScan2Path": result.get("photoScan2Path", ""),
+        "error": result.get("error"),
+        "specName": inventory_item.get("productName", "") if inventory_item else "",
+        "systemQuantity": system_qty,
+        "difference": difference,
+    }
+
+
+async def _process_and_collect_bin(
+    task_no: str,
+    bin_location: str,
+    index: int,
+    total: int,
+    on_captured: Callable[[], Awaitable[Any]],
+    robot_task_code: str = ""
+) -> Dict[str, Any]:
+    """流水线模式下单个储位的后台任务：抓图 + 识别，完成后立即回写储位状态"""
+    result = await process_single_bin_location(
+        task_no=task_no,
+        bin_location=bin_location,
+        index=index,
+        total=total,
+        is_sim=False,
+        on_captured=on_captured,
+        robot_task_code=robot_task_code
+    )
+    return _collect_bin_result(task_no, bin_location, result)
+
+
 async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_sim: bool = False):
-    """执行完整的盘点工作流"""
+    """
+    执行完整的盘点工作流
+
+    真实模式且开启流水线（config.json: pipeline.enabled）时，库位抓图完成后立即发送 continue，
+    该库位的识别在后台继续执行，与机器人前往下一个库位并行；盘点结果仍按库位顺序汇总。
+    """
     from services.api.shared.operation_log import log_operation
 
     logger.info(f"开始执行盘点工作流: {task_no}, 共 {len(bin_locations)} 个储位, 模拟模式: {is_sim}")
@@ -1043,9 +1100,14 @@ async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_
 
     # 存储所有储位的盘点结果
     inventory_results = []
+    # 按库位顺序保存结果：已完成的结果字典，或流水线模式下仍在识别中的后台任务
+    result_slots: List[Any] = []
+    # 流水线模式下识别中的后台任务（用于限制并发）
+    in_flight: set = set()
+    pipelined = PIPELINE_INVENTORY and not is_sim
 
     try:
-        logger.info(f"开始顺序处理 {len(bin_locations)} 个储位")
+        logger.info(f"开始{'流水线' if pipelined else '顺序'}处理 {len(bin_locations)} 个储位")
 
         # 先将所有储位状态设为运行中
         if task_no in _inventory_task_bins:
@@ -1090,7 +1152,7 @@ async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_
                         "actualSpec": "未识别",
                         "error": submit_result.get("message", "下发失败")
                     }
-                    inventory_results.append({
+                    result_slots.append({
                         "binLocation": bin_location,
                         "status": result["status"],
                         "actualQuantity": result.get("actualQuantity"),
@@ -1099,12 +1161,53 @@ async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_
                     })
                     continue
 
+                # 下发成功后登记：该储位的状态按 robotTaskCode 分发，不会被其他任务的回调覆盖
+                get_status_broker().bind(robot_task_code, bin_location)
+
+            if pipelined:
+                # 限制同时识别的库位数量，避免推理队列被占满
+                while len(in_flight) >= PIPELINE_MAX_INFLIGHT:
+                    _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+                captured = asyncio.Event()
+
+                async def _send_continue_after_capture(bin_location=bin_location,
+                                                       robot_task_code=robot_task_code,
+                                                       captured=captured):
+                    logger.info(f"库位 {bin_location} 抓图完成，发送 continue，识别在后台继续")
+                    try:
+                        continue_result = await continue_inventory_task(is_sim=False, robot_task_code=robot_task_code)
+                        logger.info(f"continue 接口调用结果: {continue_result}")
+                    finally:
+                        captured.set()
+
+                bin_task = asyncio.create_task(_process_and_collect_bin(
+                    task_no, bin_location, i, len(bin_locations), _send_continue_after_capture,
+                    robot_task_code=robot_task_code
+                ))
+                in_flight.add(bin_task)
+                captured_waiter = asyncio.create_task(captured.wait())
+                try:
+                    await asyncio.wait({bin_task, captured_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    captured_waiter.cancel()
+
+                # 未到达抓图阶段就结束（如等待机器人超时），与顺序模式一致，仍发送 continue
+                if not captured.is_set():
+                    logger.info(f"库位 {bin_location} 处理完成，发送 continue")
+                    continue_result = await continue_inventory_task(is_sim=False, robot_task_code=robot_task_code)
+                    logger.info(f"continue 接口调用结果: {continue_result}")
+
+                result_slots.append(bin_task)
+                continue
+
             result = await process_single_bin_location(
                 task_no=task_no,
                 bin_location=bin_location,
                 index=i,
                 total=len(bin_locations),
-                is_sim=is_sim
+                is_sim=is_sim,
+                robot_task_code=robot_task_code
             )
 
             # 真实模式下，当前库位处理完成后，发送 continue（使用本库位的 robotTaskCode）
@@ -1113,41 +1216,12 @@ async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_
                 continue_result = await continue_inventory_task(is_sim=False, robot_task_code=robot_task_code)
                 logger.info(f"continue 接口调用结果: {continue_result}")
 
-            # 更新 bin 状态
-            if task_no in _inventory_task_bins:
-                for bin_status in _inventory_task_bins[task_no]:
-                    if bin_status.bin_location == bin_location:
-                        bin_status.status = "completed" if result["status"] == "成功" else "failed"
-                        break
-
-            # 从原始盘点项中查找匹配的储位信息
-            inventory_item = None
-            if task_no in _inventory_task_details and "inventoryItems" in _inventory_task_details[task_no]:
-                for item in _inventory_task_details[task_no]["inventoryItems"]:
-                    if item.get("locationName") == bin_location:
-                        inventory_item = item
-                        break
-
-            # 计算差异
-            actual_qty = int(result.get("actualQuantity", 0) or 0)
-            system_qty = int(inventory_item.get("systemQuantity", 0) or 0) if inventory_item else 0
-            difference = actual_qty - system_qty
-
             # 收集盘点结果
-            inventory_results.append({
-                "binLocation": bin_location,
-                "status": result["status"],
-                "actualQuantity": result.get("actualQuantity"),
-                "actualSpec": result.get("actualSpec"),
-                "photo3dPath": result.get("photo3dPath"),
-                "photoDepthPath": result.get("photoDepthPath"),
-                "photoScan1Path": result.get("photoScan1Path", ""),
-                "photoScan2Path": result.get("photoScan2Path", ""),
-                "error": result.get("error"),
-                "specName": inventory_item.get("productName", "") if inventory_item else "",
-                "systemQuantity": system_qty,
-                "difference": difference,
-            })
+            result_slots.append(_collect_bin_result(task_no, bin_location, result))
+
+        # 等待后台识别全部完成，按库位顺序汇总结果
+        for slot in result_slots:
+            inventory_results.append(await slot if isinstance(slot, asyncio.Task) else slot)
 
         logger.info(f"所有 {len(bin_locations)} 个储位处理完成")
 
@@ -1206,3 +1280,12 @@ async def execute_inventory_workflow(task_no: str, bin_locations: List[str], is_
         )
 
         logger.error(f"盘点任务失败: {task_no}, 错误: {str(e)}")
+
+    finally:
+        # 工作流异常退出（或被取消）时，取消仍在后台识别的库位任务并等待其结束，避免任务泄漏
+        remaining = [t for t in in_flight | {s for s in result_slots if isinstance(s, asyncio.Task)} if not t.done()]
+        if remaining:
+            logger.warning(f"盘点任务 {task_no} 未正常完成，取消 {len(remaining)} 个后台识别任务")
+            for task in remaining:
+                task.cancel()
+            await asyncio.gather(*remaining, return_exceptions=True)
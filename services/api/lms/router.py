@@ -3,11 +3,12 @@ LMS 系统对接路由
 """
 import json
 import logging
-import requests
+import httpx
 from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.responses import JSONResponse
 
 from services.api.shared.config import LMS_BASE_URL, logger
+from services.api.shared.http_client import UpstreamUnavailable, get_lms_client
 import services.api.custom_utils as custom_utils
 
 router = APIRouter(prefix="/lms", tags=["lms"])
@@ -34,9 +35,9 @@ async def get_lms_bin(authToken: str, useLocal: bool = False):
     from services.api.shared.config import project_root
 
     try:
-        lms_bin_url = f"{LMS_BASE_URL}/third/api/v1/lmsToRcsService/getLmsBin"
         headers = {"authToken": authToken}
-        response = requests.get(lms_bin_url, headers=headers, timeout=10)
+        response = await get_lms_client().request("GET", "/third/api/v1/lmsToRcsService/getLmsBin",
+                                                  headers=headers, timeout=10)
 
         if response.status_code == 200:
             try:
@@ -49,10 +50,10 @@ async def get_lms_bin(authToken: str, useLocal: bool = False):
         else:
             logger.warning(f"LMS返回错误状态码 {response.status_code}，从本地文件读取库位数据")
             return _get_local_bins_data()
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.warning("LMS服务响应超时，从本地文件读取库位数据")
         return _get_local_bins_data()
-    except requests.exceptions.ConnectionError:
+    except (httpx.TransportError, UpstreamUnavailable):
         logger.warning("无法连接到LMS服务,从本地文件读取库位数据")
         return _get_local_bins_data()
     except Exception as e:
@@ -128,9 +129,9 @@ async def get_count_tasks(authToken: str):
     """获取盘点任务，调用LMS的getCountTasks接口"""
     try:
         logger.info(f"收到获取盘点任务请求，authToken: {authToken[:20]}...")
-        lms_tasks_url = f"{LMS_BASE_URL}/third/api/v1/lmsToRcsService/getCountTasks"
         headers = {"authToken": authToken}
-        response = requests.get(lms_tasks_url, headers=headers, timeout=30)
+        response = await get_lms_client().request("GET", "/third/api/v1/lmsToRcsService/getCountTasks",
+                                                  headers=headers, timeout=30)
 
         if response.status_code == 200:
             try:
@@ -148,9 +149,9 @@ async def get_count_tasks(authToken: str):
                 status_code=response.status_code,
                 detail=f"LMS获取盘点任务失败: {response.text}"
             )
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="LMS服务响应超时")
-    except requests.exceptions.ConnectionError:
+    except (httpx.TransportError, UpstreamUnavailable):
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="无法连接到LMS服务")
     except Exception as e:
         logger.error(f"获取盘点任务请求失败: {str(e)}")
@@ -168,9 +169,10 @@ async def set_task_results(request: Request):
         data = await request.json()
         encoded_data = custom_utils.compress_and_encode(data)
 
-        lms_results_url = f"{LMS_BASE_URL}/third/api/v1/RcsToLmsService/setTaskResults"
         headers = {"authToken": auth_token, "Content-Type": "text/plain"}
-        response = requests.post(lms_results_url, data=encoded_data, headers=headers)
+        # 提交结果不是幂等请求，不重试；原实现不设超时，这里也不设
+        response = await get_lms_client().request("POST", "/third/api/v1/RcsToLmsService/setTaskResults",
+                                                  content=encoded_data, headers=headers, timeout=None)
 
         if response.status_code == 200:
             return {"success": True, "message": "盘点结果已提交"}
@@ -189,9 +191,9 @@ async def get_users(request: Request):
         if not auth_token:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="未提供认证令牌")
 
-        lms_users_url = f"{LMS_BASE_URL}/third/api/v1/userManagement/getUsers"
         headers = {"authToken": auth_token}
-        response = requests.get(lms_users_url, headers=headers, timeout=10)
+        response = await get_lms_client().request("GET", "/third/api/v1/userManagement/getUsers",
+                                                  headers=headers, timeout=10)
 
         if response.status_code == 200:
             result = response.json()
@@ -213,9 +215,9 @@ async def register_user(request: Request):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="未提供认证令牌")
 
         data = await request.json()
-        lms_register_url = f"{LMS_BASE_URL}/third/api/v1/userManagement/registerUser"
         headers = {"authToken": auth_token, "Content-Type": "application/json"}
-        response = requests.post(lms_register_url, json=data, headers=headers, timeout=10)
+        response = await get_lms_client().request("POST", "/third/api/v1/userManagement/registerUser",
+                                                  json=data, headers=headers, timeout=10)
 
         if response.status_code == 200:
             result = response.json()
@@ -237,9 +239,9 @@ async def delete_user(request: Request):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="未提供认证令牌")
 
         data = await request.json()
-        lms_delete_url = f"{LMS_BASE_URL}/third/api/v1/userManagement/deleteUser"
         headers = {"authToken": auth_token, "Content-Type": "application/json"}
-        response = requests.post(lms_delete_url, json=data, headers=headers, timeout=10)
+        response = await get_lms_client().request("POST", "/third/api/v1/userManagement/deleteUser",
+                                                  json=data, headers=headers, timeout=10)
 
         if response.status_code == 200:
             result = response.json()
@@ -0,0 +1,6 @@
+"""
+指标模块
+"""
+from services.api.metrics.router import router
+
+__all__ = ["router"]
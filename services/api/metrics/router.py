@@ -0,0 +1,30 @@
+"""
+指标路由：以 Prometheus 文本格式输出计数流程各阶段耗时、推理执行器状态和外部系统请求耗时
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.api.shared.config import DETECT_MODULE_AVAILABLE
+from services.api.shared.metrics import get_pipeline_metrics, get_upstream_metrics
+
+router = APIRouter(tags=["metrics"])
+
+# Prometheus 文本格式的 Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 指标（各阶段耗时直方图、CPU时间、读写字节数、推理队列状态、RCS/LMS 请求耗时）"""
+    gauges = {}
+    if DETECT_MODULE_AVAILABLE:
+        from services.vision.inference_executor import get_inference_executor
+        executor_status = get_inference_executor().status()
+        gauges = {
+            "leafdepot_inference_pending": executor_status["pending"],
+            "leafdepot_inference_max_pending": executor_status["max_pending"],
+            "leafdepot_inference_workers": executor_status["max_workers"],
+            "leafdepot_inference_model_generation": executor_status["model_generation"],
+        }
+    body = get_pipeline_metrics().render(gauges) + get_upstream_metrics().render()
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
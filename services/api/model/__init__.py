@@ -0,0 +1,6 @@
+"""
+模型管理模块
+"""
+from services.api.model.router import router
+
+__all__ = ["router"]
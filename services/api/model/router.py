@@ -0,0 +1,80 @@
+"""
+模型管理路由：查看模型注册表状态、热更新YOLO权重和堆垛配置
+"""
+import asyncio
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import JSONResponse
+
+from services.api.shared.config import logger, DETECT_MODULE_AVAILABLE
+from services.api.shared.operation_log import log_operation
+
+router = APIRouter(prefix="/api/model", tags=["model"])
+
+
+def _get_registry():
+    if not DETECT_MODULE_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="检测模块不可用"
+        )
+    from core.detection.utils.model_registry import get_model_registry
+    return get_model_registry()
+
+
+@router.get("/status")
+async def get_model_status():
+    """获取模型注册表中已加载的模型和配置，以及推理执行器状态"""
+    registry = _get_registry()
+    from services.vision.inference_executor import get_inference_executor
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "code": 200,
+            "message": "获取模型状态成功",
+            "data": {
+                "registry": registry.status(),
+                "executor": get_inference_executor().status()
+            }
+        }
+    )
+
+
+@router.post("/reload")
+async def reload_models():
+    """热更新：重新加载YOLO权重和堆垛配置（替换权重文件后调用）"""
+    registry = _get_registry()
+    from services.vision.inference_executor import get_inference_executor
+    try:
+        data = {"executor": await get_inference_executor().reload_models()}
+        # 网关进程本身加载过模型时一并重新加载（加载权重和预热是阻塞操作，放到线程中执行）
+        registry_status = registry.status()
+        if registry_status["models"] or registry_status["detectors"]:
+            data["registry"] = await asyncio.to_thread(registry.reload)
+        logger.info(f"模型热更新完成: {data}")
+        log_operation(
+            operation_type="system",
+            action="模型热更新",
+            status="success",
+            details=data
+        )
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "code": 200,
+                "message": "模型已重新加载",
+                "data": data
+            }
+        )
+    except Exception as e:
+        logger.error(f"模型热更新失败: {str(e)}")
+        log_operation(
+            operation_type="system",
+            action="模型热更新",
+            status="failed",
+            details={"error": str(e)}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"模型热更新失败: {str(e)}"
+        )
@@ -2,60 +2,45 @@
 机器人接口路由
 """
 import json
-import time
 import asyncio
 import logging
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, Request, HTTPException
 
-from services.api.shared.config import logger
+from services.api.shared.config import logger, ROBOT_STATUS_FALLBACK_AFTER
+from services.api.robot.status_broker import GLOBAL_CHANNEL, get_status_broker
 
 router = APIRouter(prefix="/api/robot", tags=["robot"])
 
-# 机器人状态存储
-_robot_status_store: Dict[str, Any] = {}
-_status_event = asyncio.Event()
-
-
-async def update_robot_status(method: str, data: Optional[Dict] = None):
-    """更新机器人状态并触发事件"""
-    _robot_status_store["ROBOT_STATUS"] = {
-        "method": method,
-        "timestamp": time.time(),
-        "data": data or {}
-    }
-    logger.info(f"更新机器人状态: {method}")
-    _status_event.set()
-
-
-async def wait_for_robot_status(expected_method: str, timeout: int = 300):
-    """等待特定机器人状态的同步函数"""
-    logger.info(f"开始等待机器人状态: {expected_method}, 超时: {timeout}秒")
-    start_time = time.time()
-    _status_event.clear()
-
-    if "ROBOT_STATUS" in _robot_status_store:
-        current_status = _robot_status_store["ROBOT_STATUS"]
-        if current_status.get("method") == expected_method:
-            logger.info(f"已存在期望状态: {expected_method}")
-            return current_status
-
-    while True:
-        try:
-            await asyncio.wait_for(_status_event.wait(), timeout=1.0)
-            if "ROBOT_STATUS" in _robot_status_store:
-                current_status = _robot_status_store["ROBOT_STATUS"]
-                logger.info(f"收到机器人状态: {current_status.get('method')}")
-                if current_status.get("method") == expected_method:
-                    logger.info(f"收到期望状态: {expected_method}")
-                    return current_status
-            _status_event.clear()
-        except asyncio.TimeoutError:
-            elapsed_time = time.time() - start_time
-            if elapsed_time >= timeout:
-                logger.error(f"等待机器人状态超时: {expected_method}")
-                raise asyncio.TimeoutError(f"等待 {expected_method} 状态超时")
-            continue
+
+async def update_robot_status(method: str, data: Optional[Dict] = None, robot_task_code: str = ""):
+    """
+    更新机器人状态并通知等待方
+
+    :param robot_task_code: 机器人任务编号（为空时只更新全局状态）
+    """
+    get_status_broker().publish(method, data, robot_task_code=robot_task_code or GLOBAL_CHANNEL)
+    logger.info(f"更新机器人状态: {method} (robotTaskCode={robot_task_code or '-'})")
+
+
+async def wait_for_robot_status(expected_method: str, timeout: int = 300, robot_task_code: str = "",
+                                fallback_after: Optional[float] = ROBOT_STATUS_FALLBACK_AFTER):
+    """
+    等待特定机器人状态（订阅前已到达的最后一个状态同样计入，不会错过通知）
+
+    :param robot_task_code: 机器人任务编号（为空时等待全局状态，即任意任务的最新状态）
+    :param fallback_after: 按任务等待超过该时间（秒）后，同时接受无法归属到任务的回调（None 表示不回退）
+    """
+    logger.info(f"开始等待机器人状态: {expected_method}, robotTaskCode: {robot_task_code or '-'}, 超时: {timeout}秒")
+    try:
+        current_status = await get_status_broker().wait_for(
+            expected_method, robot_task_code=robot_task_code or GLOBAL_CHANNEL, timeout=timeout,
+            fallback_after=fallback_after)
+    except asyncio.TimeoutError:
+        logger.error(f"等待机器人状态超时: {expected_method}")
+        raise
+    logger.info(f"收到期望状态: {expected_method}")
+    return current_status
 
 
 @router.post("/reporter/task")
@@ -79,7 +64,7 @@ async def task_status(request: Request):
                         values = item.get("values", {})
                         method = values.get("method", "")
                         logger.info(f"处理method: {method}")
-                        await update_robot_status(method, values)
+                        await update_robot_status(method, values, robot_task_code=str(robot_task_code or ""))
                         if method == "start":
                             logger.info("任务开始")
                         elif method == "outbin":
@@ -90,7 +75,7 @@ async def task_status(request: Request):
                     values = extra_data.get("values", {})
                     method = values.get("method", "")
                     logger.info(f"处理method: {method}")
-                    await update_robot_status(method, values)
+                    await update_robot_status(method, values, robot_task_code=str(robot_task_code or ""))
                     if method == "start":
                         logger.info("任务开始")
                     elif method == "outbin":
@@ -109,3 +94,9 @@ async def task_status(request: Request):
     except Exception as e:
         logger.error(f"处理状态反馈失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"处理状态反馈失败: {str(e)}")
+
+
+@router.get("/status")
+async def robot_status():
+    """各机器人任务（robotTaskCode）的最后状态和等待方数量"""
+    return {"code": "SUCCESS", "message": "成功", "data": get_status_broker().status()}
@@ -0,0 +1,219 @@
+"""
+机器人状态分发
+
+RCS 回调按 robotTaskCode 分通道分发，每个等待方持有自己的队列：
+- 订阅时先回放该通道的最后一个状态，订阅之前到达的状态不会丢失
+- 回调先入队再唤醒，等待方不会错过两次检查之间到达的状态
+- 不同任务（不同 CTU）的状态互不覆盖，一个网关可同时驱动多个任务
+
+所有状态同时发布到全局通道（GLOBAL_CHANNEL），兼容不区分任务的等待方式。
+回调的 robotTaskCode 为空或不是已登记的任务编号时，按回调中的储位归属到该储位登记的任务；
+仍无法归属的状态只发布到全局通道，按任务等待的一方在 fallback_after 秒后才会接受这类状态。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from services.api.shared.config import logger
+
+# 全局通道（所有状态的最新值）
+GLOBAL_CHANNEL = ""
+
+# 回调 values 中可能携带储位的字段
+BIN_KEYS = ("binLocation", "binCode", "locationName", "storageCode")
+
+
+class RobotStatusBroker:
+    """机器人状态分发器（在网关事件循环中使用）"""
+
+    def __init__(self, max_channels: int = 256):
+        """
+        :param max_channels: 保留最后状态的通道数上限（超出时丢弃最早的空闲通道）
+        """
+        self.max_channels = max_channels
+        # 通道 -> 最后一个状态
+        self._last: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # 通道 -> 订阅队列
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # robotTaskCode -> 储位（下发时登记，随状态一起分发）
+        self._bins: "OrderedDict[str, str]" = OrderedDict()
+
+    def bind(self, robot_task_code: str, bin_location: str):
+        """登记 robotTaskCode 对应的储位"""
+        if not robot_task_code:
+            return
+        self._bins[robot_task_code] = bin_location
+        self._bins.move_to_end(robot_task_code)
+        while len(self._bins) > self.max_channels:
+            self._bins.popitem(last=False)
+
+    def _code_for_bin(self, bin_location: str) -> Optional[str]:
+        """储位最近一次登记的 robotTaskCode"""
+        for code in reversed(self._bins):
+            if self._bins[code] == bin_location:
+                return code
+        return None
+
+    def _resolve_channel(self, robot_task_code: str, data: Dict[str, Any]) -> str:
+        """状态所属的任务通道（无法归属时返回 GLOBAL_CHANNEL）"""
+        if robot_task_code in self._bins:
+            return robot_task_code
+        bin_location = next((str(data[key]) for key in BIN_KEYS if data.get(key)), None)
+        code = self._code_for_bin(bin_location) if bin_location else None
+        if code is not None:
+            logger.warning(f"回调 robotTaskCode={robot_task_code or '-'} 未登记，按储位 {bin_location} 归属到任务 {code}")
+            return code
+        if robot_task_code:
+            logger.warning(f"回调 robotTaskCode={robot_task_code} 未登记且无法按储位归属")
+        return robot_task_code
+
+    def publish(self, method: str, data: Optional[Dict] = None, robot_task_code: str = "") -> Dict[str, Any]:
+        """
+        发布状态（同步入队，不等待订阅方处理）
+
+        :param method: 状态（start / outbin / end 等）
+        :param data: 回调中的 values
+        :param robot_task_code: 机器人任务编号（为空或未登记时按 values 中的储位归属，仍无法归属时只发布到全局通道）
+        :return: 状态 {"method", "timestamp", "data", "robotTaskCode", "binLocation", "attributed"}
+        """
+        data = data or {}
+        channel = self._resolve_channel(robot_task_code, data)
+        event = {
+            "method": method,
+            "timestamp": time.time(),
+            "data": data,
+            "robotTaskCode": channel,
+            "binLocation": self._bins.get(channel),
+            # 是否归属到已登记的任务
+            "attributed": channel in self._bins,
+        }
+        queues: Set[asyncio.Queue] = set()
+        for target in {GLOBAL_CHANNEL, channel}:
+            self._last[target] = event
+            self._last.move_to_end(target)
+            queues.update(self._subscribers.get(target, ()))
+        # 同时订阅任务通道和全局通道的队列只收到一次
+        for queue in queues:
+            queue.put_nowait(event)
+        self._trim()
+        return event
+
+    def _trim(self):
+        """丢弃最早的无订阅方通道"""
+        while len(self._last) > self.max_channels:
+            channel = next((c for c in self._last if c != GLOBAL_CHANNEL and not self._subscribers.get(c)), None)
+            if channel is None:
+                return
+            del self._last[channel]
+
+    def last_event(self, robot_task_code: str = GLOBAL_CHANNEL) -> Optional[Dict[str, Any]]:
+        """通道的最后一个状态"""
+        return self._last.get(robot_task_code)
+
+    @contextmanager
+    def subscribe(self, robot_task_code: str = GLOBAL_CHANNEL, replay: bool = True,
+                  include_global: bool = False) -> Iterator[asyncio.Queue]:
+        """
+        订阅通道，退出上下文时取消订阅
+
+        :param robot_task_code: 机器人任务编号（默认全局通道）
+        :param replay: 是否先放入该通道的最后一个状态
+        :param include_global: 是否同时接收全局通道的状态（不回放）
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        if replay and robot_task_code in self._last:
+            queue.put_nowait(self._last[robot_task_code])
+        channels = {robot_task_code, GLOBAL_CHANNEL} if include_global else {robot_task_code}
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    async def wait_for(self, expected_method: str, robot_task_code: str = GLOBAL_CHANNEL,
+                       timeout: float = 300, replay: bool = True,
+                       fallback_after: Optional[float] = None) -> Dict[str, Any]:
+        """
+        等待通道出现指定状态
+
+        :param expected_method: 期望的状态
+        :param robot_task_code: 机器人任务编号（默认全局通道）
+        :param timeout: 超时时间（秒）
+        :param replay: 订阅前已到达的最后一个状态是否计入
+        :param fallback_after: 按任务等待时，超过该时间（秒）仍未收到则同时接受无法归属到任务的状态
+                               （应对回调中的任务编号与下发返回的不一致），None 表示不回退
+        :raises asyncio.TimeoutError: 超时
+        """
+        fallback = bool(robot_task_code) and fallback_after is not None
+        with self.subscribe(robot_task_code, replay=replay, include_global=fallback) as queue:
+            async def _wait():
+                loop = asyncio.get_running_loop()
+                fallback_at = loop.time() + fallback_after if fallback else None
+                # 回退前收到的无法归属状态（回退后按到达顺序检查）
+                deferred: List[Dict[str, Any]] = []
+                while True:
+                    if fallback_at is not None and loop.time() >= fallback_at:
+                        logger.warning(f"robotTaskCode={robot_task_code} {fallback_after}s 内未收到 "
+                                       f"{expected_method}，回退为同时接受无法归属到任务的状态")
+                        fallback_at = None
+                        for event in deferred:
+                            if event["method"] == expected_method:
+                                logger.warning(f"robotTaskCode={robot_task_code} 使用无法归属到任务的状态: {event}")
+                                return event
+                        deferred.clear()
+                    try:
+                        wait_time = None if fallback_at is None else max(0.0, fallback_at - loop.time())
+                        event = await asyncio.wait_for(queue.get(), timeout=wait_time)
+                    except asyncio.TimeoutError:
+                        continue
+                    if robot_task_code and event["robotTaskCode"] != robot_task_code:
+                        # 全局通道：其他任务的状态不计入，无法归属的状态回退后才计入
+                        if event["attributed"]:
+                            continue
+                        if fallback_at is not None:
+                            deferred.append(event)
+                            continue
+                        if event["method"] == expected_method:
+                            logger.warning(f"robotTaskCode={robot_task_code} 使用无法归属到任务的状态: {event}")
+                            return event
+                        continue
+                    logger.info(f"收到机器人状态: {event['method']} (robotTaskCode={event['robotTaskCode'] or '-'})")
+                    if event["method"] == expected_method:
+                        return event
+            try:
+                return await asyncio.wait_for(_wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"等待 {expected_method} 状态超时") from None
+
+    def status(self) -> Dict[str, Any]:
+        """各通道的最后状态和订阅数"""
+        return {
+            channel or "global": {
+                "method": event["method"],
+                "timestamp": event["timestamp"],
+                "binLocation": event["binLocation"],
+                "subscribers": len(self._subscribers.get(channel, ())),
+            }
+            for channel, event in self._last.items()
+        }
+
+
+# 全局单例实例
+_status_broker: Optional[RobotStatusBroker] = None
+
+
+def get_status_broker() -> RobotStatusBroker:
+    """获取全局RobotStatusBroker实例（单例模式）"""
+    global _status_broker
+    if _status_broker is None:
+        _status_broker = RobotStatusBroker()
+    return _status_broker
@@ -0,0 +1,84 @@
+"""
+相机服务客户端
+
+相机常驻服务（hardware/cam_sys/camera_daemon.py）保持各相机的登录会话和预览码流，
+网关通过本机 HTTP 接口触发抓图，接口在图片完整写入 capture_img 后返回。
+"""
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.api.shared.config import logger, CAMSYS_URL, CAMERA_CAPTURE_TIMEOUT
+from services.api.shared.http_client import AsyncHttpClient, UpstreamUnavailable
+
+
+class CameraDaemonUnavailable(Exception):
+    """相机服务未启动或无法连接"""
+
+
+class CameraDaemonClient(AsyncHttpClient):
+    """相机服务客户端（与 LMS、RCS 客户端共用连接池和熔断实现）"""
+
+    def __init__(self, base_url: str = CAMSYS_URL, capture_timeout: float = CAMERA_CAPTURE_TIMEOUT):
+        """
+        :param base_url: 相机服务地址
+        :param capture_timeout: 相机服务中单个码流的抓图超时（秒），请求超时在此基础上留出余量
+        """
+        super().__init__("camsys", base_url=base_url.rstrip("/"),
+                         timeout=httpx.Timeout(capture_timeout + 15, connect=2.0))
+        self.capture_timeout = capture_timeout
+
+    async def _call(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """发送请求，连接失败和熔断转为 CameraDaemonUnavailable（调用方回退到抓图脚本）"""
+        try:
+            return await self.request(method, path, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout, UpstreamUnavailable) as e:
+            raise CameraDaemonUnavailable(f"无法连接相机服务 {self.base_url}: {e}") from e
+
+    async def capture(self, task_no: str, bin_location: str,
+                      cameras: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        触发抓图（相机服务内并行触发各相机），图片写入完成后返回
+
+        :param task_no: 任务编号
+        :param bin_location: 储位名称
+        :param cameras: 相机类型列表（可选，默认全部相机）
+        :return: {"success", "elapsed_ms", "cameras": {相机类型: {"success", "files", "elapsed_ms", "error"}}}
+        :raises CameraDaemonUnavailable: 相机服务不可用
+        """
+        payload = {"task_no": task_no, "bin_location": bin_location}
+        if cameras:
+            payload["cameras"] = list(cameras)
+        response = await self._call("POST", "/capture", json=payload)
+        body = response.json()
+        if response.status_code != 200:
+            raise ValueError(body.get("message") or f"相机服务返回 {response.status_code}")
+        result = body["data"]
+        per_camera = ", ".join(f"{name}={r['elapsed_ms']}ms" for name, r in result["cameras"].items())
+        logger.info(f"[CameraDaemon] 抓图{'成功' if result['success'] else '失败'}: {task_no}/{bin_location}, "
+                    f"耗时 {result['elapsed_ms']}ms ({per_camera})")
+        return result
+
+    async def daemon_status(self) -> Dict[str, Any]:
+        """相机服务中各会话的状态（status() 为客户端自身的连接和熔断状态）"""
+        response = await self._call("GET", "/status", retries=0, timeout=2.0)
+        return response.json()["data"]
+
+
+# 全局单例实例
+_camera_client: Optional[CameraDaemonClient] = None
+
+
+def get_camera_client() -> CameraDaemonClient:
+    """获取全局CameraDaemonClient实例（单例模式）"""
+    global _camera_client
+    if _camera_client is None:
+        _camera_client = CameraDaemonClient()
+    return _camera_client
+
+
+async def close_camera_client():
+    """关闭相机服务客户端的连接池"""
+    if _camera_client is not None:
+        await _camera_client.aclose()
@@ -80,6 +80,15 @@ RCS_REAL = _config.get("rcs_real", {})
 # 优先使用 config.json 中 rcs_real.callback_url，否则从 host + gateway_port 派生
 RCS_CALLBACK_URL = RCS_REAL.get("callback_url", f"http://{_HOST}:{GATEWAY_PORT}/api/robot/reporter/task")
 
+# 外部系统（RCS、LMS）HTTP 客户端：连接池、重试退避、熔断
+_UPSTREAM = _config.get("upstream", {})
+UPSTREAM_MAX_CONNECTIONS = int(_UPSTREAM.get("max_connections", 10))
+UPSTREAM_KEEPALIVE_EXPIRY = float(_UPSTREAM.get("keepalive_expiry", 60))
+UPSTREAM_BACKOFF_BASE = float(_UPSTREAM.get("backoff_base", 1.0))
+UPSTREAM_BACKOFF_MAX = float(_UPSTREAM.get("backoff_max", 10.0))
+UPSTREAM_CIRCUIT_FAILURE_THRESHOLD = int(_UPSTREAM.get("circuit_failure_threshold", 5))
+UPSTREAM_CIRCUIT_RESET_TIMEOUT = float(_UPSTREAM.get("circuit_reset_timeout", 30))
+
 logger.info(f"[{datetime.now().isoformat()}] HOST={_HOST}, LMS_BASE_URL={LMS_BASE_URL}, RCS_BASE_URL={RCS_BASE_URL}, RCS_FULL_URL={RCS_FULL_URL}")
 
 # 模拟模式配置（从 JSON 文件读取）
@@ -92,6 +101,59 @@ WITH_CAMERA = _config.get("with_camera", False)
 ENABLE_DEBUG = _config.get("enable_debug", False)
 ENABLE_VISUALIZATION = _config.get("enable_visualization", False)
 
+# 推理执行器配置（识别任务在独立进程池中执行，避免阻塞网关事件循环）
+_INFERENCE = _config.get("inference", {})
+INFERENCE_WORKERS = _INFERENCE.get("workers", 2)
+INFERENCE_MAX_PENDING = _INFERENCE.get("max_pending", 8)
+INFERENCE_BATCH_SIZE = max(1, int(_INFERENCE.get("batch_size", 8)))
+
+# 检测器后端配置（ultralytics: .pt + PyTorch；onnx: onnxruntime；openvino: OpenVINO IR；auto: 按模型文件类型）
+_DETECTOR = _config.get("detector", {})
+DETECTOR_BACKEND = _DETECTOR.get("backend", "auto")
+DETECTOR_MODEL_PATH = (
+    str(project_root / _DETECTOR["model_path"]) if _DETECTOR.get("model_path") else None
+)
+DETECTOR_NUM_THREADS = int(_DETECTOR.get("num_threads", 0))
+
+# 立体匹配配置（sgbm: 全分辨率；sgbm_downscaled: 按 scale 缩小后匹配；bm: StereoBM）
+_DEPTH = _config.get("depth", {})
+DEPTH_MODE = _DEPTH.get("mode", "sgbm")
+DEPTH_SCALE = float(_DEPTH.get("scale", 0.5))
+DEPTH_NUM_THREADS = int(_DEPTH.get("num_threads", 0))
+DEPTH_CALIBRATION_PATH = (
+    str(project_root / _DEPTH["calibration_path"]) if _DEPTH.get("calibration_path") else None
+)
+
+# 可视化/调试图保存配置（后台写盘；none: 不保存；final: 只保存最终结果图；all: 全部；sample: 每 sample_every 次保存一次）
+_ARTIFACTS = _config.get("artifacts", {})
+ARTIFACT_POLICY = _ARTIFACTS.get("policy", "all")
+ARTIFACT_SAMPLE_EVERY = max(1, int(_ARTIFACTS.get("sample_every", 10)))
+ARTIFACT_MAX_QUEUE = max(1, int(_ARTIFACTS.get("max_queue", 16)))
+
+# 条码解码服务配置（常驻解码进程；cli: BarcodeReaderCLI；zxing: zxing-cpp 进程内解码）
+_BARCODE = _config.get("barcode", {})
+BARCODE_BACKEND = _BARCODE.get("backend", "cli")
+BARCODE_WORKERS = max(1, int(_BARCODE.get("workers", 2)))
+BARCODE_TIMEOUT = float(_BARCODE.get("timeout", 30))
+# 流式解析：每张图片解码后立即解析烟箱信息，同一条码成功解析 required_matches 次即取消剩余解码
+BARCODE_EARLY_EXIT = _BARCODE.get("early_exit", True)
+BARCODE_REQUIRED_MATCHES = max(1, int(_BARCODE.get("required_matches", 1)))
+# 条码区域裁剪：用 YOLO 检测 barcode 框，只解码带边距的裁剪区域（可纠偏、放大），未检测到时回退整图
+_BARCODE_ROI = _BARCODE.get("roi", {})
+BARCODE_ROI_ENABLED = _BARCODE_ROI.get("enabled", True)
+BARCODE_ROI_CONF = float(_BARCODE_ROI.get("conf", 0.25))
+BARCODE_ROI_PAD_RATIO = float(_BARCODE_ROI.get("pad_ratio", 0.15))
+BARCODE_ROI_DESKEW = _BARCODE_ROI.get("deskew", True)
+BARCODE_ROI_MIN_SIDE = int(_BARCODE_ROI.get("min_side", 160))
+
+# 盘点流水线配置（真实模式：抓图完成即发送 continue，识别与机器人移动并行）
+_PIPELINE = _config.get("pipeline", {})
+PIPELINE_INVENTORY = _PIPELINE.get("enabled", False)
+PIPELINE_MAX_INFLIGHT = max(1, _PIPELINE.get("max_inflight", 4))
+
+# 按 robotTaskCode 等待机器人状态时，超过该时间（秒）仍未收到则同时接受无法归属到任务的回调
+ROBOT_STATUS_FALLBACK_AFTER = float(_config.get("robot_status", {}).get("fallback_after", 120))
+
 # CORS 配置（从 JSON 文件读取）
 CORS_ORIGINS = _config.get("cors_origins", [
     f"http://{_HOST}", f"http://{_HOST}:{GATEWAY_PORT}",
@@ -110,12 +172,33 @@ MOCK_USER = {
 
 logger.info(f"配置加载完成: CORS_ORIGINS={len(CORS_ORIGINS)}个")
 
-# 抓图脚本路径
-CAPTURE_SCRIPTS = [
-    str(project_root / "hardware" / "cam_sys" / "build" / "scan_1_capture.py"),
-    str(project_root / "hardware" / "cam_sys" / "build" / "scan_2_capture.py"),
-    str(project_root / "hardware" / "cam_sys" / "build" / "3d_capture.py"),
-]
+# 相机配置（daemon: 通过常驻相机服务 hardware/cam_sys/camera_daemon.py 抓图，服务不可用时回退到抓图脚本；
+# script: 每个储位逐个执行抓图脚本）
+_CAMERAS = _config.get("cameras", {})
+CAMERA_CAPTURE_MODE = _CAMERAS.get("capture_mode", "daemon")
+CAMERA_CAPTURE_TIMEOUT = float(_CAMERAS.get("capture_timeout", 30))
+# 每个相机独立重试（只重新触发失败的相机）
+CAMERA_MAX_RETRIES = int(_CAMERAS.get("max_retries", 5))
+CAMERA_RETRY_INTERVAL = float(_CAMERAS.get("retry_interval", 5))
+# 抓图返回后等待图片完整写入的超时（秒），超时视为本次抓图失败
+CAMERA_FRAME_TIMEOUT = float(_CAMERAS.get("frame_timeout", 5))
+CAMERA_DEVICES = _CAMERAS.get("devices") or {
+    "3d_camera": {"ip": "10.16.82.180", "port": 8000, "streams": [0, 3]},
+    "scan_camera_1": {"ip": "10.16.82.181", "port": 8000, "streams": [0]},
+    "scan_camera_2": {"ip": "10.16.82.182", "port": 8000, "streams": [0]},
+}
+# 码流 -> 抓图文件名（与 C++ getPic 一致）
+CAMERA_STREAM_FILES = {0: "main.jpg", 3: "depth.jpg"}
+# 相机服务只监听本机
+CAMSYS_URL = os.getenv("CAMSYS_URL", f"http://127.0.0.1:{CAMSYS_PORT}")
+
+# 抓图脚本路径（按相机类型）
+CAPTURE_SCRIPTS_BY_CAMERA = {
+    "scan_camera_1": str(project_root / "hardware" / "cam_sys" / "build" / "scan_1_capture.py"),
+    "scan_camera_2": str(project_root / "hardware" / "cam_sys" / "build" / "scan_2_capture.py"),
+    "3d_camera": str(project_root / "hardware" / "cam_sys" / "build" / "3d_capture.py"),
+}
+CAPTURE_SCRIPTS = list(CAPTURE_SCRIPTS_BY_CAMERA.values())
 
 # 垛型字符串 → 垛型编码 映射
 STACK_TYPE_TO_CODE = {
@@ -0,0 +1,207 @@
+"""
+抓图帧到达通知
+
+等待抓图目录中的图片（main.jpg、depth.jpg 等）完整写入：Linux 下监听 inotify 的
+IN_CLOSE_WRITE / IN_MOVED_TO 事件，文件写完关闭后立即返回；inotify 不可用时按固定间隔轮询。
+超时未到达的帧立即报错，不再固定等待后再查找文件。
+指定 since 时只接受该时间之后写入的文件，上一次抓图留在目录中的旧图片不会被当作本次结果。
+文件检查在线程中执行，不阻塞事件循环；inotify 模式下只检查事件涉及的文件。
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from services.api.shared.config import logger
+
+JPEG_EOI = b"\xff\xd9"
+
+# inotify 常量（linux/inotify.h）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# 文件修改时间使用内核的粗粒度时钟，可能比写入前取得的 time.time() 略早
+_MTIME_SLACK = 0.02
+
+
+class FrameTimeout(TimeoutError):
+    """等待的帧在超时前未完整写入"""
+
+    def __init__(self, directory: Path, missing: List[str], timeout: float):
+        self.directory = directory
+        self.missing = missing
+        super().__init__(f"等待图片超时（{timeout}s）: {directory} ({', '.join(missing)})")
+
+
+def is_frame_complete(path: Path, since: Optional[float] = None) -> bool:
+    """
+    图片是否已完整写入（JPEG 需以 EOI 标记 FFD9 结尾，其他格式非空即可）
+
+    :param path: 图片路径
+    :param since: 只接受修改时间不早于该时间（time.time()）的文件，None 表示不检查
+    """
+    try:
+        st = path.stat()
+        if since is not None and st.st_mtime < since - _MTIME_SLACK:
+            return False
+        size = st.st_size
+        if path.suffix.lower() not in (".jpg", ".jpeg"):
+            return size > 0
+        if size < 4:
+            return False
+        with open(path, "rb") as f:
+            f.seek(-2, os.SEEK_END)
+            return f.read(2) == JPEG_EOI
+    except OSError:
+        return False
+
+
+def _complete_frames(directory: Path, names: Iterable[str], since: Optional[float]) -> List[str]:
+    """已完整写入的文件名（在线程中执行）"""
+    return [name for name in names if is_frame_complete(directory / name, since)]
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FrameNotifier:
+    """帧到达通知器（inotify，不可用时轮询）"""
+
+    def __init__(self, poll_interval: float = 0.05, use_inotify: bool = True):
+        """
+        :param poll_interval: 轮询间隔（秒，inotify 不可用时使用）
+        :param use_inotify: 是否使用 inotify（False 时始终轮询）
+        """
+        self.poll_interval = poll_interval
+        self._libc = _load_libc() if use_inotify else None
+        if use_inotify and self._libc is None:
+            logger.info("[FrameNotifier] inotify 不可用，使用轮询等待图片")
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._libc is not None else "polling"
+
+    def _open_watch(self, directory: Path) -> Optional[int]:
+        """监听目录中的写完关闭/移入事件，失败时返回None（调用方改为轮询）"""
+        if self._libc is None:
+            return None
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"[FrameNotifier] inotify_init1 失败: {os.strerror(ctypes.get_errno())}")
+            return None
+        if self._libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            logger.warning(f"[FrameNotifier] 监听目录失败 {directory}: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _drain(fd: int) -> List[str]:
+        """读出已到达的事件，返回涉及的文件名"""
+        names = []
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                return names
+            if not data:
+                return names
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                names.append(data[offset:offset + length].rstrip(b"\0").decode(errors="replace"))
+                offset += length
+
+    async def wait_for_files(self, directory: Path, names: List[str], timeout: float,
+                             since: Optional[float] = None) -> Dict[str, Path]:
+        """
+        等待目录中的指定文件全部完整写入
+
+        :param directory: 图片目录（不存在时创建，抓图程序以 mkdir -p 写入同一目录）
+        :param names: 文件名列表
+        :param timeout: 超时时间（秒）
+        :param since: 只接受修改时间不早于该时间（time.time()，通常为触发抓图前的时间）的文件
+        :return: 文件名 -> 路径
+        :raises FrameTimeout: 超时仍有文件未完整写入
+        """
+        directory = Path(directory)
+        await asyncio.to_thread(directory.mkdir, parents=True, exist_ok=True)
+        pending = {name: directory / name for name in names}
+        arrived: Dict[str, Path] = {}
+        deadline = time.monotonic() + timeout
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        # 待检查的文件：首次检查全部，之后只检查 inotify 事件涉及的文件
+        touched: Set[str] = set(pending)
+
+        def _on_events():
+            touched.update(self._drain(fd))
+            changed.set()
+
+        # 先开始监听再检查已有文件，避免检查与监听之间写完的文件被漏掉
+        fd = self._open_watch(directory)
+        if fd is not None:
+            loop.add_reader(fd, _on_events)
+        try:
+            while True:
+                candidates = list(pending) if fd is None else [name for name in pending if name in touched]
+                touched.clear()
+                if candidates:
+                    for name in await asyncio.to_thread(_complete_frames, directory, candidates, since):
+                        arrived[name] = pending.pop(name)
+                if not pending:
+                    return arrived
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FrameTimeout(directory, sorted(pending), timeout)
+                if fd is None:
+                    await asyncio.sleep(min(self.poll_interval, remaining))
+                    continue
+                try:
+                    # 事件只用于唤醒，到达后仍按内容校验（JPEG 可能分多次写入关闭）
+                    await asyncio.wait_for(changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+                changed.clear()
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+                os.close(fd)
+
+
+# 全局单例实例
+_frame_notifier: Optional[FrameNotifier] = None
+
+
+def get_frame_notifier() -> FrameNotifier:
+    """获取全局FrameNotifier实例（单例模式）"""
+    global _frame_notifier
+    if _frame_notifier is None:
+        _frame_notifier = FrameNotifier()
+    return _frame_notifier
+
+
+async def wait_for_frames(directory: Path, names: List[str], timeout: float,
+                          since: Optional[float] = None) -> Dict[str, Path]:
+    """等待目录中的指定图片全部完整写入（见 FrameNotifier.wait_for_files）"""
+    return await get_frame_notifier().wait_for_files(directory, names, timeout, since=since)
@@ -0,0 +1,237 @@
+"""
+外部系统 HTTP 客户端
+
+网关调用 RCS、LMS 的公共实现：
+- 连接池 + keep-alive（httpx.AsyncClient），不再每次请求重新建立（TLS）连接
+- 请求不阻塞事件循环，重试使用带抖动的指数退避（asyncio.sleep）
+- 非幂等请求（如 RCS 下发任务）只在确定未被处理时重试：连接未建立，或服务端明确拒绝（retry_if）；
+  超时、连接中断和 5xx 可能已被处理，不重试
+- 熔断：连续失败达到阈值后在一段时间内直接失败，之后放行一次试探请求
+- 每次尝试的耗时、重试次数、熔断次数记入 UpstreamMetrics（GET /metrics）
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from services.api.shared.config import (
+    logger,
+    LMS_BASE_URL,
+    UPSTREAM_BACKOFF_BASE,
+    UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_CIRCUIT_FAILURE_THRESHOLD,
+    UPSTREAM_CIRCUIT_RESET_TIMEOUT,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_MAX_CONNECTIONS,
+)
+from services.api.shared.metrics import get_upstream_metrics
+
+# 默认允许重试的方法（幂等）
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# 请求确定未发出的传输错误（连接未建立），非幂等请求也可以重试
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class UpstreamUnavailable(Exception):
+    """外部系统熔断中（连续失败），请求未发出"""
+
+
+class CircuitBreaker:
+    """熔断器：closed（正常）→ open（直接失败）→ half_open（放行一次试探请求）"""
+
+    def __init__(self, failure_threshold: int = UPSTREAM_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = UPSTREAM_CIRCUIT_RESET_TIMEOUT):
+        """
+        :param failure_threshold: 连续失败多少次后打开
+        :param reset_timeout: 打开后多久（秒）放行试探请求
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """是否允许发出请求（打开超过 reset_timeout 后放行一个试探请求）"""
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+        # 放行试探请求并重新计时：试探请求未返回（如被取消）时，下一个周期再放行一次
+        self.opened_at = time.monotonic()
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回熔断器是否因此打开"""
+        self.failures += 1
+        was_open = self.opened_at is not None
+        if self._probing or self.failures >= self.failure_threshold:
+            # 试探失败或连续失败达到阈值：重新计时
+            self.opened_at = time.monotonic()
+            self._probing = False
+            return not was_open
+        return False
+
+
+class AsyncHttpClient:
+    """带连接池、退避重试和熔断的异步 HTTP 客户端"""
+
+    def __init__(self, name: str, base_url: str = "", timeout: float = 10.0, verify: bool = True,
+                 max_retries: int = 2, backoff_base: float = UPSTREAM_BACKOFF_BASE,
+                 backoff_max: float = UPSTREAM_BACKOFF_MAX,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        :param name: 外部系统名称（日志和指标标签）
+        :param base_url: 基础地址（请求路径拼接在其后）
+        :param timeout: 默认请求超时（秒）
+        :param verify: 是否校验 TLS 证书
+        :param max_retries: 幂等请求的默认重试次数（非幂等请求默认不重试）
+        :param backoff_base: 退避基数（秒），第 n 次重试前等待约 base * 2^(n-1)
+        :param backoff_max: 单次退避上限（秒）
+        :param breaker: 熔断器（默认按配置创建）
+        """
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.verify = verify
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                verify=self.verify,
+                limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+                                    keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY),
+            )
+        return self._client
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（指数退避，一半固定一半随机抖动）"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def request(self, method: str, path: str, *, retries: Optional[int] = None,
+                      retry_if: Optional[Callable[[httpx.Response], bool]] = None,
+                      idempotent: Optional[bool] = None,
+                      **kwargs: Any) -> httpx.Response:
+        """
+        发送请求（按退避重试）
+
+        幂等请求在连接错误、超时、5xx/429 时重试；非幂等请求只在连接未建立时重试，
+        超时、连接中断和 5xx 时服务端可能已处理该请求，直接返回或抛出。
+
+        :param method: HTTP 方法
+        :param path: 请求路径（相对 base_url）或完整 URL
+        :param retries: 重试次数（默认幂等请求为 max_retries，其他为 0）
+        :param retry_if: 服务端明确拒绝（如 200 但业务失败、请求未被执行）的判定，返回 True 时重试；
+                         该响应计为熔断器的失败
+        :param idempotent: 是否幂等（默认按方法判断，见 IDEMPOTENT_METHODS）
+        :param kwargs: 透传给 httpx（json、data、headers、params、timeout 等）
+        :return: 最后一次响应（不再重试时返回最后一次的失败响应）
+        :raises UpstreamUnavailable: 熔断中
+        :raises httpx.TransportError: 连接失败或超时且不再重试
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if retries is None:
+            retries = self.max_retries if idempotent else 0
+        metrics = get_upstream_metrics()
+        endpoint = httpx.URL(path).path or path
+
+        for attempt in range(retries + 1):
+            if attempt:
+                metrics.observe_retry(self.name, endpoint)
+                wait_time = self.backoff(attempt)
+                logger.info(f"[{self.name}] {method} {endpoint} 等待 {wait_time:.1f} 秒后重试 ({attempt}/{retries})")
+                await asyncio.sleep(wait_time)
+
+            if not self.breaker.allow():
+                metrics.observe_request(self.name, endpoint, "circuit_open", 0.0)
+                raise UpstreamUnavailable(f"{self.name} 连续请求失败，熔断中（{self.breaker.reset_timeout}s 后重试）")
+
+            start = time.perf_counter()
+            try:
+                response = await self._get_client().request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+                metrics.observe_request(self.name, endpoint, outcome, time.perf_counter() - start)
+                self._record_failure()
+                logger.warning(f"[{self.name}] {method} {endpoint} 请求失败 ({attempt + 1}/{retries + 1}): "
+                               f"{type(e).__name__}: {e}")
+                if attempt >= retries:
+                    raise
+                if not idempotent and not isinstance(e, NOT_SENT_ERRORS):
+                    logger.warning(f"[{self.name}] {method} {endpoint} 为非幂等请求，服务端可能已处理，不重试")
+                    raise
+                continue
+
+            metrics.observe_request(self.name, endpoint, str(response.status_code), time.perf_counter() - start)
+            server_error = response.status_code >= 500 or response.status_code == 429
+            rejected = not server_error and retry_if is not None and retry_if(response)
+            if server_error or rejected:
+                self._record_failure()
+            else:
+                self.breaker.record_success()
+            if attempt < retries and (rejected or (server_error and idempotent)):
+                logger.warning(f"[{self.name}] {method} {endpoint} 返回 {response.status_code}"
+                               f"{'（业务失败）' if rejected else ''}，准备重试 ({attempt + 1}/{retries + 1})")
+                continue
+            return response
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            get_upstream_metrics().observe_circuit_open(self.name)
+            logger.error(f"[{self.name}] 连续 {self.breaker.failures} 次请求失败，熔断 {self.breaker.reset_timeout}s")
+
+    def status(self) -> Dict[str, Any]:
+        """客户端状态"""
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 全局单例实例
+_lms_client: Optional[AsyncHttpClient] = None
+
+
+def get_lms_client() -> AsyncHttpClient:
+    """获取全局 LMS 客户端实例（单例模式）"""
+    global _lms_client
+    if _lms_client is None:
+        _lms_client = AsyncHttpClient("lms", base_url=LMS_BASE_URL, timeout=10.0)
+    return _lms_client
@@ -0,0 +1,221 @@
+"""
+计数流程指标（Prometheus 文本格式）
+
+推理在工作进程中执行，各阶段追踪结果随任务结果返回网关进程，在这里汇总，
+由 GET /metrics 以 Prometheus exposition 格式输出。
+网关调用外部系统（RCS、LMS）的请求耗时也在这里汇总（UpstreamMetrics）。
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 阶段耗时直方图的桶（秒）
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PREFIX = "leafdepot_detect"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _StageHistogram:
+    """单个阶段的耗时直方图"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(STAGE_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(STAGE_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+
+class PipelineMetrics:
+    """计数流程指标汇总（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wall: Dict[str, _StageHistogram] = {}
+        # (指标名, 阶段) -> 累计值
+        self._counters: Dict[Tuple[str, str], float] = {}
+        # 计数结果：status -> 次数
+        self._runs: Dict[str, int] = {}
+
+    def observe_stages(self, stages: Iterable[Dict]):
+        """
+        记录一次计数的各阶段追踪结果（StageTracer.to_dict()["stages"]）
+
+        :param stages: [{"name", "wall_ms", "cpu_ms", "read_bytes", "write_bytes", "rss_peak_delta_kb"}, ...]
+        """
+        with self._lock:
+            for record in stages:
+                name = record["name"]
+                self._wall.setdefault(name, _StageHistogram()).observe(record["wall_ms"] / 1000.0)
+                self._add("cpu_seconds_total", name, record.get("cpu_ms", 0) / 1000.0)
+                self._add("read_bytes_total", name, record.get("read_bytes"))
+                self._add("write_bytes_total", name, record.get("write_bytes"))
+                if record.get("rss_peak_delta_kb"):
+                    self._add("rss_peak_growth_bytes_total", name, record["rss_peak_delta_kb"] * 1024)
+
+    def observe_timings(self, timings: Dict[str, float]):
+        """记录只有墙钟耗时（毫秒）的阶段结果（如批量检测阶段）"""
+        self.observe_stages({"name": name, "wall_ms": ms} for name, ms in timings.items())
+
+    def observe_run(self, status: str):
+        """记录一次计数结果（success / failed）"""
+        with self._lock:
+            self._runs[status] = self._runs.get(status, 0) + 1
+
+    def _add(self, metric: str, stage: str, value: Optional[float]):
+        if value is None:
+            return
+        key = (metric, stage)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        输出 Prometheus 文本格式
+
+        :param gauges: 额外的瞬时值指标 {指标名: 值}（如推理队列长度）
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines.append(f"# HELP {_PREFIX}_runs_total 计数调用次数")
+            lines.append(f"# TYPE {_PREFIX}_runs_total counter")
+            for run_status, count in sorted(self._runs.items()):
+                lines.append(f"{_PREFIX}_runs_total{_format_labels((('status', run_status),))} {count}")
+
+            metric = f"{_PREFIX}_stage_seconds"
+            lines.append(f"# HELP {metric} 计数流程各阶段墙钟耗时")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, hist in sorted(self._wall.items()):
+                for bound, count in zip(STAGE_BUCKETS, hist.bucket_counts):
+                    labels = _format_labels((("stage", stage), ("le", _format_value(bound))))
+                    lines.append(f"{metric}_bucket{labels} {count}")
+                labels = _format_labels((("stage", stage), ("le", "+Inf")))
+                lines.append(f"{metric}_bucket{labels} {hist.count}")
+                labels = _format_labels((("stage", stage),))
+                lines.append(f"{metric}_sum{labels} {_format_value(hist.sum)}")
+                lines.append(f"{metric}_count{labels} {hist.count}")
+
+            helps = {
+                "cpu_seconds_total": "计数流程各阶段CPU时间",
+                "read_bytes_total": "计数流程各阶段读取字节数",
+                "write_bytes_total": "计数流程各阶段写入字节数",
+                "rss_peak_growth_bytes_total": "计数流程各阶段进程峰值内存增长",
+            }
+            for name, help_text in helps.items():
+                values = sorted((stage, v) for (m, stage), v in self._counters.items() if m == name)
+                if not values:
+                    continue
+                lines.append(f"# HELP {_PREFIX}_stage_{name} {help_text}")
+                lines.append(f"# TYPE {_PREFIX}_stage_{name} counter")
+                for stage, value in values:
+                    labels = _format_labels((("stage", stage),))
+                    lines.append(f"{_PREFIX}_stage_{name}{labels} {_format_value(value)}")
+
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class UpstreamMetrics:
+    """外部系统请求指标汇总（线程安全）"""
+
+    _METRIC = "leafdepot_upstream_request_seconds"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (系统, 接口, 结果) -> 耗时直方图
+        self._latency: Dict[Tuple[str, str, str], _StageHistogram] = {}
+        # (系统, 接口) -> 重试次数
+        self._retries: Dict[Tuple[str, str], int] = {}
+        # 系统 -> 熔断打开次数
+        self._circuit_opens: Dict[str, int] = {}
+
+    def observe_request(self, upstream: str, endpoint: str, outcome: str, seconds: float):
+        """
+        记录一次请求（每次尝试分别记录）
+
+        :param upstream: 外部系统名称（如 rcs、lms）
+        :param endpoint: 接口路径
+        :param outcome: 结果（HTTP 状态码、timeout、error、circuit_open）
+        :param seconds: 耗时（秒）
+        """
+        with self._lock:
+            self._latency.setdefault((upstream, endpoint, outcome), _StageHistogram()).observe(seconds)
+
+    def observe_retry(self, upstream: str, endpoint: str):
+        with self._lock:
+            key = (upstream, endpoint)
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    def observe_circuit_open(self, upstream: str):
+        with self._lock:
+            self._circuit_opens[upstream] = self._circuit_opens.get(upstream, 0) + 1
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        metric = self._METRIC
+        lines: List[str] = []
+        with self._lock:
+            lines.append(f"# HELP {metric} 外部系统请求耗时（每次尝试）")
+            lines.append(f"# TYPE {metric} histogram")
+            for (upstream, endpoint, outcome), hist in sorted(self._latency.items()):
+                base = (("upstream", upstream), ("endpoint", endpoint), ("outcome", outcome))
+                for bound, count in zip(STAGE_BUCKETS, hist.bucket_counts):
+                    lines.append(f"{metric}_bucket{_format_labels(base + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{metric}_bucket{_format_labels(base + (('le', '+Inf'),))} {hist.count}")
+                lines.append(f"{metric}_sum{_format_labels(base)} {_format_value(hist.sum)}")
+                lines.append(f"{metric}_count{_format_labels(base)} {hist.count}")
+
+            lines.append("# HELP leafdepot_upstream_retries_total 外部系统请求重试次数")
+            lines.append("# TYPE leafdepot_upstream_retries_total counter")
+            for (upstream, endpoint), count in sorted(self._retries.items()):
+                labels = _format_labels((("upstream", upstream), ("endpoint", endpoint)))
+                lines.append(f"leafdepot_upstream_retries_total{labels} {count}")
+
+            lines.append("# HELP leafdepot_upstream_circuit_open_total 外部系统熔断打开次数")
+            lines.append("# TYPE leafdepot_upstream_circuit_open_total counter")
+            for upstream, count in sorted(self._circuit_opens.items()):
+                lines.append(f"leafdepot_upstream_circuit_open_total{_format_labels((('upstream', upstream),))} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局单例实例
+_pipeline_metrics: Optional[PipelineMetrics] = None
+_upstream_metrics: Optional[UpstreamMetrics] = None
+
+
+def get_pipeline_metrics() -> PipelineMetrics:
+    """获取全局PipelineMetrics实例（单例模式）"""
+    global _pipeline_metrics
+    if _pipeline_metrics is None:
+        _pipeline_metrics = PipelineMetrics()
+    return _pipeline_metrics
+
+
+def get_upstream_metrics() -> UpstreamMetrics:
+    """获取全局UpstreamMetrics实例（单例模式）"""
+    global _upstream_metrics
+    if _upstream_metrics is None:
+        _upstream_metrics = UpstreamMetrics()
+    return _upstream_metrics
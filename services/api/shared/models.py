@@ -66,6 +66,19 @@ class ScanAndRecognizeRequest(BaseModel):
     code_type: str = "ucc128"  # 条码类型，默认ucc128
 
 
+class BatchRecountBin(BaseModel):
+    """批量重新识别中的单个库位"""
+    binLocation: str  # 库位号
+    pile_id: int = 1  # 堆垛ID，默认为1
+
+
+class BatchRecountRequest(BaseModel):
+    """批量重新识别请求模型"""
+    taskNo: str  # 任务编号
+    bins: List[BatchRecountBin]  # 库位列表
+    batch_size: Optional[int] = None  # YOLO批次大小，默认使用配置 inference.batch_size
+
+
 class FrontendLogRequest(BaseModel):
     """前端日志请求模型"""
     level: str  # log, info, warn, error
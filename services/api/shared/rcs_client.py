@@ -0,0 +1,176 @@
+"""
+RCS 客户端
+
+下发盘点任务（task/submit）和继续任务（task/extend/continue），模拟 RCS 与真实 RCS 各一个实例。
+真实 RCS 的认证头（X-App-Id、X-Sign）在创建时生成一次；时间戳和请求 ID 每个请求生成一次，
+重试时沿用同一请求 ID，便于 RCS 侧识别重复请求。
+
+下发和继续都不是幂等操作：只在连接未建立或 RCS 明确返回业务失败时重试；
+超时、连接中断、5xx 和无法解析的响应不重试（请求可能已被执行），直接返回失败。
+"""
+
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.api.shared.config import logger, RCS_FULL_URL, RCS_PREFIX, RCS_REAL
+from services.api.shared.http_client import AsyncHttpClient, UpstreamUnavailable
+
+
+def _is_success(response: httpx.Response) -> bool:
+    """兼容两种返回格式：code="SUCCESS" 或 success=true"""
+    if response.status_code != 200:
+        return False
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and (data.get("success") is True or data.get("code") == "SUCCESS")
+
+
+def _is_rejected(response: httpx.Response) -> bool:
+    """RCS 明确返回业务失败（200 且带 success / code 字段），请求未被执行，可以重试"""
+    if response.status_code != 200:
+        return False
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and ("success" in data or "code" in data) and not _is_success(response)
+
+
+class RcsClient(AsyncHttpClient):
+    """RCS 客户端（模拟 / 真实）"""
+
+    def __init__(self, is_sim: bool = True, real_config: Optional[Dict[str, Any]] = None):
+        """
+        :param is_sim: 是否为模拟 RCS
+        :param real_config: 真实 RCS 配置（默认 config.json 中的 rcs_real）
+        """
+        self.is_sim = is_sim
+        self.real_config = real_config if real_config is not None else (RCS_REAL or {})
+        if is_sim:
+            super().__init__("rcs_sim", base_url=RCS_FULL_URL, timeout=30.0)
+            self._auth_headers = {"X-lr-request-id": "ldui"}
+        else:
+            cfg = self.real_config
+            protocol = "https" if cfg.get("use_ssl", True) else "http"
+            base_url = f"{protocol}://{cfg.get('host', '10.16.82.90')}:{cfg.get('port', 443)}"
+            super().__init__("rcs", base_url=base_url, timeout=20.0, verify=False)
+            self._auth_headers = {
+                "X-App-Id": cfg.get("app_id", "1008"),
+                "X-Sign": cfg.get("sign", ""),
+            }
+
+    def _headers(self) -> Dict[str, str]:
+        """单个请求的请求头（重试沿用）"""
+        headers = {**self._auth_headers, "Content-Type": "application/json"}
+        if not self.is_sim:
+            headers["X-Timestamp"] = str(int(time.time() * 1000))
+            headers["X-LR-REQUEST-ID"] = str(uuid.uuid4())
+        return headers
+
+    async def _post(self, action: str, path: str, body: Dict[str, Any], max_retries: int) -> Dict[str, Any]:
+        """
+        发送请求（只在连接未建立或 RCS 明确返回业务失败时重试）
+
+        :return: {"success", "data", "error"}，error 为失败原因（与原日志格式一致，以空格开头）
+        """
+        headers = self._headers()
+        if not self.is_sim:
+            logger.info(f"【真实RCS{action}请求】url={self.base_url}{path} "
+                        f"headers={json.dumps(headers, ensure_ascii=False)} body={json.dumps(body, ensure_ascii=False)}")
+        try:
+            response = await self.request("POST", path, json=body, headers=headers,
+                                          retries=max(0, max_retries - 1),
+                                          retry_if=_is_rejected, idempotent=False)
+        except UpstreamUnavailable as e:
+            return {"success": False, "data": {}, "error": f" {e}"}
+        except httpx.TimeoutException:
+            return {"success": False, "data": {}, "error": " 请求超时"}
+        except httpx.TransportError as e:
+            return {"success": False, "data": {}, "error": f" 连接失败: {e}"}
+
+        if not self.is_sim:
+            logger.info(f"【真实RCS{action}响应】code={response.status_code} body={response.text}")
+        if response.status_code != 200:
+            return {"success": False, "data": {}, "error": f" HTTP {response.status_code}"}
+        try:
+            data = response.json()
+        except ValueError as e:
+            return {"success": False, "data": {}, "error": f" 请求异常: {e}"}
+        if not isinstance(data, dict):
+            return {"success": False, "data": {}, "error": " 请求异常: 响应格式错误"}
+        if not _is_success(response):
+            return {"success": False, "data": data,
+                    "error": f" RCS 返回错误: {data.get('message', '')} ({data.get('errorCode', '')})"}
+        return {"success": True, "data": data, "error": None}
+
+    async def submit_task(self, bin_locations: List[str], max_retries: int = 3) -> Dict[str, Any]:
+        """
+        下发盘点任务
+
+        :param bin_locations: 储位名称列表
+        :param max_retries: 最多尝试次数
+        :return: {"success", "data", "error"}
+        """
+        if self.is_sim:
+            body = {
+                "taskType": "PF-CTU-COMMON-TEST",
+                "targetRoute": [{"seq": i, "type": "ZONE", "code": loc} for i, loc in enumerate(bin_locations)],
+            }
+        else:
+            # 构建 targetRoute：STORAGE（储位）+ CARRIER_TYPE（载体类型）
+            target_route = []
+            for i, loc in enumerate(bin_locations):
+                target_route.append({"autoStart": 1, "code": loc, "extra": {}, "seq": i, "type": "STORAGE"})
+                target_route.append({"autoStart": 1, "code": "1", "extra": {}, "seq": i, "type": "CARRIER_TYPE"})
+            body = {
+                "extra": {},
+                "groupCode": "",
+                "interrupt": 0,
+                "liftCode": "",
+                "robotTaskCode": "",
+                "robotType": "",
+                "targetRoute": target_route,
+                "taskType": self.real_config.get("task_type", "PF-CTU-HS-H-DETECT-NOTIFY-1"),
+            }
+        path = "/api/robot/controller/task/submit" if self.is_sim else \
+            f"{RCS_PREFIX}/api/robot/controller/task/submit"
+        return await self._post("下发", path, body, max_retries)
+
+    async def continue_task(self, robot_task_code: str = "", max_retries: int = 3) -> Dict[str, Any]:
+        """
+        继续盘点任务
+
+        :param robot_task_code: 机器人任务编号（真实 RCS 使用）
+        :param max_retries: 最多尝试次数
+        :return: {"success", "data", "error"}
+        """
+        if self.is_sim:
+            path = "/api/robot/controller/task/extend/continue"
+            body = {"triggerType": "TASK", "triggerCode": "001"}
+        else:
+            path = self.real_config.get("continue_url", "/rcs/rtas/api/robot/controller/task/extend/continue")
+            body = {"extra": {}, "triggerType": "TASK", "triggerCode": robot_task_code}
+        return await self._post("继续", path, body, max_retries)
+
+
+# 全局单例实例
+_rcs_clients: Dict[bool, RcsClient] = {}
+
+
+def get_rcs_client(is_sim: bool = True) -> RcsClient:
+    """获取全局RcsClient实例（模拟 / 真实各一个，单例模式）"""
+    if is_sim not in _rcs_clients:
+        _rcs_clients[is_sim] = RcsClient(is_sim=is_sim)
+    return _rcs_clients[is_sim]
+
+
+async def close_rcs_clients():
+    """关闭所有 RCS 客户端的连接池"""
+    for client in _rcs_clients.values():
+        await client.aclose()
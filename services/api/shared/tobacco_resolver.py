@@ -1,8 +1,12 @@
 """
 烟箱信息解析器
 """
+import os
+import pickle
 import re
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 import pandas as pd
 
@@ -14,6 +18,74 @@ from services.api.shared.config import (
 )
 
 
+# 条码中提取的数字位数
+SIX_DIGIT_LENGTH = 6
+
+# 解析快照格式版本（快照结构变化时递增，旧快照自动失效）
+_SNAPSHOT_VERSION = 1
+
+
+class CaseCodeIndex:
+    """
+    烟箱六位码索引
+
+    精确匹配使用哈希表；模糊匹配（查询码包含于表中代码，或表中代码包含于查询码）
+    使用 6-gram 子串索引，多个候选时取表格中最靠前的一条，与按表格顺序线性扫描的结果一致。
+    最近的查询结果保存在有界 LRU 缓存中。
+    """
+
+    def __init__(self, mapping: Dict[str, Dict[str, str]], cache_size: int = 1024):
+        """
+        :param mapping: 六位码 -> 烟箱信息（按表格顺序）
+        :param cache_size: LRU 缓存的查询数量上限
+        """
+        self.mapping = mapping
+        self.cache_size = cache_size
+        self._order = {code: i for i, code in enumerate(mapping)}
+        # 长度为 SIX_DIGIT_LENGTH 的子串 -> 包含它的代码（表格顺序号）
+        self._ngrams: Dict[str, Set[int]] = {}
+        self._codes: List[str] = list(mapping)
+        for i, code in enumerate(self._codes):
+            for start in range(len(code) - SIX_DIGIT_LENGTH + 1):
+                self._ngrams.setdefault(code[start:start + SIX_DIGIT_LENGTH], set()).add(i)
+        self._cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def _fuzzy(self, digits: str) -> Optional[str]:
+        if len(digits) != SIX_DIGIT_LENGTH:
+            # 非六位查询不在索引覆盖范围内，按表格顺序扫描
+            return next((code for code in self._codes if digits in code or code in digits), None)
+        # 查询码包含于代码中
+        candidates = set(self._ngrams.get(digits, ()))
+        # 代码包含于查询码中（代码是查询码的子串）
+        for start in range(len(digits)):
+            for end in range(start + 1, len(digits) + 1):
+                order = self._order.get(digits[start:end])
+                if order is not None:
+                    candidates.add(order)
+        return self._codes[min(candidates)] if candidates else None
+
+    def lookup(self, digits: str) -> Optional[str]:
+        """
+        查找匹配的代码
+
+        :param digits: 条码中提取的六位数字
+        :return: 匹配到的代码（精确匹配时即为 digits），未匹配时返回None
+        """
+        if digits in self.mapping:
+            return digits
+        if digits in self._cache:
+            self._cache.move_to_end(digits)
+            return self._cache[digits]
+        code = self._fuzzy(digits)
+        self._cache[digits] = code
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return code
+
+
 class TobaccoCaseInfoResolver:
     """
     烟草烟箱信息解析器
@@ -23,6 +95,7 @@ class TobaccoCaseInfoResolver:
 
     _instance = None
     _code_mapping = None
+    _index = None
 
     def __new__(cls):
         """单例模式，避免重复加载Excel数据"""
@@ -36,34 +109,89 @@ class TobaccoCaseInfoResolver:
             self._load_excel_data()
 
     def _load_excel_data(self):
-        """加载烟箱信息Excel数据"""
+        """加载烟箱信息（优先读取与Excel修改时间一致的快照，否则解析Excel并重新生成快照）"""
         try:
             excel_path = project_root / "shared" / "data" / "烟箱信息汇总完整版.xlsx"
 
             if not excel_path.exists():
                 logger.warning(f"烟箱信息Excel文件不存在: {excel_path}")
-                self._code_mapping = {}
+                self._set_mapping({})
                 return
 
-            df = pd.read_excel(excel_path, dtype=str)
-            self._code_mapping = {}
-
-            for _, row in df.iterrows():
-                # 获取6位数字代码
-                code = str(row.get('提取的6位数字', '')).strip()
-                if code and code not in ['nan', '']:
-                    self._code_mapping[code] = {
-                        'product_name': str(row.get('品名', '')),
-                        'tobacco_code': str(row.get('烟草内部品规代号', '')),
-                        'stack_type_1': str(row.get('垛型_1', '')),
-                        'stack_type_2': str(row.get('垛型_2', '')),
-                    }
-
-            logger.info(f"成功加载 {len(self._code_mapping)} 条烟箱信息")
+            snapshot_path = excel_path.with_suffix(".snapshot.pkl")
+            source_key = self._source_key(excel_path)
+            mapping = self._read_snapshot(snapshot_path, source_key)
+            if mapping is None:
+                mapping = self._parse_excel(excel_path)
+                self._write_snapshot(snapshot_path, source_key, mapping)
+                logger.info(f"成功加载 {len(mapping)} 条烟箱信息")
+            else:
+                logger.info(f"成功加载 {len(mapping)} 条烟箱信息（快照）")
+            self._set_mapping(mapping)
 
         except Exception as e:
             logger.error(f"加载烟箱信息Excel失败: {e}")
-            self._code_mapping = {}
+            self._set_mapping({})
+
+    def _set_mapping(self, mapping: Dict[str, Dict[str, str]]):
+        self._code_mapping = mapping
+        self._index = CaseCodeIndex(mapping)
+
+    @staticmethod
+    def _source_key(excel_path: Path) -> Tuple[int, int]:
+        stat = excel_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _parse_excel(excel_path: Path) -> Dict[str, Dict[str, str]]:
+        """解析Excel，返回 六位码 -> 烟箱信息（按表格顺序，重复代码保留最后一行的信息）"""
+        df = pd.read_excel(excel_path, dtype=str)
+
+        def column(name: str) -> List[str]:
+            return [str(value) for value in df[name].tolist()] if name in df.columns else [''] * len(df)
+
+        mapping = {}
+        for code, product_name, tobacco_code, stack_type_1, stack_type_2 in zip(
+                column('提取的6位数字'), column('品名'), column('烟草内部品规代号'),
+                column('垛型_1'), column('垛型_2')):
+            # 获取6位数字代码
+            code = code.strip()
+            if code and code not in ['nan', '']:
+                mapping[code] = {
+                    'product_name': product_name,
+                    'tobacco_code': tobacco_code,
+                    'stack_type_1': stack_type_1,
+                    'stack_type_2': stack_type_2,
+                }
+        return mapping
+
+    @staticmethod
+    def _read_snapshot(snapshot_path: Path, source_key: Tuple[int, int]) -> Optional[Dict[str, Dict[str, str]]]:
+        """读取快照；不存在、版本不符或Excel已修改时返回None"""
+        if not snapshot_path.exists():
+            return None
+        try:
+            with open(snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"烟箱信息快照读取失败，重新解析Excel: {e}")
+            return None
+        if snapshot.get("version") != _SNAPSHOT_VERSION or tuple(snapshot.get("source", ())) != source_key:
+            return None
+        return snapshot["mapping"]
+
+    @staticmethod
+    def _write_snapshot(snapshot_path: Path, source_key: Tuple[int, int], mapping: Dict[str, Dict[str, str]]):
+        """写入快照（先写临时文件再替换，避免并发启动的进程读到不完整的文件）"""
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": _SNAPSHOT_VERSION, "source": source_key, "mapping": mapping}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, snapshot_path)
+        except OSError as e:
+            logger.warning(f"烟箱信息快照写入失败: {e}")
+            tmp_path.unlink(missing_ok=True)
 
     def _extract_six_digits(self, barcode: str) -> Optional[str]:
         """从条码中提取6位数字（忽略91前缀）"""
@@ -123,15 +251,11 @@ class TobaccoCaseInfoResolver:
 
         result['six_digit_code'] = six_digits
 
-        # 查找匹配的烟箱信息
-        match_data = self._code_mapping.get(six_digits)
-        if not match_data:
-            # 尝试模糊匹配
-            for code in self._code_mapping:
-                if six_digits in code or code in six_digits:
-                    match_data = self._code_mapping[code]
-                    logger.info(f"使用模糊匹配: {six_digits} -> {code}")
-                    break
+        # 查找匹配的烟箱信息（精确匹配，未命中时模糊匹配）
+        code = self._index.lookup(six_digits)
+        match_data = self._code_mapping[code] if code is not None else None
+        if code is not None and code != six_digits:
+            logger.info(f"使用模糊匹配: {six_digits} -> {code}")
 
         if not match_data:
             logger.warning(f"未找到匹配的烟箱信息: {six_digits}")
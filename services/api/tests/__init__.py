@@ -0,0 +1,3 @@
+"""
+网关服务测试模块
+"""
@@ -0,0 +1,188 @@
+"""
+并行抓图与按相机重试（services/api/inventory/service.py）单元测试脚本
+
+抓图触发（trigger_capture）和相机连通性检查由测试内的模拟函数代替，模拟函数在延迟后写入图片。
+
+使用方法:
+    python -m services.api.tests.test_camera_capture
+    或
+    python services/api/tests/test_camera_capture.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+import services.api.shared.config as config
+from services.api.inventory import service
+
+DEVICES = {
+    "3d_camera": {"ip": "10.0.0.1", "streams": [0, 3]},
+    "scan_camera_1": {"ip": "10.0.0.2", "streams": [0]},
+    "scan_camera_2": {"ip": "10.0.0.3", "streams": [0]},
+}
+JPEG = b"\xff\xd8" + b"\x00" * 32 + b"\xff\xd9"
+
+
+@contextmanager
+def _fake_cameras(failures=None, delay=0.05, max_retries=3):
+    """
+    替换抓图触发和相机配置
+
+    :param failures: 相机类型 -> 前几次触发失败
+    :param delay: 每次抓图的耗时（秒）
+    :return: 各相机的触发次数
+    """
+    failures = failures or {}
+    triggers = Counter()
+
+    async def trigger_capture(task_no, bin_location, cameras=None):
+        camera_type = cameras[0]
+        triggers[camera_type] += 1
+        await asyncio.sleep(delay)
+        if triggers[camera_type] <= failures.get(camera_type, 0):
+            raise Exception(f"{camera_type} 抓图失败")
+        image_dir = service.project_root / "capture_img" / task_no / bin_location / camera_type
+        image_dir.mkdir(parents=True, exist_ok=True)
+        for name in service._expected_capture_files(camera_type):
+            (image_dir / name).write_bytes(JPEG)
+
+    patches = [
+        (service, "trigger_capture", trigger_capture),
+        (service, "_ping_camera", lambda host, timeout=3: True),
+        (config, "CAMERA_DEVICES", DEVICES),
+        (config, "CAMERA_MAX_RETRIES", max_retries),
+        (config, "CAMERA_RETRY_INTERVAL", 0.01),
+        (config, "CAMERA_FRAME_TIMEOUT", 0.5),
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        patches.append((service, "project_root", Path(tmp_dir)))
+        originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        for module, name, value in patches:
+            setattr(module, name, value)
+        try:
+            yield triggers
+        finally:
+            for module, name, value in originals:
+                setattr(module, name, value)
+
+
+def test_parallel_capture():
+    """各相机并行抓图，总耗时接近最慢的相机"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 并行抓图")
+    print("="*60)
+
+    with _fake_cameras(delay=0.2) as triggers:
+        start = time.perf_counter()
+        result = asyncio.run(service.capture_images_with_scripts("T1", "A01"))
+        elapsed = time.perf_counter() - start
+
+    if not result["success"] or result["image_count"] != 2 or set(result["cameras"]) != set(DEVICES):
+        print(f"❌ 抓图结果错误: {result}")
+        return False
+    # 串行需要 0.6 秒
+    if elapsed > 0.45 or triggers != Counter({name: 1 for name in DEVICES}):
+        print(f"❌ 未并行抓图: 耗时 {elapsed:.2f}s, 触发次数 {dict(triggers)}")
+        return False
+    print(f"✅ 3 个相机并行抓图，耗时 {elapsed * 1000:.0f}ms")
+    return True
+
+
+def test_retry_failed_camera_only():
+    """失败的相机单独重试，其他相机只触发一次"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 只重试失败的相机")
+    print("="*60)
+
+    with _fake_cameras(failures={"scan_camera_1": 1}) as triggers:
+        result = asyncio.run(service.capture_images_with_scripts("T1", "A01"))
+
+    attempts = {name: r["attempts"] for name, r in result.get("cameras", {}).items()}
+    if not result["success"] or attempts != {"3d_camera": 1, "scan_camera_1": 2, "scan_camera_2": 1}:
+        print(f"❌ 重试结果错误: {result}")
+        return False
+    if triggers != Counter({"3d_camera": 1, "scan_camera_1": 2, "scan_camera_2": 1}):
+        print(f"❌ 触发次数错误: {dict(triggers)}")
+        return False
+    print(f"✅ 各相机尝试次数: {attempts}")
+    return True
+
+
+def test_retries_exhausted():
+    """重试用尽时该相机失败，整体抓图失败并报告失败相机"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 重试用尽")
+    print("="*60)
+
+    with _fake_cameras(failures={"3d_camera": 5}, max_retries=2) as triggers:
+        result = asyncio.run(service.capture_images_with_scripts("T1", "A01"))
+
+    camera = result.get("cameras", {}).get("3d_camera", {})
+    if result["success"] or camera.get("success") or camera.get("attempts") != 2 or triggers["3d_camera"] != 2:
+        print(f"❌ 重试用尽结果错误: {result}, 触发次数 {dict(triggers)}")
+        return False
+    if "3d_camera" not in result["error"] or not result["cameras"]["scan_camera_1"]["success"]:
+        print(f"❌ 失败信息错误: {result['error']}")
+        return False
+    print(f"✅ 3d_camera 尝试 2 次后失败: {camera['error']}")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行并行抓图测试")
+    print("="*60)
+
+    tests = [
+        ("并行抓图测试", test_parallel_capture),
+        ("只重试失败相机测试", test_retry_failed_camera_only),
+        ("重试用尽测试", test_retries_exhausted),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,275 @@
+"""
+相机常驻服务（hardware/cam_sys/camera_daemon.py）与客户端（services/api/shared/camera_client.py）单元测试脚本
+
+相机 SDK（camera_api）由测试内的模拟控制器代替：getCapture 在后台写入以 EOI 结尾的 JPEG。
+
+使用方法:
+    python -m services.api.tests.test_camera_client
+    或
+    python services/api/tests/test_camera_client.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from hardware.cam_sys.camera_daemon import CameraDaemon, STREAM_FILES, make_handler
+from services.api.shared.camera_client import CameraDaemonClient, CameraDaemonUnavailable
+
+DEVICES = {
+    "3d_camera": {"ip": "10.0.0.1", "streams": [0, 3]},
+    "scan_camera_1": {"ip": "10.0.0.2", "streams": [0]},
+}
+
+
+class _FakeSdk:
+    """模拟 camera_api 模块：记录登录次数和调用顺序，抓图时写入图片（broken 中的 IP 不写图片）"""
+
+    def __init__(self, capture_root: Path):
+        self.capture_root = capture_root
+        self.logins = Counter()
+        self.broken = set()
+        self.capture_delay = 0
+        self.events = []
+        sdk = self
+
+        class CamController:
+            def login(self, ip, port, username, password):
+                sdk.logins[ip] += 1
+                self.ip = ip
+                return True
+
+            def setCameraType(self, camera_type):
+                self.camera_type = camera_type
+
+            def startRealPlay(self, channel, stream, *args):
+                self.stream = stream
+                return True
+
+            def setTaskInfo(self, task_no, bin_location):
+                self.task = (task_no, bin_location)
+
+            def getCapture(self):
+                if self.ip in sdk.broken:
+                    time.sleep(sdk.capture_delay)
+                    sdk.events.append(("getCapture", self.ip))
+                    return
+                path = sdk.capture_root.joinpath(*self.task, self.camera_type, STREAM_FILES[self.stream])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(b"\xff\xd8" + b"\x00" * 32 + b"\xff\xd9")
+
+            def stopRealPlay(self):
+                sdk.events.append(("stopRealPlay", self.ip))
+
+            def logout(self):
+                pass
+
+        self.module = types.ModuleType("camera_api")
+        self.module.CamController = CamController
+
+
+class _DaemonServer:
+    """在后台线程中运行相机服务的 HTTP 接口"""
+
+    def __init__(self, daemon: CameraDaemon):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(daemon))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _run(client: CameraDaemonClient, *calls):
+    """在同一个事件循环中依次抓图（连接池绑定创建它的事件循环），结束后关闭客户端"""
+    async def _capture_all():
+        try:
+            return [await client.capture(*args, **kwargs) for args, kwargs in calls]
+        finally:
+            await client.aclose()
+    return asyncio.run(_capture_all())
+
+
+def _with_daemon(test):
+    """创建模拟 SDK、相机服务和客户端，执行 test(sdk, client, capture_root)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture_root = Path(tmp_dir)
+        sdk = _FakeSdk(capture_root)
+        previous = sys.modules.get("camera_api")
+        sys.modules["camera_api"] = sdk.module
+        daemon = CameraDaemon(DEVICES, capture_root=capture_root, timeout=0.3)
+        server = _DaemonServer(daemon)
+        try:
+            return test(sdk, CameraDaemonClient(base_url=server.url, capture_timeout=1), capture_root)
+        finally:
+            server.close()
+            daemon.close()
+            if previous is None:
+                sys.modules.pop("camera_api", None)
+            else:
+                sys.modules["camera_api"] = previous
+
+
+def test_capture_reuses_sessions():
+    """抓图返回各相机的图片，多次抓图只登录一次"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 抓图并复用会话")
+    print("="*60)
+
+    def _test(sdk, client, capture_root):
+        first, second = _run(client, (("T1", "A01"), {}), (("T1", "A02"), {"cameras": ["scan_camera_1"]}))
+        files = sorted(Path(f).relative_to(capture_root).as_posix() for f in first["cameras"]["3d_camera"]["files"])
+        if not first["success"] or files != ["T1/A01/3d_camera/depth.jpg", "T1/A01/3d_camera/main.jpg"]:
+            print(f"❌ 抓图结果错误: {first}")
+            return False
+        if list(second["cameras"]) != ["scan_camera_1"] or not second["success"]:
+            print(f"❌ 指定相机抓图错误: {second}")
+            return False
+        # 3D 相机两个码流各一个会话
+        if sdk.logins != Counter({"10.0.0.1": 2, "10.0.0.2": 1}):
+            print(f"❌ 会话未复用: {dict(sdk.logins)}")
+            return False
+        print(f"✅ 抓图成功，两次抓图共登录 {sum(sdk.logins.values())} 次: {dict(sdk.logins)}")
+        return True
+
+    return _with_daemon(_test)
+
+
+def test_capture_failure_reported():
+    """图片超时未写入时报告该相机失败，下次抓图重新登录"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 抓图失败与重连")
+    print("="*60)
+
+    def _test(sdk, client, capture_root):
+        sdk.broken.add("10.0.0.2")
+        failed, = _run(client, (("T1", "A01"), {}))
+        sdk.broken.clear()
+        recovered, = _run(client, (("T1", "A01"), {"cameras": ["scan_camera_1"]}))
+        cameras = failed["cameras"]
+        if failed["success"] or not cameras["3d_camera"]["success"] or cameras["scan_camera_1"]["success"]:
+            print(f"❌ 失败结果错误: {failed}")
+            return False
+        if not recovered["success"] or sdk.logins["10.0.0.2"] != 2:
+            print(f"❌ 未重新登录: {recovered}, logins={dict(sdk.logins)}")
+            return False
+        print(f"✅ 失败相机: {cameras['scan_camera_1']['error']}；重新登录后抓图成功")
+        return True
+
+    return _with_daemon(_test)
+
+
+def test_close_waits_for_capture():
+    """抓图超时关闭会话时，等 getCapture 返回后才停止预览"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 关闭会话等待取帧线程")
+    print("="*60)
+
+    def _test(sdk, client, capture_root):
+        sdk.broken.add("10.0.0.2")
+        # getCapture 比等待图片的超时（0.3 秒）晚返回
+        sdk.capture_delay = 0.6
+        failed, = _run(client, (("T1", "A01"), {"cameras": ["scan_camera_1"]}))
+        events = [name for name, ip in sdk.events if ip == "10.0.0.2"]
+        if failed["success"] or events != ["getCapture", "stopRealPlay"]:
+            print(f"❌ 关闭顺序错误: {events}, {failed}")
+            return False
+        print(f"✅ 调用顺序: {' → '.join(events)}")
+        return True
+
+    return _with_daemon(_test)
+
+
+def test_errors():
+    """未知相机返回参数错误，服务未启动时抛出 CameraDaemonUnavailable"""
+    print("\n" + "="*60)
+    print("🧪 测试4: 错误处理")
+    print("="*60)
+
+    def _test(sdk, client, capture_root):
+        try:
+            _run(client, (("T1", "A01"), {"cameras": ["no_such_camera"]}))
+            return None
+        except ValueError as e:
+            return str(e)
+
+    unknown_error = _with_daemon(_test)
+    if not unknown_error or "no_such_camera" not in unknown_error:
+        print(f"❌ 未知相机应返回参数错误: {unknown_error}")
+        return False
+
+    # 取一个未监听的端口
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(None))
+    port = server.server_address[1]
+    server.server_close()
+    try:
+        _run(CameraDaemonClient(base_url=f"http://127.0.0.1:{port}"), (("T1", "A01"), {}))
+        print("❌ 服务未启动时应抛出 CameraDaemonUnavailable")
+        return False
+    except CameraDaemonUnavailable:
+        pass
+    print(f"✅ 未知相机: {unknown_error}；服务未启动时抛出 CameraDaemonUnavailable")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行相机服务客户端测试")
+    print("="*60)
+
+    tests = [
+        ("抓图并复用会话测试", test_capture_reuses_sessions),
+        ("抓图失败与重连测试", test_capture_failure_reported),
+        ("关闭会话等待取帧线程测试", test_close_waits_for_capture),
+        ("错误处理测试", test_errors),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
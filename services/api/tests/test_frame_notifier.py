@@ -0,0 +1,171 @@
+"""
+抓图帧到达通知（services/api/shared/frame_notifier.py）单元测试脚本
+
+使用方法:
+    python -m services.api.tests.test_frame_notifier
+    或
+    python services/api/tests/test_frame_notifier.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from services.api.shared.frame_notifier import FrameNotifier, FrameTimeout, JPEG_EOI
+
+JPEG_BODY = b"\xff\xd8" + b"\x00" * 64
+
+
+def _notifiers():
+    """inotify 和轮询两种模式（inotify 不可用时两者都是轮询）"""
+    return [FrameNotifier(), FrameNotifier(poll_interval=0.02, use_inotify=False)]
+
+
+def test_frames_arrive():
+    """图片分次写入，写完（JPEG 以 EOI 结尾）后立即返回"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 图片到达")
+    print("="*60)
+
+    async def _write(directory: Path):
+        await asyncio.sleep(0.05)
+        (directory / "main.jpg").write_bytes(JPEG_BODY)
+        await asyncio.sleep(0.05)
+        with open(directory / "main.jpg", "ab") as f:
+            f.write(JPEG_EOI)
+        (directory / "depth.jpg").write_bytes(JPEG_BODY + JPEG_EOI)
+
+    async def _run(notifier: FrameNotifier, directory: Path):
+        writer = asyncio.create_task(_write(directory))
+        start = time.monotonic()
+        arrived = await notifier.wait_for_files(directory, ["main.jpg", "depth.jpg"], timeout=2)
+        await writer
+        return arrived, time.monotonic() - start
+
+    for notifier in _notifiers():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # 目录由等待方创建（抓图程序写入同一目录）
+            directory = Path(tmp_dir) / "3d_camera"
+            arrived, elapsed = asyncio.run(_run(notifier, directory))
+            if sorted(arrived) != ["depth.jpg", "main.jpg"] or elapsed > 1:
+                print(f"❌ {notifier.mode} 模式等待结果错误: {arrived}, 耗时 {elapsed:.2f}s")
+                return False
+            print(f"✅ {notifier.mode} 模式: {sorted(arrived)}, 耗时 {elapsed * 1000:.0f}ms")
+    return True
+
+
+def test_stale_frames():
+    """since 之前写入的旧图片不计入，重新写入后返回"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 旧图片不计入")
+    print("="*60)
+
+    async def _run(notifier: FrameNotifier, directory: Path, since: float):
+        try:
+            await notifier.wait_for_files(directory, ["main.jpg"], timeout=0.2, since=since)
+            return None, None
+        except FrameTimeout as e:
+            missing = e.missing
+
+        async def _rewrite():
+            await asyncio.sleep(0.05)
+            (directory / "main.jpg").write_bytes(JPEG_BODY + JPEG_EOI)
+
+        writer = asyncio.create_task(_rewrite())
+        arrived = await notifier.wait_for_files(directory, ["main.jpg"], timeout=2, since=since)
+        await writer
+        return missing, arrived
+
+    for notifier in _notifiers():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            directory = Path(tmp_dir)
+            stale = directory / "main.jpg"
+            stale.write_bytes(JPEG_BODY + JPEG_EOI)
+            os.utime(stale, (time.time() - 60, time.time() - 60))
+            missing, arrived = asyncio.run(_run(notifier, directory, time.time()))
+            if missing != ["main.jpg"] or not arrived:
+                print(f"❌ {notifier.mode} 模式旧图片判定错误: missing={missing}, arrived={arrived}")
+                return False
+            print(f"✅ {notifier.mode} 模式: 旧图片超时，重新写入后到达")
+    return True
+
+
+def test_incomplete_frame_timeout():
+    """JPEG 未写完（缺少 EOI）时超时，报告缺失的文件"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 未写完的图片超时")
+    print("="*60)
+
+    for notifier in _notifiers():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            directory = Path(tmp_dir)
+            (directory / "main.jpg").write_bytes(JPEG_BODY)
+            (directory / "depth.jpg").write_bytes(JPEG_BODY + JPEG_EOI)
+            try:
+                asyncio.run(notifier.wait_for_files(directory, ["main.jpg", "depth.jpg"], timeout=0.2))
+                print(f"❌ {notifier.mode} 模式未写完的图片不应计入")
+                return False
+            except FrameTimeout as e:
+                if e.missing != ["main.jpg"]:
+                    print(f"❌ {notifier.mode} 模式缺失文件错误: {e.missing}")
+                    return False
+            print(f"✅ {notifier.mode} 模式: 未写完的 main.jpg 超时")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行抓图帧到达通知测试")
+    print("="*60)
+
+    tests = [
+        ("图片到达测试", test_frames_arrive),
+        ("旧图片不计入测试", test_stale_frames),
+        ("未写完图片超时测试", test_incomplete_frame_timeout),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
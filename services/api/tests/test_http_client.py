@@ -0,0 +1,250 @@
+"""
+外部系统 HTTP 客户端（services/api/shared/http_client.py、rcs_client.py）单元测试脚本
+
+使用方法:
+    python -m services.api.tests.test_http_client
+    或
+    python services/api/tests/test_http_client.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from services.api.shared.http_client import AsyncHttpClient, CircuitBreaker, UpstreamUnavailable
+from services.api.shared.rcs_client import RcsClient
+
+
+def _mock_client(client: AsyncHttpClient, handler) -> AsyncHttpClient:
+    """用 MockTransport 替换连接池，退避时间缩短"""
+    client.backoff_base = 0.001
+    client.backoff_max = 0.001
+    client._client = httpx.AsyncClient(base_url=client.base_url or "http://upstream",
+                                       transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_breaker_transitions():
+    """熔断器：closed → open → half_open →（试探失败）open →（试探成功）closed"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 熔断器状态转换")
+    print("="*60)
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    states = [breaker.state]
+    opened = [breaker.record_failure(), breaker.record_failure()]
+    states.append(breaker.state)
+    blocked = not breaker.allow()
+    time.sleep(0.06)
+    states.append(breaker.state)
+    probe_allowed = breaker.allow()
+    # 试探请求在途时不再放行其他请求
+    second_blocked = not breaker.allow()
+    reopened = breaker.record_failure()
+    states.append(breaker.state)
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    states.append(breaker.state)
+
+    expected = ["closed", "open", "half_open", "open", "closed"]
+    if (states != expected or opened != [False, True] or not blocked or not probe_allowed
+            or not second_blocked or reopened):
+        print(f"❌ 状态转换错误: states={states}, opened={opened}, blocked={blocked}, "
+              f"probe={probe_allowed}, second_blocked={second_blocked}, reopened={reopened}")
+        return False
+    print(f"✅ 状态转换正确: {' → '.join(states)}")
+    return True
+
+
+def test_client_circuit_open():
+    """连续 5xx 后熔断：剩余重试和后续请求都不再发出"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 客户端熔断")
+    print("="*60)
+
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    async def _run():
+        client = _mock_client(AsyncHttpClient("test", breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60)),
+                              handler)
+        rejected = []
+        for _ in range(2):
+            try:
+                await client.request("GET", "/bins", retries=3)
+                rejected.append(False)
+            except UpstreamUnavailable:
+                rejected.append(True)
+        await client.aclose()
+        return rejected, client.status()
+
+    rejected, status = asyncio.run(_run())
+    if rejected != [True, True] or len(calls) != 2 or status["circuit"] != "open":
+        print(f"❌ 熔断错误: rejected={rejected}, calls={len(calls)}, {status}")
+        return False
+    print(f"✅ 2 次 503 后熔断，剩余重试和后续请求未发出: {status}")
+    return True
+
+
+def test_non_idempotent_retry():
+    """非幂等请求：超时和 5xx 不重试，连接失败重试；幂等请求 5xx 重试"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 非幂等请求的重试")
+    print("="*60)
+
+    def scripted(*outcomes):
+        calls = []
+
+        def handler(request):
+            outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+            calls.append(request.method)
+            if isinstance(outcome, type):
+                raise outcome("mock", request=request)
+            return httpx.Response(outcome)
+        return calls, handler
+
+    async def _call(method, *outcomes):
+        calls, handler = scripted(*outcomes)
+        client = _mock_client(AsyncHttpClient("test"), handler)
+        try:
+            result = (await client.request(method, "/task", retries=2)).status_code
+        except httpx.TransportError as e:
+            result = type(e).__name__
+        await client.aclose()
+        return result, len(calls)
+
+    async def _run():
+        return {
+            "POST 超时": await _call("POST", httpx.ReadTimeout, 200),
+            "POST 500": await _call("POST", 500, 200),
+            "POST 连接失败": await _call("POST", httpx.ConnectError, 200),
+            "GET 500": await _call("GET", 500, 200),
+        }
+
+    results = asyncio.run(_run())
+    expected = {
+        "POST 超时": ("ReadTimeout", 1),
+        "POST 500": (500, 1),
+        "POST 连接失败": (200, 2),
+        "GET 500": (200, 2),
+    }
+    if results != expected:
+        print(f"❌ 重试判定错误: {results}")
+        return False
+    for name, (result, calls) in results.items():
+        print(f"✅ {name}: 结果 {result}, 请求 {calls} 次")
+    return True
+
+
+def test_rcs_submit_retry():
+    """RCS 下发：业务失败重试（沿用请求 ID、计为熔断失败），超时不重试"""
+    print("\n" + "="*60)
+    print("🧪 测试4: RCS 下发重试")
+    print("="*60)
+
+    def make_handler(*outcomes):
+        request_ids = []
+
+        def handler(request):
+            outcome = outcomes[min(len(request_ids), len(outcomes) - 1)]
+            request_ids.append(request.headers.get("X-LR-REQUEST-ID"))
+            if outcome == "timeout":
+                raise httpx.ReadTimeout("mock", request=request)
+            if outcome == "reject":
+                return httpx.Response(200, json={"code": "ERROR", "message": "busy", "errorCode": "E1"})
+            return httpx.Response(200, json={"code": "SUCCESS", "data": {"robotTaskCode": "R1"}})
+        return request_ids, handler
+
+    async def _run():
+        rejected_ids, handler = make_handler("reject", "ok")
+        client = _mock_client(RcsClient(is_sim=False, real_config={"host": "rcs", "use_ssl": False}), handler)
+        failures = []
+        original = client._record_failure
+
+        def _record_failure():
+            failures.append(client.breaker.failures)
+            original()
+
+        client._record_failure = _record_failure
+        retried = await client.submit_task(["A01"], max_retries=3)
+        await client.aclose()
+
+        timeout_ids, handler = make_handler("timeout", "ok")
+        client = _mock_client(RcsClient(is_sim=False, real_config={"host": "rcs", "use_ssl": False}), handler)
+        timed_out = await client.submit_task(["A01"], max_retries=3)
+        await client.aclose()
+        return retried, rejected_ids, failures, timed_out, timeout_ids
+
+    retried, rejected_ids, failures, timed_out, timeout_ids = asyncio.run(_run())
+    if (not retried["success"] or len(rejected_ids) != 2 or len(set(rejected_ids)) != 1
+            or failures != [0]):
+        print(f"❌ 业务失败重试错误: {retried}, request_ids={rejected_ids}, failures={failures}")
+        return False
+    if timed_out["success"] or len(timeout_ids) != 1 or "超时" not in timed_out["error"]:
+        print(f"❌ 超时后不应重试: {timed_out}, 请求 {len(timeout_ids)} 次")
+        return False
+    print(f"✅ 业务失败后重试成功（同一请求 ID，计 1 次熔断失败）；超时只请求 1 次: {timed_out['error'].strip()}")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行外部系统 HTTP 客户端测试")
+    print("="*60)
+
+    tests = [
+        ("熔断器状态转换测试", test_breaker_transitions),
+        ("客户端熔断测试", test_client_circuit_open),
+        ("非幂等请求重试测试", test_non_idempotent_retry),
+        ("RCS 下发重试测试", test_rcs_submit_retry),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
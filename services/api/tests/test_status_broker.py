@@ -0,0 +1,172 @@
+"""
+机器人状态分发（services/api/robot/status_broker.py）单元测试脚本
+
+使用方法:
+    python -m services.api.tests.test_status_broker
+    或
+    python services/api/tests/test_status_broker.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from services.api.robot.status_broker import RobotStatusBroker
+
+
+def test_replay_before_subscribe():
+    """订阅之前到达的状态回放给等待方"""
+    print("\n" + "="*60)
+    print("🧪 测试1: 订阅前到达的状态回放")
+    print("="*60)
+
+    async def _run():
+        broker = RobotStatusBroker()
+        broker.bind("R1", "A01")
+        broker.publish("end", {"x": 1}, robot_task_code="R1")
+        return await broker.wait_for("end", robot_task_code="R1", timeout=1)
+
+    event = asyncio.run(_run())
+    if event["robotTaskCode"] != "R1" or event["binLocation"] != "A01" or event["data"] != {"x": 1}:
+        print(f"❌ 回放状态错误: {event}")
+        return False
+    print(f"✅ 回放正确: {event['method']} / {event['binLocation']}")
+    return True
+
+
+def test_task_isolation():
+    """不同任务的状态互不影响，不带任务编号的状态不通知按任务等待的一方"""
+    print("\n" + "="*60)
+    print("🧪 测试2: 任务间隔离")
+    print("="*60)
+
+    async def _run():
+        broker = RobotStatusBroker()
+        broker.bind("R1", "A01")
+        broker.bind("R2", "A02")
+        wait_r1 = asyncio.create_task(broker.wait_for("end", robot_task_code="R1", timeout=1))
+        wait_r2 = asyncio.create_task(broker.wait_for("end", robot_task_code="R2", timeout=1))
+        await asyncio.sleep(0)
+        broker.publish("end", robot_task_code="R2")
+        broker.publish("end")  # 不带任务编号，且无法按储位归属
+        first = await wait_r2
+        await asyncio.sleep(0.05)
+        r1_pending = not wait_r1.done()
+        broker.publish("outbin", robot_task_code="R1")
+        broker.publish("end", robot_task_code="R1")
+        second = await wait_r1
+        return first, r1_pending, second
+
+    first, r1_pending, second = asyncio.run(_run())
+    if first["robotTaskCode"] != "R2" or not r1_pending or second["robotTaskCode"] != "R1":
+        print(f"❌ 隔离错误: R2={first}, R1等待中={r1_pending}, R1={second}")
+        return False
+    print("✅ 任务间隔离正确")
+    return True
+
+
+def test_unregistered_code_fallback():
+    """回调任务编号未登记时按储位归属；无法归属时在回退后才计入"""
+    print("\n" + "="*60)
+    print("🧪 测试3: 任务编号不一致时的回退")
+    print("="*60)
+
+    async def _run():
+        broker = RobotStatusBroker()
+        broker.bind("R1", "A01")
+        broker.bind("R2", "A02")
+        # 回调带的任务编号未登记，但 values 中有储位
+        broker.publish("end", {"binCode": "A01"}, robot_task_code="RCS-999")
+        by_bin = await broker.wait_for("end", robot_task_code="R1", timeout=1)
+
+        # 无法归属：回退前不计入，回退后计入；其他任务的状态始终不计入
+        waiter = asyncio.create_task(
+            broker.wait_for("end", robot_task_code="R2", timeout=2, fallback_after=0.2))
+        await asyncio.sleep(0)
+        broker.publish("end", robot_task_code="R1")
+        broker.publish("end", robot_task_code="RCS-998")
+        await asyncio.sleep(0.1)
+        early = waiter.done()
+        fallback = await waiter
+        return by_bin, early, fallback
+
+    by_bin, early, fallback = asyncio.run(_run())
+    if by_bin["robotTaskCode"] != "R1" or early or fallback["robotTaskCode"] != "RCS-998" or fallback["attributed"]:
+        print(f"❌ 回退错误: 按储位={by_bin}, 提前返回={early}, 回退={fallback}")
+        return False
+    print("✅ 按储位归属和超时回退正确")
+    return True
+
+
+def test_trim_channels():
+    """超过通道上限时丢弃最早的空闲通道，保留有订阅方的通道和全局通道"""
+    print("\n" + "="*60)
+    print("🧪 测试4: 通道裁剪")
+    print("="*60)
+
+    broker = RobotStatusBroker(max_channels=3)
+    with broker.subscribe("R0"):
+        for i in range(5):
+            broker.publish("end", robot_task_code=f"R{i}")
+        channels = list(broker.status())
+    if len(channels) != 3 or "R0" not in channels or "global" not in channels or "R4" not in channels:
+        print(f"❌ 裁剪错误: {channels}")
+        return False
+    print(f"✅ 通道裁剪正确: {channels}")
+    return True
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 开始运行机器人状态分发测试")
+    print("="*60)
+
+    tests = [
+        ("订阅前状态回放测试", test_replay_before_subscribe),
+        ("任务间隔离测试", test_task_isolation),
+        ("任务编号不一致回退测试", test_unregistered_code_fallback),
+        ("通道裁剪测试", test_trim_channels),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n❌ 测试 '{name}' 执行异常: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    # 汇总结果
+    print("\n" + "="*60)
+    print("📊 测试结果汇总")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for name, result in results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"{status} - {name}")
+
+    print(f"\n总计: {passed}/{total} 测试通过")
+
+    if passed == total:
+        print("🎉 所有测试通过！")
+        return 0
+    else:
+        print("⚠️  部分测试失败")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
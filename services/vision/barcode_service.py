@@ -0,0 +1,356 @@
+"""
+条码解码服务
+功能：
+1. 常驻解码工作进程（启动时创建解码器并构建好运行环境，后续图片复用），通过管道收发任务
+2. 提供 async decode(images) 接口：多张图片分发到各工作进程并行解码
+3. 单张图片超时或工作进程崩溃时，该图片返回错误结果并重启对应的工作进程
+4. 两个扫码相机的图片合并为一次解码请求，不再按目录串行处理
+5. 可选条码区域裁剪：工作进程用 YOLO 检测 barcode 框，只解码裁剪区域，未检测到时回退到整图
+6. 流式解码 decode_stream：按完成顺序逐个返回结果，调用方得到所需结果后关闭即可取消剩余解码
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from pathlib import Path
+from itertools import chain, zip_longest
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 主进程等待结果的额外宽限时间（秒），工作进程内部的超时优先触发
+_TIMEOUT_GRACE = 5.0
+
+# 工作进程启动（导入模块、创建解码器）的超时时间（秒），不计入单张图片的解码超时
+_STARTUP_TIMEOUT = 60.0
+
+
+# ==================== 工作进程侧函数 ====================
+
+def _create_roi_decoder(decoder, roi_config: Dict, detector_config: Optional[Dict]):
+    """为解码器增加条码区域裁剪；检测模型不可用时返回原解码器（整图解码）"""
+    try:
+        from core.detection.utils.model_registry import get_model_registry
+        from core.vision.barcode_roi import BarcodeRoiDecoder
+        if detector_config:
+            get_model_registry().configure_detector(**detector_config)
+        return BarcodeRoiDecoder(decoder, **roi_config)
+    except Exception as e:
+        logger.warning(f"[BarcodeWorker] pid={os.getpid()} 条码区域检测不可用，使用整图解码: {e}")
+        return decoder
+
+
+def _worker_main(conn, backend: str, barcode_reader_path: Optional[str], timeout: float,
+                 roi_config: Optional[Dict] = None, detector_config: Optional[Dict] = None):
+    """
+    解码工作进程主循环：就绪后先发送 "ready"，之后接收 (image_path, code_type)，返回识别结果；
+    收到 None 或管道关闭时退出
+    """
+    from core.vision.barcode_recognizer import create_barcode_decoder
+
+    init_error = ""
+    try:
+        decoder = create_barcode_decoder(backend, barcode_reader_path=barcode_reader_path)
+    except Exception as e:
+        # 解码器无法创建（工具缺失等），把错误返回给每个请求，避免主进程反复重启
+        decoder = None
+        init_error = f"条码解码器初始化失败: {e}"
+        logger.error(f"[BarcodeWorker] pid={os.getpid()} {init_error}")
+    if decoder is not None and roi_config is not None:
+        decoder = _create_roi_decoder(decoder, roi_config, detector_config)
+    conn.send("ready")
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        image_path, code_type = task
+        if decoder is None:
+            result = {"filename": os.path.basename(image_path), "output": "", "error": init_error}
+        else:
+            result = decoder.decode_image(image_path, code_type=code_type, timeout=timeout)
+        conn.send(result)
+    conn.close()
+
+
+# ==================== 主进程侧 ====================
+
+class _DecodeWorker:
+    """单个常驻解码进程（同一时间只处理一个请求）"""
+
+    def __init__(self, index: int, backend: str, barcode_reader_path: Optional[str], timeout: float,
+                 roi_config: Optional[Dict] = None, detector_config: Optional[Dict] = None):
+        self.index = index
+        self.backend = backend
+        self.barcode_reader_path = barcode_reader_path
+        self.timeout = timeout
+        self.roi_config = roi_config
+        self.detector_config = detector_config
+        self.restarts = 0
+        self._process = None
+        self._conn = None
+        self._ready = False
+
+    def start(self):
+        """启动工作进程（使用 spawn 方式，避免 fork 网关进程的线程状态）"""
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.backend, self.barcode_reader_path, self.timeout,
+                  self.roi_config, self.detector_config),
+            name=f"barcode-worker-{self.index}",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+
+    def _wait_ready(self):
+        """等待工作进程完成初始化（首个请求前调用一次）"""
+        if self._ready:
+            return
+        if not self._conn.poll(_STARTUP_TIMEOUT):
+            raise TimeoutError(f"解码进程启动超时（{_STARTUP_TIMEOUT}s）")
+        self._conn.recv()
+        self._ready = True
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def request(self, image_path: str, code_type: str) -> Dict[str, Any]:
+        """
+        发送一张图片并阻塞等待结果（在线程中调用）
+
+        :raises TimeoutError: 超时未返回
+        :raises EOFError: 工作进程已退出
+        """
+        if not self.is_alive():
+            raise EOFError("解码进程已退出")
+        self._wait_ready()
+        self._conn.send((image_path, code_type))
+        if not self._conn.poll(self.timeout + _TIMEOUT_GRACE):
+            raise TimeoutError(f"解码超时（{self.timeout}s）")
+        return self._conn.recv()
+
+    def restart(self):
+        """强制结束并重新启动工作进程"""
+        self.stop(graceful=False)
+        self.restarts += 1
+        self.start()
+        logger.warning(f"[BarcodeService] 解码进程 {self.index} 已重启（累计 {self.restarts} 次）")
+
+    def stop(self, graceful: bool = True):
+        """停止工作进程"""
+        process, conn = self._process, self._conn
+        self._process, self._conn = None, None
+        if process is None:
+            return
+        if graceful and process.is_alive():
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=2)
+        if process.is_alive():
+            process.kill()
+            process.join(timeout=2)
+        if conn is not None:
+            conn.close()
+
+
+class BarcodeDecodeService:
+    """条码解码服务：常驻解码进程池 + async 接口"""
+
+    def __init__(self, workers: int = 2, timeout: float = 30.0, backend: str = "cli",
+                 barcode_reader_path: Optional[str] = None, roi_config: Optional[Dict] = None,
+                 detector_config: Optional[Dict] = None):
+        """
+        :param workers: 解码进程数量
+        :param timeout: 单张图片解码超时（秒）
+        :param backend: 解码后端（"cli" / "zxing"）
+        :param barcode_reader_path: BarcodeReaderCLI 路径（可选，默认使用 shared/tools 下的工具）
+        :param roi_config: 条码区域裁剪参数（传给 BarcodeRoiDecoder，None 表示整图解码）
+        :param detector_config: 检测器后端配置（传给 ModelRegistry.configure_detector）
+        """
+        self.workers = max(1, int(workers))
+        self.timeout = float(timeout)
+        self.backend = backend
+        self.barcode_reader_path = barcode_reader_path
+        self.roi_config = roi_config
+        self.detector_config = detector_config
+        self._workers: List[_DecodeWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动解码进程（重复调用无副作用）"""
+        with self._lock:
+            if self._workers:
+                return
+            self._workers = [
+                _DecodeWorker(i, self.backend, self.barcode_reader_path, self.timeout,
+                              self.roi_config, self.detector_config)
+                for i in range(self.workers)
+            ]
+            for worker in self._workers:
+                worker.start()
+            logger.info(f"[BarcodeService] 解码进程已启动: workers={self.workers}, backend={self.backend}")
+
+    def shutdown(self):
+        """停止所有解码进程"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle, self._loop = None, None
+        for worker in workers:
+            worker.stop()
+        if workers:
+            logger.info("[BarcodeService] 解码进程已关闭")
+
+    def _idle_queue(self) -> asyncio.Queue:
+        """空闲工作进程队列（绑定到当前事件循环）"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        if self._idle is None or self._loop is not loop:
+            self._idle, self._loop = asyncio.Queue(), loop
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+        return self._idle
+
+    async def _request(self, worker: _DecodeWorker, image_path: str, code_type: str) -> Dict[str, Any]:
+        try:
+            if not worker.is_alive():
+                # 空闲期间退出的进程先重启，不影响本次解码
+                await asyncio.to_thread(worker.restart)
+            return await asyncio.to_thread(worker.request, image_path, code_type)
+        except (TimeoutError, EOFError, OSError) as e:
+            logger.error(f"[BarcodeService] 解码失败 - 图片: {image_path}, 错误: {e}")
+            await asyncio.to_thread(worker.restart)
+            return {"filename": os.path.basename(image_path), "output": "", "error": f"识别失败: {e}"}
+
+    async def _decode_one(self, idle: asyncio.Queue, image_path: str, code_type: str) -> Dict[str, Any]:
+        worker = await idle.get()
+        # 请求发出后不能中途撤回：被取消时在后台等本次解码结束再放回空闲队列，避免下个请求收到旧结果
+        task = asyncio.ensure_future(self._request(worker, image_path, code_type))
+        task.add_done_callback(lambda _: idle.put_nowait(worker))
+        return await asyncio.shield(task)
+
+    async def decode(self, images: List[Union[str, Path]], code_type: str = "ucc128") -> List[Dict[str, Any]]:
+        """
+        并行解码多张图片
+
+        :param images: 图片路径列表
+        :param code_type: 条码类型
+        :return: 识别结果列表（与 images 顺序一致）[ { "filename": str, "output": str, "error": str }, ... ]
+        """
+        if not images:
+            return []
+        idle = self._idle_queue()
+        return list(await asyncio.gather(
+            *[self._decode_one(idle, str(image), code_type) for image in images]
+        ))
+
+    async def decode_stream(self, images: List[Union[str, Path]],
+                            code_type: str = "ucc128") -> AsyncIterator[Dict[str, Any]]:
+        """
+        并行解码多张图片，按完成顺序逐个返回结果
+
+        提前结束时调用 aclose()：尚未开始的解码被取消，正在解码的图片在后台完成后释放工作进程
+
+        :param images: 图片路径列表
+        :param code_type: 条码类型
+        """
+        if not images:
+            return
+        idle = self._idle_queue()
+        tasks = [asyncio.ensure_future(self._decode_one(idle, str(image), code_type)) for image in images]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def scan_images(scan_dirs: List[Union[str, Path]], interleave: bool = False) -> List[str]:
+        """
+        列出多个扫码相机目录中的图片
+
+        :param scan_dirs: 扫码相机图片目录列表（不存在的目录会被跳过）
+        :param interleave: 是否按相机轮流排列（流式解码时让各相机的图片同时开始解码）
+        """
+        from core.vision.barcode_recognizer import list_barcode_images
+
+        per_dir = [list_barcode_images(str(scan_dir)) for scan_dir in scan_dirs]
+        if not interleave:
+            return list(chain.from_iterable(per_dir))
+        return [image for group in zip_longest(*per_dir) for image in group if image is not None]
+
+    async def decode_dirs(self, scan_dirs: List[Union[str, Path]], code_type: str = "ucc128") -> List[Dict[str, Any]]:
+        """
+        解码多个扫码相机目录中的图片（所有目录的图片一起并行解码，结果按目录顺序排列）
+
+        :param scan_dirs: 扫码相机图片目录列表（不存在的目录会被跳过）
+        :param code_type: 条码类型
+        """
+        return await self.decode(self.scan_images(scan_dirs), code_type=code_type)
+
+    def status(self) -> Dict:
+        """返回服务状态"""
+        return {
+            "running": bool(self._workers),
+            "backend": self.backend,
+            "workers": self.workers,
+            "timeout": self.timeout,
+            "roi": self.roi_config is not None,
+            "alive": sum(1 for worker in self._workers if worker.is_alive()),
+            "restarts": sum(worker.restarts for worker in self._workers),
+        }
+
+
+# 全局单例实例
+_barcode_service: Optional[BarcodeDecodeService] = None
+
+
+def get_barcode_service() -> BarcodeDecodeService:
+    """获取全局BarcodeDecodeService实例（单例模式）"""
+    global _barcode_service
+    if _barcode_service is None:
+        from services.api.shared.config import (
+            BARCODE_BACKEND,
+            BARCODE_WORKERS,
+            BARCODE_TIMEOUT,
+            BARCODE_ROI_ENABLED,
+            BARCODE_ROI_CONF,
+            BARCODE_ROI_PAD_RATIO,
+            BARCODE_ROI_DESKEW,
+            BARCODE_ROI_MIN_SIDE,
+            DETECTOR_BACKEND,
+            DETECTOR_MODEL_PATH,
+            DETECTOR_NUM_THREADS,
+        )
+        roi_config = {
+            "conf": BARCODE_ROI_CONF,
+            "pad_ratio": BARCODE_ROI_PAD_RATIO,
+            "deskew_enabled": BARCODE_ROI_DESKEW,
+            "min_side": BARCODE_ROI_MIN_SIDE,
+        } if BARCODE_ROI_ENABLED else None
+        _barcode_service = BarcodeDecodeService(
+            workers=BARCODE_WORKERS,
+            timeout=BARCODE_TIMEOUT,
+            backend=BARCODE_BACKEND,
+            roi_config=roi_config,
+            detector_config={
+                "backend": DETECTOR_BACKEND,
+                "model_path": DETECTOR_MODEL_PATH,
+                "num_threads": DETECTOR_NUM_THREADS,
+            }
+        )
+    return _barcode_service
@@ -10,15 +10,14 @@ import os
 import shutil
 from pathlib import Path
 from typing import Dict, Optional, Tuple
-from ultralytics import YOLO
 import logging
 
-from core.detection.utils.yolo_utils import extract_yolo_detections
+from core.detection.utils.image_context import load_image
 from core.detection.core.scene_prepare import prepare_logic
 from core.detection.core.layer_filter import remove_fake_top_layer
 from core.detection.core.layer_clustering import cluster_layers_with_box_roi
 from core.detection.processors.factory import StackProcessorFactory
-from core.detection.utils.pile_db import PileTypeDatabase
+from core.detection.utils.model_registry import get_model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -36,16 +35,13 @@ class BoxCountService:
         """
         初始化箱体计数服务
         
-        :param model_path: YOLO模型路径，默认使用 shared/models/yolo/best.pt
+        :param model_path: 检测模型路径，默认使用 config.json 中 detector 配置的模型（未配置时为 shared/models/yolo/best.pt）
         :param pile_config_path: 堆垛配置路径，默认使用 core/config/pile_config.json
         :param work_dir: 工作目录，用于保存临时图片和处理结果
         :param confidence_threshold: 置信度阈值
         """
-        # 设置默认路径
-        if model_path is None:
-            project_root = Path(__file__).resolve().parent.parent.parent
-            model_path = project_root / "shared" / "models" / "yolo" / "best.pt"
-        self.model_path = str(model_path)
+        # 设置默认路径（未指定模型时使用注册表配置的检测模型）
+        self.model_path = str(model_path) if model_path is not None else None
         
         if pile_config_path is None:
             project_root = Path(__file__).resolve().parent.parent.parent
@@ -60,12 +56,13 @@ class BoxCountService:
         
         self.confidence_threshold = confidence_threshold
         
-        # 初始化模型和数据库
-        logger.info(f"加载YOLO模型: {self.model_path}")
-        self.model = YOLO(self.model_path)
+        # 初始化模型和数据库（从进程级模型注册表获取共享实例）
+        registry = get_model_registry()
+        self.detector, self.detector_lock = registry.get_detector_and_lock(self.model_path)
+        logger.info(f"获取检测器: backend={self.detector.name}, model={self.detector.model_path}")
         
-        logger.info(f"加载堆垛配置: {self.pile_config_path}")
-        self.pile_db = PileTypeDatabase(self.pile_config_path)
+        logger.info(f"获取堆垛配置: {self.pile_config_path}")
+        self.pile_db = registry.get_pile_db(self.pile_config_path)
         
         # 初始化处理器工厂
         self.processor_factory = StackProcessorFactory(enable_debug=False)
@@ -150,14 +147,13 @@ class BoxCountService:
             logger.info(f"开始检测图片: {image_path} (任务ID: {task_id})")
             
             # Step 1: YOLO 检测
-            results = self.model.predict(
-                source=str(image_path),
-                save=False,
-                conf=self.confidence_threshold
-            )
+            image = load_image(image_path)
+            if image is None:
+                raise FileNotFoundError(f"无法读取图片: {image_path}")
+            with self.detector_lock:
+                detections = self.detector.detect([image], conf=self.confidence_threshold)[0]
             
-            # Step 2: 提取检测结果
-            detections = extract_yolo_detections(results)
+            # Step 2: 检测结果（后端已转换为统一格式）
             logger.info(f"YOLO检测到 {len(detections)} 个对象")
             
             if not detections:
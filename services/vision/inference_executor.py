@@ -0,0 +1,371 @@
+"""
+推理执行器
+功能：
+1. 在独立的进程池中执行箱体计数（YOLO + 深度计算），避免阻塞 asyncio 事件循环（条码解码见 barcode_service）
+2. 工作进程启动时预加载模型（通过模型注册表），后续任务复用已加载的模型
+3. 提供 async 提交/等待接口，并限制排队任务数量（超出时直接拒绝）
+4. 批量计数：YOLO在一个工作进程中按批次推理，后处理分发到各工作进程
+5. 计数任务返回各阶段追踪结果，在网关进程中汇总为 Prometheus 指标
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFullError(RuntimeError):
+    """推理队列已满（排队任务数超过上限）"""
+
+
+# ==================== 工作进程侧函数 ====================
+# 以下函数在工作进程中执行，必须是模块级函数（可被 pickle）
+
+# 工作进程当前已加载的模型版本号（与主进程的 model_generation 对比，用于热更新）
+_worker_model_generation = 0
+
+
+def _init_worker(preload: bool, model_generation: int, detector_config: Optional[Dict] = None,
+                 depth_config: Optional[Dict] = None, artifact_config: Optional[Dict] = None):
+    """工作进程初始化：设置检测器后端、立体匹配引擎和产物写盘器，预加载模型和堆垛配置"""
+    global _worker_model_generation
+    _worker_model_generation = model_generation
+    from core.detection.utils.model_registry import get_model_registry
+    if detector_config:
+        get_model_registry().configure_detector(**detector_config)
+    if depth_config:
+        from core.detection.depth.stereo_engine import configure_stereo_engine
+        configure_stereo_engine(**depth_config)
+    if artifact_config:
+        from core.detection.utils.artifact_sink import configure_artifact_sink
+        configure_artifact_sink(**artifact_config)
+    if not preload:
+        return
+    try:
+        get_model_registry().preload()
+        logger.info(f"[InferenceWorker] pid={os.getpid()} 模型预加载完成")
+    except Exception as e:
+        logger.warning(f"[InferenceWorker] pid={os.getpid()} 模型预加载失败，将在首次任务时加载: {e}")
+
+
+def _run_task(model_generation: int, fn: Callable, args: tuple, kwargs: dict):
+    """在工作进程中执行任务；模型版本落后时先重新加载模型"""
+    global _worker_model_generation
+    if model_generation > _worker_model_generation:
+        # 版本号先更新：重新加载失败时注册表缓存已清空，后续任务会按需加载
+        _worker_model_generation = model_generation
+        try:
+            from core.detection.utils.model_registry import get_model_registry
+            get_model_registry().reload()
+        except Exception as e:
+            logger.warning(f"[InferenceWorker] pid={os.getpid()} 模型重新加载失败: {e}")
+    return fn(*args, **kwargs)
+
+
+def _worker_status_task() -> Dict:
+    """返回工作进程的注册表状态（进程池启动时提交，确保工作进程提前启动并完成预加载）"""
+    from core.detection.utils.model_registry import get_model_registry
+    return {"pid": os.getpid(), **get_model_registry().status()}
+
+
+def count_boxes_task(**kwargs) -> int:
+    """工作进程中执行箱体计数（参数同 core.detection.count_boxes）"""
+    from core.detection import count_boxes
+    return count_boxes(**kwargs)
+
+
+def count_boxes_traced_task(**kwargs) -> Dict[str, Any]:
+    """工作进程中执行箱体计数并返回阶段追踪结果（参数同 core.detection.count_boxes_traced）"""
+    from core.detection import count_boxes_traced
+    return count_boxes_traced(**kwargs)
+
+
+def detect_batch_task(image_paths: List[str], batch_size: int = 8) -> List[Dict[str, Any]]:
+    """工作进程中执行批量YOLO检测（返回值同 StackProcessorFactory.detect_batch）"""
+    from core.detection.processors.factory import StackProcessorFactory
+    return StackProcessorFactory(enable_debug=False).detect_batch(image_paths, batch_size=batch_size)
+
+
+def count_batch_item_task(**kwargs) -> Dict[str, Any]:
+    """工作进程中执行单个库位的后处理（参数同 core.detection.processors.factory.count_batch_item）"""
+    from core.detection.processors.factory import count_batch_item
+    return count_batch_item(**kwargs)
+
+
+# ==================== 主进程侧执行器 ====================
+
+class InferenceExecutor:
+    """推理执行器：有界进程池 + 排队上限 + async 接口"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, preload: bool = True,
+                 detector_config: Optional[Dict] = None, depth_config: Optional[Dict] = None,
+                 artifact_config: Optional[Dict] = None):
+        """
+        :param max_workers: 工作进程数量
+        :param max_pending: 最大在途任务数（执行中 + 排队中），超出时抛出 InferenceQueueFullError
+        :param preload: 工作进程启动时是否预加载模型
+        :param detector_config: 检测器后端配置（传给 ModelRegistry.configure_detector）
+        :param depth_config: 立体匹配引擎配置（传给 configure_stereo_engine）
+        :param artifact_config: 可视化/调试图写盘配置（传给 configure_artifact_sink）
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.preload = preload
+        self.detector_config = detector_config or {}
+        self.depth_config = depth_config or {}
+        self.artifact_config = artifact_config or {}
+        self.model_generation = 0
+        # 进程池重建次数（工作进程异常退出或热更新时重建）
+        self.pool_generation = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _create_pool(self) -> Tuple[ProcessPoolExecutor, List[Future]]:
+        """创建进程池（工作进程按当前模型版本初始化），返回进程池和预加载任务；调用方需持有 self._lock"""
+        # 使用 spawn 方式创建进程，避免 fork 带有线程/CUDA 状态的网关进程
+        pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.preload, self.model_generation, self.detector_config, self.depth_config,
+                      self.artifact_config),
+        )
+        if not self.preload:
+            return pool, []
+        # 进程池按需创建进程，这里提交状态任务让所有工作进程提前启动并加载模型
+        return pool, [pool.submit(_worker_status_task) for _ in range(self.max_workers)]
+
+    def start(self) -> ProcessPoolExecutor:
+        """启动进程池（重复调用无副作用），返回当前进程池"""
+        with self._lock:
+            if self._pool is None:
+                self._pool, _ = self._create_pool()
+                logger.info(f"[InferenceExecutor] 进程池已启动: workers={self.max_workers}, "
+                            f"max_pending={self.max_pending}")
+            return self._pool
+
+    def _recycle(self, broken: Optional[ProcessPoolExecutor] = None) -> List[Future]:
+        """
+        用新进程池替换当前进程池；旧进程池不再接收任务，执行中的任务完成后工作进程退出
+
+        :param broken: 已损坏的进程池（仅当它仍是当前进程池时替换，避免同时失败的多个任务重复重建）
+        :return: 新工作进程的预加载任务（未预加载时为空）
+        """
+        with self._lock:
+            if broken is not None and self._pool is not broken:
+                return []
+            old, (self._pool, warmups) = self._pool, self._create_pool()
+            self.pool_generation += 1
+        if old is not None:
+            old.shutdown(wait=False)
+        logger.info(f"[InferenceExecutor] 进程池已重建: pool_generation={self.pool_generation}, "
+                    f"model_generation={self.model_generation}")
+        return warmups
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+            logger.info("[InferenceExecutor] 进程池已关闭")
+
+    async def submit(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        提交任务到进程池并等待结果
+
+        工作进程异常退出（如被 OOM 终止）时进程池整体不可用，重建进程池后重试一次，仍失败则抛出。
+
+        :param fn: 模块级函数（需可被 pickle）
+        :raises InferenceQueueFullError: 在途任务数达到上限
+        :raises BrokenProcessPool: 重建进程池后任务仍导致工作进程退出
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise InferenceQueueFullError(
+                    f"推理队列已满（在途任务 {self._pending}/{self.max_pending}），请稍后重试"
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in range(2):
+                pool = self.start()
+                try:
+                    return await loop.run_in_executor(
+                        pool,
+                        functools.partial(_run_task, self.model_generation, fn, args, kwargs)
+                    )
+                except BrokenProcessPool as e:
+                    logger.error(f"[InferenceExecutor] 工作进程异常退出，重建进程池 "
+                                 f"({getattr(fn, '__name__', fn)}, 第 {attempt + 1} 次): {e}")
+                    self._recycle(broken=pool)
+                    if attempt:
+                        raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def count_boxes(self, **kwargs) -> int:
+        """异步执行箱体计数（参数同 core.detection.count_boxes）"""
+        return (await self.count_boxes_traced(**kwargs))["total"]
+
+    async def count_boxes_traced(self, profile: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """
+        异步执行箱体计数，返回总箱数和各阶段追踪结果，并记录到流程指标
+
+        :param profile: 性能分析方式（可选，"cprofile" / "pyinstrument"）
+        :return: {"total": int, "trace": {"stages": [...], "profile": {...}}}
+        """
+        from services.api.shared.metrics import get_pipeline_metrics
+
+        metrics = get_pipeline_metrics()
+        try:
+            result = await self.submit(count_boxes_traced_task, profile=profile, **kwargs)
+        except InferenceQueueFullError:
+            metrics.observe_run("rejected")
+            raise
+        except Exception:
+            metrics.observe_run("failed")
+            raise
+        metrics.observe_run("success")
+        metrics.observe_stages(result["trace"]["stages"])
+        return result
+
+    async def count_boxes_batch(self, items: List[tuple], batch_size: int = 8, **factory_kwargs) -> List[Dict[str, Any]]:
+        """
+        异步批量计数（结果格式同 core.detection.count_boxes_batch，另含 rejected 字段）
+
+        YOLO批量推理占用一个工作进程，后处理按库位分发，同时在途的后处理任务不超过工作进程数。
+        某个库位的后处理因推理队列已满被拒绝时只影响该库位（rejected=True，error 为拒绝原因），
+        其他库位的结果照常返回。
+
+        :param items: [(image_path, pile_id), (image_path, pile_id, depth_image_path), ...]
+        :param batch_size: YOLO批次大小
+        :param factory_kwargs: StackProcessorFactory 的其他参数（enable_debug、output_dir 等）
+        :raises InferenceQueueFullError: 批量检测任务本身被拒绝（所有库位均未识别）
+        """
+        from core.detection.processors.factory import normalize_batch_items, merge_batch_result
+
+        items = normalize_batch_items(items)
+        detected = await self.submit(detect_batch_task, [str(item[0]) for item in items], batch_size)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def _post(item, det):
+            if det["error"] is not None:
+                return None
+            async with semaphore:
+                try:
+                    return await self.submit(
+                        count_batch_item_task,
+                        image_path=det["image_path"],
+                        pile_id=item[1],
+                        depth_image_path=str(item[2]) if item[2] else None,
+                        detections=det["detections"],
+                        **factory_kwargs
+                    )
+                except InferenceQueueFullError as e:
+                    return {"total": None, "error": str(e), "timings": {}, "trace": {}, "rejected": True}
+
+        post_results = await asyncio.gather(*[_post(item, det) for item, det in zip(items, detected)])
+        results = [
+            {**merge_batch_result(index, item, det, post), "rejected": bool(post and post.get("rejected"))}
+            for index, (item, det, post) in enumerate(zip(items, detected, post_results))
+        ]
+
+        from services.api.shared.metrics import get_pipeline_metrics
+        metrics = get_pipeline_metrics()
+        for result in results:
+            if result["rejected"]:
+                metrics.observe_run("rejected")
+                continue
+            metrics.observe_run("success" if result["error"] is None else "failed")
+            metrics.observe_stages(result["stages"])
+            # 批量YOLO在检测阶段完成（按图片均摊），不在后处理追踪中
+            if "yolo" in result["timings"]:
+                metrics.observe_timings({"yolo": result["timings"]["yolo"]})
+        return results
+
+    async def reload_models(self) -> Dict:
+        """
+        热更新模型：递增模型版本号并重建进程池
+
+        新工作进程启动时按新版本加载模型（每个工作进程恰好加载一次），之后的任务都提交到新进程池；
+        旧进程池中执行中的任务使用旧模型完成后退出。
+        """
+        self.model_generation += 1
+        workers = []
+        if self._pool is not None:
+            warmups = self._recycle()
+            workers = await asyncio.gather(*[asyncio.wrap_future(f) for f in warmups], return_exceptions=True)
+        return {
+            "model_generation": self.model_generation,
+            "pool_generation": self.pool_generation,
+            "workers": [w if isinstance(w, dict) else {"error": str(w)} for w in workers],
+        }
+
+    def status(self) -> Dict:
+        """返回执行器状态"""
+        return {
+            "running": self._pool is not None,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "model_generation": self.model_generation,
+            "pool_generation": self.pool_generation,
+            "detector_config": self.detector_config,
+            "depth_config": self.depth_config,
+            "artifact_config": self.artifact_config,
+        }
+
+
+# 全局单例实例
+_inference_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """获取全局InferenceExecutor实例（单例模式）"""
+    global _inference_executor
+    if _inference_executor is None:
+        from services.api.shared.config import (
+            INFERENCE_WORKERS,
+            INFERENCE_MAX_PENDING,
+            DETECTOR_BACKEND,
+            DETECTOR_MODEL_PATH,
+            DETECTOR_NUM_THREADS,
+            DEPTH_MODE,
+            DEPTH_SCALE,
+            DEPTH_NUM_THREADS,
+            DEPTH_CALIBRATION_PATH,
+            ARTIFACT_POLICY,
+            ARTIFACT_SAMPLE_EVERY,
+            ARTIFACT_MAX_QUEUE,
+        )
+        _inference_executor = InferenceExecutor(
+            max_workers=INFERENCE_WORKERS,
+            max_pending=INFERENCE_MAX_PENDING,
+            detector_config={
+                "backend": DETECTOR_BACKEND,
+                "model_path": DETECTOR_MODEL_PATH,
+                "num_threads": DETECTOR_NUM_THREADS,
+            },
+            depth_config={
+                "mode": DEPTH_MODE,
+                "scale": DEPTH_SCALE,
+                "num_threads": DEPTH_NUM_THREADS,
+                "calibration_path": DEPTH_CALIBRATION_PATH,
+            },
+            artifact_config={
+                "policy": ARTIFACT_POLICY,
+                "sample_every": ARTIFACT_SAMPLE_EVERY,
+                "max_queue": ARTIFACT_MAX_QUEUE,
+            }
+        )
+    return _inference_executor